@@ -16,6 +16,7 @@ rules:
       - "rbac.authorization.k8s.io"
     resources:
       - workflows
+      - workflowtemplates
       - deployments
       - deployments/scale
       - deployments/status
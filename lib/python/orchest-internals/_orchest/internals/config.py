@@ -11,6 +11,7 @@ USERDIR_JUPYTER_IMG_BUILDS = "/userdir/.orchest/jupyter-img-builds"
 USERDIR_JUPYTERLAB = "/userdir/.orchest/user-configurations/jupyterlab"
 USERDIR_KANIKO_BASE_IMAGES_CACHE = "/userdir/.orchest/kaniko-base-images-cache"
 USERDIR_BUILDKIT_CACHE = "/userdir/.orchest/buildkit-cache"
+USERDIR_JOB_SNAPSHOTS = "/userdir/.orchest/job-snapshots"
 
 DATA_DIR = "/data"
 PROJECT_DIR = "/project-dir"
@@ -116,7 +117,11 @@ DEFAULT_ENVIRONMENTS = [
 ]
 
 # memory-server
-MEMORY_SERVER_SOCK_PATH = os.path.join(PROJECT_DIR, ".orchest")
+# Directory shared by the memory-server and the kernels of an
+# interactive session, holding the objects of the memory store and its
+# control socket. It is backed by a directory on the tmpfs of the node.
+MEMORY_SERVER_DIR = "/memory-server"
+MEMORY_SERVER_HOST_DIR = "/dev/shm/orchest-memory-server/{session_uuid}"
 
 SIDECAR_PORT = 1111
 
@@ -0,0 +1,362 @@
+"""Content addressed storage of job snapshots.
+
+The files of a snapshot are stored once in a blob store, by the hash of
+their content and their permission bits, and the snapshot directory is
+made of hardlinks to the blobs. Identical files are thus shared across
+the snapshots of all jobs.
+
+Blobs are read-only, since writing a blob in place would modify the
+file in all snapshots, hence the files of snapshot directories are
+read-only as well. Their permission bits are kept in the manifest of
+the snapshot, and directories that are written to, like the directories
+of pipeline runs, are to be private copies of the snapshot that get
+these permission bits back.
+
+Every snapshot comes with a manifest listing its files, which is also
+used to avoid rehashing the files of a project that did not change
+since its last snapshot (by size and modification time). A blob that
+has been written in place regardless, e.g. by root, is not reused but
+stored again.
+
+The number of hardlinks of a blob acts as its reference count: a blob
+with a single link is only referenced by the store and can be garbage
+collected.
+
+Layout of the store::
+
+    blobs/<digest[:2]>/<digest>-<mode>
+    manifests/<group>/<snapshot_id>.json
+
+"""
+import errno
+import hashlib
+import json
+import os
+import re
+import shutil
+import stat
+import subprocess
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional
+
+_CHUNK_SIZE = 1024 * 1024
+_WRITE_BITS = stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH
+
+
+class SnapshotStore:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._blobs_dir = os.path.join(path, "blobs")
+        self._manifests_dir = os.path.join(path, "manifests")
+
+    def create_snapshot(
+        self,
+        source_dir: str,
+        snapshot_dir: str,
+        snapshot_id: str,
+        group: str,
+        use_gitignore: bool = True,
+    ) -> Dict[str, Any]:
+        """Creates a snapshot of a directory.
+
+        Args:
+            source_dir: Directory to take a snapshot of.
+            snapshot_dir: Where to create the snapshot, must not exist.
+            snapshot_id: Id of the snapshot, e.g. the job uuid.
+            group: Group of the snapshot, e.g. the project uuid.
+                Snapshots of the same group reuse the hashes of the
+                files of the latest snapshot of the group.
+            use_gitignore: If True, files matching the patterns of the
+                top-level `.gitignore` in `source_dir` are left out,
+                like `copytree`.
+
+        Returns:
+            The manifest of the snapshot.
+
+        """
+        previous_files = self._get_latest_manifest(group).get("files", {})
+
+        files = {}
+        symlinks = {}
+        os.makedirs(snapshot_dir)
+        for relpath in _list_entries(source_dir, use_gitignore):
+            source = os.path.join(source_dir, relpath)
+            target = os.path.join(snapshot_dir, relpath)
+            st = os.lstat(source)
+
+            if stat.S_ISDIR(st.st_mode):
+                os.makedirs(target, exist_ok=True)
+                os.chmod(target, stat.S_IMODE(st.st_mode))
+            elif stat.S_ISLNK(st.st_mode):
+                symlinks[relpath] = os.readlink(source)
+                os.symlink(symlinks[relpath], target)
+            elif stat.S_ISREG(st.st_mode):
+                entry = {
+                    "digest": None,
+                    "mode": stat.S_IMODE(st.st_mode),
+                    "size": st.st_size,
+                    "mtime_ns": st.st_mtime_ns,
+                }
+                previous = previous_files.get(relpath)
+                if (
+                    previous is not None
+                    and previous["size"] == entry["size"]
+                    and previous["mtime_ns"] == entry["mtime_ns"]
+                    and previous["mode"] == entry["mode"]
+                    and self._check_blob(previous)
+                ):
+                    entry["digest"] = previous["digest"]
+
+                entry["digest"] = self._link_blob(source, target, entry)
+                entry["blob_mtime_ns"] = os.stat(target).st_mtime_ns
+                files[relpath] = entry
+
+        manifest = {"files": files, "symlinks": symlinks}
+        manifest_path = self._get_manifest_path(snapshot_id, group)
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        _write_json_atomically(manifest_path, manifest)
+        return manifest
+
+    def get_manifest(self, snapshot_id: str, group: str) -> Dict[str, Any]:
+        """Gets the manifest of a snapshot, empty if it does not exist.
+
+        The "files" of the manifest map the paths of the files of the
+        snapshot to their "digest", "mode", "size" and "mtime_ns".
+        """
+        try:
+            with open(self._get_manifest_path(snapshot_id, group), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def delete_snapshot(self, snapshot_id: str, group: str) -> int:
+        """Deletes the manifest of a snapshot and collects its blobs.
+
+        Must be called after the snapshot directory, and the directories
+        hardlinking to it, have been removed.
+
+        Returns:
+            The number of blobs that have been deleted.
+
+        """
+        manifest_path = self._get_manifest_path(snapshot_id, group)
+        try:
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return 0
+
+        os.remove(manifest_path)
+        return self.collect_garbage(
+            _blob_name(entry["digest"], entry["mode"])
+            for entry in manifest["files"].values()
+        )
+
+    def delete_group(self, group: str) -> int:
+        """Deletes the manifests of a group and collects all blobs.
+
+        Returns:
+            The number of blobs that have been deleted.
+
+        """
+        shutil.rmtree(os.path.join(self._manifests_dir, group), ignore_errors=True)
+        return self.collect_garbage()
+
+    def collect_garbage(self, blobs: Optional[Iterable[str]] = None) -> int:
+        """Deletes blobs that are not referenced by any snapshot.
+
+        Args:
+            blobs: Names of the blobs to consider, all blobs if None.
+
+        Returns:
+            The number of blobs that have been deleted.
+
+        """
+        if blobs is None:
+            blobs = [
+                blob
+                for _, _, names in os.walk(self._blobs_dir)
+                for blob in names
+                if not blob.startswith(".")
+            ]
+
+        deleted = 0
+        for blob in set(blobs):
+            path = self._get_blob_path(blob)
+            try:
+                # A link that is concurrently created to the blob after
+                # this check keeps its data, since it's a hardlink.
+                if os.stat(path).st_nlink == 1:
+                    os.remove(path)
+                    deleted += 1
+            except FileNotFoundError:
+                pass
+        return deleted
+
+    def _check_blob(self, entry: Dict[str, Any]) -> bool:
+        """Checks that the blob of a manifest entry can be reused.
+
+        A blob that has been modified in place, which changes its
+        modification time, is removed from the store so that it gets
+        stored again. Its links keep their, modified, data.
+
+        Returns:
+            False if the blob does not exist or has been modified.
+
+        """
+        blob_path = self._get_blob_path(_blob_name(entry["digest"], entry["mode"]))
+        try:
+            st = os.stat(blob_path)
+        except FileNotFoundError:
+            return False
+
+        if st.st_size == entry["size"] and st.st_mtime_ns == entry.get("blob_mtime_ns"):
+            return True
+        try:
+            os.remove(blob_path)
+        except FileNotFoundError:
+            pass
+        return False
+
+    def _link_blob(self, source: str, target: str, entry: Dict[str, Any]) -> str:
+        """Hardlinks target to the blob of source, storing it if needed.
+
+        Returns:
+            The digest of the content of the source.
+
+        """
+        digest = entry["digest"]
+        while True:
+            if digest is None:
+                digest = self._store_blob(source, entry["mode"])
+
+            blob_path = self._get_blob_path(_blob_name(digest, entry["mode"]))
+            try:
+                os.link(blob_path, target)
+            except FileNotFoundError:
+                # Not stored yet, or concurrently garbage collected.
+                digest = self._store_blob(source, entry["mode"])
+                continue
+            except OSError as e:
+                # Reached the max number of links of the filesystem.
+                if e.errno != errno.EMLINK:
+                    raise
+                shutil.copy2(blob_path, target)
+            return digest
+
+    def _store_blob(self, source: str, mode: int) -> str:
+        """Stores the content of source as a blob.
+
+        Returns:
+            The digest of the content of the source.
+
+        """
+        os.makedirs(self._blobs_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".", dir=self._blobs_dir)
+        try:
+            h = hashlib.sha256()
+            with open(source, "rb") as src, os.fdopen(fd, "wb") as dst:
+                for chunk in iter(lambda: src.read(_CHUNK_SIZE), b""):
+                    h.update(chunk)
+                    dst.write(chunk)
+            shutil.copystat(source, tmp_path)
+            os.chmod(tmp_path, mode & ~_WRITE_BITS)
+
+            digest = h.hexdigest()
+            blob_path = self._get_blob_path(_blob_name(digest, mode))
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            try:
+                # Unlike a rename, does not replace a blob that has been
+                # concurrently stored and might already be linked to.
+                os.link(tmp_path, blob_path)
+            except FileExistsError:
+                # Blobs stored before blobs were read-only could have
+                # been written in place, replace them.
+                if os.stat(blob_path).st_mode & _WRITE_BITS:
+                    os.replace(tmp_path, blob_path)
+        finally:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+        return digest
+
+    def _get_latest_manifest(self, group: str) -> Dict[str, Any]:
+        group_dir = os.path.join(self._manifests_dir, group)
+        try:
+            paths = [entry.path for entry in os.scandir(group_dir)]
+        except FileNotFoundError:
+            return {}
+
+        for path in sorted(paths, key=_get_mtime, reverse=True):
+            try:
+                with open(path, "r") as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                continue
+        return {}
+
+    def _get_manifest_path(self, snapshot_id: str, group: str) -> str:
+        return os.path.join(self._manifests_dir, group, f"{snapshot_id}.json")
+
+    def _get_blob_path(self, blob: str) -> str:
+        return os.path.join(self._blobs_dir, blob[:2], blob)
+
+
+def _blob_name(digest: str, mode: int) -> str:
+    # The mode is part of the name since it's shared by all the links
+    # to a blob.
+    return f"{digest}-{mode:o}"
+
+
+def _get_mtime(path: str) -> float:
+    try:
+        return os.stat(path).st_mtime
+    except FileNotFoundError:
+        return 0
+
+
+def _write_json_atomically(path: str, data: Any) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _list_entries(source_dir: str, use_gitignore: bool) -> List[str]:
+    """Lists the entries of a directory, relative to the directory.
+
+    Parents are listed before their children.
+    """
+    if use_gitignore:
+        return _list_entries_rsync(source_dir)
+
+    entries = []
+    for root, dirs, files in os.walk(source_dir):
+        relroot = os.path.relpath(root, source_dir)
+        for name in dirs + files:
+            entries.append(os.path.normpath(os.path.join(relroot, name)))
+    return entries
+
+
+def _list_entries_rsync(source_dir: str) -> List[str]:
+    # Lists the entries through an rsync dry-run so that the patterns
+    # of the `.gitignore` are interpreted exactly like in `copytree`.
+    if not source_dir.endswith("/"):
+        source_dir += "/"
+    cmd = ["rsync", "-a", "--dry-run", "--out-format=%n"]
+    if os.path.isfile(f"{source_dir}.gitignore"):
+        cmd += [f"--exclude-from={source_dir}.gitignore"]
+    with tempfile.TemporaryDirectory() as target:
+        output = subprocess.run(
+            cmd + [source_dir, target], stdout=subprocess.PIPE, check=True
+        ).stdout
+
+    entries = []
+    for line in output.splitlines():
+        # rsync escapes non printable characters as \#ooo.
+        line = re.sub(rb"\\#([0-7]{3})", lambda m: bytes([int(m.group(1), 8)]), line)
+        relpath = os.path.normpath(os.fsdecode(line))
+        if relpath != ".":
+            entries.append(relpath)
+    return entries
@@ -0,0 +1,108 @@
+"""Benchmark the compression of outputs written to disk.
+
+Outputs a DataFrame, both as a ``pa.Table`` and pickled, with every
+codec supported by ``output_to_disk`` and reports the size on disk and
+the write and read throughput, in MB/s of the DataFrame in memory.
+Writes are synced to disk and the files are dropped from the page cache
+before being read.
+
+The data directory of Orchest lives on the userdir volume, which can be
+network backed. To compare codecs on such a volume, either run the
+benchmark on a throttled disk, e.g. in a container started with
+``--device-write-bps`` and ``--device-read-bps``, or pass
+``--throttle-mbps`` to add the time the files would take to transfer at
+the given bandwidth.
+
+Usage (from the ``orchest-sdk/python`` directory):
+    python -m benchmarks.bench_compression --rows 1000000 \\
+        --throttle-mbps 100 --dir /userdir/.orchest
+
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from orchest import transfer
+
+
+def _generate_df(n_rows: int) -> pd.DataFrame:
+    # Typical tabular data: ids, categories and measurements.
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "id": np.arange(n_rows),
+            "category": rng.choice(["a", "b", "c", "d"], size=n_rows),
+            "count": rng.integers(0, 100, size=n_rows),
+            "value": rng.normal(size=n_rows).round(2),
+        }
+    )
+
+
+def _drop_from_page_cache(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+def _run(data, full_path: str, compression, throttle_mbps):
+    start = time.perf_counter()
+    obj, serialization = transfer._serialize(data, compression=compression)
+    transfer._output_to_disk(obj, full_path, serialization, compression)
+    file_path = transfer._get_data_file_path(full_path, serialization.name, compression)
+    _drop_from_page_cache(file_path)
+    write_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    transfer._deserialize_output_disk(
+        full_path, serialization.name, compression=compression
+    )
+    read_time = time.perf_counter() - start
+
+    size = os.path.getsize(file_path)
+    if throttle_mbps is not None:
+        transfer_time = size / 2 ** 20 / throttle_mbps
+        write_time += transfer_time
+        read_time += transfer_time
+    os.remove(file_path)
+    return size, write_time, read_time
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--throttle-mbps", type=float, default=None)
+    parser.add_argument("--dir", default=None)
+    args = parser.parse_args()
+
+    df = _generate_df(args.rows)
+    datasets = {"table": pa.Table.from_pandas(df), "pickle": df}
+    raw_size = df.memory_usage(deep=True).sum() / 2 ** 20
+
+    print(f"{'data':>8}{'codec':>7}{'MB':>8}{'w MB/s':>9}{'r MB/s':>9}")
+    data_dir = tempfile.mkdtemp(dir=args.dir)
+    try:
+        full_path = os.path.join(data_dir, "step")
+        for name, data in datasets.items():
+            for compression in [None, *transfer._COMPRESSIONS]:
+                size, write_time, read_time = _run(
+                    data, full_path, compression, args.throttle_mbps
+                )
+                print(
+                    f"{name:>8}{compression or '-':>7}{size / 2 ** 20:>8.1f}"
+                    f"{raw_size / write_time:>9.0f}{raw_size / read_time:>9.0f}"
+                )
+    finally:
+        shutil.rmtree(data_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,7 +17,7 @@ from orchest._version import __version__
 from orchest.config import Config
 from orchest.parameters import get_pipeline_param, get_step_param
 from orchest.services import get_service, get_services
-from orchest.transfer import get_inputs, output
+from orchest.transfer import get_inputs, output, output_stream
 
 orchest_version = __os.getenv("ORCHEST_VERSION")
 if orchest_version is not None:
@@ -32,21 +32,26 @@ class Config:
         "/project-dir/.orchest/pipelines/" + PIPELINE_UUID + "/data/{step_uuid}"
     )
 
-    # Only fill the Plasma store to 95% capacity. Otherwise the
-    # additional messages for eviction cannot be inserted. NOTE:
-    # trying to use 100% might therefore raise a MemoryError.
-    MAX_RELATIVE_STORE_CAPACITY = 0.95
-
-    # Where all the functions will look for the plasma.sock file. Note
-    # however, the plasma.sock file is not created by the sdk. This
-    # configuration value only specifies where the sdk will look for the
-    # socket to connect to the plasma store.
-    STORE_SOCKET_NAME = "/project-dir/.orchest/plasma.sock"
+    # Where all the functions will look for the control socket of the
+    # memory store, see ``orchest.memory_store``. Note however, the
+    # socket is not created by the sdk but by the memory-server, which
+    # shares the directory with the kernels of interactive sessions.
+    STORE_SOCKET_NAME = "/memory-server/memory-server.sock"
 
     # For transfer.py
     IDENTIFIER_SERIALIZATION = 1
     IDENTIFIER_EVICTION = 2
     CONN_NUM_RETRIES = 20
+    # Max number of threads used by ``get_inputs()`` to concurrently
+    # retrieve the outputs of the parent steps.
+    GET_INPUTS_MAX_WORKERS = 8
+    # Number of seconds the path of the notebook of a kernel is cached
+    # for, to resolve the step UUID of the kernel.
+    NOTEBOOK_PATH_CACHE_TTL = 10
+    # Buffers of pickled data (e.g. of NumPy arrays) of at least this
+    # size are written to disk out-of-band, see
+    # ``Serialization.PICKLE_OOB``.
+    PICKLE_OOB_MIN_BUFFER_SIZE = 64 * 1024
     # Separator for the metadata related to stored data, both to disk
     # and to memory.
     __METADATA_SEPARATOR__ = "; "
@@ -0,0 +1,489 @@
+"""Shared memory object store to pass data between steps in memory.
+
+Objects are files in a directory on a tmpfs, e.g. on ``/dev/shm``,
+that is shared by the steps and the store. Steps write the objects
+directly to the directory and memory map them to read them, which
+makes getting data from memory zero-copy. The store itself only keeps
+track of the objects through a small control socket: it reserves
+memory for new objects, seals them once they are written, serves their
+metadata and gets notified of their consumers, to evict them.
+
+The control protocol is line delimited JSON. Every request is an
+object with an ``op`` and its arguments, every reply either contains
+the ``result`` of the request or an ``error``.
+
+When the store runs out of memory, it can spill the objects that were
+read the least recently to disk, in the format of
+:func:`orchest.transfer.output_to_disk`, so that steps transparently
+get them from disk instead.
+
+"""
+import collections
+import contextlib
+import json
+import logging
+import os
+import re
+import shutil
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from orchest import error
+
+logger = logging.getLogger(__name__)
+_OBJECT_ID_REGEX = re.compile(r"^[\w\-]+$")
+
+# Errors that are passed from the store to the client.
+_ERRORS = {
+    "MemoryError": MemoryError,
+    "ObjectNotFoundError": error.ObjectNotFoundError,
+    "ValueError": ValueError,
+}
+
+
+class _Object:
+    def __init__(self, path: str, size: int, metadata: str) -> None:
+        self.path = path
+        self.size = size
+        self.metadata = metadata
+
+
+class ObjectStore:
+    """Keeps track of the objects in the store directory.
+
+    Args:
+        store_dir: Directory, on a tmpfs, in which objects are stored.
+        capacity: Max total size of the objects in bytes.
+        on_consumed: Called with the ID of an object and the consumer
+            that read it. Is used by the memory-server to evict
+            objects once all their consumers have read them.
+        on_sealed: Called with the ID of an object once it is sealed,
+            i.e. once a new object is available under the ID. Is used
+            by the memory-server to count the consumers of every
+            object anew.
+        spill: If ``True``, objects are spilled to disk, the least
+            recently read first, to make room for new objects. The ID
+            of an object has to be the UUID of the step that output it.
+
+    """
+
+    def __init__(
+        self,
+        store_dir: str,
+        capacity: int,
+        on_consumed: Optional[Callable[[str, str], None]] = None,
+        spill: bool = False,
+        on_sealed: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        self.store_dir = store_dir
+        self.capacity = capacity
+        self.on_consumed = on_consumed
+        self.on_sealed = on_sealed
+        self.spill = spill
+
+        self._lock = threading.Lock()
+        # Ordered from least to most recently read, or sealed.
+        self._objects: "collections.OrderedDict[str, _Object]" = (
+            collections.OrderedDict()
+        )
+        # Memory reserved for objects that are being written, by path.
+        self._reservations: Dict[str, int] = {}
+        # IDs of the objects that are being spilled to disk.
+        self._spilling: Set[str] = set()
+        self._used = 0
+        self._counters = {"hits": 0, "misses": 0, "spills": 0, "spilled_bytes": 0}
+
+        os.makedirs(store_dir, exist_ok=True)
+
+    def create(self, obj_id: str, size: int) -> str:
+        """Reserves memory for a new object.
+
+        The memory of the object it replaces, if any, is considered
+        free since it is deleted once the new object is sealed.
+
+        Returns:
+            The path the object has to be written to.
+
+        Raises:
+            MemoryError: If the object does not fit in the store, even
+                after spilling objects to disk.
+
+        """
+        if not _OBJECT_ID_REGEX.match(obj_id):
+            raise ValueError(f"Invalid object ID: {obj_id}.")
+
+        with self._lock:
+            victims = self._select_spill_victims(obj_id, size)
+            if not victims:
+                return self._reserve(obj_id, size)
+
+        # Objects are copied to disk outside of the lock, so that other
+        # requests are not blocked in the meantime.
+        self._spill(victims)
+        with self._lock:
+            return self._reserve(obj_id, size)
+
+    def seal(self, obj_id: str, path: str, metadata: str) -> None:
+        """Makes a written object available, replacing the previous
+        one."""
+        with self._lock:
+            reserved = self._reservations.pop(path, None)
+            if reserved is None:
+                raise ValueError(f"No object is being created at {path}.")
+
+            # The actual size of the object takes precedence over the
+            # reservation.
+            self._used -= reserved
+            try:
+                size = os.path.getsize(path)
+            except FileNotFoundError:
+                raise error.ObjectNotFoundError(f"{path} has not been written.")
+            self._used += size
+
+            previous = self._objects.pop(obj_id, None)
+            self._objects[obj_id] = _Object(path, size, metadata)
+            if previous is not None:
+                self._remove(previous)
+
+        # Outside of the lock, since the callback can delete objects.
+        if self.on_sealed is not None:
+            self.on_sealed(obj_id)
+
+    def abort(self, path: str) -> None:
+        """Releases the memory reserved for an object being created."""
+        with self._lock:
+            reserved = self._reservations.pop(path, None)
+            if reserved is None:
+                return
+            self._used -= reserved
+        _remove_file(path)
+
+    def get(self, obj_id: str) -> Tuple[str, str]:
+        """Gets the path and metadata of an object.
+
+        Raises:
+            ObjectNotFoundError: If the object is not in the store.
+
+        """
+        with self._lock:
+            obj = self._objects.get(obj_id)
+            if obj is None:
+                self._counters["misses"] += 1
+                raise error.ObjectNotFoundError(
+                    f'Object "{obj_id}" is not in the store.'
+                )
+            self._counters["hits"] += 1
+            self._objects.move_to_end(obj_id)
+        return obj.path, obj.metadata
+
+    def consumed(self, obj_id: str, consumer: str) -> None:
+        """Notifies that an object was read by the given consumer."""
+        if self.on_consumed is not None:
+            self.on_consumed(obj_id, consumer)
+
+    def delete(self, obj_ids: Iterable[str]) -> None:
+        """Deletes objects, objects that are not in the store are
+        ignored."""
+        with self._lock:
+            for obj_id in obj_ids:
+                obj = self._objects.pop(obj_id, None)
+                if obj is not None:
+                    self._remove(obj)
+
+    def stats(self) -> Dict[str, Any]:
+        """Gets the usage of the store.
+
+        Besides the capacity, used memory and number of objects, the
+        stats contain the number of ``hits`` and ``misses`` of reads,
+        and the number of ``spills`` to disk and ``spilled_bytes``,
+        which are used to size the store.
+
+        """
+        with self._lock:
+            return {
+                "capacity": self.capacity,
+                "used": self._used,
+                "objects": len(self._objects),
+                **self._counters,
+            }
+
+    def clear(self) -> None:
+        """Deletes all objects and the files in the store directory."""
+        with self._lock:
+            self._objects = collections.OrderedDict()
+            self._reservations = {}
+            self._used = 0
+            for entry in os.scandir(self.store_dir):
+                _remove_file(entry.path)
+
+    def _get_available(self, obj_id: str) -> int:
+        available = self.capacity - self._used
+        if obj_id in self._objects:
+            available += self._objects[obj_id].size
+        return available
+
+    def _reserve(self, obj_id: str, size: int) -> str:
+        available = self._get_available(obj_id)
+        if size > available:
+            raise MemoryError(
+                f"Object of {size} bytes does not fit in memory, "
+                f"{available} bytes are available."
+            )
+
+        path = os.path.join(self.store_dir, f"{obj_id}.{uuid.uuid4().hex}")
+        self._reservations[path] = size
+        self._used += size
+        return path
+
+    def _select_spill_victims(
+        self, obj_id: str, size: int
+    ) -> List[Tuple[str, _Object]]:
+        """Selects the objects to spill to make room for an object.
+
+        The least recently read objects are selected first, and marked
+        as spilling so that they are not selected concurrently. Nothing
+        is selected if spilling would not free enough memory.
+        """
+        needed = size - self._get_available(obj_id)
+        if not self.spill or needed <= 0:
+            return []
+
+        candidates = [
+            (candidate_id, obj)
+            for candidate_id, obj in self._objects.items()
+            if candidate_id != obj_id and candidate_id not in self._spilling
+        ]
+        if sum(obj.size for _, obj in candidates) < needed:
+            return []
+
+        victims = []
+        freed = 0
+        for candidate_id, obj in candidates:
+            if freed >= needed:
+                break
+            victims.append((candidate_id, obj))
+            freed += obj.size
+        self._spilling.update(victim_id for victim_id, _ in victims)
+        return victims
+
+    def _spill(self, victims: List[Tuple[str, _Object]]) -> None:
+        """Spills the selected objects to disk, without the lock held.
+
+        Stops at the first object that fails to be spilled.
+        """
+        # Local import, since the transfer module depends on this one.
+        from orchest import transfer
+
+        try:
+            for obj_id, obj in victims:
+                try:
+                    transfer._spill_to_disk(obj_id, obj.path, obj.metadata)
+                except OSError as e:
+                    logger.warning("Failed to spill %s to disk: %s", obj_id, e)
+                    return
+
+                with self._lock:
+                    self._spilling.discard(obj_id)
+                    # The object could have been replaced or deleted
+                    # while it was spilled.
+                    if self._objects.get(obj_id) is not obj:
+                        continue
+                    del self._objects[obj_id]
+                    self._counters["spills"] += 1
+                    self._counters["spilled_bytes"] += obj.size
+                    self._remove(obj)
+        finally:
+            with self._lock:
+                self._spilling.difference_update(obj_id for obj_id, _ in victims)
+
+    def _remove(self, obj: _Object) -> None:
+        # Steps that memory mapped the object can keep reading it, its
+        # memory is only freed once they unmap it.
+        self._used -= obj.size
+        _remove_file(obj.path)
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        store: ObjectStore = self.server.store
+        # Objects created through this connection that still have to
+        # be sealed, to release their memory if the client goes away.
+        pending = set()
+        try:
+            for line in self.rfile:
+                try:
+                    request = json.loads(line)
+                    result = self._handle_request(store, request, pending)
+                    reply = {"result": result}
+                except Exception as e:
+                    kind = type(e).__name__
+                    if kind not in _ERRORS:
+                        kind = "ValueError"
+                    reply = {"error": kind, "message": str(e)}
+                self.wfile.write(json.dumps(reply).encode() + b"\n")
+        finally:
+            for path in pending:
+                store.abort(path)
+
+    @staticmethod
+    def _handle_request(store: ObjectStore, request: Dict[str, Any], pending) -> Any:
+        op = request["op"]
+        if op == "create":
+            path = store.create(request["id"], request["size"])
+            pending.add(path)
+            return path
+        elif op == "seal":
+            pending.discard(request["path"])
+            return store.seal(request["id"], request["path"], request["metadata"])
+        elif op == "abort":
+            pending.discard(request["path"])
+            return store.abort(request["path"])
+        elif op == "get":
+            return store.get(request["id"])
+        elif op == "consumed":
+            return store.consumed(request["id"], request["consumer"])
+        elif op == "delete":
+            return store.delete(request["ids"])
+        elif op == "stats":
+            return store.stats()
+        raise ValueError(f"Unknown operation: {op}.")
+
+
+class MemoryStoreServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serves the control socket of an :class:`ObjectStore`."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_name: str, store: ObjectStore) -> None:
+        self.store = store
+        super().__init__(socket_name, _RequestHandler)
+
+
+@contextlib.contextmanager
+def start_memory_store(
+    capacity: int,
+    store_dir: Optional[str] = None,
+    socket_name: Optional[str] = None,
+    spill: bool = False,
+) -> Iterator[Tuple[str, ObjectStore]]:
+    """Starts a memory store in a background thread.
+
+    Args:
+        capacity: The capacity of the store in bytes.
+        store_dir: Directory to store the objects in, a temporary
+            directory on ``/dev/shm`` if ``None``.
+        socket_name: Path of the control socket, created in the
+            store directory if ``None``.
+        spill: Whether objects are spilled to disk when the store is
+            out of memory, see :class:`ObjectStore`.
+
+    Yields:
+        Socket name of the store and the store.
+
+    """
+    tmp_dir = None
+    if store_dir is None:
+        shm = "/dev/shm" if os.path.isdir("/dev/shm") else None
+        tmp_dir = store_dir = tempfile.mkdtemp(prefix="orchest-memory-store-", dir=shm)
+    if socket_name is None:
+        socket_name = os.path.join(store_dir, "store.sock")
+
+    store = ObjectStore(os.path.join(store_dir, "objects"), capacity, spill=spill)
+    server = MemoryStoreServer(socket_name, store)
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    )
+    thread.start()
+    try:
+        yield socket_name, store
+    finally:
+        server.shutdown()
+        server.server_close()
+        store.clear()
+        _remove_file(socket_name)
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+class MemoryStoreClient:
+    """Client of the control socket of a memory store.
+
+    Args:
+        socket_name: Path of the control socket of the store.
+        num_retries: Number of times to retry to connect if the store
+            is not accepting connections yet.
+
+    Raises:
+        OSError: If the client could not connect to the store.
+
+    """
+
+    def __init__(self, socket_name: str, num_retries: int = 0) -> None:
+        for attempt in range(num_retries + 1):
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                self._sock.connect(socket_name)
+                break
+            except (ConnectionRefusedError, FileNotFoundError):
+                # The store might still be starting up.
+                self._sock.close()
+                if attempt == num_retries:
+                    raise
+                time.sleep(0.1)
+            except OSError:
+                self._sock.close()
+                raise
+        self._file = self._sock.makefile("rwb")
+
+    def create(self, obj_id: str, size: int) -> str:
+        return self._request("create", id=obj_id, size=size)
+
+    def seal(self, obj_id: str, path: str, metadata: str) -> None:
+        self._request("seal", id=obj_id, path=path, metadata=metadata)
+
+    def abort(self, path: str) -> None:
+        self._request("abort", path=path)
+
+    def get(self, obj_id: str) -> Tuple[str, str]:
+        path, metadata = self._request("get", id=obj_id)
+        return path, metadata
+
+    def consumed(self, obj_id: str, consumer: str) -> None:
+        self._request("consumed", id=obj_id, consumer=consumer)
+
+    def delete(self, obj_ids: List[str]) -> None:
+        self._request("delete", ids=obj_ids)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._request("stats")
+
+    def close(self) -> None:
+        self._file.close()
+        self._sock.close()
+
+    def _request(self, op: str, **kwargs) -> Any:
+        try:
+            self._file.write(json.dumps({"op": op, **kwargs}).encode() + b"\n")
+            self._file.flush()
+            line = self._file.readline()
+        except OSError as e:
+            raise error.OrchestNetworkError(f"Lost connection to the store: {e}.")
+        if not line:
+            raise error.OrchestNetworkError("Lost connection to the store.")
+
+        reply = json.loads(line)
+        if "error" in reply:
+            raise _ERRORS[reply["error"]](reply["message"])
+        return reply["result"]
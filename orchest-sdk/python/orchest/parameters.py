@@ -4,6 +4,7 @@ Handle to parameters that are stored in the corresponding pipeline
 definition file, e.g. ``pipeline.orchest``.
 
 """
+import copy
 from typing import Any, Optional, Tuple
 
 from orchest.error import StepUUIDResolveError
@@ -28,7 +29,8 @@ def get_params() -> Tuple[dict, dict]:
     """
     pipeline = get_pipeline()
     step = _get_current_step(pipeline)
-    return step.get_params(), pipeline.get_params()
+    # Copied since the pipeline is cached.
+    return copy.deepcopy((step.get_params(), pipeline.get_params()))
 
 
 def get_step_param(name: str, default: Optional[Any] = None) -> Any:
@@ -43,7 +45,7 @@ def get_step_param(name: str, default: Optional[Any] = None) -> Any:
     pipeline = get_pipeline()
     step = _get_current_step(pipeline)
     params = step.get_params()
-    return params.get(name, default)
+    return copy.deepcopy(params.get(name, default))
 
 
 def get_pipeline_param(name: str, default: Optional[Any] = None) -> Any:
@@ -57,4 +59,4 @@ def get_pipeline_param(name: str, default: Optional[Any] = None) -> Any:
     """
     pipeline = get_pipeline()
     params = pipeline.get_params()
-    return params.get(name, default)
+    return copy.deepcopy(params.get(name, default))
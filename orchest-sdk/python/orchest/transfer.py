@@ -1,20 +1,37 @@
 """Transfer mechanisms to output data and get data."""
+import hashlib
 import json
+import mmap
 import os
 import pickle
+import shutil
+import struct
 import warnings
+import weakref
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 from enum import Enum
-from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
 import pyarrow as pa
-import pyarrow.plasma as plasma
 
 from orchest import error
 from orchest.config import Config
+from orchest.memory_store import MemoryStoreClient
 from orchest.pipeline import Pipeline
-from orchest.utils import get_step_uuid
+from orchest.utils import get_pipeline, get_step_uuid
 
 
 class Serialization(Enum):
@@ -25,12 +42,15 @@ class Serialization(Enum):
         * ``ARROW_TABLE``
         * ``ARROW_BATCH``
         * ``PICKLE``
+        * ``PICKLE_OOB``: pickle protocol 5 with its large buffers (e.g.
+          of NumPy arrays) stored out-of-band, requires Python 3.8+.
 
     """
 
     ARROW_TABLE = 0
     ARROW_BATCH = 1
     PICKLE = 2
+    PICKLE_OOB = 3
 
 
 _MULTIPLE_DATA_TRANSFER_CALLS_WARNING_DOCS_REFERENCE = (
@@ -116,6 +136,21 @@ def _check_data_name_validity(name: Optional[str]):
         )
 
 
+def _get_pipeline() -> Pipeline:
+    """Gets the (cached) pipeline from its definition file.
+
+    Raises:
+        PipelineDefinitionNotFoundError: If the pipeline definition file
+            could not be found.
+    """
+    try:
+        return get_pipeline()
+    except FileNotFoundError:
+        raise error.PipelineDefinitionNotFoundError(
+            f"Could not open {Config.PIPELINE_DEFINITION_PATH}."
+        )
+
+
 def _interpret_metadata(metadata: str) -> Tuple[str, str, str]:
     """Interpret and return Orchest SDK metadata.
 
@@ -127,7 +162,8 @@ def _interpret_metadata(metadata: str) -> Tuple[str, str, str]:
             , in the case of 4 elements, only the last 3 elements are
             considered. Those three strings must be, in order: a valid
             string representing a datetime (utc, ISO format), the string
-            representation of a member of the Serialization enum, any
+            representation of a member of the Serialization enum,
+            optionally suffixed by ``.<codec>`` for compressed data, any
             string.
 
     Raises:
@@ -168,12 +204,19 @@ def _interpret_metadata(metadata: str) -> Tuple[str, str, str]:
             # user is manually writing the data passing.
             pass
 
-        # check serialization for correctness
-        if serialization not in [
-            Serialization.ARROW_TABLE.name,
-            Serialization.ARROW_BATCH.name,
-            Serialization.PICKLE.name,
-        ]:
+        # check serialization for correctness, it is suffixed by the
+        # codec in case the data was compressed.
+        base_serialization, _, compression = serialization.partition(".")
+        if (
+            base_serialization
+            not in [
+                Serialization.ARROW_TABLE.name,
+                Serialization.ARROW_BATCH.name,
+                Serialization.PICKLE.name,
+                Serialization.PICKLE_OOB.name,
+            ]
+            or (compression and compression not in _COMPRESSIONS)
+        ):
             raise error.InvalidMetaDataError(
                 f"Metadata {metadata} has an "
                 f"invalid serialization ({serialization})."
@@ -186,49 +229,168 @@ def _interpret_metadata(metadata: str) -> Tuple[str, str, str]:
         )
 
 
-class _PlasmaConnector:
-    """Manages the connection to the plasma in-memory store.
+@contextmanager
+def _connect_to_memory_store() -> Iterator[MemoryStoreClient]:
+    """Connects to the in-memory object store.
 
-    Allows for only one connection to make sure the different methods
-    don't all try to connect to the store individually.
+    Every call opens its own connection, which is cheap for a local
+    socket, so that the store can be restarted and the connection be
+    used from multiple threads without further management.
 
+    Yields:
+        A client of the memory store.
+
+    Raises:
+        OrchestNetworkError: Could not connect to the
+            ``Config.STORE_SOCKET_NAME``, because it does not exist.
+            Which might be because the specified value was wrong or the
+            store died.
     """
+    try:
+        client = MemoryStoreClient(
+            Config.STORE_SOCKET_NAME, num_retries=Config.CONN_NUM_RETRIES
+        )
+    except OSError:
+        raise error.OrchestNetworkError("Failed to connect to in-memory object store.")
 
-    _client: plasma.PlasmaClient = None
+    try:
+        yield client
+    finally:
+        client.close()
 
-    @property
-    def client(self):
-        """Connects to the plasma store if not already connected.
 
-        Returns:
-            A plasma client.
+# Layout of the files of the ``PICKLE_OOB`` serialization:
+#
+#     header: magic, size of the pickle, number of buffers
+#     segment table: (offset, size) of every buffer
+#     pickle
+#     buffers, each starting at an offset aligned to _OOB_ALIGNMENT
+#
+# so that the buffers can be memory mapped as is when reading the file.
+_OOB_MAGIC = b"ORCHOOB1"
+_OOB_HEADER = struct.Struct("<8sQQ")
+_OOB_SEGMENT = struct.Struct("<QQ")
+_OOB_ALIGNMENT = 64
 
-        Raises:
-            MemoryOutputNotFoundError: If output from `step_uuid` cannot
-                be found.
-            OrchestNetworkError: Could not connect to the
-                ``Config.STORE_SOCKET_NAME``, because it does not exist.
-                Which might be because the specified value was wrong or
-                the store died.
-        """
-        if self._client is not None:
-            return self._client
+# ``pickle.PickleBuffer`` and protocol 5 were added in Python 3.8.
+_PICKLE_OOB_SUPPORTED = hasattr(pickle, "PickleBuffer")
 
+# Codecs with which outputs can be compressed on disk. Arrow data is
+# written with compressed IPC buffers, pickles as a compressed stream.
+_COMPRESSIONS = ["lz4", "zstd"]
+
+
+class _OutOfBandPickle:
+    """A protocol 5 pickle along with its out-of-band buffers."""
+
+    def __init__(self, pickled: bytes, buffers: List[memoryview]) -> None:
+        self.pickled = pickled
+        self.buffers = buffers
+
+
+def _pickle_out_of_band(data: Any) -> Optional[_OutOfBandPickle]:
+    """Pickles data, keeping its large buffers out-of-band.
+
+    Returns:
+        ``None`` if the data has no buffer large enough to be kept
+        out-of-band.
+
+    """
+    buffers = []
+
+    def buffer_callback(buffer) -> bool:
+        # Returning a true value serializes the buffer in-band.
         try:
-            self._client = plasma.connect(
-                Config.STORE_SOCKET_NAME, num_retries=Config.CONN_NUM_RETRIES
-            )
-        except OSError:
-            raise error.OrchestNetworkError(
-                "Failed to connect to in-memory object store."
-            )
+            raw = buffer.raw()
+        except BufferError:
+            # Non-contiguous buffers can't be written as is.
+            return True
+        if raw.nbytes < Config.PICKLE_OOB_MIN_BUFFER_SIZE:
+            return True
+        buffers.append(raw)
+        return False
+
+    pickled = pickle.dumps(data, protocol=5, buffer_callback=buffer_callback)
+    if not buffers:
+        return None
+    return _OutOfBandPickle(pickled, buffers)
+
+
+def _align(offset: int) -> int:
+    return -(-offset // _OOB_ALIGNMENT) * _OOB_ALIGNMENT
+
+
+def _get_out_of_band_segments(
+    obj: _OutOfBandPickle,
+) -> Tuple[List[Tuple[int, int]], int]:
+    """Returns the (offset, size) of the buffers and the file size."""
+    segments = []
+    offset = _OOB_HEADER.size + len(obj.buffers) * _OOB_SEGMENT.size + len(obj.pickled)
+    for buffer in obj.buffers:
+        offset = _align(offset)
+        segments.append((offset, buffer.nbytes))
+        offset += buffer.nbytes
+    return segments, offset
+
+
+def _write_out_of_band_pickle(f, obj: _OutOfBandPickle) -> None:
+    segments, _ = _get_out_of_band_segments(obj)
+    position = _OOB_HEADER.size + len(obj.buffers) * _OOB_SEGMENT.size
+
+    f.write(_OOB_HEADER.pack(_OOB_MAGIC, len(obj.pickled), len(obj.buffers)))
+    for segment in segments:
+        f.write(_OOB_SEGMENT.pack(*segment))
+    f.write(obj.pickled)
+    position += len(obj.pickled)
+
+    # NOTE: the buffers are written directly, without being copied.
+    for (offset, size), buffer in zip(segments, obj.buffers):
+        f.write(b"\0" * (offset - position))
+        f.write(buffer)
+        position = offset + size
+
+
+def _read_out_of_band_pickle(file_path: str) -> Any:
+    with open(file_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < _OOB_HEADER.size:
+            raise pickle.UnpicklingError(f"{file_path} is truncated.")
+        # A private (copy-on-write) mapping so that the deserialized
+        # objects, e.g. NumPy arrays, are writable without the file
+        # being copied to memory nor modified.
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    # The memory map stays open as long as objects reference it.
+    view = memoryview(mapped)
+    magic, pickle_size, n_buffers = _OOB_HEADER.unpack_from(view)
+    if magic != _OOB_MAGIC:
+        raise pickle.UnpicklingError(f"{file_path} has an invalid header.")
+
+    buffers = []
+    for i in range(n_buffers):
+        offset, size = _OOB_SEGMENT.unpack_from(
+            view, _OOB_HEADER.size + i * _OOB_SEGMENT.size
+        )
+        buffers.append(view[offset : offset + size])
 
-        return self._client
+    start = _OOB_HEADER.size + n_buffers * _OOB_SEGMENT.size
+    return pickle.loads(view[start : start + pickle_size], buffers=buffers)
+
+
+def _check_compression(compression: Optional[str]) -> None:
+    if compression is None:
+        return
+
+    if compression not in _COMPRESSIONS:
+        raise ValueError(
+            f"Compression should be one of {_COMPRESSIONS}, got '{compression}'."
+        )
+    if not pa.Codec.is_available(compression):
+        raise ValueError(f"Compression '{compression}' is unavailable in pyarrow.")
 
 
 def _serialize(
-    data: Any,
-) -> Tuple[bytes, Serialization]:
+    data: Any, out_of_band: bool = False, compression: Optional[str] = None
+) -> Tuple[Any, Serialization]:
     """Serializes an object to a ``pa.Buffer``.
 
     The way the object is serialized depends on the nature of the
@@ -238,6 +400,12 @@ def _serialize(
 
     Args:
         data: The object/data to be serialized.
+        out_of_band: If ``True``, pickled data with large buffers is
+            serialized with ``PICKLE_OOB``, in which case the serialized
+            data is not a ``pa.Buffer`` and can only be written to disk.
+        compression: Codec to compress the buffers of Arrow data with.
+            Pickled data is not compressed here but when written to
+            disk, and is then never serialized with ``PICKLE_OOB``.
 
     Returns:
         Tuple of the serialized data (in ``pa.Buffer`` format) and the
@@ -263,9 +431,17 @@ def _serialize(
         else:
             serialization = Serialization.ARROW_BATCH
 
+        options = None
+        if compression is not None:
+            options = pa.ipc.IpcWriteOptions(compression=compression)
+
         output_buffer = pa.BufferOutputStream()
         try:
-            writer = pa.RecordBatchStreamWriter(output_buffer, data.schema)
+            # The file format, unlike the stream format, allows batches
+            # to be read at random, see :class:`LazyTable`.
+            writer = pa.RecordBatchFileWriter(
+                output_buffer, data.schema, options=options
+            )
             writer.write(data)
             writer.close()
         except pa.ArrowSerializationError:
@@ -282,20 +458,32 @@ def _serialize(
         # Use the best protocol possible, for reference see:
         # https://docs.python.org/3/library/pickle.html#pickle-protocols
         try:
-            serialized = pickle.dumps(data, pickle.DEFAULT_PROTOCOL)
+            serialized = None
+            if out_of_band and compression is None and _PICKLE_OOB_SUPPORTED:
+                # Large buffers are then written to disk without being
+                # copied into the pickle first.
+                serialized = _pickle_out_of_band(data)
+            if serialized is not None:
+                serialization = Serialization.PICKLE_OOB
+            else:
+                serialized = pickle.dumps(data, pickle.DEFAULT_PROTOCOL)
         except pickle.PicklingError:
             raise error.SerializationError(
                 f"Could not pickle data of type {type(data)}."
             )
 
-        # NOTE: zero-copy view on the bytes.
-        serialized = pa.py_buffer(serialized)
+        if serialization == Serialization.PICKLE:
+            # NOTE: zero-copy view on the bytes.
+            serialized = pa.py_buffer(serialized)
 
     return serialized, serialization
 
 
 def _output_to_disk(
-    obj: pa.Buffer, full_path: str, serialization: Serialization
+    obj: Any,
+    full_path: str,
+    serialization: Serialization,
+    compression: Optional[str] = None,
 ) -> None:
     """Outputs a serialized object to disk to the specified path.
 
@@ -304,23 +492,68 @@ def _output_to_disk(
         full_path: Full path to save the data to.
         serialization: Serialization of the `obj`. For possible values
             see :class:`Serialization`.
+        compression: Codec the data is compressed with. Pickled data is
+            compressed while being written, Arrow data is expected to
+            have been serialized with compressed buffers.
 
     Raises:
         ValueError: If the specified serialization is not valid.
     """
-    if isinstance(serialization, Serialization):
-        with pa.OSFile(f"{full_path}.{serialization.name}", "wb") as f:
-            f.write(obj)
-    else:
+    if not isinstance(serialization, Serialization):
         raise ValueError("Function not defined for specified 'serialization'")
 
+    file_path = _get_data_file_path(full_path, serialization.name, compression)
+    _write_serialized(obj, file_path, serialization, compression)
+
     return
 
 
+def _write_serialized(
+    obj: Any,
+    file_path: str,
+    serialization: Serialization,
+    compression: Optional[str] = None,
+) -> None:
+    if serialization == Serialization.PICKLE_OOB:
+        with open(file_path, "wb") as f:
+            _write_out_of_band_pickle(f, obj)
+    elif serialization == Serialization.PICKLE and compression is not None:
+        # Compressed streams do not take a path on pyarrow 2.0.
+        with pa.OSFile(file_path, "wb") as sink, pa.CompressedOutputStream(
+            sink, compression
+        ) as f:
+            f.write(obj)
+    else:
+        with pa.OSFile(file_path, "wb") as f:
+            f.write(obj)
+
+
+def _get_serialized_size(obj: Any, serialization: Serialization) -> int:
+    if serialization == Serialization.PICKLE_OOB:
+        _, size = _get_out_of_band_segments(obj)
+        return size
+    return obj.size
+
+
+def _get_serialization_str(serialization: str, compression: Optional[str]) -> str:
+    # Compressed data is marked by suffixing the serialization with the
+    # codec, both in the HEAD file and in the name of the data file.
+    if compression is None:
+        return serialization
+    return f"{serialization}.{compression}"
+
+
+def _get_data_file_path(
+    full_path: str, serialization: str, compression: Optional[str] = None
+) -> str:
+    return f"{full_path}.{_get_serialization_str(serialization, compression)}"
+
+
 def output_to_disk(
     data: Any,
     name: Optional[str],
     serialization: Optional[Serialization] = None,
+    compression: Optional[str] = None,
 ) -> None:
     """Outputs data to disk.
 
@@ -336,6 +569,9 @@ def output_to_disk(
     * Writes to a HEAD file alongside the actual data file. This file
       serves as a protocol that returns the timestamp of the latest
       write to disk via this function alongside the used serialization.
+    * Writes a MANIFEST file with the hashes of the data, and of the
+      parameters, code and inputs of the step, which lets incremental
+      runs skip the step while these are unchanged.
 
     Args:
         data: Data to output to disk.
@@ -345,6 +581,10 @@ def output_to_disk(
             :func:`get_inputs`.
         serialization: Serialization of the `data` in case it is already
             serialized. For possible values see :class:`Serialization`.
+        compression: Codec to compress the data with, one of ``"lz4"``
+            and ``"zstd"``. Uncompressed if ``None``. Compressing pays
+            off when the data directory is on a slow (e.g. network)
+            volume. The next steps decompress the data transparently.
 
     Raises:
         DataInvalidNameError: The name of the output data is invalid,
@@ -354,30 +594,26 @@ def output_to_disk(
             could not be found.
         StepUUIDResolveError: The step's UUID cannot be resolved and
             thus it cannot determine where to output data to.
+        ValueError: If the compression is unsupported.
 
     Example:
         >>> data = "Data I would like to use in my next step"
         >>> output_to_disk(data, name="my_data")
+        >>> output_to_disk(data, name="my_data", compression="zstd")
     """
     try:
         _check_data_name_validity(name)
     except (ValueError, TypeError) as e:
         raise error.DataInvalidNameError(e)
 
+    _check_compression(compression)
+
     _warn_multiple_data_output_if_necessary(name)
 
     if name is None:
         name = Config._RESERVED_UNNAMED_OUTPUTS_STR
 
-    try:
-        with open(Config.PIPELINE_DEFINITION_PATH, "r") as f:
-            pipeline_definition = json.load(f)
-    except FileNotFoundError:
-        raise error.PipelineDefinitionNotFoundError(
-            f"Could not open {Config.PIPELINE_DEFINITION_PATH}."
-        )
-
-    pipeline = Pipeline.from_json(pipeline_definition)
+    pipeline = _get_pipeline()
 
     try:
         step_uuid = get_step_uuid(pipeline)
@@ -387,47 +623,390 @@ def output_to_disk(
     # In case the data is not already serialized, then we need to
     # serialize it.
     if serialization is None:
-        data, serialization = _serialize(data)
+        data, serialization = _serialize(
+            data, out_of_band=True, compression=compression
+        )
 
     # Recursively create any directories if they do not already exists.
     step_data_dir = Config.get_step_data_dir(step_uuid)
     os.makedirs(step_data_dir, exist_ok=True)
 
+    _remove_manifest(step_data_dir)
+    timestamp = _write_head(step_data_dir, serialization, name, compression)
+
+    # Full path to write the actual data to.
+    full_path = os.path.join(step_data_dir, step_uuid)
+
+    _output_to_disk(
+        data, full_path, serialization=serialization, compression=compression
+    )
+    _write_manifest(
+        pipeline,
+        step_uuid,
+        _get_data_file_path(full_path, serialization.name, compression),
+        timestamp,
+    )
+
+
+def _write_head(
+    step_data_dir: str,
+    serialization: Serialization,
+    name: str,
+    compression: Optional[str] = None,
+    timestamp: Optional[str] = None,
+) -> str:
     # The HEAD file serves to resolve the transfer method.
+    if timestamp is None:
+        timestamp = datetime.utcnow().isoformat(timespec="seconds")
     head_file = os.path.join(step_data_dir, "HEAD")
     with open(head_file, "w") as f:
         metadata = [
-            datetime.utcnow().isoformat(timespec="seconds"),
-            serialization.name,
+            timestamp,
+            _get_serialization_str(serialization.name, compression),
             name,
         ]
         metadata = Config.__METADATA_SEPARATOR__.join(metadata)
         f.write(metadata)
+    return timestamp
 
-    # Full path to write the actual data to.
-    full_path = os.path.join(step_data_dir, step_uuid)
 
-    return _output_to_disk(data, full_path, serialization=serialization)
+def _hash_file(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _hash_step_code(file_path: str) -> Optional[str]:
+    """Hashes the code of a step, ``None`` if it cannot be read.
+
+    Only the source of the code cells of a notebook is hashed, since
+    running a notebook stores its outputs in the file.
+
+    Note:
+        Must be kept in sync with the orchest-api, which compares this
+        hash to the current code of the step for incremental runs.
+    """
+    try:
+        with open(file_path, "rb") as f:
+            content = f.read()
+    except OSError:
+        return None
+
+    if file_path.endswith(".ipynb"):
+        try:
+            cells = json.loads(content.decode("utf-8"))["cells"]
+            sources = [
+                "".join(cell["source"]) for cell in cells if cell["cell_type"] == "code"
+            ]
+        except (ValueError, KeyError, TypeError):
+            return None
+        content = json.dumps(sources).encode("utf-8")
+
+    return hashlib.sha256(content).hexdigest()
+
+
+def _hash_step_parameters(pipeline: Pipeline, step_uuid: str) -> str:
+    """Hashes the parameters of a step and of its pipeline.
+
+    Note:
+        Must be kept in sync with the orchest-api, see
+        :func:`_hash_step_code`.
+    """
+    parameters = {
+        "pipeline": pipeline.get_params(),
+        "step": pipeline.get_step_by_uuid(step_uuid).get_params(),
+    }
+    content = json.dumps(parameters, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _read_manifest(step_data_dir: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(step_data_dir, "MANIFEST"), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _remove_manifest(step_data_dir: str) -> None:
+    try:
+        os.remove(os.path.join(step_data_dir, "MANIFEST"))
+    except FileNotFoundError:
+        pass
+
+
+def _write_manifest(
+    pipeline: Pipeline, step_uuid: str, data_file_path: str, timestamp: str
+) -> None:
+    """Writes the MANIFEST file of the output of a step to disk.
+
+    The manifest describes how the output came to be: the hash of its
+    content, of the parameters and of the code of the step, and the
+    content hashes of the outputs of the parent steps at the time of
+    writing. The orchest-api uses it to skip steps whose output is
+    still up to date, see the "incremental" run type.
+
+    The manifest belongs to the output whose HEAD has the same
+    `timestamp`, outputting again removes it first.
+    """
+    step = pipeline.get_step_by_uuid(step_uuid)
+    inputs = {}
+    for parent in step.parents:
+        parent_uuid = parent.properties["uuid"]
+        manifest = _read_manifest(Config.get_step_data_dir(parent_uuid))
+        inputs[parent_uuid] = None if manifest is None else manifest["content_hash"]
+
+    # Steps are run from the directory of their file, both by the
+    # runner of pipeline runs and by the kernels.
+    code_hash = None
+    if step.properties.get("file_path"):
+        code_hash = _hash_step_code(
+            os.path.join(os.getcwd(), os.path.basename(step.properties["file_path"]))
+        )
+
+    manifest = {
+        "timestamp": timestamp,
+        "content_hash": _hash_file(data_file_path),
+        "parameters_hash": _hash_step_parameters(pipeline, step_uuid),
+        "code_hash": code_hash,
+        "inputs": inputs,
+    }
+
+    # Written atomically, a partial manifest would make the output
+    # look outdated.
+    step_data_dir = os.path.dirname(data_file_path)
+    manifest_file = os.path.join(step_data_dir, "MANIFEST")
+    with open(f"{manifest_file}.tmp", "w") as f:
+        json.dump(manifest, f)
+    os.replace(f"{manifest_file}.tmp", manifest_file)
+
+
+class OutputStream:
+    """Writes Arrow data incrementally to the output of a step.
+
+    Returned by :func:`output_stream`. Every chunk is written straight
+    to disk, so that data larger than memory can be output. Chunks are
+    written to a temporary file next to the output file, which replaces
+    the output file once the stream is closed, so that the previous
+    output stays intact until then.
+    All chunks must have the same schema, which is taken from the first
+    chunk unless specified.
+
+    """
+
+    def __init__(
+        self,
+        full_path: str,
+        schema: Optional[pa.Schema] = None,
+        compression: Optional[str] = None,
+    ):
+        self._full_path = full_path
+        self._schema = schema
+        self._compression = compression
+        self._sink = None
+        self._writer = None
+
+    def write(self, data: Any) -> None:
+        """Writes a chunk of data.
+
+        Args:
+            data: A ``pa.RecordBatch``, ``pa.Table`` or
+                ``pd.DataFrame``.
+
+        Raises:
+            SerializationError: If the data could not be serialized,
+                e.g. because its schema does not match the schema of
+                the stream.
+        """
+        try:
+            if not isinstance(data, (pa.RecordBatch, pa.Table)):
+                data = pa.RecordBatch.from_pandas(data, schema=self._schema)
+
+            if self._writer is None:
+                self._open(data.schema if self._schema is None else self._schema)
+
+            if isinstance(data, pa.Table):
+                self._writer.write_table(data)
+            else:
+                self._writer.write_batch(data)
+        except (pa.ArrowException, AttributeError, TypeError):
+            raise error.SerializationError(
+                f"Could not serialize data of type {type(data)} to the stream."
+            )
+
+    def close(self) -> None:
+        """Closes the stream, writing the footer of the file, and
+        replaces the output file."""
+        if self._writer is None:
+            self._open(pa.schema([]) if self._schema is None else self._schema)
+        self._writer.close()
+        self._sink.close()
+        os.replace(self._tmp_file_path, self._file_path)
+
+    def _open(self, schema: pa.Schema) -> None:
+        self._schema = schema
+        self._sink = pa.OSFile(self._tmp_file_path, "wb")
+        options = None
+        if self._compression is not None:
+            options = pa.ipc.IpcWriteOptions(compression=self._compression)
+        self._writer = pa.ipc.new_file(self._sink, schema, options=options)
+
+    def _abort(self) -> None:
+        if self._sink is not None:
+            self._sink.close()
+            try:
+                os.remove(self._tmp_file_path)
+            except FileNotFoundError:
+                pass
+
+    @property
+    def _file_path(self) -> str:
+        return _get_data_file_path(
+            self._full_path, Serialization.ARROW_TABLE.name, self._compression
+        )
+
+    @property
+    def _tmp_file_path(self) -> str:
+        return f"{self._file_path}.tmp"
+
+
+@contextmanager
+def output_stream(
+    name: Optional[str],
+    schema: Optional[pa.Schema] = None,
+    compression: Optional[str] = None,
+) -> Iterator[OutputStream]:
+    """Outputs Arrow data to disk, chunk by chunk.
 
+    Unlike :func:`output_to_disk`, the data is not serialized in memory
+    first, every chunk is directly written to disk. The data is
+    received by the next steps as a ``pa.Table``, or as a
+    ``pa.ipc.RecordBatchReader`` through ``get_inputs(stream=True)``.
 
-def _deserialize_output_disk(full_path: str, serialization: str) -> Any:
+    Note:
+        Like the other output functions, calling it multiple times
+        within the same script will overwrite the output.
+
+    Args:
+        name: Name of the output data. As a string, it becomes the name
+            of the data, when ``None``, the data is considered nameless.
+            This affects the way the data can be later retrieved using
+            :func:`get_inputs`.
+        schema: Schema of the data. If ``None`` it is taken from the
+            first chunk.
+        compression: Codec to compress the chunks with, see
+            :func:`output_to_disk`.
+
+    Yields:
+        An :class:`OutputStream` to write chunks to. The output is only
+        made available to the next steps once the context exits without
+        errors.
+
+    Raises:
+        DataInvalidNameError: The name of the output data is invalid,
+            e.g because it is a reserved name (``"unnamed"``) or because
+            it contains a reserved substring.
+        PipelineDefinitionNotFoundError: If the pipeline definition file
+            could not be found.
+        StepUUIDResolveError: The step's UUID cannot be resolved and
+            thus it cannot determine where to output data to.
+        ValueError: If the compression is unsupported.
+
+    Example:
+        >>> with output_stream("my_data") as stream:
+        ...     for chunk in pd.read_csv("data.csv", chunksize=10000):
+        ...         stream.write(chunk)
+    """
+    try:
+        _check_data_name_validity(name)
+    except (ValueError, TypeError) as e:
+        raise error.DataInvalidNameError(e)
+
+    _check_compression(compression)
+
+    _warn_multiple_data_output_if_necessary(name)
+
+    if name is None:
+        name = Config._RESERVED_UNNAMED_OUTPUTS_STR
+
+    pipeline = _get_pipeline()
+
+    try:
+        step_uuid = get_step_uuid(pipeline)
+    except error.StepUUIDResolveError:
+        raise error.StepUUIDResolveError("Failed to determine where to output data to.")
+
+    step_data_dir = Config.get_step_data_dir(step_uuid)
+    os.makedirs(step_data_dir, exist_ok=True)
+    _remove_manifest(step_data_dir)
+
+    stream = OutputStream(
+        os.path.join(step_data_dir, step_uuid), schema=schema, compression=compression
+    )
+    try:
+        yield stream
+        stream.close()
+    except BaseException:
+        stream._abort()
+        raise
+
+    # Written last so that the previous output of the step is used
+    # until the new output is complete.
+    timestamp = _write_head(step_data_dir, Serialization.ARROW_TABLE, name, compression)
+    _write_manifest(pipeline, step_uuid, stream._file_path, timestamp)
+
+
+def _deserialize_output_disk(
+    full_path: str,
+    serialization: str,
+    stream: bool = False,
+    compression: Optional[str] = None,
+    lazy_table: bool = False,
+) -> Any:
     """Gets data from disk.
 
+    Args:
+        full_path: Path of the data, without the serialization suffix.
+        serialization: The serialization of the data.
+        stream: If ``True``, Arrow data is returned as a
+            ``pa.ipc.RecordBatchReader`` over the memory mapped file.
+        compression: The codec the data was compressed with.
+        lazy_table: If ``True``, Arrow tables are returned as a
+            :class:`LazyTable` over the memory mapped file.
+
     Raises:
         ValueError: If the serialization argument is unsupported.
     """
-    file_path = f"{full_path}.{serialization}"
-    if serialization == Serialization.ARROW_TABLE.name:
-        # pa.memory_map is for reading (zero-copy)
-        with pa.memory_map(file_path, "rb") as input_file:
-            # read all batches as a table
-            stream = pa.ipc.open_stream(input_file)
-            return stream.read_all()
-    elif serialization == Serialization.ARROW_BATCH.name:
-        with pa.memory_map(file_path, "rb") as input_file:
-            # return the first batch (the only one)
-            stream = pa.ipc.open_stream(input_file)
-            return [b for b in stream][0]
+    file_path = _get_data_file_path(full_path, serialization, compression)
+    return _read_serialized(file_path, serialization, stream, compression, lazy_table)
+
+
+def _read_serialized(
+    file_path: str,
+    serialization: str,
+    stream: bool = False,
+    compression: Optional[str] = None,
+    lazy_table: bool = False,
+) -> Any:
+    if serialization in [
+        Serialization.ARROW_TABLE.name,
+        Serialization.ARROW_BATCH.name,
+    ]:
+        return _read_arrow(
+            file_path,
+            as_batch=serialization == Serialization.ARROW_BATCH.name,
+            stream=stream,
+            lazy_table=lazy_table,
+        )
+    elif serialization == Serialization.PICKLE.name and compression is not None:
+        # The IPC buffers of Arrow data are decompressed by the
+        # readers, pickles are decompressed as a whole.
+        with pa.OSFile(file_path, "rb") as source, pa.CompressedInputStream(
+            source, compression
+        ) as input_file:
+            return pickle.loads(input_file.read_buffer())
     elif serialization == Serialization.PICKLE.name:
         # https://docs.python.org/3/library/pickle.html
         # The argument file must have three methods:
@@ -443,19 +1022,78 @@ def _deserialize_output_disk(full_path: str, serialization: str) -> Any:
         # normal python file.
         with open(file_path, "rb") as input_file:
             return pickle.load(input_file)
+    elif serialization == Serialization.PICKLE_OOB.name:
+        return _read_out_of_band_pickle(file_path)
     else:
         raise ValueError(
             f"The specified serialization of '{serialization}' is unsupported."
         )
 
 
-def _get_output_disk(step_uuid: str, serialization: str) -> Any:
+_ARROW_FILE_MAGIC = b"ARROW1"
+
+
+def _read_arrow(
+    file_path: str, as_batch: bool, stream: bool = False, lazy_table: bool = False
+) -> Any:
+    """Reads Arrow data from a memory mapped file.
+
+    Data is written in the IPC file format, outputs of previous
+    versions of the SDK in the IPC stream format.
+    """
+    with open(file_path, "rb") as f:
+        is_file_format = f.read(len(_ARROW_FILE_MAGIC)) == _ARROW_FILE_MAGIC
+
+    if lazy_table and not as_batch:
+        if is_file_format:
+            return LazyTable(file_path)
+        with pa.memory_map(file_path, "rb") as input_file:
+            return LazyTable.from_table(pa.ipc.open_stream(input_file).read_all())
+
+    if not is_file_format:
+        if stream:
+            # The reader keeps the memory map open.
+            return pa.ipc.open_stream(pa.memory_map(file_path, "rb"))
+        # pa.memory_map is for reading (zero-copy)
+        with pa.memory_map(file_path, "rb") as input_file:
+            reader = pa.ipc.open_stream(input_file)
+            if as_batch:
+                # return the first batch (the only one)
+                return [b for b in reader][0]
+            # read all batches as a table
+            return reader.read_all()
+
+    # The batches reference the memory map, which stays open for as
+    # long as they are.
+    reader = pa.ipc.open_file(pa.memory_map(file_path, "rb"))
+    if stream:
+        return pa.ipc.RecordBatchReader.from_batches(
+            reader.schema,
+            (reader.get_batch(i) for i in range(reader.num_record_batches)),
+        )
+    elif as_batch:
+        return reader.get_batch(0)
+    return reader.read_all()
+
+
+def _get_output_disk(
+    step_uuid: str,
+    serialization: str,
+    stream: bool = False,
+    compression: Optional[str] = None,
+    lazy_table: bool = False,
+) -> Any:
     """Gets data from disk.
 
     Args:
         step_uuid: The UUID of the step to get output data from.
         serialization: The serialization for the output. For possible
             values see :class:`Serialization`.
+        stream: If ``True``, Arrow data is returned as a
+            ``pa.ipc.RecordBatchReader``.
+        compression: The codec the output was compressed with.
+        lazy_table: If ``True``, Arrow tables are returned as a
+            :class:`LazyTable`.
 
     Returns:
         Data from the step identified by `step_uuid`.
@@ -469,7 +1107,13 @@ def _get_output_disk(step_uuid: str, serialization: str) -> Any:
     full_path = os.path.join(step_data_dir, step_uuid)
 
     try:
-        return _deserialize_output_disk(full_path, serialization=serialization)
+        return _deserialize_output_disk(
+            full_path,
+            serialization=serialization,
+            stream=stream,
+            compression=compression,
+            lazy_table=lazy_table,
+        )
     except FileNotFoundError:
         # TODO: Ideally we want to provide the user with the step's
         #       name instead of UUID.
@@ -478,14 +1122,16 @@ def _get_output_disk(step_uuid: str, serialization: str) -> Any:
             "Try rerunning it."
         )
     # IOError is to try to catch pyarrow failures on opening the file.
-    except (pickle.UnpicklingError, IOError):
+    except (pickle.UnpicklingError, struct.error, IOError):
         raise error.DeserializationError(
             f'Output from incoming step "{step_uuid}" ({full_path}) '
             "could not be deserialized."
         )
 
 
-def _resolve_disk(step_uuid: str) -> Dict[str, Any]:
+def _resolve_disk(
+    step_uuid: str, stream: bool = False, lazy_table: bool = False
+) -> Dict[str, Any]:
     """Returns information of the most recent write to disk.
 
     Resolves via the HEAD file the timestamp (that is used to determine
@@ -495,6 +1141,10 @@ def _resolve_disk(step_uuid: str) -> Dict[str, Any]:
     Args:
         step_uuid: The UUID of the step to resolve its most recent write
             to disk.
+        stream: If ``True``, Arrow data will be retrieved as a
+            ``pa.ipc.RecordBatchReader``.
+        lazy_table: If ``True``, Arrow tables will be retrieved as a
+            :class:`LazyTable`.
 
     Returns:
         Dictionary containing the information of the function to be
@@ -521,10 +1171,16 @@ def _resolve_disk(step_uuid: str) -> Dict[str, Any]:
             "Try rerunning it."
         )
 
+    serialization, _, compression = serialization.partition(".")
     res = {
         "method_to_call": _get_output_disk,
         "method_args": (step_uuid,),
-        "method_kwargs": {"serialization": serialization},
+        "method_kwargs": {
+            "serialization": serialization,
+            "stream": stream,
+            "compression": compression or None,
+            "lazy_table": lazy_table,
+        },
         "metadata": {
             "timestamp": timestamp,
             "serialization": serialization,
@@ -535,73 +1191,73 @@ def _resolve_disk(step_uuid: str) -> Dict[str, Any]:
 
 
 def _output_to_memory(
-    obj: pa.Buffer,
-    client: plasma.PlasmaClient,
-    obj_id: Optional[plasma.ObjectID] = None,
-    metadata: Optional[bytes] = None,
-    memcopy_threads: int = 6,
-) -> plasma.ObjectID:
-    """Outputs an object to memory.
+    obj: Any,
+    serialization: Serialization,
+    client: MemoryStoreClient,
+    obj_id: str,
+    metadata: str,
+) -> None:
+    """Outputs a serialized object to memory.
+
+    The object is written directly to the memory of the store, in the
+    same format as the files of :func:`output_to_disk`.
 
     Args:
         obj: Object to output to memory.
-        client: A PlasmaClient to interface with the in-memory object
-            store.
-        obj_id: The ID to assign to the `obj` inside the plasma store.
-            If ``None`` then one is randomly generated.
+        serialization: Serialization of the `obj`.
+        client: A client to interface with the in-memory object store.
+        obj_id: The ID to assign to the `obj` inside the store. An
+            existing object with the same ID is replaced.
         metadata: Metadata to add to the `obj` inside the store.
-        memcopy_threads: The number of threads to use to write the
-            `obj` into the object store for large objects.
-
-    Returns:
-        The ID of the object inside the store. Either the given `obj_id`
-        or a randomly generated one.
 
     Raises:
         MemoryError: If the `obj` does not fit in memory.
     """
-    # Check whether the object to be passed in memory actually fits in
-    # memory. We check explicitely instead of trying to insert it,
-    # because inserting an already full Plasma store will start evicting
-    # objects to free up space. However, we want to maintain control
-    # over what objects get evicted.
-    # obj.size -> "The buffer size in bytes."
-    total_size = obj.size
-    if metadata is not None:
-        total_size += len(metadata)
-
-    occupied_size = sum(
-        obj["data_size"] + obj["metadata_size"] for obj in client.list().values()
-    )
-    # Take a percentage of the maximum capacity such that the message
-    # for object eviction always fits inside the store.
-    store_capacity = Config.MAX_RELATIVE_STORE_CAPACITY * client.store_capacity()
-    available_size = store_capacity - occupied_size
-
-    if total_size > available_size:
-        raise MemoryError("Object does not fit in memory")
-
-    # In case no `obj_id` is specified, one has to be generated because
-    # an ID is required for an object to be inserted in the store.
-    if obj_id is None:
-        obj_id = plasma.ObjectID.from_random()
-
-    # Write the object to the plasma store. If the obj_id already
-    # exists, then it first has to be deleted. Essentially we are
-    # overwriting the data (just like we do for disk)
+    # The store reserves the memory up front, so that it maintains
+    # control over what objects get evicted.
+    path = client.create(obj_id, _get_serialized_size(obj, serialization))
     try:
-        buffer = client.create(obj_id, obj.size, metadata=metadata)
-    except plasma.PlasmaObjectExists:
-        client.delete([obj_id])
-        buffer = client.create(obj_id, obj.size, metadata=metadata)
+        _write_serialized(obj, path, serialization)
+    except BaseException:
+        client.abort(path)
+        raise
+    client.seal(obj_id, path, metadata)
 
-    stream = pa.FixedSizeBufferWriter(buffer)
-    stream.set_memcopy_threads(memcopy_threads)
 
-    stream.write(obj)
-    client.seal(obj_id)
+def _spill_to_disk(step_uuid: str, file_path: str, metadata: str) -> None:
+    """Moves an object of the memory store to disk.
 
-    return obj_id
+    The object is written like :func:`output_to_disk` would, keeping
+    the timestamp of the object so that :func:`_resolve` considers it
+    the same output. An object is not spilled if the step has output
+    more recent data to disk.
+
+    Args:
+        step_uuid: The UUID of the step that output the object.
+        file_path: Path of the object in the memory store.
+        metadata: Metadata of the object in the memory store.
+    """
+    timestamp, serialization, name = _interpret_metadata(metadata)
+
+    step_data_dir = Config.get_step_data_dir(step_uuid)
+    try:
+        disk_timestamp = _resolve_disk(step_uuid)["metadata"]["timestamp"]
+    except (error.DiskOutputNotFoundError, error.InvalidMetaDataError):
+        pass
+    else:
+        if disk_timestamp > timestamp:
+            return
+
+    os.makedirs(step_data_dir, exist_ok=True)
+    full_path = os.path.join(step_data_dir, step_uuid)
+    data_file_path = _get_data_file_path(full_path, serialization)
+
+    # Steps that are reading previous data from disk keep reading that
+    # data, since the file is replaced.
+    tmp_path = f"{data_file_path}.tmp"
+    shutil.copyfile(file_path, tmp_path)
+    os.replace(tmp_path, data_file_path)
+    _write_head(step_data_dir, Serialization[serialization], name, timestamp=timestamp)
 
 
 def output_to_memory(
@@ -611,9 +1267,10 @@ def output_to_memory(
 ) -> None:
     """Outputs data to memory.
 
-    Warning:
-        Memory passing is not supported in this version of Orchest, this
-        function will output to disk.
+    The data is passed through the memory-server of the session, which
+    is only running in interactive sessions. Steps receive the data
+    without it being copied, e.g. NumPy arrays and Arrow tables are
+    memory mapped.
 
     Note:
         Calling :meth:`output_to_memory` multiple times within the same
@@ -622,7 +1279,7 @@ def output_to_memory(
         function once.
 
     To manage outputing the data to memory for the user, this function
-    uses metadata to add info to objects inside the plasma store.
+    uses metadata to add info to objects inside the memory store.
 
     Args:
         data: Data to output.
@@ -631,8 +1288,8 @@ def output_to_memory(
             This affects the way the data can be later retrieved using
             :func:`get_inputs`.
         disk_fallback: If ``True``, then outputing to disk is used when
-            the `data` does not fit in memory. If ``False``, then a
-            :exc:`MemoryError` is thrown.
+            the `data` does not fit in memory or when no memory store is
+            running. If ``False``, then a :exc:`MemoryError` is thrown.
 
     Raises:
         DataInvalidNameError: The name of the output data is invalid,
@@ -654,13 +1311,6 @@ def output_to_memory(
         >>> data = "Data I would like to use in my next step"
         >>> output_to_memory(data, name="my_data")
     """
-    msg = (
-        "Memory passing is not supported in this version of Orchest. This function "
-        "will output to disk. No changes to your code are required."
-    )
-    _print_warning_message(msg)
-    output(data, name)
-    return
     try:
         _check_data_name_validity(name)
     except (ValueError, TypeError) as e:
@@ -668,15 +1318,7 @@ def output_to_memory(
 
     _warn_multiple_data_output_if_necessary(name)
 
-    try:
-        with open(Config.PIPELINE_DEFINITION_PATH, "r") as f:
-            pipeline_definition = json.load(f)
-    except FileNotFoundError:
-        raise error.PipelineDefinitionNotFoundError(
-            f"Could not open {Config.PIPELINE_DEFINITION_PATH}."
-        )
-
-    pipeline = Pipeline.from_json(pipeline_definition)
+    pipeline = _get_pipeline()
 
     try:
         step_uuid = get_step_uuid(pipeline)
@@ -684,24 +1326,12 @@ def output_to_memory(
         raise error.StepUUIDResolveError("Failed to determine where to output data to.")
 
     # Serialize the object and collect the serialization metadata.
-    obj, serialization = _serialize(data)
-
-    try:
-        client = _PlasmaConnector().client
-    except error.OrchestNetworkError as e:
-        if not disk_fallback:
-            raise error.OrchestNetworkError(e)
-
-        return output_to_disk(obj, name, serialization=serialization)
+    obj, serialization = _serialize(data, out_of_band=True)
 
-    # Try to output to memory.
-    obj_id = _convert_uuid_to_object_id(step_uuid)
     metadata = [
         str(Config.IDENTIFIER_SERIALIZATION),
-        # The plasma store allows to get the creation timestamp, but
-        # creating it this way makes the process more consistent with
-        # the metadata we are writing when outputting to disk, moreover,
-        # it makes the code less dependent on the plasma store API.
+        # Creating the timestamp this way makes the process consistent
+        # with the metadata we are writing when outputting to disk.
         datetime.utcnow().isoformat(timespec="seconds"),
         serialization.name,
         # Can't simply assign to name beforehand because name might be
@@ -709,10 +1339,23 @@ def output_to_memory(
         # validity itself since its a public function.
         name if name is not None else Config._RESERVED_UNNAMED_OUTPUTS_STR,
     ]
-    metadata = bytes(Config.__METADATA_SEPARATOR__.join(metadata), "utf-8")
+    metadata = Config.__METADATA_SEPARATOR__.join(metadata)
+
+    # The output on disk, if any, is no longer the latest output of the
+    # step, thus it can't be reused by incremental runs.
+    _remove_manifest(Config.get_step_data_dir(step_uuid))
 
     try:
-        obj_id = _output_to_memory(obj, client, obj_id=obj_id, metadata=metadata)
+        with _connect_to_memory_store() as client:
+            _output_to_memory(
+                obj, serialization, client, obj_id=step_uuid, metadata=metadata
+            )
+
+    except error.OrchestNetworkError as e:
+        if not disk_fallback:
+            raise error.OrchestNetworkError(e)
+
+        return output_to_disk(obj, name, serialization=serialization)
 
     except MemoryError:
         if not disk_fallback:
@@ -731,14 +1374,20 @@ def output_to_memory(
 
 
 def _deserialize_output_memory(
-    obj_id: plasma.ObjectID, client: plasma.PlasmaClient
+    obj_id: str,
+    client: MemoryStoreClient,
+    stream: bool = False,
+    lazy_table: bool = False,
 ) -> Any:
     """Gets data from memory.
 
     Args:
-        obj_id: The ID of the object to retrieve from the plasma store.
-        client: A PlasmaClient to interface with the in-memory object
-            store.
+        obj_id: The ID of the object to retrieve from the store.
+        client: A client to interface with the in-memory object store.
+        stream: If ``True``, Arrow data is returned as a
+            ``pa.ipc.RecordBatchReader``.
+        lazy_table: If ``True``, Arrow tables are returned as a
+            :class:`LazyTable`.
 
     Returns:
         The unserialized data from the store corresponding to the
@@ -750,52 +1399,43 @@ def _deserialize_output_memory(
         ValueError: If the serialization type in the metadata is not
             valid.
     """
-    obj_ids = [obj_id]
-
-    # TODO: the get_buffers allows for batch, which we want to use in
-    #       the future.
-    buffers = client.get_buffers(obj_ids, with_meta=True, timeout_ms=1000)
-
-    # Since we currently know that we are only restrieving one buffer,
-    # we can instantly get its metadata and buffer.
-    metadata, buffer = buffers[0]
+    path, metadata = client.get(obj_id)
 
-    # Getting the buffer timed out. We conclude that the object has not
-    # yet been written to the store and maybe never will.
-    if metadata is None and buffer is None:
+    metadata = metadata.split(Config.__METADATA_SEPARATOR__)
+    _, _, serialization, _ = metadata
+    try:
+        # Objects are memory mapped, where possible, and remain readable
+        # even if they are evicted from the store in the meantime.
+        return _read_serialized(
+            path, serialization, stream=stream, lazy_table=lazy_table
+        )
+    except FileNotFoundError:
         raise error.ObjectNotFoundError(
             f'Object with ObjectID "{obj_id}" does not exist in store.'
         )
 
-    metadata = metadata.decode("utf-8").split(Config.__METADATA_SEPARATOR__)
-    _, _, serialization, _ = metadata
-    if serialization == Serialization.ARROW_TABLE.name:
-        # Read all batches as a table.
-        stream = pa.ipc.open_stream(buffer)
-        return stream.read_all()
 
-    elif serialization == Serialization.ARROW_BATCH.name:
-        # Return the first batch (the only one).
-        stream = pa.ipc.open_stream(buffer)
-        return [b for b in stream][0]
-
-    elif serialization == Serialization.PICKLE.name:
-        # Can load the buffer directly because its a bytes-like-object:
-        # https://docs.python.org/3/library/pickle.html#pickle.loads
-        return pickle.loads(buffer)
-    else:
-        raise ValueError("Object was serialized with an unsupported serialization")
-
-
-def _get_output_memory(step_uuid: str, consumer: Optional[str] = None) -> Any:
+def _get_output_memory(
+    step_uuid: str,
+    consumer: Optional[str] = None,
+    stream: bool = False,
+    timestamp: Optional[str] = None,
+    lazy_table: bool = False,
+) -> Any:
     """Gets data from memory.
 
     Args:
         step_uuid: The UUID of the step to get output data from.
-        consumer: The consumer of the output data. This is put inside
-            the metadata of an empty object to trigger a notification in
-            the plasma store, which is then used to manage eviction of
-            objects.
+        consumer: The consumer of the output data. The store is notified
+            that the consumer read the data, which is then used to
+            manage eviction of objects.
+        stream: If ``True``, Arrow data is returned as a
+            ``pa.ipc.RecordBatchReader``.
+        timestamp: The timestamp of the output, as resolved by
+            :func:`_resolve_memory`. If given and the output has been
+            spilled to disk in the meantime, it is read from disk.
+        lazy_table: If ``True``, Arrow tables are returned as a
+            :class:`LazyTable`.
 
     Returns:
         Data from step identified by `step_uuid`.
@@ -809,53 +1449,83 @@ def _get_output_memory(step_uuid: str, consumer: Optional[str] = None) -> Any:
             Which might be because the specified value was wrong or the
             store died.
     """
-    client = _PlasmaConnector().client
-
-    obj_id = _convert_uuid_to_object_id(step_uuid)
-    try:
-        obj = _deserialize_output_memory(obj_id, client)
+    with _connect_to_memory_store() as client:
+        try:
+            obj = _deserialize_output_memory(
+                step_uuid, client, stream=stream, lazy_table=lazy_table
+            )
 
-    except error.ObjectNotFoundError:
-        raise error.MemoryOutputNotFoundError(
-            f'Output from incoming step "{step_uuid}" cannot be found. '
-            "Try rerunning it."
-        )
-    # IOError is to try to catch pyarrow deserialization errors.
-    except (pickle.UnpicklingError, IOError):
-        raise error.DeserializationError(
-            f'Output from incoming step "{step_uuid}" could not be deserialized.'
-        )
-    else:
-        # TODO: note somewhere (maybe in the docstring) that it might
-        #       although very unlikely raise MemoryError, because the
-        #       receive is now actually also outputing data.
-        # NOTE: the "ORCHEST_MEMORY_EVICTION" ENV variable is set in the
-        # orchest-api. Now we always know when we are running inside a
-        # jupyter kernel interactively. And in that case we never want
-        # to do eviction.
-        if os.getenv("ORCHEST_MEMORY_EVICTION") is not None:
-            empty_obj, _ = _serialize("")
-            msg = f"{Config.IDENTIFIER_EVICTION};{step_uuid},{consumer}"
-            metadata = bytes(msg, "utf-8")
-            _output_to_memory(empty_obj, client, metadata=metadata)
+        except error.ObjectNotFoundError:
+            obj = _get_spilled_output(
+                step_uuid, timestamp, stream=stream, lazy_table=lazy_table
+            )
+            if obj is None:
+                raise error.MemoryOutputNotFoundError(
+                    f'Output from incoming step "{step_uuid}" cannot be found. '
+                    "Try rerunning it."
+                )
+        # IOError is to try to catch pyarrow deserialization errors.
+        except (pickle.UnpicklingError, struct.error, IOError):
+            raise error.DeserializationError(
+                f'Output from incoming step "{step_uuid}" could not be deserialized.'
+            )
+        else:
+            # NOTE: the "ORCHEST_MEMORY_EVICTION" ENV variable is set in
+            # the orchest-api. Now we always know when we are running
+            # inside a jupyter kernel interactively. And in that case we
+            # never want to do eviction.
+            if os.getenv("ORCHEST_MEMORY_EVICTION") is not None:
+                client.consumed(step_uuid, consumer)
 
     return obj
 
 
-def _resolve_memory(step_uuid: str, consumer: str = None) -> Dict[str, Any]:
+def _get_spilled_output(
+    step_uuid: str,
+    timestamp: Optional[str],
+    stream: bool = False,
+    lazy_table: bool = False,
+) -> Any:
+    """Gets the output of a step that was spilled from memory to disk.
+
+    Returns:
+        The output, or ``None`` if the output on disk is not the one
+        with the given `timestamp`, e.g. because the output was evicted
+        instead.
+    """
+    if timestamp is None:
+        return None
+    try:
+        res = _resolve_disk(step_uuid, stream=stream, lazy_table=lazy_table)
+    except (error.DiskOutputNotFoundError, error.InvalidMetaDataError):
+        return None
+    if res["metadata"]["timestamp"] != timestamp:
+        return None
+    return res["method_to_call"](*res["method_args"], **res["method_kwargs"])
+
+
+def _resolve_memory(
+    step_uuid: str,
+    consumer: str = None,
+    stream: bool = False,
+    lazy_table: bool = False,
+) -> Dict[str, Any]:
     """Returns information of the most recent write to memory.
 
-    Resolves the timestamp via the `create_time` attribute from the info
-    of the plasma store. It also sets the arguments to call the
-    :func:`get_output_memory` method with.
+    Resolves the timestamp via the metadata of the object in the store.
+    It also sets the arguments to call the :func:`get_output_memory`
+    method with.
 
     Args:
         step_uuid: The UUID of the step to resolve its most recent write
             to memory.
-        consumer: The consumer of the output data. This is put inside
-            the metadata of an empty object to trigger a notification in
-            the plasma store, which is then used to manage eviction of
-            objects.
+        consumer: The consumer of the output data. The store is notified
+            that the consumer read the data, which is then used to
+            manage eviction of objects.
+        stream: If ``True``, Arrow data will be retrieved as a
+            ``pa.ipc.RecordBatchReader``.
+        lazy_table: If ``True``, Arrow tables will be retrieved as a
+            :class:`LazyTable`.
 
     Returns:
         Dictionary containing the information of the function to be
@@ -871,28 +1541,27 @@ def _resolve_memory(step_uuid: str, consumer: str = None) -> Dict[str, Any]:
             Which might be because the specified value was wrong or the
             store died.
     """
-    client = _PlasmaConnector().client
-
-    obj_id = _convert_uuid_to_object_id(step_uuid)
+    with _connect_to_memory_store() as client:
+        try:
+            _, metadata = client.get(step_uuid)
+        except error.ObjectNotFoundError:
+            raise error.MemoryOutputNotFoundError(
+                f'Output from incoming step "{step_uuid}" cannot be found. '
+                "Try rerunning it."
+            )
 
-    # get metadata of the object if it exists
-    metadata = client.get_metadata([obj_id], timeout_ms=0)
-    metadata = metadata[0]
-    if metadata is None:
-        raise error.MemoryOutputNotFoundError(
-            f'Output from incoming step "{step_uuid}" cannot be found. '
-            "Try rerunning it."
-        )
-    # this is a pyarrow.Buffer, gotta make it into pybytes to decode,
-    # not much overhead given that this is just metadata
-    metadata = metadata.to_pybytes()
-    metadata = _interpret_metadata(metadata.decode("utf-8"))
+    metadata = _interpret_metadata(metadata)
     timestamp, serialization, name = metadata
 
     res = {
         "method_to_call": _get_output_memory,
         "method_args": (step_uuid,),
-        "method_kwargs": {"consumer": consumer},
+        "method_kwargs": {
+            "consumer": consumer,
+            "stream": stream,
+            "timestamp": timestamp,
+            "lazy_table": lazy_table,
+        },
         "metadata": {
             "timestamp": timestamp,
             "serialization": serialization,
@@ -903,7 +1572,10 @@ def _resolve_memory(step_uuid: str, consumer: str = None) -> Dict[str, Any]:
 
 
 def _resolve(
-    step_uuid: str, consumer: str = None
+    step_uuid: str,
+    consumer: str = None,
+    stream: bool = False,
+    lazy_table: bool = False,
 ) -> Tuple[Callable, Sequence[Any], Dict[str, Any], Dict[str, Any]]:
     """Resolves the most recently used tranfer method of the given step.
 
@@ -912,10 +1584,13 @@ def _resolve(
 
     Args:
         step_uuid: UUID of the step to resolve its most recent write.
-        consumer: The consumer of the output data. This is put inside
-            the metadata of an empty object to trigger a notification in
-            the plasma store, which is then used to manage eviction of
-            objects.
+        consumer: The consumer of the output data. The memory store is
+            notified that the consumer read the data, which is then used
+            to manage eviction of objects.
+        stream: If ``True``, Arrow data will be retrieved as a
+            ``pa.ipc.RecordBatchReader``.
+        lazy_table: If ``True``, Arrow tables will be retrieved as a
+            :class:`LazyTable`.
 
     Returns:
         Tuple containing the information of the function to be called
@@ -931,16 +1606,18 @@ def _resolve(
     # NOTE: All "resolve_{method}" functions have to be included in this
     # list. It is used to resolve what what "get_output_..." method to
     # invoke.
-    resolve_methods: List[Callable] = [_resolve_disk]
+    resolve_methods: List[Callable] = [_resolve_memory, _resolve_disk]
 
     method_infos = []
     method_infos_exceptions = []
     for method in resolve_methods:
         try:
             if method.__name__ == "_resolve_memory":
-                method_info = method(step_uuid, consumer=consumer)
+                method_info = method(
+                    step_uuid, consumer=consumer, stream=stream, lazy_table=lazy_table
+                )
             else:
-                method_info = method(step_uuid)
+                method_info = method(step_uuid, stream=stream, lazy_table=lazy_table)
         except (
             # Might happen in the case a user has metadata produced by a
             # version of the Orchest-SDK that is incompatible with this
@@ -978,10 +1655,354 @@ def _resolve(
     )
 
 
+class _Input:
+    """Output of a parent step, to be retrieved as an input."""
+
+    def __init__(
+        self,
+        parent: Any,
+        get_output_method: Callable,
+        args: Sequence[Any],
+        kwargs: Dict[str, Any],
+        metadata: Dict[str, Any],
+    ):
+        self.parent = parent
+        self.get_output_method = get_output_method
+        self.args = args
+        self.kwargs = kwargs
+        self.metadata = metadata
+
+    @property
+    def name(self) -> str:
+        return self.metadata["name"]
+
+    def retrieve(self, ignore_failure: bool, verbose: bool) -> Any:
+        # Either raise an error on failure of getting output or
+        # continue with other steps.
+        try:
+            data = self.get_output_method(*self.args, **self.kwargs)
+        except error.OutputNotFoundError as e:
+            if not ignore_failure:
+                raise error.OutputNotFoundError(e)
+
+            data = None
+
+        if verbose:
+            parent_title = self.parent.properties["title"]
+            if data is None:
+                print(f'Failed to retrieve input from step: "{parent_title}"')
+            else:
+                print(f'Retrieved input from step: "{parent_title}"')
+
+        return data
+
+    def release(self) -> None:
+        """Notifies the memory store that the input won't be retrieved.
+
+        Like retrieving it, so that the output can be evicted once all
+        the consumers of the output are done with it.
+        """
+        if self.get_output_method is not _get_output_memory:
+            return
+        if os.getenv("ORCHEST_MEMORY_EVICTION") is None:
+            return
+        try:
+            with _connect_to_memory_store() as client:
+                client.consumed(self.args[0], self.kwargs["consumer"])
+        except (error.OrchestNetworkError, OSError):
+            # The store died, the output is gone anyway.
+            pass
+
+
+def _release_inputs(inputs: List[_Input]) -> None:
+    for step_input in inputs:
+        step_input.release()
+    inputs.clear()
+
+
+def _resolve_input(
+    parent: Any, consumer: str, stream: bool, lazy_tables: bool
+) -> _Input:
+    # For each parent get what function to use to retrieve its output
+    # data and metadata related to said data.
+    parent_uuid = parent.properties["uuid"]
+
+    try:
+        get_output_method, args, kwargs, metadata = _resolve(
+            parent_uuid, consumer=consumer, stream=stream, lazy_table=lazy_tables
+        )
+    except error.OutputNotFoundError:
+        parent_title = parent.properties["title"]
+        msg = (
+            f'Output from incoming step "{parent_title}" '
+            f'("{parent_uuid}") cannot be found. Try rerunning it.'
+        )
+        raise error.OutputNotFoundError(msg)
+
+    return _Input(parent, get_output_method, args, kwargs, metadata)
+
+
+def _retrieve_inputs(
+    inputs: List[_Input], ignore_failure: bool, verbose: bool
+) -> List[Any]:
+    """Retrieves inputs concurrently, preserving their order.
+
+    Deserialization of Arrow data and file reads release the GIL, so
+    reading the outputs of multiple parents overlaps.
+    """
+    if len(inputs) <= 1:
+        return [step_input.retrieve(ignore_failure, verbose) for step_input in inputs]
+
+    with ThreadPoolExecutor(
+        max_workers=min(len(inputs), Config.GET_INPUTS_MAX_WORKERS)
+    ) as executor:
+        return list(
+            executor.map(
+                lambda step_input: step_input.retrieve(ignore_failure, verbose), inputs
+            )
+        )
+
+
+class LazyTable:
+    """Handle to an Arrow table output that is read lazily.
+
+    Returned by ``get_inputs(lazy_tables=True)``. The output is memory
+    mapped and only the requested columns and rows are read, which
+    makes reading a few columns of a wide table, or a range of rows of
+    a long table, cheap.
+
+    Example:
+        >>> table = get_inputs(lazy_tables=True)["my_table"]
+        >>> table.read(columns=["a", "b"], offset=1000, length=100)
+
+    """
+
+    def __init__(self, file_path: str) -> None:
+        self._file_path = file_path
+        self._table = None
+        reader = pa.ipc.open_file(pa.memory_map(file_path, "rb"))
+        self._schema = reader.schema
+        self._num_batches = reader.num_record_batches
+        self._batch_offsets = None
+
+    @classmethod
+    def from_table(cls, table: pa.Table) -> "LazyTable":
+        """Wraps a table that has already been read."""
+        lazy_table = cls.__new__(cls)
+        lazy_table._file_path = None
+        lazy_table._table = table
+        lazy_table._schema = table.schema
+        return lazy_table
+
+    @property
+    def schema(self) -> pa.Schema:
+        return self._schema
+
+    @property
+    def column_names(self) -> List[str]:
+        return self._schema.names
+
+    @property
+    def num_rows(self) -> int:
+        if self._table is not None:
+            return self._table.num_rows
+        return self._get_batch_offsets()[-1]
+
+    def __len__(self) -> int:
+        return self.num_rows
+
+    def read(
+        self,
+        columns: Optional[List[str]] = None,
+        offset: int = 0,
+        length: Optional[int] = None,
+    ) -> pa.Table:
+        """Reads (part of) the table.
+
+        Args:
+            columns: Names of the columns to read, all columns if
+                ``None``.
+            offset: Index of the first row to read.
+            length: Number of rows to read, up to the end of the table
+                if ``None``.
+
+        Returns:
+            A ``pa.Table`` referencing the memory mapped output.
+
+        Raises:
+            KeyError: If a column does not exist.
+        """
+        if columns is None:
+            columns = self.column_names
+        indices = [self._get_column_index(column) for column in columns]
+
+        if self._table is not None:
+            table = self._table.select(indices)
+            return table.slice(offset, length)
+
+        if length is None:
+            length = max(0, self.num_rows - offset)
+        end = offset + length
+
+        # Only the batches that overlap with the row range are read.
+        batch_offsets = self._get_batch_offsets()
+        reader = self._open(indices)
+        batches = []
+        for i in range(self._num_batches):
+            start, stop = batch_offsets[i], batch_offsets[i + 1]
+            if stop <= offset or start >= end:
+                continue
+            batch = self._select(reader.get_batch(i), indices)
+            batches.append(
+                batch.slice(max(offset - start, 0), min(end, stop) - max(offset, start))
+            )
+
+        schema = pa.schema([self._schema.field(i) for i in indices])
+        return pa.Table.from_batches(batches, schema=schema)
+
+    def to_pandas(self, columns: Optional[List[str]] = None, **kwargs) -> Any:
+        """Reads the given columns into a ``pd.DataFrame``.
+
+        Keyword arguments are passed to ``pa.Table.to_pandas``.
+        """
+        return self.read(columns=columns).to_pandas(**kwargs)
+
+    def _get_column_index(self, column: str) -> int:
+        index = self._schema.get_field_index(column)
+        if index == -1:
+            raise KeyError(f'Column "{column}" does not exist.')
+        return index
+
+    def _open(self, indices: List[int]) -> Any:
+        # Opening a reader only reads the footer of the file. Limiting
+        # the fields of the reader avoids decompressing all columns of
+        # compressed data.
+        source = pa.memory_map(self._file_path, "rb")
+        try:
+            options = pa.ipc.IpcReadOptions(included_fields=sorted(set(indices)))
+            return pa.ipc.open_file(source, options=options)
+        except (AttributeError, TypeError):
+            return pa.ipc.open_file(source)
+
+    def _select(self, batch: pa.RecordBatch, indices: List[int]) -> pa.RecordBatch:
+        # The batch contains either all fields, or the included fields
+        # in the order of the schema.
+        if batch.num_columns == len(self._schema):
+            included = list(range(len(self._schema)))
+        else:
+            included = sorted(set(indices))
+        return pa.RecordBatch.from_arrays(
+            [batch.column(included.index(i)) for i in indices],
+            schema=pa.schema([self._schema.field(i) for i in indices]),
+        )
+
+    def _get_batch_offsets(self) -> List[int]:
+        if self._batch_offsets is None:
+            # The number of rows of a batch is in its metadata, only
+            # the first column is read to get it.
+            reader = self._open([0] if self._schema.names else [])
+            offsets = [0]
+            for i in range(self._num_batches):
+                offsets.append(offsets[-1] + reader.get_batch(i).num_rows)
+            self._batch_offsets = offsets
+        return self._batch_offsets
+
+    def __repr__(self) -> str:
+        return f"LazyTable({self._schema!r})"
+
+
+class LazyInputs(Mapping):
+    """Inputs of a step that are retrieved once they are accessed.
+
+    Returned by ``get_inputs(lazy=True)``, it behaves like the
+    dictionary returned by :func:`get_inputs`, but the data of an input
+    is only retrieved, and deserialized, the first time it is accessed.
+    Accessing the ``"unnamed"`` key retrieves all unnamed inputs.
+
+    Outputs in memory are only evicted once all the steps consuming
+    them are done with them. Inputs that are never accessed are
+    released when the inputs are closed, which happens at the latest
+    once they are garbage collected or the step exits.
+
+    Example:
+        >>> with get_inputs(lazy=True) as inputs:
+        ...     # Only the output named "features" is read.
+        ...     features = inputs["features"]
+    """
+
+    def __init__(self, inputs: List[_Input], ignore_failure: bool, verbose: bool):
+        self._named = {
+            step_input.name: step_input
+            for step_input in inputs
+            if step_input.name != Config._RESERVED_UNNAMED_OUTPUTS_STR
+        }
+        self._unnamed = [
+            step_input
+            for step_input in inputs
+            if step_input.name == Config._RESERVED_UNNAMED_OUTPUTS_STR
+        ]
+        self._ignore_failure = ignore_failure
+        self._verbose = verbose
+        self._data = {}  # type: Dict[str, Any]
+        # Inputs that have not been retrieved, released on close. The
+        # finalizer does not reference the mapping, so that it can be
+        # garbage collected.
+        self._unretrieved = list(inputs)
+        self._finalizer = weakref.finalize(self, _release_inputs, self._unretrieved)
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._data:
+            if key == Config._RESERVED_UNNAMED_OUTPUTS_STR:
+                inputs = self._unnamed
+                self._data[key] = _retrieve_inputs(
+                    inputs, self._ignore_failure, self._verbose
+                )
+            else:
+                inputs = [self._named[key]]
+                self._data[key] = inputs[0].retrieve(
+                    self._ignore_failure, self._verbose
+                )
+            for step_input in inputs:
+                if step_input in self._unretrieved:
+                    self._unretrieved.remove(step_input)
+        return self._data[key]
+
+    def __contains__(self, key: object) -> bool:
+        # Mapping.__contains__ would retrieve the input.
+        return key == Config._RESERVED_UNNAMED_OUTPUTS_STR or key in self._named
+
+    def close(self) -> None:
+        """Releases the inputs that have not been accessed.
+
+        The memory store is notified that this step consumed them, so
+        that they can be evicted. Accessing them afterwards might fail.
+        """
+        self._finalizer()
+
+    def __enter__(self) -> "LazyInputs":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def __iter__(self) -> Iterator[str]:
+        yield Config._RESERVED_UNNAMED_OUTPUTS_STR
+        yield from self._named
+
+    def __len__(self) -> int:
+        return len(self._named) + 1
+
+    def __repr__(self) -> str:
+        return f"LazyInputs({list(self)})"
+
+
 def get_inputs(
     ignore_failure: bool = False,
     verbose: bool = False,
-) -> Dict[str, Any]:
+    lazy: bool = False,
+    stream: bool = False,
+    lazy_tables: bool = False,
+) -> Mapping[str, Any]:
     """Gets all data sent from incoming steps.
 
     Warning:
@@ -998,6 +2019,20 @@ def get_inputs(
             :exc:`OutputNotFoundError`
         verbose: If ``True`` print all the steps from which the current
             step has retrieved data.
+        lazy: If ``True`` the data of the incoming steps is only
+            retrieved once it is accessed, see :class:`LazyInputs`.
+            Useful when a step only uses some of its inputs. Inputs
+            that are not accessed are released once the returned
+            mapping is closed.
+        stream: If ``True`` Arrow data, e.g. output through
+            :func:`output_stream`, is returned as a
+            ``pa.ipc.RecordBatchReader`` over the memory mapped output
+            file, so that it can be processed batch by batch instead of
+            being read in full.
+        lazy_tables: If ``True`` Arrow tables are returned as a
+            :class:`LazyTable` over the memory mapped output, from
+            which only the needed columns and rows are read. Takes
+            precedence over `stream` for Arrow tables.
 
     Returns:
         Dictionary with input data for this step. We differentiate
@@ -1016,6 +2051,8 @@ def get_inputs(
           GUI, refer to the :ref:`this section <unnamed order>` for more
           details.
 
+        The outputs of the incoming steps are retrieved concurrently.
+
         Example::
 
             # It does not matter how the data was outputted by parent
@@ -1041,48 +2078,33 @@ def get_inputs(
         _print_warning_message(_GET_INPUTS_CALLED_TWICE_WARNING)
     _get_inputs_called = True
 
-    try:
-        with open(Config.PIPELINE_DEFINITION_PATH, "r") as f:
-            pipeline_definition = json.load(f)
-    except FileNotFoundError:
-        raise error.PipelineDefinitionNotFoundError(
-            f"Could not open {Config.PIPELINE_DEFINITION_PATH}."
-        )
-
-    pipeline = Pipeline.from_json(pipeline_definition)
+    pipeline = _get_pipeline()
     try:
         step_uuid = get_step_uuid(pipeline)
     except error.StepUUIDResolveError:
         raise error.StepUUIDResolveError("Failed to determine from where to get data.")
 
-    collisions_dict = defaultdict(list)
-    get_output_methods = []
+    parents = pipeline.get_step_by_uuid(step_uuid).parents
+
+    # Resolve (e.g. read the HEAD file of) every parent concurrently.
+    # Raises the error of the first parent, in order, that failed.
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(len(parents), Config.GET_INPUTS_MAX_WORKERS))
+    ) as executor:
+        inputs = list(
+            executor.map(
+                lambda parent: _resolve_input(parent, step_uuid, stream, lazy_tables),
+                parents,
+            )
+        )
 
     # Check for collisions before retrieving any data.
-    for parent in pipeline.get_step_by_uuid(step_uuid).parents:
-
-        # For each parent get what function to use to retrieve its
-        # output data and metadata related to said data.
-        parent_uuid = parent.properties["uuid"]
-
-        try:
-            get_output_method, args, kwargs, metadata = _resolve(
-                parent_uuid, consumer=step_uuid
-            )
-        except error.OutputNotFoundError:
-            parent_title = parent.properties["title"]
-            msg = (
-                f'Output from incoming step "{parent_title}" '
-                f'("{parent_uuid}") cannot be found. Try rerunning it.'
+    collisions_dict = defaultdict(list)
+    for step_input in inputs:
+        if step_input.name != Config._RESERVED_UNNAMED_OUTPUTS_STR:
+            collisions_dict[step_input.name].append(
+                step_input.parent.properties["title"]
             )
-            raise error.OutputNotFoundError(msg)
-
-        # Maintain the output methods in order, but wait with calling
-        # them so that we can first check for collisions.
-        get_output_methods.append((parent, get_output_method, args, kwargs, metadata))
-
-        if metadata["name"] != Config._RESERVED_UNNAMED_OUTPUTS_STR:
-            collisions_dict[metadata["name"]].append(parent.properties["title"])
 
     # If there are collisions raise an error.
     collisions_dict = {k: v for k, v in collisions_dict.items() if len(v) > 1}
@@ -1097,40 +2119,23 @@ def get_inputs(
             f"Name collisions between input data coming from different steps: {msg}"
         )
 
-    # TODO: maybe instead of for loop we could first get the receive
-    #       method and then do batch receive. For example memory allows
-    #       to do get_buffers which operates in batch.
+    if lazy:
+        return LazyInputs(inputs, ignore_failure, verbose)
+
     # NOTE: the order in which the `parents` list is traversed is
     # indirectly set in the UI. The order is important since it
     # determines the order in which unnamed inputs are received in
     # the next step.
     data = {Config._RESERVED_UNNAMED_OUTPUTS_STR: []}  # type: Dict[str, Any]
-    for parent, get_output_method, args, kwargs, metadata in get_output_methods:
-
-        # Either raise an error on failure of getting output or
-        # continue with other steps.
-        try:
-            incoming_step_data = get_output_method(*args, **kwargs)
-        except error.OutputNotFoundError as e:
-            if not ignore_failure:
-                raise error.OutputNotFoundError(e)
-
-            incoming_step_data = None
-
-        if verbose:
-            parent_title = parent.properties["title"]
-            if incoming_step_data is None:
-                print(f'Failed to retrieve input from step: "{parent_title}"')
-            else:
-                print(f'Retrieved input from step: "{parent_title}"')
-
+    for step_input, incoming_step_data in zip(
+        inputs, _retrieve_inputs(inputs, ignore_failure, verbose)
+    ):
         # Populate the return dictionary, where nameless data gets
         # appended to a list and named data becomes a (name, data) pair.
-        name = metadata["name"]
-        if name == Config._RESERVED_UNNAMED_OUTPUTS_STR:
+        if step_input.name == Config._RESERVED_UNNAMED_OUTPUTS_STR:
             data[Config._RESERVED_UNNAMED_OUTPUTS_STR].append(incoming_step_data)
         else:
-            data[name] = incoming_step_data
+            data[step_input.name] = incoming_step_data
 
     return data
 
@@ -1138,6 +2143,7 @@ def get_inputs(
 def output(
     data: Any,
     name: Optional[str],
+    compression: Optional[str] = None,
 ) -> None:
     """Outputs data so that it can be retrieved by the next step.
 
@@ -1153,6 +2159,8 @@ def output(
             of the data, when ``None``, the data is considered nameless.
             This affects the way the data can be later retrieved using
             :func:`get_inputs`.
+        compression: Codec to compress the data with, see
+            :func:`output_to_disk`.
 
     Raises:
         DataInvalidNameError: The name of the output data is invalid,
@@ -1177,22 +2185,10 @@ def output(
     return output_to_disk(
         data,
         name,
+        compression=compression,
     )
 
 
-def _convert_uuid_to_object_id(step_uuid: str) -> plasma.ObjectID:
-    """Converts a UUID to a plasma.ObjectID.
-
-    Args:
-        step_uuid: UUID of a step.
-
-    Returns:
-        An ObjectID of the first 20 characters of the `step_uuid`.
-    """
-    binary_uuid = str.encode(step_uuid)
-    return plasma.ObjectID(binary_uuid[:20])
-
-
 # TODO: Once we are set on the API we could specify __all__. For now we
 #       will stick with the leading _underscore convention to indicate
 #       private methods.
@@ -1,12 +1,22 @@
 import json
 import os
+import threading
+import time
 import urllib
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Tuple
 
 from orchest.config import Config
 from orchest.error import OrchestNetworkError, StepUUIDResolveError
 from orchest.pipeline import Pipeline
 
+_cache_lock = threading.Lock()
+# Parsed pipeline definitions by path, along with the version of the
+# file they were parsed from.
+_pipeline_cache: Dict[str, Tuple[Tuple[int, int, int], Pipeline]] = {}
+# Notebook paths of kernels by (sessions url, kernel id), along with
+# the time they were retrieved.
+_notebook_path_cache: Dict[Tuple[str, str], Tuple[float, str]] = {}
+
 
 def get_step_uuid(pipeline: Pipeline) -> str:
     """Gets the currently running script's step UUID.
@@ -35,11 +45,48 @@ def get_step_uuid(pipeline: Pipeline) -> str:
     # Get JupyterLab sessions to resolve the step's UUID via the id of
     # the running kernel and the step's associated file path.
     session_uuid = Config.PROJECT_UUID[:18] + pipeline.properties["uuid"][:18]
-    jupyter_sessions = _request_json(
+    sessions_url = (
         f"http://jupyter-server-{session_uuid}/jupyter-server-{session_uuid}/"
         "api/sessions"
     )
 
+    # The cached notebook path is outdated if the notebook got renamed.
+    for use_cache in [True, False]:
+        notebook_path = _get_notebook_path(sessions_url, kernel_id, use_cache)
+        for step in pipeline.steps:
+            # Compare basenames, one pipeline can not have duplicate
+            # notebook names, so this should work
+            if os.path.basename(step.properties["file_path"]) == os.path.basename(
+                notebook_path
+            ):
+                # NOTE: the UUID cannot be cached here. Because if the
+                # notebook is assigned to a different step, then the env
+                # variable does not change and thus the notebooks
+                # wrongly thinks it is a different step. Only the
+                # notebook path of the kernel is cached, the step is
+                # resolved through the current pipeline definition.
+                return step.properties["uuid"]
+
+    raise StepUUIDResolveError(f'No step with "notebook_path": {notebook_path}.')
+
+
+def _get_notebook_path(sessions_url: str, kernel_id: str, use_cache: bool) -> str:
+    """Gets the path of the notebook the kernel is running for.
+
+    The path is cached for ``Config.NOTEBOOK_PATH_CACHE_TTL`` seconds,
+    since it only changes when the notebook is renamed.
+    """
+    key = (sessions_url, kernel_id)
+    with _cache_lock:
+        cached = _notebook_path_cache.get(key)
+    if (
+        use_cache
+        and cached is not None
+        and time.monotonic() - cached[0] < Config.NOTEBOOK_PATH_CACHE_TTL
+    ):
+        return cached[1]
+
+    jupyter_sessions = _request_json(sessions_url)
     for session in jupyter_sessions:
         if session["kernel"]["id"] == kernel_id:
             notebook_path = session["notebook"]["path"]
@@ -50,25 +97,46 @@ def get_step_uuid(pipeline: Pipeline) -> str:
             f'"KERNEL_ID" of this step: {kernel_id}.'
         )
 
-    for step in pipeline.steps:
-        # Compare basenames, one pipeline can not have duplicate
-        # notebook names, so this should work
-        if os.path.basename(step.properties["file_path"]) == os.path.basename(
-            notebook_path
-        ):
-            # NOTE: the UUID cannot be cached here. Because if the
-            # notebook is assigned to a different step, then the env
-            # variable does not change and thus the notebooks wrongly
-            # thinks it is a different step.
-            return step.properties["uuid"]
-
-    raise StepUUIDResolveError(f'No step with "notebook_path": {notebook_path}.')
+    with _cache_lock:
+        _notebook_path_cache[key] = (time.monotonic(), notebook_path)
+    return notebook_path
 
 
 def get_pipeline() -> Pipeline:
-    with open(Config.PIPELINE_DEFINITION_PATH, "r") as f:
+    """Gets the pipeline from the pipeline definition file.
+
+    The parsed pipeline is cached for as long as the file does not
+    change, it must therefore not be modified.
+
+    Raises:
+        FileNotFoundError: If the pipeline definition file does not
+            exist.
+    """
+    path = Config.PIPELINE_DEFINITION_PATH
+    version = _get_file_version(path)
+    with _cache_lock:
+        cached = _pipeline_cache.get(path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    with open(path, "r") as f:
         pipeline_definition = json.load(f)
-    return Pipeline.from_json(pipeline_definition)
+    pipeline = Pipeline.from_json(pipeline_definition)
+
+    # The file is only cached if it did not change while being read.
+    if version is not None and version == _get_file_version(path):
+        with _cache_lock:
+            _pipeline_cache[path] = (version, pipeline)
+    return pipeline
+
+
+def _get_file_version(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    # The inode changes when the file is atomically replaced.
+    return st.st_ino, st.st_mtime_ns, st.st_size
 
 
 def _request_json(url: str) -> Dict[Any, Any]:
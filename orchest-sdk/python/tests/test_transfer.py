@@ -1,6 +1,8 @@
 """
 uuid-1, uuid-3 --> uuid-2
 """
+import json
+import os
 import shutil
 import time
 from unittest.mock import patch
@@ -8,18 +10,17 @@ from unittest.mock import patch
 import numpy as np
 import pandas as pd
 import pyarrow as pa
-import pyarrow.plasma as plasma
 import pytest
 
 import orchest
-from orchest import transfer
+from orchest import memory_store, transfer
 
 KILOBYTE = 1 << 10
 MEGABYTE = KILOBYTE * KILOBYTE
 
 # NOTE: has to be multiple of 10, ie. 10, 100, etc.
-PLASMA_KILOBYTES = 10
-PLASMA_STORE_CAPACITY = PLASMA_KILOBYTES * KILOBYTE
+STORE_KILOBYTES = 10
+STORE_CAPACITY = STORE_KILOBYTES * KILOBYTE
 
 
 def generate_data(total_size):
@@ -76,8 +77,8 @@ class CustomClass:
 
 
 @pytest.fixture()
-def plasma_store(monkeypatch):
-    with plasma.start_plasma_store(PLASMA_STORE_CAPACITY) as info:
+def store(monkeypatch):
+    with memory_store.start_memory_store(STORE_CAPACITY) as info:
         store_socket_name, _ = info
         monkeypatch.setattr(orchest.Config, "STORE_SOCKET_NAME", store_socket_name)
         yield store_socket_name
@@ -110,11 +111,10 @@ def plasma_store(monkeypatch):
 )
 @patch("orchest.transfer.get_step_uuid")
 @patch("orchest.Config.STEP_DATA_DIR", "tests/userdir/.data/{step_uuid}")
-def test_disk(mock_get_step_uuid, data_1, test_transfer, plasma_store):
+def test_disk(mock_get_step_uuid, data_1, test_transfer, store):
     orchest.Config.PIPELINE_DEFINITION_PATH = "tests/userdir/pipeline-basic.json"
 
-    # Do as if we are uuid-1. Note the trailing underscores. This is to
-    # make the plasma.ObjectID the required 20 characters.
+    # Do as if we are uuid-1.
     mock_get_step_uuid.return_value = "uuid-1______________"
 
     test_transfer["method"](data_1, **test_transfer["kwargs"])
@@ -173,11 +173,10 @@ def test_disk(mock_get_step_uuid, data_1, test_transfer, plasma_store):
 )
 @patch("orchest.transfer.get_step_uuid")
 @patch("orchest.Config.STEP_DATA_DIR", "tests/userdir/.data/{step_uuid}")
-def test_memory(mock_get_step_uuid, data_1, test_transfer, plasma_store):
+def test_memory(mock_get_step_uuid, data_1, test_transfer, store):
     orchest.Config.PIPELINE_DEFINITION_PATH = "tests/userdir/pipeline-basic.json"
 
-    # Do as if we are uuid-1. Note the trailing underscores. This is to
-    # make the plasma.ObjectID the required 20 characters.
+    # Do as if we are uuid-1.
     mock_get_step_uuid.return_value = "uuid-1______________"
     test_transfer["method"](data_1, **test_transfer["kwargs"])
 
@@ -202,11 +201,11 @@ def test_memory(mock_get_step_uuid, data_1, test_transfer, plasma_store):
 
 @patch("orchest.transfer.get_step_uuid")
 @patch("orchest.Config.STEP_DATA_DIR", "tests/userdir/.data/{step_uuid}")
-def test_memory_out_of_memory(mock_get_step_uuid, plasma_store):
-    data_1 = generate_data((PLASMA_KILOBYTES + 1) * KILOBYTE)
+def test_memory_out_of_memory(mock_get_step_uuid, store):
+    data_1 = generate_data((STORE_KILOBYTES + 1) * KILOBYTE)
     ser_data, _ = transfer._serialize(data_1)
     data_size = ser_data.size
-    assert data_size > PLASMA_STORE_CAPACITY
+    assert data_size > STORE_CAPACITY
 
     orchest.Config.PIPELINE_DEFINITION_PATH = "tests/userdir/pipeline-basic.json"
 
@@ -221,16 +220,112 @@ def test_memory_out_of_memory(mock_get_step_uuid, plasma_store):
         )
 
 
+@pytest.fixture()
+def spilling_store(monkeypatch):
+    with memory_store.start_memory_store(STORE_CAPACITY, spill=True) as info:
+        store_socket_name, store = info
+        monkeypatch.setattr(orchest.Config, "STORE_SOCKET_NAME", store_socket_name)
+        yield store
+
+    uuids = ["uuid-1______________", "uuid-2______________", "uuid-3______________"]
+
+    for step_uuid in uuids:
+        shutil.rmtree(f"tests/userdir/.data/{step_uuid}", ignore_errors=True)
+
+
 @patch("orchest.transfer.get_step_uuid")
 @patch("orchest.Config.STEP_DATA_DIR", "tests/userdir/.data/{step_uuid}")
-def test_memory_disk_fallback(mock_get_step_uuid, plasma_store):
+def test_memory_spill_to_disk(mock_get_step_uuid, spilling_store):
     orchest.Config.PIPELINE_DEFINITION_PATH = "tests/userdir/pipeline-basic.json"
 
     # Do as if we are uuid-1
-    data_1 = generate_data((PLASMA_KILOBYTES + 1) * KILOBYTE)
+    mock_get_step_uuid.return_value = "uuid-1______________"
+    data_1 = generate_data(0.6 * STORE_KILOBYTES * KILOBYTE)
+    transfer.output_to_memory(data_1, name="data_1", disk_fallback=False)
+
+    # Do as if we are uuid-3, its output only fits by spilling the
+    # output of uuid-1 to disk.
+    mock_get_step_uuid.return_value = "uuid-3______________"
+    data_3 = generate_data(0.6 * STORE_KILOBYTES * KILOBYTE)
+    transfer.output_to_memory(data_3, name="data_3", disk_fallback=False)
+
+    stats = spilling_store.stats()
+    assert stats["spills"] == 1
+    assert stats["objects"] == 1
+
+    # Do as if we are uuid-2, the output of uuid-1 is read from disk.
+    mock_get_step_uuid.return_value = "uuid-2______________"
+    input_data = transfer.get_inputs()
+    assert (input_data["data_1"] == data_1).all()
+
+    stats = spilling_store.stats()
+    assert stats["hits"] == 0
+    assert stats["misses"] == 1
+
+
+@patch("orchest.transfer.get_step_uuid")
+@patch("orchest.Config.STEP_DATA_DIR", "tests/userdir/.data/{step_uuid}")
+def test_memory_spill_does_not_block_store(
+    mock_get_step_uuid, spilling_store, monkeypatch
+):
+    orchest.Config.PIPELINE_DEFINITION_PATH = "tests/userdir/pipeline-basic.json"
+
+    mock_get_step_uuid.return_value = "uuid-1______________"
+    data_1 = generate_data(0.6 * STORE_KILOBYTES * KILOBYTE)
+    transfer.output_to_memory(data_1, name=None, disk_fallback=False)
+
+    spill_to_disk = transfer._spill_to_disk
+    during_spill = {}
+
+    def _spill_to_disk(*args, **kwargs):
+        # The store serves other requests while an object is spilled.
+        during_spill["locked"] = spilling_store._lock.locked()
+        during_spill["stats"] = spilling_store.stats()
+        spill_to_disk(*args, **kwargs)
+
+    monkeypatch.setattr(transfer, "_spill_to_disk", _spill_to_disk)
+    mock_get_step_uuid.return_value = "uuid-3______________"
+    data_3 = generate_data(0.6 * STORE_KILOBYTES * KILOBYTE)
+    transfer.output_to_memory(data_3, name=None, disk_fallback=False)
+
+    assert during_spill["locked"] is False
+    assert during_spill["stats"]["objects"] == 1
+    assert spilling_store.stats()["spills"] == 1
+    assert not spilling_store._spilling
+
+
+@patch("orchest.transfer.get_step_uuid")
+@patch("orchest.Config.STEP_DATA_DIR", "tests/userdir/.data/{step_uuid}")
+def test_memory_spill_after_resolve(mock_get_step_uuid, spilling_store):
+    orchest.Config.PIPELINE_DEFINITION_PATH = "tests/userdir/pipeline-basic.json"
+
+    mock_get_step_uuid.return_value = "uuid-1______________"
+    data_1 = generate_data(0.6 * STORE_KILOBYTES * KILOBYTE)
+    transfer.output_to_memory(data_1, name=None, disk_fallback=False)
+
+    method, args, kwargs, _ = transfer._resolve(
+        "uuid-1______________", consumer="uuid-2______________"
+    )
+    assert method == transfer._get_output_memory
+
+    # The output is spilled to disk before it is read.
+    mock_get_step_uuid.return_value = "uuid-3______________"
+    data_3 = generate_data(0.6 * STORE_KILOBYTES * KILOBYTE)
+    transfer.output_to_memory(data_3, name=None, disk_fallback=False)
+
+    assert (method(*args, **kwargs) == data_1).all()
+
+
+@patch("orchest.transfer.get_step_uuid")
+@patch("orchest.Config.STEP_DATA_DIR", "tests/userdir/.data/{step_uuid}")
+def test_memory_disk_fallback(mock_get_step_uuid, store):
+    orchest.Config.PIPELINE_DEFINITION_PATH = "tests/userdir/pipeline-basic.json"
+
+    # Do as if we are uuid-1
+    data_1 = generate_data((STORE_KILOBYTES + 1) * KILOBYTE)
     ser_data, _ = transfer._serialize(data_1)
     data_size = ser_data.size
-    assert data_size > PLASMA_STORE_CAPACITY
+    assert data_size > STORE_CAPACITY
 
     mock_get_step_uuid.return_value = "uuid-1______________"
     transfer.output_to_memory(
@@ -248,10 +343,10 @@ def test_memory_disk_fallback(mock_get_step_uuid, plasma_store):
 
 @patch("orchest.transfer.get_step_uuid")
 @patch("orchest.Config.STEP_DATA_DIR", "tests/userdir/.data/{step_uuid}")
-def test_memory_pickle_fallback_and_disk_fallback(mock_get_step_uuid, plasma_store):
-    data_1 = [CustomClass(generate_data(KILOBYTE)) for _ in range(PLASMA_KILOBYTES + 1)]
+def test_memory_pickle_fallback_and_disk_fallback(mock_get_step_uuid, store):
+    data_1 = [CustomClass(generate_data(KILOBYTE)) for _ in range(STORE_KILOBYTES + 1)]
     serialized, _ = transfer._serialize(data_1)
-    assert serialized.size > PLASMA_STORE_CAPACITY
+    assert serialized.size > STORE_CAPACITY
 
     orchest.Config.PIPELINE_DEFINITION_PATH = "tests/userdir/pipeline-basic.json"
 
@@ -272,7 +367,7 @@ def test_memory_pickle_fallback_and_disk_fallback(mock_get_step_uuid, plasma_sto
 
 @patch("orchest.transfer.get_step_uuid")
 @patch("orchest.Config.STEP_DATA_DIR", "tests/userdir/.data/{step_uuid}")
-def test_resolve_disk_then_memory(mock_get_step_uuid, plasma_store):
+def test_resolve_disk_then_memory(mock_get_step_uuid, store):
     orchest.Config.PIPELINE_DEFINITION_PATH = "tests/userdir/pipeline-basic.json"
 
     # Do as if we are uuid-1.
@@ -302,7 +397,7 @@ def test_resolve_disk_then_memory(mock_get_step_uuid, plasma_store):
 
 @patch("orchest.transfer.get_step_uuid")
 @patch("orchest.Config.STEP_DATA_DIR", "tests/userdir/.data/{step_uuid}")
-def test_resolve_memory_then_disk(mock_get_step_uuid, plasma_store):
+def test_resolve_memory_then_disk(mock_get_step_uuid, store):
     orchest.Config.PIPELINE_DEFINITION_PATH = "tests/userdir/pipeline-basic.json"
 
     # Do as if we are uuid-1.
@@ -332,7 +427,7 @@ def test_resolve_memory_then_disk(mock_get_step_uuid, plasma_store):
 
 @patch("orchest.transfer.get_step_uuid")
 @patch("orchest.Config.STEP_DATA_DIR", "tests/userdir/.data/{step_uuid}")
-def test_receive_input_order(mock_get_step_uuid, plasma_store):
+def test_receive_input_order(mock_get_step_uuid, store):
     """Test the order of the inputs of the receiving step.
 
     Note that the order in which the data is output does not determine the
@@ -361,7 +456,7 @@ def test_receive_input_order(mock_get_step_uuid, plasma_store):
 
 @patch("orchest.transfer.get_step_uuid")
 @patch("orchest.Config.STEP_DATA_DIR", "tests/userdir/.data/{step_uuid}")
-def test_receive_multiple_named_inputs(mock_get_step_uuid, plasma_store):
+def test_receive_multiple_named_inputs(mock_get_step_uuid, store):
     """Test receiving multiple named inputs."""
     orchest.Config.PIPELINE_DEFINITION_PATH = "tests/userdir/pipeline-order.json"
 
@@ -407,3 +502,359 @@ def test_output_no_memory_store(mock_get_step_uuid):
     input_data = transfer.get_inputs()
     input_data = input_data[orchest.Config._RESERVED_UNNAMED_OUTPUTS_STR][0]
     assert (input_data == data_1).all()
+
+
+@patch("orchest.transfer.get_step_uuid")
+@patch("orchest.Config.STEP_DATA_DIR", "tests/userdir/.data/{step_uuid}")
+def test_get_inputs_lazy(mock_get_step_uuid, monkeypatch):
+    """Test that lazy inputs are only retrieved once accessed."""
+    orchest.Config.PIPELINE_DEFINITION_PATH = "tests/userdir/pipeline-order.json"
+
+    # Do as if we are uuid-3
+    data_3 = generate_data(KILOBYTE)
+    mock_get_step_uuid.return_value = "uuid-3______________"
+    transfer.output(data_3, name="output3")
+
+    # Do as if we are uuid-1
+    data_1 = generate_data(KILOBYTE)
+    mock_get_step_uuid.return_value = "uuid-1______________"
+    transfer.output(data_1, name=None)
+
+    retrieved = []
+    get_output_disk = transfer._get_output_disk
+
+    def _get_output_disk(step_uuid, *args, **kwargs):
+        retrieved.append(step_uuid)
+        return get_output_disk(step_uuid, *args, **kwargs)
+
+    monkeypatch.setattr(transfer, "_get_output_disk", _get_output_disk)
+
+    # Do as if we are uuid-2
+    mock_get_step_uuid.return_value = "uuid-2______________"
+    input_data = transfer.get_inputs(lazy=True)
+    assert sorted(input_data) == ["output3", "unnamed"]
+    assert "output3" in input_data
+    assert "unnamed" in input_data
+    assert "output1" not in input_data
+    assert not retrieved
+
+    assert (input_data["output3"] == data_3).all()
+    assert (input_data["output3"] == data_3).all()
+    assert retrieved == ["uuid-3______________"]
+
+    assert (input_data["unnamed"][0] == data_1).all()
+    assert retrieved == ["uuid-3______________", "uuid-1______________"]
+
+
+@patch("orchest.transfer.get_step_uuid")
+@patch("orchest.Config.STEP_DATA_DIR", "tests/userdir/.data/{step_uuid}")
+def test_get_inputs_lazy_releases_unaccessed_inputs(mock_get_step_uuid, monkeypatch):
+    orchest.Config.PIPELINE_DEFINITION_PATH = "tests/userdir/pipeline-order.json"
+    monkeypatch.setenv("ORCHEST_MEMORY_EVICTION", "True")
+
+    with memory_store.start_memory_store(STORE_CAPACITY) as (socket_name, store):
+        monkeypatch.setattr(orchest.Config, "STORE_SOCKET_NAME", socket_name)
+        consumed = []
+        store.on_consumed = lambda obj_id, consumer: consumed.append(obj_id)
+
+        mock_get_step_uuid.return_value = "uuid-3______________"
+        transfer.output_to_memory(generate_data(KILOBYTE), name="output3")
+        mock_get_step_uuid.return_value = "uuid-1______________"
+        transfer.output_to_memory(generate_data(KILOBYTE), name=None)
+
+        # Do as if we are uuid-2
+        mock_get_step_uuid.return_value = "uuid-2______________"
+        with transfer.get_inputs(lazy=True) as input_data:
+            input_data["output3"]
+            assert consumed == ["uuid-3______________"]
+        # Only the input that was not accessed is released.
+        assert consumed == ["uuid-3______________", "uuid-1______________"]
+
+        # Unclosed inputs are released once garbage collected.
+        consumed.clear()
+        input_data = transfer.get_inputs(lazy=True)
+        del input_data
+        assert sorted(consumed) == ["uuid-1______________", "uuid-3______________"]
+
+
+@patch("orchest.transfer.get_step_uuid")
+@patch("orchest.Config.STEP_DATA_DIR", "tests/userdir/.data/{step_uuid}")
+def test_output_stream(mock_get_step_uuid):
+    orchest.Config.PIPELINE_DEFINITION_PATH = "tests/userdir/pipeline-basic.json"
+    df = pd.DataFrame({"a": range(100), "b": [str(i) for i in range(100)]})
+
+    # Do as if we are uuid-1
+    mock_get_step_uuid.return_value = "uuid-1______________"
+    with orchest.output_stream("streamed") as stream:
+        for i in range(0, 100, 10):
+            stream.write(df.iloc[i : i + 10])
+
+    # Do as if we are uuid-2
+    mock_get_step_uuid.return_value = "uuid-2______________"
+    input_data = transfer.get_inputs()
+    assert input_data["streamed"].to_pandas().equals(df)
+
+    reader = transfer.get_inputs(stream=True)["streamed"]
+    assert isinstance(reader, pa.ipc.RecordBatchReader)
+    batches = list(reader)
+    assert len(batches) == 10
+    assert pa.Table.from_batches(batches).to_pandas().equals(df)
+
+
+@patch("orchest.transfer.get_step_uuid")
+@patch("orchest.Config.STEP_DATA_DIR", "tests/userdir/.data/{step_uuid}")
+def test_output_stream_failure_keeps_previous_output(mock_get_step_uuid):
+    orchest.Config.PIPELINE_DEFINITION_PATH = "tests/userdir/pipeline-basic.json"
+
+    # Do as if we are uuid-1
+    mock_get_step_uuid.return_value = "uuid-1______________"
+    transfer.output("previous", name="data")
+    with pytest.raises(orchest.error.SerializationError):
+        with orchest.output_stream("data") as stream:
+            stream.write(get_test_record_batch())
+            stream.write(pa.record_batch([pa.array([1])], names=["other"]))
+
+    # Do as if we are uuid-2
+    mock_get_step_uuid.return_value = "uuid-2______________"
+    assert transfer.get_inputs()["data"] == "previous"
+
+
+@patch("orchest.transfer.get_step_uuid")
+@patch("orchest.Config.STEP_DATA_DIR", "tests/userdir/.data/{step_uuid}")
+def test_output_stream_writes_to_temporary_file(mock_get_step_uuid):
+    orchest.Config.PIPELINE_DEFINITION_PATH = "tests/userdir/pipeline-basic.json"
+    previous = get_test_table()
+
+    # Do as if we are uuid-1
+    mock_get_step_uuid.return_value = "uuid-1______________"
+    with orchest.output_stream("data") as stream:
+        stream.write(previous)
+    with pytest.raises(orchest.error.SerializationError):
+        with orchest.output_stream("data") as stream:
+            stream.write(get_test_record_batch())
+            # The output is only replaced once the stream is closed.
+            mock_get_step_uuid.return_value = "uuid-2______________"
+            assert transfer.get_inputs()["data"].equals(previous)
+            mock_get_step_uuid.return_value = "uuid-1______________"
+            stream.write(pa.record_batch([pa.array([1])], names=["other"]))
+
+    data_dir = orchest.Config.get_step_data_dir("uuid-1______________")
+    assert not [f for f in os.listdir(data_dir) if f.endswith(".tmp")]
+
+    # Do as if we are uuid-2
+    mock_get_step_uuid.return_value = "uuid-2______________"
+    assert transfer.get_inputs()["data"].equals(previous)
+
+
+@pytest.mark.skipif(
+    not transfer._PICKLE_OOB_SUPPORTED, reason="Requires pickle protocol 5."
+)
+@patch("orchest.transfer.get_step_uuid")
+@patch("orchest.Config.STEP_DATA_DIR", "tests/userdir/.data/{step_uuid}")
+def test_disk_pickle_out_of_band(mock_get_step_uuid):
+    orchest.Config.PIPELINE_DEFINITION_PATH = "tests/userdir/pipeline-basic.json"
+    data = {
+        "array": generate_data(MEGABYTE),
+        "df": pd.DataFrame({"a": np.arange(100000), "b": np.random.randn(100000)}),
+        "small": np.arange(10),
+    }
+
+    # Do as if we are uuid-1
+    mock_get_step_uuid.return_value = "uuid-1______________"
+    transfer.output_to_disk(data, name="data")
+    step_data_dir = orchest.Config.get_step_data_dir("uuid-1______________")
+    with open(os.path.join(step_data_dir, "HEAD")) as f:
+        assert "PICKLE_OOB" in f.read()
+
+    # Do as if we are uuid-2
+    mock_get_step_uuid.return_value = "uuid-2______________"
+    input_data = transfer.get_inputs()["data"]
+    assert (input_data["array"] == data["array"]).all()
+    assert input_data["df"].equals(data["df"])
+    assert (input_data["small"] == data["small"]).all()
+
+    # Mapped copy-on-write, modifying the data does not modify the file.
+    assert input_data["array"].ctypes.data % transfer._OOB_ALIGNMENT == 0
+    input_data["array"][:] = 0
+    assert (transfer.get_inputs()["data"]["array"] == data["array"]).all()
+
+
+@pytest.mark.parametrize(
+    "data_1",
+    [generate_data(MEGABYTE), generate_pandas_df(20), get_test_table()],
+    ids=["ndarray", "pandas", "table"],
+)
+@pytest.mark.parametrize("compression", ["lz4", "zstd"])
+@patch("orchest.transfer.get_step_uuid")
+@patch("orchest.Config.STEP_DATA_DIR", "tests/userdir/.data/{step_uuid}")
+def test_disk_compression(mock_get_step_uuid, data_1, compression):
+    orchest.Config.PIPELINE_DEFINITION_PATH = "tests/userdir/pipeline-basic.json"
+
+    # Do as if we are uuid-1
+    mock_get_step_uuid.return_value = "uuid-1______________"
+    transfer.output_to_disk(data_1, name="data", compression=compression)
+    step_data_dir = orchest.Config.get_step_data_dir("uuid-1______________")
+    with open(os.path.join(step_data_dir, "HEAD")) as f:
+        assert f.read().split("; ")[1].endswith(f".{compression}")
+
+    # Do as if we are uuid-2
+    mock_get_step_uuid.return_value = "uuid-2______________"
+    input_data = transfer.get_inputs()["data"]
+    if isinstance(data_1, (pa.Table, pd.DataFrame)):
+        assert input_data.equals(data_1)
+    else:
+        assert (input_data == data_1).all()
+
+
+@patch("orchest.transfer.get_step_uuid")
+@patch("orchest.Config.STEP_DATA_DIR", "tests/userdir/.data/{step_uuid}")
+def test_output_stream_compression(mock_get_step_uuid):
+    orchest.Config.PIPELINE_DEFINITION_PATH = "tests/userdir/pipeline-basic.json"
+    table = get_test_table()
+
+    # Do as if we are uuid-1
+    mock_get_step_uuid.return_value = "uuid-1______________"
+    with pytest.raises(ValueError):
+        with orchest.output_stream("streamed", compression="gzip"):
+            pass
+    with orchest.output_stream("streamed", compression="zstd") as stream:
+        stream.write(table)
+        stream.write(table)
+
+    # Do as if we are uuid-2
+    mock_get_step_uuid.return_value = "uuid-2______________"
+    reader = transfer.get_inputs(stream=True)["streamed"]
+    assert reader.read_all().equals(pa.concat_tables([table, table]))
+
+
+@pytest.mark.parametrize("compression", [None, "zstd"])
+@patch("orchest.transfer.get_step_uuid")
+@patch("orchest.Config.STEP_DATA_DIR", "tests/userdir/.data/{step_uuid}")
+def test_lazy_table(mock_get_step_uuid, compression):
+    orchest.Config.PIPELINE_DEFINITION_PATH = "tests/userdir/pipeline-basic.json"
+    df = pd.DataFrame({"a": range(100), "b": [str(i) for i in range(100)]})
+    df["c"] = df["a"] * 2
+
+    # Do as if we are uuid-1
+    mock_get_step_uuid.return_value = "uuid-1______________"
+    with orchest.output_stream("streamed", compression=compression) as stream:
+        for i in range(0, 100, 10):
+            stream.write(df.iloc[i : i + 10])
+
+    # Do as if we are uuid-2
+    mock_get_step_uuid.return_value = "uuid-2______________"
+    table = transfer.get_inputs(lazy_tables=True)["streamed"]
+    assert isinstance(table, transfer.LazyTable)
+    assert table.column_names == ["a", "b", "c"]
+    assert len(table) == 100
+
+    expected = df[["c", "a"]].iloc[15:35].reset_index(drop=True)
+    assert table.read(["c", "a"], offset=15, length=20).to_pandas().equals(expected)
+    assert table.read(offset=95).to_pandas().equals(df.iloc[95:].reset_index(drop=True))
+    assert table.to_pandas(columns=["b"]).equals(df[["b"]])
+    with pytest.raises(KeyError):
+        table.read(["d"])
+
+
+@patch("orchest.transfer.get_step_uuid")
+@patch("orchest.Config.STEP_DATA_DIR", "tests/userdir/.data/{step_uuid}")
+def test_lazy_table_memory(mock_get_step_uuid, store):
+    orchest.Config.PIPELINE_DEFINITION_PATH = "tests/userdir/pipeline-basic.json"
+    data_1 = get_test_table()
+
+    # Do as if we are uuid-1
+    mock_get_step_uuid.return_value = "uuid-1______________"
+    transfer.output_to_memory(data_1, name="table", disk_fallback=False)
+
+    # Do as if we are uuid-2
+    mock_get_step_uuid.return_value = "uuid-2______________"
+    table = transfer.get_inputs(lazy_tables=True)["table"]
+    assert isinstance(table, transfer.LazyTable)
+    assert table.read().equals(data_1)
+
+
+@patch("orchest.transfer.get_step_uuid")
+@patch("orchest.Config.STEP_DATA_DIR", "tests/userdir/.data/{step_uuid}")
+def test_read_arrow_stream_format(mock_get_step_uuid):
+    orchest.Config.PIPELINE_DEFINITION_PATH = "tests/userdir/pipeline-basic.json"
+    data_1 = get_test_table()
+
+    # Do as if we are uuid-1, which uses a previous version of the SDK
+    # that writes Arrow data in the stream format.
+    mock_get_step_uuid.return_value = "uuid-1______________"
+    transfer.output_to_disk(data_1, name="table")
+    step_data_dir = orchest.Config.get_step_data_dir("uuid-1______________")
+    with pa.OSFile(
+        os.path.join(step_data_dir, "uuid-1______________.ARROW_TABLE"), "wb"
+    ) as f:
+        with pa.ipc.new_stream(f, data_1.schema) as writer:
+            writer.write_table(data_1)
+
+    # Do as if we are uuid-2
+    mock_get_step_uuid.return_value = "uuid-2______________"
+    assert transfer.get_inputs()["table"].equals(data_1)
+    table = transfer.get_inputs(lazy_tables=True)["table"]
+    assert table.read(["f1"], offset=1).equals(data_1.select(["f1"]).slice(1))
+
+
+@patch("orchest.transfer.get_step_uuid")
+def test_disk_manifest(mock_get_step_uuid, tmp_path, monkeypatch):
+    with open("tests/userdir/pipeline-basic.json", "r") as f:
+        description = json.load(f)
+    description["parameters"] = {"a": 1}
+    description["steps"]["uuid-1______________"]["file_path"] = "step-1.py"
+    description["steps"]["uuid-2______________"]["file_path"] = "step-2.ipynb"
+    pipeline_fname = str(tmp_path / "pipeline.json")
+    with open(pipeline_fname, "w") as f:
+        json.dump(description, f)
+
+    monkeypatch.setattr(orchest.Config, "PIPELINE_DEFINITION_PATH", pipeline_fname)
+    monkeypatch.setattr(
+        orchest.Config, "STEP_DATA_DIR", str(tmp_path / "data" / "{step_uuid}")
+    )
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "step-1.py").write_text("print(1)")
+    notebook = {
+        "cells": [
+            {"cell_type": "code", "source": ["x = 1\n", "y = 2"], "outputs": []},
+            {"cell_type": "markdown", "source": "text"},
+        ]
+    }
+    (tmp_path / "step-2.ipynb").write_text(json.dumps(notebook))
+
+    def read_manifest(step_uuid):
+        with open(tmp_path / "data" / step_uuid / "MANIFEST", "r") as f:
+            return json.load(f)
+
+    mock_get_step_uuid.return_value = "uuid-1______________"
+    transfer.output_to_disk("data", name="x")
+    manifest_1 = read_manifest("uuid-1______________")
+    with open(tmp_path / "data" / "uuid-1______________" / "HEAD", "r") as f:
+        assert f.read().startswith(manifest_1["timestamp"])
+    assert manifest_1["code_hash"] == transfer._hash_step_code("step-1.py")
+    assert manifest_1["inputs"] == {}
+
+    mock_get_step_uuid.return_value = "uuid-2______________"
+    with orchest.output_stream("y") as stream:
+        stream.write(get_test_record_batch())
+    manifest_2 = read_manifest("uuid-2______________")
+    assert manifest_2["inputs"] == {"uuid-1______________": manifest_1["content_hash"]}
+
+    # The outputs of a notebook do not change the hash of its code.
+    notebook["cells"][0]["outputs"] = [{"output_type": "stream", "text": "1"}]
+    (tmp_path / "step-2.ipynb").write_text(json.dumps(notebook))
+    assert transfer._hash_step_code("step-2.ipynb") == manifest_2["code_hash"]
+    notebook["cells"][0]["source"] = "x = 2"
+    (tmp_path / "step-2.ipynb").write_text(json.dumps(notebook))
+    assert transfer._hash_step_code("step-2.ipynb") != manifest_2["code_hash"]
+
+    # Same output, same content hash. Other parameters, other hash.
+    mock_get_step_uuid.return_value = "uuid-1______________"
+    description["steps"]["uuid-1______________"]["parameters"] = {"b": 2}
+    with open(pipeline_fname, "w") as f:
+        json.dump(description, f)
+    time.sleep(0.01)
+    transfer.output_to_disk("data", name="x")
+    manifest = read_manifest("uuid-1______________")
+    assert manifest["content_hash"] == manifest_1["content_hash"]
+    assert manifest["parameters_hash"] != manifest_1["parameters_hash"]
@@ -0,0 +1,90 @@
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+from orchest import parameters, utils
+from orchest.config import Config
+
+
+@pytest.fixture
+def pipeline_fname(tmp_path, monkeypatch):
+    with open("tests/userdir/pipeline-basic.json", "r") as f:
+        description = json.load(f)
+    description["steps"]["uuid-1______________"]["file_path"] = "step-1.ipynb"
+    description["steps"]["uuid-2______________"]["file_path"] = "step-2.ipynb"
+    description["steps"]["uuid-1______________"]["parameters"] = {"a": [1]}
+
+    fname = str(tmp_path / "pipeline.json")
+    with open(fname, "w") as f:
+        json.dump(description, f)
+
+    monkeypatch.setattr(Config, "PIPELINE_DEFINITION_PATH", fname)
+    monkeypatch.setattr(Config, "PROJECT_UUID", "project-uuid")
+    monkeypatch.setenv("KERNEL_ID", "kernel-id")
+    monkeypatch.delenv("ORCHEST_STEP_UUID", raising=False)
+    monkeypatch.setattr(utils, "_notebook_path_cache", {})
+    yield fname, description
+
+
+def write_description(fname, description):
+    # Written to a new file, like the webserver does, so that the
+    # change is detected regardless of the mtime granularity.
+    with open(f"{fname}.tmp", "w") as f:
+        json.dump(description, f)
+    os.replace(f"{fname}.tmp", fname)
+
+
+def test_get_pipeline_cached(pipeline_fname):
+    fname, description = pipeline_fname
+
+    pipeline = utils.get_pipeline()
+    assert utils.get_pipeline() is pipeline
+
+    description["name"] = "renamed"
+    write_description(fname, description)
+    assert utils.get_pipeline().properties["name"] == "renamed"
+
+
+def test_get_step_param_is_copied(pipeline_fname):
+    with patch("orchest.parameters.get_step_uuid") as mock_get_step_uuid:
+        mock_get_step_uuid.return_value = "uuid-1______________"
+        parameters.get_step_param("a").append(2)
+        assert parameters.get_step_param("a") == [1]
+
+
+@patch("orchest.utils._request_json")
+def test_get_step_uuid_notebook_reassigned(mock_request_json, pipeline_fname):
+    fname, description = pipeline_fname
+    mock_request_json.return_value = [
+        {"kernel": {"id": "kernel-id"}, "notebook": {"path": "step-1.ipynb"}}
+    ]
+
+    assert utils.get_step_uuid(utils.get_pipeline()) == "uuid-1______________"
+    assert utils.get_step_uuid(utils.get_pipeline()) == "uuid-1______________"
+    assert mock_request_json.call_count == 1
+
+    # The notebook is assigned to another step.
+    description["steps"]["uuid-1______________"]["file_path"] = "other.ipynb"
+    description["steps"]["uuid-2______________"]["file_path"] = "step-1.ipynb"
+    write_description(fname, description)
+    assert utils.get_step_uuid(utils.get_pipeline()) == "uuid-2______________"
+    assert mock_request_json.call_count == 1
+
+
+@patch("orchest.utils._request_json")
+def test_get_step_uuid_notebook_renamed(mock_request_json, pipeline_fname):
+    fname, description = pipeline_fname
+    mock_request_json.return_value = [
+        {"kernel": {"id": "kernel-id"}, "notebook": {"path": "step-1.ipynb"}}
+    ]
+    assert utils.get_step_uuid(utils.get_pipeline()) == "uuid-1______________"
+
+    description["steps"]["uuid-1______________"]["file_path"] = "renamed.ipynb"
+    write_description(fname, description)
+    mock_request_json.return_value = [
+        {"kernel": {"id": "kernel-id"}, "notebook": {"path": "renamed.ipynb"}}
+    ]
+    assert utils.get_step_uuid(utils.get_pipeline()) == "uuid-1______________"
+    assert mock_request_json.call_count == 2
@@ -98,6 +98,7 @@ SDK_IMAGES=(
     "base-kernel-py-gpu"
     "base-kernel-r"
     "base-kernel-julia"
+    "memory-server"
 )
 
 HELM_IMAGES=(
@@ -2,8 +2,12 @@ import os
 
 from _orchest.internals import config as _config
 
-# Default location where the socket is created.
-STORE_SOCKET_NAME = os.path.join(_config.MEMORY_SERVER_SOCK_PATH, "plasma.sock")
+# Directory, on a tmpfs shared with the kernels, in which the objects
+# are stored.
+STORE_DIR = os.path.join(_config.MEMORY_SERVER_DIR, "objects")
+
+# Default location where the control socket of the store is created.
+STORE_SOCKET_NAME = os.path.join(_config.MEMORY_SERVER_DIR, "memory-server.sock")
 
 # Used to determine whether objects need to be evicted.
 PIPELINE_FNAME = os.environ.get("ORCHEST_PIPELINE_PATH", "")
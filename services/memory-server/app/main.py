@@ -1,28 +1,24 @@
 import argparse
-import contextlib
 import os
 import signal
-import subprocess
 import sys
-import time
-from typing import Tuple
 
-import pyarrow as pa
 import utils
-from manager import start_manager
+from manager import EvictionManager
 
 import config
+from orchest.memory_store import MemoryStoreServer, ObjectStore
 
 
 def get_command_line_args():
-    parser = argparse.ArgumentParser(description="Start plasma store and manager.")
+    parser = argparse.ArgumentParser(description="Start memory store and manager.")
     parser.add_argument(
         "-m",
         "--memory",
         type=int,
         required=False,
         default=None,
-        help="amount of memory for plasma store",
+        help="amount of memory for the memory store",
     )
     parser.add_argument(
         "-s",
@@ -31,6 +27,18 @@ def get_command_line_args():
         default=config.STORE_SOCKET_NAME,
         help="socket name to communicate with store",
     )
+    parser.add_argument(
+        "-d",
+        "--store_dir",
+        required=False,
+        default=config.STORE_DIR,
+        help="directory, on a tmpfs, in which objects are stored",
+    )
+    parser.add_argument(
+        "--no_spill",
+        action="store_true",
+        help="do not spill objects to disk when the store is out of memory",
+    )
     parser.add_argument(
         "-p",
         "--pipeline_fname",
@@ -43,63 +51,44 @@ def get_command_line_args():
     return args
 
 
-@contextlib.contextmanager
-def start_plasma_store(
-    memory: int,
-    store_socket_name: str = "/tmp/plasma.sock",
-) -> Tuple[str, subprocess.Popen]:
-    """Starts a plasma store in a subprocess.
-
-    Args:
-        memory: The capacity of the plasma store in bytes.
-
-    Yields:
-        Socket name of the store and process in which the store was
-        started.
-
-    """
-    try:
-        executable = os.path.join(pa.__path__[0], "plasma-store-server")
-
-        command = [executable, "-s", store_socket_name, "-m", str(memory)]
-
-        proc = subprocess.Popen(command)
-
-        time.sleep(0.5)
-
-        rc = proc.poll()
-        if rc is not None:
-            raise RuntimeError(f'Plasma store exited unexpectedly with code "{rc}".')
-
-        yield store_socket_name, proc
-
-    finally:
-        if proc.poll() is None:
-            proc.kill()
-
-        os.remove(store_socket_name)
-
-
 def main():
-    signal.signal(signal.SIGTERM, lambda: sys.exit(0))
+    # Exit through the `finally` clause so that the objects, which live
+    # in shared memory, are deleted.
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
     args = get_command_line_args()
 
     memory = args.memory
     if memory is None:
         memory = utils.get_store_memory_size(args.pipeline_fname)
 
-    with start_plasma_store(
-        memory=memory,
-        store_socket_name=args.store_socket_name,
-    ) as (store_socket_name, _):
-
+    # Objects are spilled to the data directories of the steps of the
+    # pipeline, like when outputting to disk.
+    store = ObjectStore(args.store_dir, memory, spill=not args.no_spill)
+    # Objects of a previous run of the server are unknown to the store.
+    store.clear()
+
+    # The manager handles eviction through the notifications of the
+    # store of objects that have been read, or output anew.
+    manager = EvictionManager(store, pipeline_fname=args.pipeline_fname)
+    store.on_consumed = manager.consumed
+    store.on_sealed = manager.sealed
+
+    if os.path.exists(args.store_socket_name):
+        os.remove(args.store_socket_name)
+    server = MemoryStoreServer(args.store_socket_name, store)
+    try:
         # Set flexible permissions to make the socket writeable to all
         # who have access to the path through the volume mount
-        os.chmod(store_socket_name, 0o777)
+        os.chmod(args.store_socket_name, 0o777)
+        os.chmod(args.store_dir, 0o777)
 
-        # Start the manager that handles eviction by listening to the
-        # notification socket of the store.
-        start_manager(store_socket_name, pipeline_fname=args.pipeline_fname)
+        server.serve_forever()
+    finally:
+        # Helps to size the store of the pipeline.
+        print("Stats:", store.stats())
+        server.server_close()
+        store.clear()
+        os.remove(args.store_socket_name)
 
 
 if __name__ == "__main__":
@@ -1,11 +1,19 @@
 import json
+import os
+import threading
+from typing import Dict, Iterable, Optional, Set, Tuple
 
-import networkx as nx
-import pyarrow.plasma as plasma
+from orchest.memory_store import ObjectStore
 
 
-def construct_pipeline(pipeline_fname):
-    """Construct pipeline from pipeline.json"""
+def read_pipeline_definition(pipeline_fname) -> Tuple[Dict[str, Set[str]], bool]:
+    """Reads the consumers of every step from pipeline.json
+
+    Returns:
+        The steps that consume the output of every step, by step UUID,
+        and whether auto eviction is enabled.
+
+    """
     with open(pipeline_fname, "r") as f:
         description = json.load(f)
 
@@ -14,149 +22,141 @@ def construct_pipeline(pipeline_fname):
     except KeyError:
         auto_eviction = False
 
-    pipeline = nx.DiGraph(auto_eviction=auto_eviction)
-
     # If an interactive session is started the first time on a newly
     # created pipeline. Then the `pipeline.json` will not have a `steps`
     # key, since the pipeline does not yet have steps.
     steps = description.get("steps")
     if steps is None:
-        return pipeline
+        return {}, auto_eviction
 
-    # Create and add nodes.
-    uuids = steps.keys()
-    pipeline.add_nodes_from(uuids)
-
-    # Create and add edges with weight zero.
-    all_edges = []
+    consumers = {uuid: set() for uuid in steps}
     for uuid, info in steps.items():
-        edges = [(conn, uuid, 0) for conn in info["incoming_connections"]]
-        all_edges.extend(edges)
-
-    pipeline.add_weighted_edges_from(all_edges)
-
-    return pipeline
-
-
-# NOTE: changes new it in place.
-def propagate_weights(old, new):
-    """Add old weights to new pipeline."""
-    # Add weights from the previous pipeline to the new pipeline. Only
-    # weights for still existing edges are propagated.
-    for edge in new.edges:
-        s, t = edge
-
-        try:
-            new[s][t]["weight"] = old[s][t]["weight"]
-        except KeyError:
-            # Hit if the edge does not exist in the previous pipeline.
-            pass
+        for conn in info["incoming_connections"]:
+            consumers.setdefault(conn, set()).add(uuid)
 
+    return consumers, auto_eviction
 
-def get_uuids_to_evict(pipeline):
-    """Go over entire pipeline and check for objects to evict."""
-    uuids = []
-    for uuid in pipeline.nodes:
-        out_degree = pipeline.out_degree(uuid)
-        num_uniq_receivers = pipeline.out_degree(uuid, weight="weight")
 
-        # For these we want to do eviction.
-        if out_degree == num_uniq_receivers:
-            uuids.append(uuid)
-
-    return uuids
-
-
-# TODO: could actually import this from orchest.transfer
-def _convert_uuid_to_object_id(uuid):
-    bin_uuid = str.encode(uuid)
-    return plasma.ObjectID(bin_uuid[:20])
-
-
-# Evict objects by uuid
-def delete(client, uuids):
-    # Just a wrapper of the apache arrow plasma client.delete().
-    bin_uuids = [_convert_uuid_to_object_id(uuid) for uuid in uuids]
-
-    # No error is raised in case an ID is not in the store. It passes
-    # silently, since in essence it is actually succeeding.
-    client.delete(bin_uuids)
-
-
-def start_manager(store_socket_name, pipeline_fname):
-    # Connect to the plasma store and subscribe to its notification
-    # socket.
-    client = plasma.connect(store_socket_name)
-    client.subscribe()
-
-    # Keeps a `pipeline` in memory to maintain state. Everytime a step
-    # retrieves the output from another the weight of that connection
-    # (aka edge) is set to 1. If the outdegree of a step is equal to the
-    # sum of the weight of its outgoing edges, then we know that all the
-    # receiving steps have already read the output. If the
-    # `auto_eviction` is set in the `pipeline.json`, then this will
-    # cause that output to be removed from the store.
-    pipeline = construct_pipeline(pipeline_fname=pipeline_fname)
+def _get_file_version(fname) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(fname)
+    except OSError:
+        return None
+    # The inode changes when the file is atomically replaced.
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+class EvictionManager:
+    """Evicts objects from the store once all their consumers read them.
+
+    Keeps, for every step, the steps that retrieved its output and a
+    counter of the consumers that still have to. Everytime a step
+    retrieves the output from another the counter of the latter is
+    decremented, once it reaches zero all the receiving steps have
+    read the output. If the `auto_eviction` is set in the
+    `pipeline.json`, then this will cause that output to be removed
+    from the store.
+
+    The pipeline definition is only read again when the file changed,
+    since a user might have added or removed steps or connections.
+
+    Once a step outputs a new object, its consumers have to read it
+    again, see `sealed`.
+
+    """
+
+    def __init__(self, store: ObjectStore, pipeline_fname: str) -> None:
+        self.store = store
+        self.pipeline_fname = pipeline_fname
+        self.auto_eviction = False
+
+        self._consumers: Dict[str, Set[str]] = {}
+        # The state of the eviction manager, which is maintained during
+        # the lifecycle of the store.
+        self._received: Dict[str, Set[str]] = {}
+        self._remaining: Dict[str, int] = {}
+        self._version = None
+
+        # Notifications are handled by the threads of the server.
+        self._lock = threading.Lock()
+        with self._lock:
+            self._reload_if_changed()
+
+    def consumed(self, source: str, target: str) -> None:
+        """Handles that step `target` has retrieved the output of step
+        `source`."""
+        print("Received:", source, target)
+        with self._lock:
+            self._reload_if_changed()
+
+            # Set that the target uuid has received from the source.
+            if target not in self._consumers.get(source, ()):
+                # The connection was removed from the pipeline.
+                return
+            received = self._received.setdefault(source, set())
+            if target in received:
+                return
+            received.add(target)
+            self._remaining[source] -= 1
+
+            # TODO: should we check for this options earlier, because
+            #       probably we want to start counting the moment the
+            #       user selects the options (and by deselect maybe
+            #       reset all weights to zero).
+            # Only consider evicting objects if the option is set.
+            if self._remaining[source] == 0 and self.auto_eviction:
+                self._evict([source])
+
+    def sealed(self, source: str) -> None:
+        """Handles that step `source` has output a new object."""
+        with self._lock:
+            self._reload_if_changed()
+
+            # None of the consumers has received the new object yet.
+            self._received.pop(source, None)
+            self._remaining[source] = len(self._consumers.get(source, ()))
+
+    def _reload_if_changed(self) -> None:
+        version = _get_file_version(self.pipeline_fname)
+        if version is None or version == self._version:
+            return
 
-    while True:
         try:
-            obj_id, data_size, mdata_size = client.get_next_notification()
-            print("Got new notification")
-        except OSError:
-            # "Failed to read object notification from Plasma socket"
-            print("Failed to read object notification from Plasma socket")
-            continue
-
-        mdata = client.get_metadata([obj_id], timeout_ms=1000)
-
-        # Whenever a sealed object is deleted, it also triggers a
-        # notification. However, we do not need to check for eviction in
-        # that case.
-        if mdata[0] is None:
-            continue
-
-        # TODO: change print to logging to stdout
-        print("Received:", obj_id)
-        mdata = bytes(mdata[0])
-
-        # An example message: b'2;uuid-1,uuid-2'. Meaning that step with
-        # 'uuid-2' has retrieved the output from step with 'uuid-1'.
-        identifier, _, mdata = mdata.partition(b";")
-        if identifier != b"2":
-            continue
-
-        decoded_mdata = mdata.decode(encoding="utf-8")
-        source, target = decoded_mdata.split(",")
-
-        # Create new pipeline and propagate weights. A new pipeline is
-        # created to account for a possible change in the pipeline. A
-        # user might have added or removed multiple steps or
-        # connections.
-        new_pipeline = construct_pipeline(pipeline_fname=pipeline_fname)
-        propagate_weights(pipeline, new_pipeline)
-
-        # The `pipeline` instance is kept in memory so that the state of
-        # the eviction manager is maintained during the lifecycle of the
-        # store.
-        pipeline = new_pipeline
-
-        # Set that the target uuid has received from the source.
-        pipeline[source][target]["weight"] = 1
-
-        # TODO: should we check for this options earlier, because
-        #       probably we want to start counting the moment the user
-        #       selects the options (and by deselect maybe reset all
-        #       weights to zero).
-        # Only consider evicting objects if the option is set.
-        if not pipeline.graph.get("auto_eviction", False):
-            continue
-
-        # Delete the objects corresponding to the `uuids_to_evict`.
-        uuids_to_evict = get_uuids_to_evict(new_pipeline)
-        delete(client, uuids_to_evict)
-
-        print("Evicting:", uuids_to_evict)
-
-        # Need to also delete the "ping" object that contained the
-        # metadata.
-        client.delete([obj_id])
+            consumers, auto_eviction = read_pipeline_definition(self.pipeline_fname)
+        except (OSError, ValueError):
+            # The file is being written, it is read again on the next
+            # notification.
+            return
+        self._version = version
+        self._consumers = consumers
+        was_auto_eviction, self.auto_eviction = self.auto_eviction, auto_eviction
+        previous_remaining = self._remaining
+
+        # Only retrievals over still existing connections are kept.
+        self._received = {
+            source: received & consumers[source]
+            for source, received in self._received.items()
+            if source in consumers
+        }
+        self._remaining = {
+            source: len(targets - self._received.get(source, set()))
+            for source, targets in consumers.items()
+        }
+
+        # Removing connections or enabling auto eviction can make
+        # objects evictable without any new retrieval.
+        if self.auto_eviction:
+            self._evict(
+                source
+                for source, received in self._received.items()
+                if received
+                and self._remaining[source] == 0
+                and (not was_auto_eviction or previous_remaining[source] > 0)
+            )
+
+    def _evict(self, uuids: Iterable[str]) -> None:
+        # No error is raised in case an ID is not in the store.
+        uuids = list(uuids)
+        if uuids:
+            self.store.delete(uuids)
+            print("Evicting:", uuids)
@@ -1,5 +1,7 @@
+import json
 import os
 import subprocess
+import sys
 import time
 from unittest.mock import patch
 
@@ -7,18 +9,23 @@ import numpy as np
 import pytest
 
 import orchest
+from orchest.error import ObjectNotFoundError
+from orchest.memory_store import ObjectStore
 
 # Add the folder to the path to not break imports. This has to do with
 # imports that work differently when started via a subprocess.
-# import sys
-# sys.path.insert(0, os.path.abspath('app'))
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+)
+
+from manager import EvictionManager  # noqa: E402
 
 KILOBYTE = 1 << 10
 MEGABYTE = KILOBYTE * KILOBYTE
 
 # NOTE: has to be multiple of 10, ie. 10, 100, etc.
-PLASMA_KILOBYTES = 10
-PLASMA_STORE_CAPACITY = PLASMA_KILOBYTES * KILOBYTE
+STORE_KILOBYTES = 10
+STORE_CAPACITY = STORE_KILOBYTES * KILOBYTE
 
 
 def generate_data(total_size):
@@ -27,21 +34,26 @@ def generate_data(total_size):
 
 
 @pytest.fixture
-def memory_store(monkeypatch):
+def memory_store(monkeypatch, tmp_path):
     abs_path = os.path.dirname(os.path.abspath(__file__))
     script = os.path.join(abs_path, "..", "app", "main.py")
 
-    store_socket_name = os.path.join(abs_path, "plasma.sock")
+    store_socket_name = str(tmp_path / "memory-server.sock")
+    store_dir = str(tmp_path / "objects")
     pipeline_fname = os.path.join(abs_path, "pipeline.json")
     command = [
-        "python",
+        sys.executable,
         script,
         "-m",
-        str(PLASMA_STORE_CAPACITY),
+        str(STORE_CAPACITY),
         "-s",
         f"{store_socket_name}",
+        "-d",
+        f"{store_dir}",
         "-p",
         f"{pipeline_fname}",
+        # Eviction is tested with a store that runs out of memory.
+        "--no_spill",
     ]
     proc = subprocess.Popen(command, stdout=subprocess.PIPE)
 
@@ -49,9 +61,8 @@ def memory_store(monkeypatch):
     yield store_socket_name, pipeline_fname
 
     if proc.poll() is None:
-        proc.kill()
-
-    os.remove(store_socket_name)
+        proc.terminate()
+        proc.wait()
 
 
 @patch("orchest.transfer.get_step_uuid")
@@ -65,7 +76,7 @@ def test_memory_eviction_fit(mock_get_step_uuid, memory_store, monkeypatch):
     monkeypatch.setattr(os, "environ", envs)
 
     # Do as if we are uuid-1
-    data_1 = generate_data(0.6 * PLASMA_KILOBYTES * KILOBYTE)
+    data_1 = generate_data(0.6 * STORE_KILOBYTES * KILOBYTE)
     mock_get_step_uuid.return_value = "uuid-1______________"
     orchest.transfer.output_to_memory(
         data_1,
@@ -81,7 +92,7 @@ def test_memory_eviction_fit(mock_get_step_uuid, memory_store, monkeypatch):
     # Pretend to be executing something.
     time.sleep(1)
 
-    data_2 = generate_data(0.1 * PLASMA_KILOBYTES * KILOBYTE)
+    data_2 = generate_data(0.1 * STORE_KILOBYTES * KILOBYTE)
     orchest.transfer.output_to_memory(
         data_2,
         name=None,
@@ -97,7 +108,7 @@ def test_memory_eviction_fit(mock_get_step_uuid, memory_store, monkeypatch):
     # Pretend to be executing something.
     time.sleep(1)
 
-    data_3 = generate_data(0.6 * PLASMA_KILOBYTES * KILOBYTE)
+    data_3 = generate_data(0.6 * STORE_KILOBYTES * KILOBYTE)
     res = orchest.transfer.output_to_memory(
         data_3,
         name=None,
@@ -115,7 +126,7 @@ def test_memory_eviction_memoryerror(mock_get_step_uuid, memory_store):
     orchest.Config.PIPELINE_DEFINITION_PATH = pipeline_fname
 
     # Do as if we are uuid-1
-    data_1 = generate_data(0.6 * PLASMA_KILOBYTES * KILOBYTE)
+    data_1 = generate_data(0.6 * STORE_KILOBYTES * KILOBYTE)
     mock_get_step_uuid.return_value = "uuid-1______________"
     orchest.transfer.output_to_memory(
         data_1,
@@ -131,7 +142,7 @@ def test_memory_eviction_memoryerror(mock_get_step_uuid, memory_store):
     # Pretend to be executing something.
     time.sleep(1)
 
-    data_2 = generate_data(0.1 * PLASMA_KILOBYTES * KILOBYTE)
+    data_2 = generate_data(0.1 * STORE_KILOBYTES * KILOBYTE)
     orchest.transfer.output_to_memory(
         data_2,
         name=None,
@@ -147,10 +158,94 @@ def test_memory_eviction_memoryerror(mock_get_step_uuid, memory_store):
     # Pretend to be executing something.
     time.sleep(1)
 
-    data_3 = generate_data(0.6 * PLASMA_KILOBYTES * KILOBYTE)
+    data_3 = generate_data(0.6 * STORE_KILOBYTES * KILOBYTE)
     with pytest.raises(MemoryError):
         orchest.transfer.output_to_memory(
             data_3,
             name=None,
             disk_fallback=False,
         )
+
+
+class StoreMock:
+    def __init__(self):
+        self.deleted = []
+
+    def delete(self, obj_ids):
+        self.deleted.extend(obj_ids)
+
+
+def write_pipeline(fname, connections, auto_eviction=True):
+    steps = {
+        uuid: {"uuid": uuid, "incoming_connections": incoming}
+        for uuid, incoming in connections.items()
+    }
+    with open(fname, "w") as f:
+        json.dump({"settings": {"auto_eviction": auto_eviction}, "steps": steps}, f)
+
+
+def test_eviction_manager_evicts_once_consumed(tmp_path):
+    pipeline_fname = str(tmp_path / "pipeline.json")
+    write_pipeline(pipeline_fname, {"a": [], "b": ["a"], "c": ["a", "b"]})
+    store = StoreMock()
+    manager = EvictionManager(store, pipeline_fname)
+
+    manager.consumed("a", "b")
+    manager.consumed("a", "b")
+    assert store.deleted == []
+
+    manager.consumed("a", "c")
+    assert store.deleted == ["a"]
+
+    # Retrievals over connections that do not exist are ignored.
+    manager.consumed("c", "a")
+    assert store.deleted == ["a"]
+
+
+def test_eviction_manager_reloads_changed_pipeline(tmp_path):
+    pipeline_fname = str(tmp_path / "pipeline.json")
+    write_pipeline(pipeline_fname, {"a": [], "b": ["a"], "c": ["a"]}, False)
+    store = StoreMock()
+    manager = EvictionManager(store, pipeline_fname)
+
+    manager.consumed("a", "b")
+    manager.consumed("a", "c")
+    assert store.deleted == []
+
+    # Enabling auto eviction evicts the objects that are consumed.
+    write_pipeline(pipeline_fname, {"a": [], "b": ["a"], "c": ["a"], "d": ["b"]})
+    manager.consumed("b", "d")
+    assert sorted(store.deleted) == ["a", "b"]
+
+    # A new connection has to be consumed, also by steps that already
+    # did before its removal.
+    write_pipeline(pipeline_fname, {"a": [], "b": ["a"], "c": [], "d": ["b"]})
+    manager.consumed("a", "b")
+    write_pipeline(pipeline_fname, {"a": [], "b": ["a"], "c": ["a"], "d": ["b"]})
+    manager.consumed("a", "b")
+    assert sorted(store.deleted) == ["a", "b"]
+    manager.consumed("a", "c")
+    assert sorted(store.deleted) == ["a", "a", "b"]
+
+
+def test_eviction_manager_evicts_every_output(tmp_path):
+    pipeline_fname = str(tmp_path / "pipeline.json")
+    write_pipeline(pipeline_fname, {"a": [], "b": ["a"], "c": ["a"]})
+    store = ObjectStore(str(tmp_path / "objects"), STORE_CAPACITY)
+    manager = EvictionManager(store, pipeline_fname)
+    store.on_consumed = manager.consumed
+    store.on_sealed = manager.sealed
+
+    # Step "a" outputs twice, e.g. when it is run again.
+    for data in [b"first", b"second"]:
+        path = store.create("a", len(data))
+        with open(path, "wb") as f:
+            f.write(data)
+        store.seal("a", path, "metadata")
+
+        assert store.get("a")[0] == path
+        store.consumed("a", "b")
+        assert store.get("a")[0] == path
+        store.consumed("a", "c")
+        with pytest.raises(ObjectNotFoundError):
+            store.get("a")
@@ -126,6 +126,13 @@ def create_app(config_class=None, use_db=True, be_scheduler=False, to_migrate_db
             seconds=app.config["SCHEDULER_INTERVAL"],
             args=[app],
         )
+        scheduler.add_job(
+            # Serialized through a postgres advisory lock.
+            Scheduler.dispatch_job_pipeline_runs,
+            "interval",
+            seconds=app.config["SCHEDULER_INTERVAL"],
+            args=[app],
+        )
 
         if not _utils.is_running_from_reloader():
             with app.app_context():
@@ -7,9 +7,9 @@ from _orchest.internals import config as _config
 from _orchest.internals.two_phase_executor import TwoPhaseFunction
 from app import models, schema
 from app.apis.namespace_environment_image_builds import DeleteProjectBuilds
-from app.connections import db, k8s_core_api
+from app.connections import db
 from app.core import image_utils
-from app.utils import register_schema
+from app.utils import get_registry_ip, register_schema
 
 api = Namespace("environment-images", description="Managing environment images")
 api = register_schema(api)
@@ -69,9 +69,7 @@ class EnvironmentImagesToPrePull(Resource):
             models.EnvironmentImage.environment_uuid,
         )
         images_to_pre_pull = []
-        registry_ip = k8s_core_api.read_namespaced_service(
-            _config.REGISTRY, _config.ORCHEST_NAMESPACE
-        ).spec.cluster_ip
+        registry_ip = get_registry_ip()
         for img in latest_env_images:
             image = (
                 _config.ENVIRONMENT_IMAGE_NAME.format(
@@ -1,14 +1,16 @@
 import copy
+import json
 import uuid
+from collections import defaultdict, deque
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import requests
 from celery.contrib.abortable import AbortableAsyncResult
 from croniter import croniter
 from flask import abort, current_app, request
 from flask_restx import Namespace, Resource, marshal, reqparse
-from sqlalchemy import desc, func
+from sqlalchemy import and_, desc, func, or_, select
 from sqlalchemy.orm import joinedload, load_only, noload, undefer
 
 import app.models as models
@@ -20,18 +22,41 @@ from app.apis.namespace_runs import AbortPipelineRun
 from app.celery_app import make_celery
 from app.connections import db
 from app.core import environments
-from app.core.pipelines import Pipeline, construct_pipeline
+from app.core.pipelines import (
+    Pipeline,
+    construct_pipeline,
+    delete_job_workflow_templates,
+    get_job_workflow_template_manifest,
+    register_workflow_template,
+)
+from app.types import PipelineDefinition
 from app.utils import (
     fuzzy_filter_non_interactive_pipeline_runs,
     get_proj_pip_env_variables,
     page_to_pagination_data,
     register_schema,
     update_status_db,
+    update_steps_status_db,
 )
+from config import CONFIG_CLASS
 
 api = Namespace("jobs", description="Managing jobs")
 api = register_schema(api)
 
+# Arbitrary key of the postgres advisory lock serializing the dispatch
+# of job pipeline runs.
+_DISPATCH_JOB_PIPELINE_RUNS_LOCK_ID = 4830231
+
+
+def _delete_job_workflow_templates(job_uuid: str) -> None:
+    """Deletes the WorkflowTemplates of a job that ended."""
+    try:
+        delete_job_workflow_templates(job_uuid)
+    except Exception as e:
+        current_app.logger.error(
+            f"Failed to delete the workflow templates of job {job_uuid}: {e}"
+        )
+
 
 @api.route("/")
 class JobList(Resource):
@@ -71,9 +96,15 @@ class JobList(Resource):
         # have moved over to using flask_restx
         # https://flask-restx.readthedocs.io/en/stable/api.html#flask_restx.marshal
         #       to make sure the default values etc. are filled in.
+        job_spec = request.get_json()
+        # The steps of an incremental run depend on the outputs in the
+        # project directory, while job runs have their own directory.
+        if job_spec.get("pipeline_run_spec", {}).get("run_type") == "incremental":
+            return {"message": "Jobs do not support incremental runs."}, 400
+
         try:
             with TwoPhaseExecutor(db.session) as tpe:
-                job = CreateJob(tpe).transaction(request.get_json())
+                job = CreateJob(tpe).transaction(job_spec)
         except Exception as e:
             current_app.logger.error(e)
             return {"message": str(e)}, 500
@@ -393,6 +424,34 @@ class PipelineRun(Resource):
             return {"message": "Run does not exist or is not running."}, 404
 
 
+@api.route(
+    "/<string:job_uuid>/<string:run_uuid>/steps",
+    doc={
+        "description": (
+            "Set the execution status of multiple steps of a pipeline run in a "
+            "job at once."
+        )
+    },
+)
+@api.param("job_uuid", "UUID of Job")
+@api.param("run_uuid", "UUID of Run")
+class PipelineStepsStatus(Resource):
+    @api.doc("set_pipeline_run_pipeline_steps_status")
+    @api.expect(schema.steps_status_update)
+    def put(self, job_uuid, run_uuid):
+        """Set the status of multiple steps of a pipeline run."""
+        steps_status_update = request.get_json()
+
+        try:
+            update_steps_status_db(run_uuid, steps_status_update["steps"])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            return {"message": "Failed update operation."}, 500
+
+        return {"message": "Status was updated successfully."}, 200
+
+
 @api.route(
     "/<string:job_uuid>/<string:run_uuid>/<string:step_uuid>",
     doc={
@@ -688,7 +747,11 @@ def _delete_non_retained_pipeline_runs(job_uuid: str) -> None:
 
 
 class RunJob(TwoPhaseFunction):
-    """Start the pipeline runs related to a job"""
+    """Start the pipeline runs related to a job
+
+    The runs are created as PENDING, they are sent to celery by
+    DispatchJobPipelineRuns.
+    """
 
     def _transaction(self, job_uuid: str):
 
@@ -709,49 +772,108 @@ class RunJob(TwoPhaseFunction):
             .filter_by(uuid=job_uuid)
             .one()
         )
+        self.collateral_kwargs["job"] = dict()
+        self.collateral_kwargs["run_uuids"] = []
         # In case the job gets aborted while the scheduler attempts to
         # run it.
         if job.status == "ABORTED":
-            self.collateral_kwargs["job"] = dict()
-            self.collateral_kwargs["tasks_to_launch"] = []
-            self.collateral_kwargs["run_config"] = dict()
+            return
 
         # The status of jobs that run once is initially set to PENDING,
         # thus we need to update that.
         if job.status == "PENDING":
             job.status = "STARTED"
 
-        # To be later used by the collateral effect function.
-        tasks_to_launch = []
+        # The pipeline is the same for all runs, only the parameters
+        # differ.
+        spec = copy.deepcopy(job.pipeline_run_spec)
+        spec["pipeline_definition"] = job.pipeline_definition
+        pipeline = construct_pipeline(**spec)
 
-        # run_index is the index of the run within the runs of this job
-        # scheduling/execution.
-        for run_index, run_parameters in enumerate(job.parameters):
-            pipeline_def = copy.deepcopy(job.pipeline_definition)
+        runs, run_steps = _prepare_job_runs(job, pipeline)
+        job.total_scheduled_pipeline_runs += len(runs)
 
-            # Set the pipeline parameters:
-            pipeline_def["parameters"] = run_parameters.get(
-                _config.PIPELINE_PARAMETERS_RESERVED_KEY, {}
-            )
+        # Set-based inserts, the runs must be inserted before their
+        # steps because of foreign keys.
+        if runs:
+            db.session.bulk_insert_mappings(models.NonInteractivePipelineRun, runs)
+            db.session.bulk_insert_mappings(models.PipelineRunStep, run_steps)
+
+        job.total_scheduled_executions += 1
+        # Must run after total_scheduled_executions has been updated.
+        DeleteNonRetainedJobPipelineRuns(self.tpe).transaction(job.uuid)
+
+        # Prepare data for _revert.
+        self.collateral_kwargs["job"] = job.as_dict()
+        self.collateral_kwargs["run_uuids"] = [run["uuid"] for run in runs]
+
+        # Kept for _revert, to find out which runs have been sent.
+        self._dispatch = DispatchJobPipelineRuns(self.tpe)
+        self._dispatch.transaction()
+
+    def _collateral(self, job: Dict[str, Any], run_uuids: List[str]):
+        pass
+
+    def _revert(self):
+        job = self.collateral_kwargs["job"]
+        if not job:
+            return
+
+        # Runs that have been sent to celery are left alone. Runs that
+        # have been dispatched but not sent are failed as well, since
+        # the dispatch might not even have been attempted, e.g. if a
+        # collateral effect queued before it failed.
+        sent_run_uuids = set(self._dispatch.get_sent_run_uuids())
+        run_uuids = [
+            run_uuid
+            for run_uuid in self.collateral_kwargs["run_uuids"]
+            if run_uuid not in sent_run_uuids
+        ]
+
+        # Jobs that run only once are considered as entirely failed,
+        # unless some of their runs have been sent.
+        if job["schedule"] is None and len(run_uuids) == len(
+            self.collateral_kwargs["run_uuids"]
+        ):
+            models.Job.query.filter_by(uuid=job["uuid"]).update({"status": "FAILURE"})
 
-            # Set the steps parameters in the pipeline definition.
-            for step_uuid, step_parameters in run_parameters.items():
-                # One of the entries is not actually a step_uuid.
-                if step_uuid != _config.PIPELINE_PARAMETERS_RESERVED_KEY:
-                    pipeline_def["steps"][step_uuid]["parameters"] = step_parameters
+        # Set the status to FAILURE for runs and their steps.
+        models.PipelineRunStep.query.filter(
+            models.PipelineRunStep.run_uuid.in_(run_uuids)
+        ).update({"status": "FAILURE"}, synchronize_session=False)
 
-            # Instantiate a pipeline object given the specs, definition
-            # and parameters.
-            pipeline_run_spec = copy.deepcopy(job.pipeline_run_spec)
-            pipeline_run_spec["pipeline_definition"] = pipeline_def
-            pipeline = construct_pipeline(**pipeline_run_spec)
+        models.NonInteractivePipelineRun.query.filter(
+            models.PipelineRun.uuid.in_(run_uuids)
+        ).update({"status": "FAILURE"}, synchronize_session=False)
+        db.session.commit()
 
-            # Specify the task_id beforehand to avoid race conditions
-            # between the task and its presence in the db.
-            task_id = str(uuid.uuid4())
-            tasks_to_launch.append((task_id, pipeline))
 
-            non_interactive_run = {
+def _prepare_job_runs(
+    job: models.Job, pipeline: Pipeline
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Prepares the runs of a job execution, one per set of parameters.
+
+    Args:
+        job: The job to run.
+        pipeline: The pipeline run by the job.
+
+    Returns:
+        A tuple of the rows of the runs and of their steps to insert in
+        the db.
+    """
+    step_uuids = [step.properties["uuid"] for step in pipeline.steps]
+
+    runs = []
+    run_steps = []
+    # run_index is the index of the run within the runs of this job
+    # scheduling/execution.
+    for run_index, run_parameters in enumerate(job.parameters):
+        # Specify the task_id beforehand to avoid race conditions
+        # between the task and its presence in the db.
+        task_id = str(uuid.uuid4())
+        runs.append(
+            {
+                "type": "NonInteractivePipelineRun",
                 "job_uuid": job.uuid,
                 "uuid": task_id,
                 "pipeline_uuid": job.pipeline_uuid,
@@ -761,79 +883,253 @@ class RunJob(TwoPhaseFunction):
                 "parameters_text_search_values": list(run_parameters.values()),
                 "job_run_index": job.total_scheduled_executions,
                 "job_run_pipeline_run_index": run_index,
-                "pipeline_run_index": job.total_scheduled_pipeline_runs,
+                "pipeline_run_index": job.total_scheduled_pipeline_runs + run_index,
                 "env_variables": job.env_variables,
             }
-            job.total_scheduled_pipeline_runs += 1
-
-            db.session.add(models.NonInteractivePipelineRun(**non_interactive_run))
-            # Need to flush because otherwise the bulk insertion of
-            # pipeline steps will lead to foreign key errors.
-            # https://docs.sqlalchemy.org/en/13/orm/persistence_techniques.html#bulk-operations-caveats
-            db.session.flush()
-
-            # TODO: this code is also in `namespace_runs`. Could
-            #       potentially be put in a function for modularity.
-            # Set an initial value for the status of the pipeline
-            # steps that will be run.
-            step_uuids = [s.properties["uuid"] for s in pipeline.steps]
-            pipeline_steps = []
-            for step_uuid in step_uuids:
-                pipeline_steps.append(
-                    models.PipelineRunStep(
-                        **{
-                            "run_uuid": task_id,
-                            "step_uuid": step_uuid,
-                            "status": "PENDING",
-                        }
-                    )
-                )
-            db.session.bulk_save_objects(pipeline_steps)
+        )
+        # Set an initial value for the status of the pipeline steps
+        # that will be run.
+        run_steps.extend(
+            {"run_uuid": task_id, "step_uuid": step_uuid, "status": "PENDING"}
+            for step_uuid in step_uuids
+        )
 
-        job.total_scheduled_executions += 1
-        # Must run after total_scheduled_executions has been updated.
-        DeleteNonRetainedJobPipelineRuns(self.tpe).transaction(job.uuid)
+    return runs, run_steps
+
+
+def _get_run_pipeline_definition(
+    pipeline_definition: PipelineDefinition, run_parameters: Dict[str, Any]
+) -> PipelineDefinition:
+    """Gets the definition of a pipeline run given its parameters.
+
+    The returned definition shares everything but the parameters with
+    the given one, i.e. it's not a copy.
+    """
+    steps = dict(pipeline_definition["steps"])
+    for step_uuid, step_parameters in run_parameters.items():
+        # One of the entries is not actually a step_uuid.
+        if step_uuid in steps:
+            steps[step_uuid] = {**steps[step_uuid], "parameters": step_parameters}
+    return {
+        **pipeline_definition,
+        "steps": steps,
+        "parameters": run_parameters.get(_config.PIPELINE_PARAMETERS_RESERVED_KEY, {}),
+    }
+
+
+def _interleave_job_pipeline_runs(
+    pending_runs: Dict[str, List[str]],
+    dispatched_runs: Dict[str, int],
+    max_runs: int,
+    max_runs_per_job: int,
+) -> List[str]:
+    """Selects the pending runs to dispatch, fairly among jobs.
+
+    Runs are taken in turns, one per job, starting with the jobs having
+    the least dispatched runs, so that a large job cannot starve the
+    others, e.g. cron jobs.
+
+    Args:
+        pending_runs: Job uuid to the uuids of its pending runs, in
+            order of dispatch.
+        dispatched_runs: Job uuid to its number of dispatched runs that
+            have not ended yet.
+        max_runs: Max number of runs to select.
+        max_runs_per_job: Max number of dispatched runs per job.
+
+    Returns:
+        The uuids of the runs to dispatch.
+    """
+    queues = {
+        job_uuid: deque(
+            runs[: max(max_runs_per_job - dispatched_runs.get(job_uuid, 0), 0)]
+        )
+        for job_uuid, runs in pending_runs.items()
+    }
+    order = sorted(
+        (job_uuid for job_uuid, queue in queues.items() if queue),
+        key=lambda job_uuid: (dispatched_runs.get(job_uuid, 0), job_uuid),
+    )
 
-        # Prepare data for _collateral.
-        self.collateral_kwargs["job"] = job.as_dict()
+    selected = []
+    while order and len(selected) < max_runs:
+        for job_uuid in list(order):
+            if len(selected) >= max_runs:
+                break
+            queue = queues[job_uuid]
+            selected.append(queue.popleft())
+            if not queue:
+                order.remove(job_uuid)
+    return selected
+
+
+class DispatchJobPipelineRuns(TwoPhaseFunction):
+    """Send PENDING job pipeline runs to celery, if there is room.
+
+    At most JOB_PIPELINE_RUNS_DISPATCH_BATCH_SIZE runs are sent at a
+    time, while respecting the max number of dispatched runs that have
+    not ended yet, across jobs and per job, see the config. Runs are
+    dispatched when a job runs, when a job pipeline run ends and
+    periodically by the scheduler.
+    """
+
+    def _transaction(self):
+        self.collateral_kwargs["workflow_templates"] = []
+        self.collateral_kwargs["tasks_to_launch"] = []
+
+        # Serializes dispatching across processes, released on
+        # commit/rollback.
+        db.session.execute(
+            select(func.pg_advisory_xact_lock(_DISPATCH_JOB_PIPELINE_RUNS_LOCK_ID))
+        )
 
-        env_uuid_to_image = {}
-        for a in job.images_in_use:
-            env_uuid_to_image[a.environment_uuid] = (
-                _config.ENVIRONMENT_IMAGE_NAME.format(
-                    project_uuid=a.project_uuid, environment_uuid=a.environment_uuid
+        run = models.NonInteractivePipelineRun
+        dispatched_runs = dict(
+            db.session.query(run.job_uuid, func.count())
+            .filter(
+                or_(
+                    run.status == "STARTED",
+                    and_(run.status == "PENDING", run.dispatched_time.isnot(None)),
                 )
-                + f":{a.environment_image_tag}"
             )
+            .group_by(run.job_uuid)
+            .all()
+        )
+        max_runs = min(
+            CONFIG_CLASS.JOB_PIPELINE_RUNS_DISPATCH_BATCH_SIZE,
+            CONFIG_CLASS.MAX_CONCURRENT_JOB_PIPELINE_RUNS
+            - sum(dispatched_runs.values()),
+        )
+        if max_runs <= 0:
+            return
+
+        # Only the first pending runs of every job are of interest.
+        rank = (
+            func.row_number()
+            .over(partition_by=run.job_uuid, order_by=run.pipeline_run_index)
+            .label("rank")
+        )
+        pending = (
+            db.session.query(run.uuid, run.job_uuid, rank)
+            .filter(run.status == "PENDING", run.dispatched_time.is_(None))
+            .subquery()
+        )
+        pending_runs = defaultdict(list)
+        for run_uuid, job_uuid in (
+            db.session.query(pending.c.uuid, pending.c.job_uuid)
+            .filter(pending.c.rank <= CONFIG_CLASS.MAX_CONCURRENT_PIPELINE_RUNS_PER_JOB)
+            .order_by(pending.c.job_uuid, pending.c.rank)
+        ):
+            pending_runs[job_uuid].append(run_uuid)
+
+        run_uuids = _interleave_job_pipeline_runs(
+            pending_runs,
+            dispatched_runs,
+            max_runs,
+            CONFIG_CLASS.MAX_CONCURRENT_PIPELINE_RUNS_PER_JOB,
+        )
+        if not run_uuids:
+            return
+
+        run.query.filter(run.uuid.in_(run_uuids)).update(
+            {"dispatched_time": datetime.now(timezone.utc)},
+            synchronize_session=False,
+        )
+
+        runs = (
+            run.query.options(
+                load_only("uuid", "job_uuid", "parameters"), undefer("env_variables")
+            )
+            .filter(run.uuid.in_(run_uuids))
+            .all()
+        )
+        runs_per_job = defaultdict(list)
+        for r in runs:
+            runs_per_job[r.job_uuid].append(r)
+        # Dispatch in the interleaved order.
+        order = {run_uuid: i for i, run_uuid in enumerate(run_uuids)}
+
+        tasks_to_launch = []
+        workflow_templates = {}
+        for job in models.Job.query.filter(models.Job.uuid.in_(runs_per_job)).all():
+            spec = copy.deepcopy(job.pipeline_run_spec)
+            spec["pipeline_definition"] = job.pipeline_definition
+            pipeline = construct_pipeline(**spec)
+            pipeline_definition = pipeline.to_dict()
+
+            env_uuid_to_image = {}
+            for a in job.images_in_use:
+                env_uuid_to_image[a.environment_uuid] = (
+                    _config.ENVIRONMENT_IMAGE_NAME.format(
+                        project_uuid=a.project_uuid,
+                        environment_uuid=a.environment_uuid,
+                    )
+                    + f":{a.environment_image_tag}"
+                )
 
-        run_config = job.pipeline_run_spec["run_config"]
-        run_config["env_uuid_to_image"] = env_uuid_to_image
-        run_config["user_env_variables"] = job.env_variables
-        self.collateral_kwargs["run_config"] = run_config
+            # The runs of a job only differ in their env variables if
+            # the job has been updated in the meantime.
+            run_configs = {}
+            for r in runs_per_job[job.uuid]:
+                env_key = json.dumps(r.env_variables, sort_keys=True)
+                if env_key not in run_configs:
+                    run_config = copy.deepcopy(job.pipeline_run_spec["run_config"])
+                    run_config["env_uuid_to_image"] = env_uuid_to_image
+                    run_config["user_env_variables"] = r.env_variables
+
+                    # All runs share the same DAG, images and volumes,
+                    # so they are run through a single WorkflowTemplate,
+                    # only the parameters of the pipeline differ, which
+                    # are not part of the Workflow.
+                    workflow_template = get_job_workflow_template_manifest(
+                        job.uuid,
+                        pipeline,
+                        {
+                            **run_config,
+                            "project_uuid": job.project_uuid,
+                            "pipeline_uuid": job.pipeline_uuid,
+                        },
+                    )
+                    name = workflow_template["metadata"]["name"]
+                    workflow_templates[name] = workflow_template
+                    run_config["workflow_template"] = name
+                    run_configs[env_key] = run_config
 
+                tasks_to_launch.append(
+                    (
+                        r.uuid,
+                        {
+                            "job_uuid": job.uuid,
+                            "project_uuid": job.project_uuid,
+                            "pipeline_definition": _get_run_pipeline_definition(
+                                pipeline_definition, r.parameters
+                            ),
+                            "run_config": run_configs[env_key],
+                        },
+                    )
+                )
+        tasks_to_launch.sort(key=lambda task: order[task[0]])
+
+        self.collateral_kwargs["workflow_templates"] = list(workflow_templates.values())
         self.collateral_kwargs["tasks_to_launch"] = tasks_to_launch
 
     def _collateral(
         self,
-        job: Dict[str, Any],
-        run_config: Dict[str, Any],
-        tasks_to_launch: Tuple[str, Pipeline],
+        workflow_templates: List[Dict[str, Any]],
+        tasks_to_launch: List[Tuple[str, Dict[str, Any]]],
     ):
-        # Safety check in case the job has no runs.
+        # Safety check in case there are no runs to dispatch.
         if not tasks_to_launch:
             return
 
+        # Must exist before the runs are submitted.
+        for workflow_template in workflow_templates:
+            register_workflow_template(workflow_template)
+
         # Launch each task through celery.
         celery = make_celery(current_app)
-
-        for task_id, pipeline in tasks_to_launch:
-            celery_job_kwargs = {
-                "job_uuid": job["uuid"],
-                "project_uuid": job["project_uuid"],
-                "pipeline_definition": pipeline.to_dict(),
-                "run_config": run_config,
-            }
-
+        self._launched = 0
+        for task_id, celery_job_kwargs in tasks_to_launch:
             # Due to circular imports we use the task name instead of
             # importing the function directly.
             task_args = {
@@ -849,22 +1145,30 @@ class RunJob(TwoPhaseFunction):
             # associated to the task. Uncomment the line below if
             # applicable.
             res.forget()
+            self._launched += 1
 
-    def _revert(self):
-        job = self.collateral_kwargs["job"]
-        # Jobs that run only once are considered as entirely failed.
-        if job["schedule"] is None:
-            models.Job.query.filter_by(uuid=job["uuid"]).update({"status": "FAILURE"})
+    def get_sent_run_uuids(self) -> List[str]:
+        """Returns the UUIDs of the runs sent to celery."""
+        launched = getattr(self, "_launched", 0)
+        return [
+            task[0] for task in self.collateral_kwargs["tasks_to_launch"][:launched]
+        ]
 
-        tasks_ids = [task[0] for task in self.collateral_kwargs["tasks_to_launch"]]
+    def _revert(self):
+        # Runs that have not been sent are considered failed.
+        launched = getattr(self, "_launched", 0)
+        run_uuids = [
+            task[0] for task in self.collateral_kwargs["tasks_to_launch"][launched:]
+        ]
+        if not run_uuids:
+            return
 
-        # Set the status to FAILURE for runs and their steps.
         models.PipelineRunStep.query.filter(
-            models.PipelineRunStep.run_uuid.in_(tasks_ids)
+            models.PipelineRunStep.run_uuid.in_(run_uuids)
         ).update({"status": "FAILURE"}, synchronize_session=False)
 
         models.NonInteractivePipelineRun.query.filter(
-            models.PipelineRun.uuid.in_(tasks_ids)
+            models.PipelineRun.uuid.in_(run_uuids)
         ).update({"status": "FAILURE"}, synchronize_session=False)
         db.session.commit()
 
@@ -896,6 +1200,7 @@ class AbortJob(TwoPhaseFunction):
             return
 
         job.status = "ABORTED"
+        self.collateral_kwargs["aborted"] = True
         # This way a recurring job or a job which is scheduled to run
         # once in the future will not be scheduled anymore.
         job.next_scheduled_time = None
@@ -926,9 +1231,25 @@ class AbortJob(TwoPhaseFunction):
                 status_update, model=models.PipelineRunStep, filter_by=filter_by
             )
 
+        # Let the runs of other jobs take the freed slots.
+        if run_uuids:
+            DispatchJobPipelineRuns(self.tpe).transaction()
+
         return True
 
-    def _collateral(self, project_uuid: str, run_uuids: List[str], **kwargs):
+    def _collateral(
+        self,
+        project_uuid: str,
+        run_uuids: List[str],
+        job_uuid: str,
+        aborted: bool = False,
+        **kwargs,
+    ):
+        # The runs that have not been dispatched yet won't be, the ones
+        # that have been started already stored their template.
+        if aborted:
+            _delete_job_workflow_templates(job_uuid)
+
         # Aborts and revokes all pipeline runs and waits for a reply for
         # 1.0s.
         celery = make_celery(current_app)
@@ -1208,6 +1529,7 @@ class DeleteJob(TwoPhaseFunction):
         if job is None:
             return False
         self.collateral_kwargs["project_uuid"] = job.project_uuid
+        self.collateral_kwargs["job_uuid"] = job_uuid
 
         # Abort the job, won't do anything if the job is not running.
         AbortJob(self.tpe).transaction(job_uuid)
@@ -1218,8 +1540,9 @@ class DeleteJob(TwoPhaseFunction):
         db.session.delete(job)
         return True
 
-    def _collateral(self, project_uuid: str):
-        pass
+    def _collateral(self, project_uuid: str, job_uuid: Optional[str] = None):
+        if job_uuid is not None:
+            _delete_job_workflow_templates(job_uuid)
 
 
 class DeleteJobPipelineRun(TwoPhaseFunction):
@@ -1293,6 +1616,7 @@ class UpdateJobPipelineRun(TwoPhaseFunction):
         # Setup for collateral/revert.
         self.collateral_kwargs["project_uuid"] = None
         self.collateral_kwargs["completed"] = False
+        self.collateral_kwargs["job_uuid"] = job_uuid
 
         filter_by = {
             "job_uuid": job_uuid,
@@ -1320,6 +1644,8 @@ class UpdateJobPipelineRun(TwoPhaseFunction):
             )
             self.collateral_kwargs["project_uuid"] = job.project_uuid
             DeleteNonRetainedJobPipelineRuns(self.tpe).transaction(job_uuid)
+            # The run has freed a slot.
+            DispatchJobPipelineRuns(self.tpe).transaction()
 
             # Only non recurring jobs terminate to SUCCESS.
             if job.schedule is None:
@@ -1362,8 +1688,10 @@ class UpdateJobPipelineRun(TwoPhaseFunction):
 
         return {"message": "Status was updated successfully"}, 200
 
-    def _collateral(self, project_uuid: str, completed: bool):
-        pass
+    def _collateral(self, project_uuid: str, completed: bool, job_uuid: str):
+        # No runs of the job are left to be dispatched.
+        if completed:
+            _delete_job_workflow_templates(job_uuid)
 
 
 class AbortJobPipelineRun(TwoPhaseFunction):
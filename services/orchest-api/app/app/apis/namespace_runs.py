@@ -18,7 +18,12 @@ from app.celery_app import make_celery
 from app.connections import db
 from app.core import environments
 from app.core.pipelines import Pipeline, construct_pipeline
-from app.utils import get_proj_pip_env_variables, register_schema, update_status_db
+from app.utils import (
+    get_proj_pip_env_variables,
+    register_schema,
+    update_status_db,
+    update_steps_status_db,
+)
 
 api = Namespace("runs", description="Manages interactive pipeline runs")
 api = register_schema(api)
@@ -117,6 +122,25 @@ class Run(Resource):
             return {"message": "Run does not exist or is not running."}, 400
 
 
+@api.route("/<string:run_uuid>/steps")
+@api.param("run_uuid", "UUID of Run")
+class StepStatusList(Resource):
+    @api.doc("set_steps_status")
+    @api.expect(schema.steps_status_update)
+    def put(self, run_uuid):
+        """Sets the status of multiple steps of a run at once."""
+        steps_status_update = request.get_json()
+
+        try:
+            update_steps_status_db(run_uuid, steps_status_update["steps"])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            return {"message": "Failed update operation."}, 500
+
+        return {"message": "Status was updated successfully."}, 200
+
+
 @api.route("/<string:run_uuid>/<string:step_uuid>")
 @api.param("run_uuid", "UUID of Run")
 @api.param("step_uuid", "UUID of Pipeline Step")
@@ -15,19 +15,25 @@ perform a pipeline run (point 3), with "run_pipeline_workflow".
 """
 import asyncio
 import copy
+import hashlib
 import json
 import os
 from datetime import datetime
-from typing import Any, Dict, Iterable, List, Optional, Set
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
 import aiohttp
 from celery.contrib.abortable import AbortableAsyncResult
+from kubernetes import client as k8s_client
 
 from _orchest.internals import config as _config
-from _orchest.internals.utils import get_step_and_kernel_volumes_and_volume_mounts
-from app.connections import k8s_core_api, k8s_custom_obj_api
+from _orchest.internals.utils import (
+    get_step_and_kernel_volumes_and_volume_mounts,
+    get_userdir_relpath,
+)
+from app.connections import k8s_custom_obj_api
+from app.core.workflow_watcher import WorkflowSubscription, get_workflow_watcher
 from app.types import PipelineDefinition, PipelineStepProperties, RunConfig
-from app.utils import get_logger
+from app.utils import get_logger, get_registry_ip, invalidate_service_cluster_ip
 from config import CONFIG_CLASS
 
 logger = get_logger()
@@ -56,7 +62,8 @@ def construct_pipeline(
     Args:
         uuids: a selection/sequence of pipeline step UUIDs. If
             `run_type` equals "full", then this argument is ignored.
-        run_type: one of ("full", "selection", "incoming").
+        run_type: one of ("full", "selection", "incoming",
+            "incremental").
         pipeline_definition: a json description of the pipeline.
         config: configuration for the `run_type`.
 
@@ -69,6 +76,11 @@ def construct_pipeline(
             * "incoming" -> all incoming steps of the selection. In
                 other words: all ancestors of the steps of the
                 selection.
+            * "incremental" -> entire pipeline without the steps whose
+                output on disk is up to date, see
+                `_get_up_to_date_steps`. Requires the `run_config`.
+                Only for interactive runs, the outputs of job runs are
+                not in the project directory.
 
         As of now, the selection itself is NOT included in the Pipeline
         if `run_type` equals "incoming".
@@ -89,9 +101,128 @@ def construct_pipeline(
     if run_type == "incoming":
         return pipeline.incoming(uuids, inclusive=False)
 
+    if run_type == "incremental":
+        up_to_date = _get_up_to_date_steps(pipeline, kwargs["run_config"])
+        return pipeline.get_induced_subgraph(
+            [
+                step.properties["uuid"]
+                for step in pipeline.steps
+                if step.properties["uuid"] not in up_to_date
+            ]
+        )
+
     raise ValueError("Function not defined for specified run_type")
 
 
+def _hash_step_code(file_path: str) -> Optional[str]:
+    """Hashes the code of a step like the SDK, see its `transfer`."""
+    try:
+        with open(file_path, "rb") as f:
+            content = f.read()
+    except OSError:
+        return None
+
+    # Running a notebook stores its outputs in the file.
+    if file_path.endswith(".ipynb"):
+        try:
+            cells = json.loads(content.decode("utf-8"))["cells"]
+            sources = [
+                "".join(cell["source"]) for cell in cells if cell["cell_type"] == "code"
+            ]
+        except (ValueError, KeyError, TypeError):
+            return None
+        content = json.dumps(sources).encode("utf-8")
+
+    return hashlib.sha256(content).hexdigest()
+
+
+def _hash_step_parameters(pipeline: "Pipeline", step: "PipelineStep") -> str:
+    """Hashes the parameters of a step like the SDK."""
+    parameters = {
+        "pipeline": pipeline.get_params(),
+        "step": step.properties.get("parameters", {}),
+    }
+    content = json.dumps(parameters, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _read_step_manifest(step_data_dir: str) -> Optional[Dict[str, Any]]:
+    """Reads the MANIFEST of the output of a step written by the SDK.
+
+    Returns:
+        None if there is no manifest or if it does not belong to the
+        latest output on disk of the step.
+    """
+    try:
+        with open(os.path.join(step_data_dir, "HEAD"), "r") as f:
+            timestamp = f.read().split("; ")[0]
+        with open(os.path.join(step_data_dir, "MANIFEST"), "r") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if manifest.get("timestamp") != timestamp:
+        return None
+    return manifest
+
+
+def _get_up_to_date_steps(pipeline: "Pipeline", run_config: RunConfig) -> Set[str]:
+    """Gets the steps that don't have to run again.
+
+    The output on disk of a step is up to date if the MANIFEST written
+    by the SDK along with the output matches the current code and
+    parameters of the step, and if the step received the current
+    output of every parent, which must be up to date as well. Outputs
+    to memory are never up to date, nor are steps without output.
+
+    Note that changes to the environment of a step are not taken into
+    account.
+
+    Returns:
+        The UUIDs of the up to date steps.
+    """
+    project_dir = run_config["project_dir"]
+    pipeline_dir = os.path.join(
+        project_dir, os.path.split(run_config["pipeline_path"])[0]
+    )
+    data_dir = os.path.join(
+        project_dir, ".orchest", "pipelines", pipeline.properties["uuid"], "data"
+    )
+    manifests = {
+        step.properties["uuid"]: _read_step_manifest(
+            os.path.join(data_dir, step.properties["uuid"])
+        )
+        for step in pipeline.steps
+    }
+
+    up_to_date: Dict[str, bool] = {}
+
+    def is_up_to_date(step: PipelineStep) -> bool:
+        uuid = step.properties["uuid"]
+        if uuid in up_to_date:
+            return up_to_date[uuid]
+
+        manifest = manifests[uuid]
+        up_to_date[uuid] = (
+            manifest is not None
+            and manifest["code_hash"] is not None
+            and manifest["code_hash"]
+            == _hash_step_code(os.path.join(pipeline_dir, step.properties["file_path"]))
+            and manifest["parameters_hash"] == _hash_step_parameters(pipeline, step)
+            and all(is_up_to_date(parent) for parent in step.parents)
+            and manifest["inputs"]
+            == {
+                parent.properties["uuid"]: manifests[parent.properties["uuid"]][
+                    "content_hash"
+                ]
+                for parent in step.parents
+            }
+        )
+        return up_to_date[uuid]
+
+    return {step.properties["uuid"] for step in pipeline.steps if is_up_to_date(step)}
+
+
 async def update_status(
     status: str,
     task_id: str,
@@ -119,10 +250,44 @@ async def update_status(
     elif type == "pipeline":
         url = base_url
 
-    # Just await the response. The proposed fix on the aiohttp GitHub to
+    # Just read the response. The proposed fix on the aiohttp GitHub to
     # do `response.json(content_type=None)` still results in parsing
-    # issues.
-    await session.put(url, json=data)
+    # issues. Reading the response releases the connection back to the
+    # pool of the session, so that it can be reused.
+    async with session.put(url, json=data) as response:
+        await response.read()
+
+
+async def update_steps_status(
+    step_statuses: Dict[str, str],
+    task_id: str,
+    session: aiohttp.ClientSession,
+    run_endpoint: str,
+) -> Any:
+    """Updates the status of multiple steps via the orchest-api.
+
+    Sends a single request for all the given steps instead of one
+    request per step, see `update_status`.
+
+    Args:
+        step_statuses: Mapping from step UUID to its new status.
+    """
+    if not step_statuses:
+        return
+
+    now = datetime.utcnow().isoformat()
+    steps = []
+    for step_uuid, status in step_statuses.items():
+        data = {"step_uuid": step_uuid, "status": status}
+        if status == "STARTED":
+            data["started_time"] = now
+        elif status in ["SUCCESS", "FAILURE"]:
+            data["finished_time"] = now
+        steps.append(data)
+
+    url = f"{CONFIG_CLASS.ORCHEST_API_ADDRESS}/{run_endpoint}/{task_id}/steps"
+    async with session.put(url, json={"steps": steps}) as response:
+        await response.read()
 
 
 class PipelineStep:
@@ -396,22 +561,18 @@ class Pipeline:
         return f"Pipeline({self.steps!r})"
 
 
-def _step_to_workflow_manifest_task(
-    step: PipelineStep, run_config: Dict[str, Any]
-) -> dict:
-    # The working directory is the location of the file being
-    # executed.
-    project_relative_file_path = os.path.join(
-        os.path.split(run_config["pipeline_path"])[0], step.properties["file_path"]
-    )
-    working_dir = os.path.split(project_relative_file_path)[0]
+def _get_step_env_variables(run_config: Dict[str, Any]) -> List[Dict[str, str]]:
+    """Gets the env variables of the containers of the steps of a run.
 
+    The variables are the same for all steps, the step specific
+    ORCHEST_STEP_UUID is taken from the parameters of the task.
+    """
     user_env_variables = [
         {"name": key, "value": str(value)}
         for key, value in run_config["user_env_variables"].items()
     ]
     orchest_env_variables = [
-        {"name": "ORCHEST_STEP_UUID", "value": step.properties["uuid"]},
+        {"name": "ORCHEST_STEP_UUID", "value": "{{inputs.parameters.step_uuid}}"},
         {"name": "ORCHEST_SESSION_UUID", "value": run_config["session_uuid"]},
         {"name": "ORCHEST_SESSION_TYPE", "value": run_config["session_type"]},
         {"name": "ORCHEST_PIPELINE_UUID", "value": run_config["pipeline_uuid"]},
@@ -434,30 +595,25 @@ def _step_to_workflow_manifest_task(
     ]
     # Note that the order of concatenation matters, so that there is no
     # risk that the user overwrites internal variables accidentally.
-    env_variables = user_env_variables + orchest_env_variables
+    return user_env_variables + orchest_env_variables
 
-    # This allows us to edit the container that argo runs for us.
-    pod_spec_patch = json.dumps(
-        {
-            "terminationGracePeriodSeconds": 1,
-            "containers": [
-                {
-                    "name": "main",
-                    "env": env_variables,
-                    "restartPolicy": "Never",
-                    "imagePullPolicy": "IfNotPresent",
-                }
-            ],
-        },
+
+def _step_to_workflow_manifest_task(
+    step: PipelineStep, run_config: Dict[str, Any], registry_ip: str
+) -> dict:
+    """Gets the DAG task of a step.
+
+    Only contains the step specific values, everything that is shared
+    by the steps is part of the "step" template, see
+    `_get_step_template`, to keep the Workflow small.
+    """
+    # The working directory is the location of the file being
+    # executed.
+    project_relative_file_path = os.path.join(
+        os.path.split(run_config["pipeline_path"])[0], step.properties["file_path"]
     )
+    working_dir = os.path.split(project_relative_file_path)[0]
 
-    # Need to reference the ip because the local docker engine will run
-    # the container, and if the image is missing it will prompt a pull
-    # which will fail because the FQDN can't be resolved by the local
-    # engine on the node. K8S_TODO: fix this.
-    registry_ip = k8s_core_api.read_namespaced_service(
-        _config.REGISTRY, _config.ORCHEST_NAMESPACE
-    ).spec.cluster_ip
     task = {
         # "Name cannot begin with a digit when using either 'depends' or
         # 'dependencies'".
@@ -484,7 +640,6 @@ def _step_to_workflow_manifest_task(
                     "name": "project_relative_file_path",
                     "value": project_relative_file_path,
                 },
-                {"name": "pod_spec_patch", "value": pod_spec_patch},
                 {
                     # NOTE: only used by tests.
                     "name": "tests_uuid",
@@ -496,12 +651,50 @@ def _step_to_workflow_manifest_task(
     return task
 
 
-def _pipeline_to_workflow_manifest(
-    session_uuid: str,
-    workflow_name: str,
-    pipeline: Pipeline,
-    run_config: Dict[str, Any],
+def _get_step_template(
+    run_config: Dict[str, Any], volume_mounts: List[Dict[str, Any]]
 ) -> dict:
+    """Gets the template that is shared by all steps of a run."""
+    return {
+        "name": "step",
+        "securityContext": {
+            "runAsUser": 0,
+            "runAsGroup": int(os.environ.get("ORCHEST_HOST_GID")),
+            "fsGroup": int(os.environ.get("ORCHEST_HOST_GID")),
+        },
+        "inputs": {
+            "parameters": [
+                {"name": param}
+                for param in [
+                    "step_uuid",
+                    "image",
+                    "working_dir",
+                    "project_relative_file_path",
+                    "tests_uuid",
+                ]
+            ]
+        },
+        "retryStrategy": {"limit": "0", "backoff": {"maxDuration": "0s"}},
+        "container": {
+            "image": "{{inputs.parameters.image}}",
+            "command": [
+                "/orchest/bootscript.sh",
+                "runnable",
+                "{{inputs.parameters.working_dir}}",
+                "{{inputs.parameters.project_relative_file_path}}",
+            ],
+            "env": _get_step_env_variables(run_config),
+            "imagePullPolicy": "IfNotPresent",
+            "volumeMounts": volume_mounts,
+        },
+        "resources": {"requests": {"cpu": _config.USER_CONTAINERS_CPU_SHARES}},
+        # This allows us to edit the pod that argo runs for us.
+        "podSpecPatch": json.dumps({"terminationGracePeriodSeconds": 1}),
+    }
+
+
+def _get_workflow_spec(pipeline: Pipeline, run_config: Dict[str, Any]) -> dict:
+    """Gets the spec of the Workflow running the given pipeline."""
     volumes, volume_mounts = get_step_and_kernel_volumes_and_volume_mounts(
         userdir_pvc=run_config["userdir_pvc"],
         project_dir=run_config["project_dir"],
@@ -509,7 +702,46 @@ def _pipeline_to_workflow_manifest(
         container_project_dir=_config.PROJECT_DIR,
         container_pipeline_file=_config.PIPELINE_FILE,
     )
+    # Resolved once for all steps, the lookup is cached anyway.
+    registry_ip = get_registry_ip()
+
+    return {
+        "entrypoint": "pipeline",
+        "volumes": volumes,
+        # The celery task actually takes care of deleting the
+        # workflow, this is just a failsafe.
+        "ttlStrategy": {
+            "secondsAfterCompletion": 1000,
+            "secondsAfterSuccess": 1000,
+            "secondsAfterFailure": 1000,
+        },
+        "dnsPolicy": "ClusterFirst",
+        "restartPolicy": "Never",
+        # The first entry of this list is the definition of the DAG,
+        # while the second entry is the step definition.
+        "templates": [
+            {
+                "name": "pipeline",
+                "retryStrategy": {"limit": "0", "backoff": {"maxDuration": "0s"}},
+                "dag": {
+                    "failFast": True,
+                    "tasks": [
+                        _step_to_workflow_manifest_task(step, run_config, registry_ip)
+                        for step in pipeline.steps
+                    ],
+                },
+            },
+            _get_step_template(run_config, volume_mounts),
+        ],
+    }
+
 
+def _pipeline_to_workflow_manifest(
+    session_uuid: str,
+    workflow_name: str,
+    pipeline: Pipeline,
+    run_config: Dict[str, Any],
+) -> dict:
     manifest = {
         "apiVersion": "argoproj.io/v1alpha1",
         "kind": "Workflow",
@@ -520,216 +752,338 @@ def _pipeline_to_workflow_manifest(
                 "session_uuid": session_uuid,
             },
         },
-        "spec": {
-            "entrypoint": "pipeline",
-            "volumes": volumes,
-            # The celery task actually takes care of deleting the
-            # workflow, this is just a failsafe.
-            "ttlStrategy": {
-                "secondsAfterCompletion": 1000,
-                "secondsAfterSuccess": 1000,
-                "secondsAfterFailure": 1000,
+        "spec": _get_workflow_spec(pipeline, run_config),
+    }
+    return manifest
+
+
+def get_job_workflow_template_manifest(
+    job_uuid: str, pipeline: Pipeline, run_config: Dict[str, Any]
+) -> dict:
+    """Gets the WorkflowTemplate shared by the pipeline runs of a job.
+
+    All runs of a job share the same DAG, images, env variables and
+    volumes, the run specific values, i.e. the session uuid and the
+    project directory of the run, are parameters of the template, see
+    `_workflow_template_ref_manifest`.
+
+    The name of the template is derived from its content, so that the
+    same template is never registered twice and changes to the job,
+    e.g. to its env variables, lead to a new template.
+
+    Args:
+        job_uuid: UUID of the job.
+        pipeline: Pipeline that is run by the job, its parameters are
+            not part of the template.
+        run_config: Run config of the job, see the RunJob class of
+            the jobs namespace. Run specific entries are ignored.
+
+    Returns:
+        The WorkflowTemplate manifest.
+    """
+    run_config = {
+        **run_config,
+        "session_uuid": "{{workflow.parameters.session_uuid}}",
+        "session_type": "noninteractive",
+        "project_dir": os.path.join("/userdir", "{{workflow.parameters.project_dir}}"),
+    }
+    spec = _get_workflow_spec(pipeline, run_config)
+    spec["arguments"] = {
+        "parameters": [{"name": "session_uuid"}, {"name": "project_dir"}]
+    }
+
+    digest = hashlib.sha256(
+        json.dumps(spec, sort_keys=True).encode("utf-8")
+    ).hexdigest()[:16]
+    return {
+        "apiVersion": "argoproj.io/v1alpha1",
+        "kind": "WorkflowTemplate",
+        "metadata": {
+            "name": f"job-{job_uuid}-{digest}",
+            "labels": {
+                "project_uuid": run_config["project_uuid"],
+                "job_uuid": job_uuid,
+                "workflow_template_digest": digest,
             },
-            "dnsPolicy": "ClusterFirst",
-            "restartPolicy": "Never",
-            # The first entry of this list is the definition of the DAG,
-            # while the second entry is the step definition.
-            "templates": [
-                {
-                    "name": "pipeline",
-                    "retryStrategy": {"limit": "0", "backoff": {"maxDuration": "0s"}},
-                    "dag": {
-                        "failFast": True,
-                        "tasks": [
-                            _step_to_workflow_manifest_task(step, run_config)
-                            for step in pipeline.steps
-                        ],
-                    },
-                },
-                {
-                    "name": "step",
-                    "securityContext": {
-                        "runAsUser": 0,
-                        "runAsGroup": int(os.environ.get("ORCHEST_HOST_GID")),
-                        "fsGroup": int(os.environ.get("ORCHEST_HOST_GID")),
-                    },
-                    "inputs": {
-                        "parameters": [
-                            {"name": param}
-                            for param in [
-                                "step_uuid",
-                                "image",
-                                "working_dir",
-                                "project_relative_file_path",
-                                "pod_spec_patch",
-                                "tests_uuid",
-                            ]
-                        ]
-                    },
-                    "retryStrategy": {"limit": "0", "backoff": {"maxDuration": "0s"}},
-                    "container": {
-                        "image": "{{inputs.parameters.image}}",
-                        "command": [
-                            "/orchest/bootscript.sh",
-                            "runnable",
-                            "{{inputs.parameters.working_dir}}",
-                            "{{inputs.parameters.project_relative_file_path}}",
-                        ],
-                        "volumeMounts": volume_mounts,
-                    },
-                    "resources": {
-                        "requests": {"cpu": _config.USER_CONTAINERS_CPU_SHARES}
+        },
+        "spec": spec,
+    }
+
+
+def _workflow_template_ref_manifest(
+    session_uuid: str,
+    workflow_name: str,
+    run_config: Dict[str, Any],
+) -> dict:
+    """Gets the Workflow of a job run, based on the job template.
+
+    See `get_job_workflow_template_manifest`.
+    """
+    return {
+        "apiVersion": "argoproj.io/v1alpha1",
+        "kind": "Workflow",
+        "metadata": {
+            "name": workflow_name,
+            "labels": {
+                "project_uuid": run_config["project_uuid"],
+                "session_uuid": session_uuid,
+            },
+        },
+        "spec": {
+            "workflowTemplateRef": {"name": run_config["workflow_template"]},
+            "arguments": {
+                "parameters": [
+                    {"name": "session_uuid", "value": session_uuid},
+                    {
+                        "name": "project_dir",
+                        "value": get_userdir_relpath(run_config["project_dir"]),
                     },
-                    "podSpecPatch": "{{inputs.parameters.pod_spec_patch}}",
-                },
-            ],
+                ]
+            },
         },
     }
-    return manifest
 
 
-async def run_pipeline_workflow(
-    session_uuid: str, task_id: str, pipeline: Pipeline, *, run_config: RunConfig
-):
-    async with aiohttp.ClientSession() as session:
+def register_workflow_template(manifest: dict) -> None:
+    """Registers a job WorkflowTemplate, if it does not exist yet.
 
-        await update_status(
-            "STARTED",
+    Templates are shared by the runs of a job, they are only deleted
+    once no run of the job can be dispatched anymore, see
+    `delete_job_workflow_templates`.
+    """
+    try:
+        k8s_custom_obj_api.create_namespaced_custom_object(
+            "argoproj.io",
+            "v1alpha1",
+            _config.ORCHEST_NAMESPACE,
+            "workflowtemplates",
+            body=manifest,
+        )
+    except k8s_client.ApiException as e:
+        # Registered by a previous dispatch or another process.
+        if e.status != 409:
+            raise
+
+
+def delete_job_workflow_templates(job_uuid: str) -> None:
+    """Deletes the WorkflowTemplates of a job.
+
+    Must only be called once no runs of the job will be dispatched
+    anymore, e.g. when the job ends. Workflows that already started
+    store the template they are run with, so they are not affected.
+    """
+    k8s_custom_obj_api.delete_collection_namespaced_custom_object(
+        "argoproj.io",
+        "v1alpha1",
+        _config.ORCHEST_NAMESPACE,
+        "workflowtemplates",
+        label_selector=f"job_uuid={job_uuid}",
+    )
+
+
+async def _should_stop_following(
+    task_id: str, session: aiohttp.ClientSession, run_config: RunConfig
+) -> bool:
+    """Checks whether the run has been aborted or already ended."""
+    if AbortableAsyncResult(task_id).is_aborted():
+        return True
+
+    async with session.get(
+        f'{CONFIG_CLASS.ORCHEST_API_ADDRESS}/{run_config["run_endpoint"]}/{task_id}'
+    ) as response:
+        run_status = await response.json()
+        # Might not be there if it has been deleted.
+        return run_status.get("status", "ABORTED") in ["SUCCESS", "FAILURE", "ABORTED"]
+
+
+async def _follow_pipeline_workflow(
+    subscription: WorkflowSubscription,
+    task_id: str,
+    pipeline: Pipeline,
+    session: aiohttp.ClientSession,
+    run_config: RunConfig,
+) -> Tuple[Set[str], bool]:
+    """Follows the workflow of a run, updating the status of its steps.
+
+    Step transitions are pushed by the workflow watcher, checking if the
+    run has been aborted only happens every
+    `PIPELINE_RUN_STATUS_CHECK_INTERVAL` seconds.
+
+    Returns:
+        A tuple of the UUIDs of the steps that did not finish and
+        whether any step failed.
+    """
+    loop = asyncio.get_running_loop()
+    interval = CONFIG_CLASS.PIPELINE_RUN_STATUS_CHECK_INTERVAL
+    next_status_check = loop.time() + interval
+
+    steps_to_start = {step.properties["uuid"] for step in pipeline.steps}
+    steps_to_finish = set(steps_to_start)
+    had_failed_steps = False
+    while steps_to_finish:
+        workflow_nodes = await subscription.get_nodes(
+            timeout=max(next_status_check - loop.time(), 0)
+        )
+        # All the transitions of this update are sent in one request.
+        step_status_updates = {}
+        for step in (workflow_nodes or {}).values():
+            # The nodes includes the entire "pipeline" node etc.
+            if step["templateName"] != "step":
+                continue
+            # The step was not run because the workflow failed.
+            if "inputs" not in step:
+                continue
+
+            for param in step["inputs"]["parameters"]:
+                if param["name"] == "step_uuid":
+                    step_uuid = param["value"]
+                    break
+            else:
+                # Should never happen.
+                raise Exception(
+                    f"Did not find step_uuid in step parameters. Step: {step}."
+                )
+            step_status = step["phase"]
+            step_message = step.get("message", "")
+            step_status_update = None
+
+            # Argo does not fail a step if the container is stuck in a
+            # waiting state. Doesn't look like the pull backoff behavior
+            # can be tuned.
+            if step_status in ["Pending", "Running"] and (
+                "ImagePullBackOff" in step_message or "ErrImagePull" in step_message
+            ):
+                # The registry might have been redeployed with another
+                # ClusterIP, the images of next runs use the new one.
+                invalidate_service_cluster_ip(_config.REGISTRY)
+                step_status_update = "FAILURE"
+            elif step_status == "Running" and step_uuid in steps_to_start:
+                step_status_update = "STARTED"
+                steps_to_start.remove(step_uuid)
+            elif (
+                step_status in ["Succeeded", "Failed", "Error"]
+                and step_uuid in steps_to_finish
+            ):
+                step_status_update = {
+                    "Succeeded": "SUCCESS",
+                    "Failed": "FAILURE",
+                    "Error": "FAILURE",
+                }[step_status]
+
+            if step_status_update is not None:
+                if step_status_update == "FAILURE":
+                    had_failed_steps = True
+
+                if step_status_update in ["FAILURE", "ABORTED", "SUCCESS"]:
+                    steps_to_finish.remove(step_uuid)
+                    if step_uuid in steps_to_start:
+                        steps_to_start.remove(step_uuid)
+
+                step_status_updates[step_uuid] = step_status_update
+
+        await update_steps_status(
+            step_status_updates,
             task_id,
             session,
-            type="pipeline",
             run_endpoint=run_config["run_endpoint"],
         )
 
-        namespace = _config.ORCHEST_NAMESPACE
+        if not steps_to_finish or had_failed_steps:
+            break
 
-        try:
+        if loop.time() >= next_status_check:
+            if await _should_stop_following(task_id, session, run_config):
+                break
+            next_status_check = loop.time() + interval
+
+    return steps_to_finish, had_failed_steps
+
+
+async def run_pipeline_workflow(
+    session_uuid: str,
+    task_id: str,
+    pipeline: Pipeline,
+    *,
+    run_config: RunConfig,
+    session: Optional[aiohttp.ClientSession] = None,
+):
+    """Runs the pipeline as an Argo Workflow and follows its execution.
+
+    Args:
+        session: HTTP session to use to update the status of the run
+            through the orchest-api. If not given, a new session is
+            created for the run.
+    """
+    if session is None:
+        async with aiohttp.ClientSession() as session:
+            return await _run_pipeline_workflow(
+                session_uuid, task_id, pipeline, run_config, session
+            )
+    return await _run_pipeline_workflow(
+        session_uuid, task_id, pipeline, run_config, session
+    )
+
+
+async def _run_pipeline_workflow(
+    session_uuid: str,
+    task_id: str,
+    pipeline: Pipeline,
+    run_config: RunConfig,
+    session: aiohttp.ClientSession,
+):
+    await update_status(
+        "STARTED",
+        task_id,
+        session,
+        type="pipeline",
+        run_endpoint=run_config["run_endpoint"],
+    )
+
+    namespace = _config.ORCHEST_NAMESPACE
+
+    workflow_name = f"pipeline-run-task-{task_id}"
+    try:
+        if run_config.get("workflow_template") is not None:
+            manifest = _workflow_template_ref_manifest(
+                session_uuid, workflow_name, run_config
+            )
+        else:
             manifest = _pipeline_to_workflow_manifest(
-                session_uuid, f"pipeline-run-task-{task_id}", pipeline, run_config
+                session_uuid, workflow_name, pipeline, run_config
             )
+        # Subscribe before creating the workflow to not miss any
+        # update.
+        subscription = get_workflow_watcher(namespace).subscribe(workflow_name)
+        with subscription:
             k8s_custom_obj_api.create_namespaced_custom_object(
                 "argoproj.io", "v1alpha1", namespace, "workflows", body=manifest
             )
+            steps_to_finish, had_failed_steps = await _follow_pipeline_workflow(
+                subscription, task_id, pipeline, session, run_config
+            )
 
-            steps_to_start = {step.properties["uuid"] for step in pipeline.steps}
-            steps_to_finish = set(steps_to_start)
-            had_failed_steps = False
-            while steps_to_finish:
-                # Note: not async.
-                resp = k8s_custom_obj_api.get_namespaced_custom_object(
-                    "argoproj.io",
-                    "v1alpha1",
-                    namespace,
-                    "workflows",
-                    f"pipeline-run-task-{task_id}",
-                )
-                workflow_nodes: dict = resp.get("status", {}).get("nodes", {})
-                for step in workflow_nodes.values():
-                    # The nodes includes the entire "pipeline" node etc.
-                    if step["templateName"] != "step":
-                        continue
-                    # The step was not run because the workflow failed.
-                    if "inputs" not in step:
-                        continue
-
-                    for param in step["inputs"]["parameters"]:
-                        if param["name"] == "step_uuid":
-                            step_uuid = param["value"]
-                            break
-                    else:
-                        # Should never happen.
-                        raise Exception(
-                            f"Did not find step_uuid in step parameters. Step: {step}."
-                        )
-                    step_status = step["phase"]
-                    step_message = step.get("message", "")
-                    step_status_update = None
-
-                    # Argo does not fail a step if the container is
-                    # stuck in a waiting state. Doesn't look like the
-                    # pull backoff behavior can be tuned.
-                    if step_status in ["Pending", "Running"] and (
-                        "ImagePullBackOff" in step_message
-                        or "ErrImagePull" in step_message
-                    ):
-                        step_status_update = "FAILURE"
-                    elif step_status == "Running" and step_uuid in steps_to_start:
-                        step_status_update = "STARTED"
-                        steps_to_start.remove(step_uuid)
-                    elif (
-                        step_status in ["Succeeded", "Failed", "Error"]
-                        and step_uuid in steps_to_finish
-                    ):
-                        step_status_update = {
-                            "Succeeded": "SUCCESS",
-                            "Failed": "FAILURE",
-                            "Error": "FAILURE",
-                        }[step_status]
-
-                    if step_status_update is not None:
-                        if step_status_update == "FAILURE":
-                            had_failed_steps = True
-
-                        if step_status_update in ["FAILURE", "ABORTED", "SUCCESS"]:
-                            steps_to_finish.remove(step_uuid)
-                            if step_uuid in steps_to_start:
-                                steps_to_start.remove(step_uuid)
-
-                        await update_status(
-                            step_status_update,
-                            task_id,
-                            session,
-                            type="step",
-                            run_endpoint=run_config["run_endpoint"],
-                            uuid=step_uuid,
-                        )
-
-                if not steps_to_finish or had_failed_steps:
-                    break
-
-                if AbortableAsyncResult(task_id).is_aborted():
-                    break
-
-                async with session.get(
-                    f'{CONFIG_CLASS.ORCHEST_API_ADDRESS}/{run_config["run_endpoint"]}'
-                    f"/{task_id}"
-                ) as response:
-                    run_status = await response.json()
-                    # Might not be there if it has been deleted.
-                    if run_status.get("status", "ABORTED") in [
-                        "SUCCESS",
-                        "FAILURE",
-                        "ABORTED",
-                    ]:
-                        break
-
-                await asyncio.sleep(0.25)
-
-            for step_uuid in steps_to_finish:
-                await update_status(
-                    "ABORTED",
-                    task_id,
-                    session,
-                    type="step",
-                    run_endpoint=run_config["run_endpoint"],
-                    uuid=step_uuid,
-                )
+        await update_steps_status(
+            {step_uuid: "ABORTED" for step_uuid in steps_to_finish},
+            task_id,
+            session,
+            run_endpoint=run_config["run_endpoint"],
+        )
 
-            pipeline_status = "SUCCESS" if not had_failed_steps else "FAILURE"
-            await update_status(
-                pipeline_status,
-                task_id,
-                session,
-                type="pipeline",
-                run_endpoint=run_config["run_endpoint"],
-            )
+        pipeline_status = "SUCCESS" if not had_failed_steps else "FAILURE"
+        await update_status(
+            pipeline_status,
+            task_id,
+            session,
+            type="pipeline",
+            run_endpoint=run_config["run_endpoint"],
+        )
 
-        except Exception as e:
-            logger.error(e)
-            await update_status(
-                "FAILURE",
-                task_id,
-                session,
-                type="pipeline",
-                run_endpoint=run_config["run_endpoint"],
-            )
+    except Exception as e:
+        logger.error(e)
+        await update_status(
+            "FAILURE",
+            task_id,
+            session,
+            type="pipeline",
+            run_endpoint=run_config["run_endpoint"],
+        )
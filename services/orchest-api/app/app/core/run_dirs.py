@@ -0,0 +1,189 @@
+"""Provisioning of the directories of job pipeline runs.
+
+Every pipeline run of a job runs on its own copy of the job snapshot,
+i.e. the project directory as it was when the job was created. A full
+copy is expensive for projects with large data or model files, since
+it's done for every run. The directory of a run is instead provisioned
+through one of the following strategies, see
+``JOB_PIPELINE_RUN_DIR_PROVISIONING``:
+
+    copy: Plain recursive copy of the snapshot.
+    reflink: Copy-on-write copy of the files, on filesystems supporting
+        it (e.g. btrfs, xfs), where the data of a file is only
+        duplicated once a run writes to it. Falls back to a plain copy
+        on other filesystems.
+    hardlink: Files are cloned, like with reflink, on filesystems
+        supporting it. On other filesystems, read-only files, i.e.
+        files without any write permission bit in the project, are
+        hardlinked to the snapshot, while other files are copied.
+        Marking large data files as read-only (``chmod a-w``) makes
+        them free to provision.
+
+        Unsafe, hence opt-in: steps run as root, which can write to
+        read-only files. A step that writes a hardlinked file in place,
+        instead of replacing it, modifies the snapshot and thus the
+        file of all the other runs of the job, and of the other jobs
+        sharing the file through the snapshot store, see
+        ``_orchest.internals.snapshots``. Only use it if the read-only
+        files of projects are never written in place.
+
+The files of a snapshot are read-only, the files of a run get the
+permission bits they had in the project back, from the manifest of the
+snapshot.
+
+"""
+import errno
+import fcntl
+import os
+import shutil
+import stat
+import subprocess
+from typing import Callable, Dict, Optional
+
+from config import CONFIG_CLASS
+
+_WRITE_BITS = stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH
+# ioctl cloning a file, i.e. a reflink, see ioctl_ficlone(2).
+_FICLONE = 0x40049409
+# Errors of FICLONE telling that the filesystem does not support it.
+_CLONE_NOT_SUPPORTED = {
+    errno.EOPNOTSUPP,
+    errno.ENOTTY,
+    errno.EINVAL,
+    errno.EXDEV,
+    errno.ENOSYS,
+}
+
+
+def _copy(snapshot_dir: str, run_dir: str, modes: Dict[str, int]) -> None:
+    _cp(["-r"], snapshot_dir, run_dir)
+
+
+def _reflink(snapshot_dir: str, run_dir: str, modes: Dict[str, int]) -> None:
+    _cp(["-r", "--reflink=auto"], snapshot_dir, run_dir)
+
+
+def _cp(options, source: str, target: str) -> None:
+    exit_code = subprocess.call(["cp", *options, source, target])
+    if exit_code != 0:
+        raise OSError(f"Failed to copy {source} to {target}, :{exit_code}.")
+
+
+def _clone(source: str, target: str) -> bool:
+    """Clones the file, False if the filesystem does not support it."""
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+            cloned = True
+        except OSError as e:
+            if e.errno not in _CLONE_NOT_SUPPORTED:
+                raise
+            cloned = False
+    if not cloned:
+        os.remove(target)
+        return False
+    shutil.copystat(source, target)
+    return True
+
+
+def _hardlink(snapshot_dir: str, run_dir: str, modes: Dict[str, int]) -> None:
+    os.makedirs(run_dir)
+    # Whether the filesystem supports cloning, tried on the first file.
+    can_clone = True
+    for root, dirs, files in os.walk(snapshot_dir):
+        target_root = os.path.join(run_dir, os.path.relpath(root, snapshot_dir))
+
+        for name in dirs:
+            source = os.path.join(root, name)
+            target = os.path.join(target_root, name)
+            # os.walk does not follow symlinks to directories.
+            if os.path.islink(source):
+                os.symlink(os.readlink(source), target)
+            else:
+                os.mkdir(target)
+
+        for name in files:
+            source = os.path.join(root, name)
+            target = os.path.join(target_root, name)
+            st = os.lstat(source)
+            # Files of the snapshot are read-only, what counts is their
+            # mode in the project.
+            mode = modes.get(os.path.relpath(source, snapshot_dir), st.st_mode)
+            read_only = stat.S_ISREG(st.st_mode) and not mode & _WRITE_BITS
+            if stat.S_ISLNK(st.st_mode):
+                os.symlink(os.readlink(source), target)
+            elif can_clone and stat.S_ISREG(st.st_mode):
+                can_clone = _clone(source, target)
+                if not can_clone:
+                    _link_or_copy(source, target, read_only)
+            else:
+                _link_or_copy(source, target, read_only)
+
+
+def _link_or_copy(source: str, target: str, read_only: bool) -> None:
+    if read_only:
+        os.link(source, target)
+    else:
+        shutil.copy2(source, target)
+
+
+def _restore_modes(run_dir: str, modes: Dict[str, int]) -> None:
+    for relpath, mode in modes.items():
+        path = os.path.join(run_dir, relpath)
+        try:
+            # Hardlinked files, which are read-only, already have their
+            # mode.
+            if stat.S_IMODE(os.lstat(path).st_mode) != mode:
+                os.chmod(path, mode)
+        except FileNotFoundError:
+            pass
+
+
+STRATEGIES: Dict[str, Callable[[str, str, Dict[str, int]], None]] = {
+    "copy": _copy,
+    "reflink": _reflink,
+    "hardlink": _hardlink,
+}
+
+
+def provision_run_dir(
+    snapshot_dir: str,
+    run_dir: str,
+    strategy: Optional[str] = None,
+    modes: Optional[Dict[str, int]] = None,
+) -> None:
+    """Provisions the directory of a job pipeline run from a snapshot.
+
+    Args:
+        snapshot_dir: Path to the snapshot of the job.
+        run_dir: Path to the directory of the run, must not exist.
+        strategy: One of `STRATEGIES`, defaults to
+            `JOB_PIPELINE_RUN_DIR_PROVISIONING`.
+        modes: Permission bits of the files in the project, by path
+            relative to the snapshot, see the manifest of the snapshot.
+
+    Raises:
+        ValueError: If the strategy is unknown.
+        OSError: If the directory could not be provisioned.
+
+    """
+    if strategy is None:
+        strategy = CONFIG_CLASS.JOB_PIPELINE_RUN_DIR_PROVISIONING
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown run directory provisioning strategy: {strategy}.")
+
+    modes = modes if modes is not None else {}
+    STRATEGIES[strategy](snapshot_dir, run_dir, modes)
+    _restore_modes(run_dir, modes)
+
+
+def write_run_file(path: str, content: str) -> None:
+    """Writes a file of a run directory.
+
+    The file is replaced instead of being written in place, since it
+    could be a hardlink to the snapshot.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
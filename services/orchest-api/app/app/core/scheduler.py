@@ -34,7 +34,7 @@ from sqlalchemy import desc
 from sqlalchemy.orm import load_only
 
 from _orchest.internals.two_phase_executor import TwoPhaseExecutor
-from app.apis.namespace_jobs import RunJob
+from app.apis.namespace_jobs import DispatchJobPipelineRuns, RunJob
 from app.connections import db
 from app.models import Job
 
@@ -113,3 +113,21 @@ class Scheduler:
                     db.session.commit()
                 except Exception as e:
                     logger.error(e)
+
+    @classmethod
+    def dispatch_job_pipeline_runs(cls, app):
+        """Dispatches PENDING job pipeline runs, if there is room.
+
+        Runs are also dispatched when a job runs and when a job pipeline
+        run ends, this is a safety net in case, for example, a worker
+        dies before reporting the end of a run or the limits have been
+        raised.
+        """
+        logger = logging.getLogger("job-scheduler")
+
+        with app.app_context():
+            try:
+                with TwoPhaseExecutor(db.session) as tpe:
+                    DispatchJobPipelineRuns(tpe).transaction()
+            except Exception as e:
+                logger.error(e)
@@ -78,6 +78,12 @@ def launch(
         raise ValueError(f"Invalid session type: {session_type}.")
 
     if session_type == SessionType.INTERACTIVE:
+        orchest_session_service_k8s_deployment_manifests.append(
+            _manifests._get_memory_server_deployment_manifest(
+                session_uuid, session_config, session_type
+            )
+        )
+
         (
             role,
             service_account,
@@ -13,7 +13,6 @@ from typing import Any, Dict, Optional, Tuple
 from _orchest.internals import config as _config
 from _orchest.internals.utils import get_userdir_relpath
 from app import utils
-from app.connections import k8s_core_api
 from app.types import SessionConfig, SessionType
 from config import CONFIG_CLASS
 
@@ -101,6 +100,22 @@ def _get_jupyter_volumes_and_volume_mounts(
     return volumes, volume_mounts
 
 
+def _get_memory_server_volume(session_uuid: str) -> dict:
+    # The objects of the memory-server are files on the tmpfs of the
+    # node, so that kernels on the same node can memory map them.
+    return {
+        "name": "memory-server",
+        "hostPath": {
+            "path": _config.MEMORY_SERVER_HOST_DIR.format(session_uuid=session_uuid),
+            "type": "DirectoryOrCreate",
+        },
+    }
+
+
+def _get_memory_server_volume_mount() -> dict:
+    return {"name": "memory-server", "mountPath": _config.MEMORY_SERVER_DIR}
+
+
 def _get_memory_server_deployment_manifest(
     session_uuid: str,
     session_config: SessionConfig,
@@ -143,16 +158,15 @@ def _get_memory_server_deployment_manifest(
                         "runAsGroup": int(os.environ.get("ORCHEST_HOST_GID")),
                         "fsGroup": int(os.environ.get("ORCHEST_HOST_GID")),
                     },
-                    # The memory server is not respecting the SIGTERM
-                    # signal handler, apparently because of the plasma
-                    # client.
+                    # Objects only have to be deleted from the tmpfs
+                    # on SIGTERM, which is quick.
                     "terminationGracePeriodSeconds": 1,
                     "resources": {
                         "requests": {"cpu": _config.USER_CONTAINERS_CPU_SHARES}
                     },
                     "volumes": [
                         volumes_dict["userdir-pvc"],
-                        {"name": "dev-shm", "emptyDir": {"medium": "Memory"}},
+                        _get_memory_server_volume(session_uuid),
                     ],
                     "containers": [
                         {
@@ -186,7 +200,7 @@ def _get_memory_server_deployment_manifest(
                             "volumeMounts": [
                                 volume_mounts_dict["pipeline-file"],
                                 volume_mounts_dict["project-dir"],
-                                {"name": "dev-shm", "mountPath": "/dev/shm"},
+                                _get_memory_server_volume_mount(),
                             ],
                         }
                     ],
@@ -628,13 +642,7 @@ def _get_jupyter_enterprise_gateway_deployment_service_manifest(
     process_env_whitelist.extend(list(user_defined_env_vars.keys()))
     process_env_whitelist = ",".join(process_env_whitelist)
 
-    # Need to reference the ip because the local docker engine will
-    # run the container, and if the image is missing it will prompt
-    # a pull which will fail because the FQDN can't be resolved by
-    # the local engine on the node. K8S_TODO: fix this.
-    registry_ip = k8s_core_api.read_namespaced_service(
-        _config.REGISTRY, _config.ORCHEST_NAMESPACE
-    ).spec.cluster_ip
+    registry_ip = utils.get_registry_ip()
     environment = {
         "EG_MIRROR_WORKING_DIRS": "True",
         "EG_LIST_KERNELS": "True",
@@ -841,13 +849,7 @@ def _get_user_service_deployment_service_manifest(
     image = service_config["image"]
     prefix = _config.ENVIRONMENT_AS_SERVICE_PREFIX
     if image.startswith(prefix):
-        # Need to reference the ip because the local docker engine will
-        # run the container, and if the image is missing it will prompt
-        # a pull which will fail because the FQDN can't be resolved by
-        # the local engine on the node. K8S_TODO: fix this.
-        registry_ip = k8s_core_api.read_namespaced_service(
-            _config.REGISTRY, _config.ORCHEST_NAMESPACE
-        ).spec.cluster_ip
+        registry_ip = utils.get_registry_ip()
 
         image = image.replace(prefix, "")
         image = img_mappings[image]
@@ -1,12 +1,15 @@
+import asyncio
+import codecs
 import logging
 import os
-import select
 import signal
-import threading
 import time
+from typing import List, Optional
 
 import socketio
 
+from app.core import worker_loop
+
 
 # TODO: move this to util?
 class UnbufferedTextStream(object):
@@ -31,9 +34,127 @@ class UnbufferedTextStream(object):
         return getattr(self.stream, attr)
 
 
+class _TaskPipes:
+    """Reads the output and the result of the task from its pipes.
+
+    The pipes are read when they become readable, output is collected
+    into frames of at most FRAME_MAX_BYTES. While a frame is full the
+    output pipe is not read, so that a task that outputs faster than it
+    can be sent is slowed down by the pipe filling up.
+    """
+
+    def __init__(self, output_fd: int, result_fd: int) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._output_fd = output_fd
+        self._result_fd = result_fd
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+        self._frame: List[str] = []
+        self._frame_bytes = 0
+        self._last_frame_time = float("-inf")
+        self._result = bytearray()
+        self._output_eof = False
+        self._result_eof = False
+        self._changed = asyncio.Event()
+
+        for fd in [output_fd, result_fd]:
+            os.set_blocking(fd, False)
+        self._loop.add_reader(output_fd, self._read_output)
+        self._loop.add_reader(result_fd, self._read_result)
+
+    @property
+    def done(self) -> bool:
+        """Whether the task closed its pipes, i.e. it has ended."""
+        return self._output_eof and self._result_eof
+
+    @property
+    def result(self) -> str:
+        return self._result.decode(errors="replace")
+
+    async def next_frame(self) -> Optional[str]:
+        """Waits for the next frame of output.
+
+        Frames are returned at most every FRAME_INTERVAL seconds, unless
+        they are full. Output that comes in after a pause is returned
+        right away, while continuous output is collected into frames.
+
+        Returns:
+            The output, None if the task has ended and all of its output
+            has been returned.
+        """
+        while not self._frame_bytes and not self.done:
+            await self._wait_for_change()
+        if not self._frame_bytes:
+            return None
+
+        deadline = self._last_frame_time + SioStreamedTask.FRAME_INTERVAL
+        while self._frame_bytes < SioStreamedTask.FRAME_MAX_BYTES and not self.done:
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                await asyncio.wait_for(self._wait_for_change(), timeout)
+            except asyncio.TimeoutError:
+                break
+
+        frame = "".join(self._frame)
+        if self._output_eof:
+            frame += self._decoder.decode(b"", final=True)
+        elif self._frame_bytes >= SioStreamedTask.FRAME_MAX_BYTES:
+            self._loop.add_reader(self._output_fd, self._read_output)
+        self._frame = []
+        self._frame_bytes = 0
+        self._last_frame_time = self._loop.time()
+        return frame
+
+    def close(self) -> None:
+        for fd in [self._output_fd, self._result_fd]:
+            self._loop.remove_reader(fd)
+            os.close(fd)
+
+    async def _wait_for_change(self) -> None:
+        await self._changed.wait()
+        self._changed.clear()
+
+    def _read_output(self) -> None:
+        try:
+            data = os.read(
+                self._output_fd, SioStreamedTask.FRAME_MAX_BYTES - self._frame_bytes
+            )
+        except BlockingIOError:
+            return
+        if data:
+            self._frame.append(self._decoder.decode(data))
+            self._frame_bytes += len(data)
+        else:
+            self._output_eof = True
+        if self._output_eof or self._frame_bytes >= SioStreamedTask.FRAME_MAX_BYTES:
+            self._loop.remove_reader(self._output_fd)
+        self._changed.set()
+
+    def _read_result(self) -> None:
+        try:
+            data = os.read(self._result_fd, 1024)
+        except BlockingIOError:
+            return
+        if data:
+            self._result += data
+        else:
+            self._result_eof = True
+            self._loop.remove_reader(self._result_fd)
+        self._changed.set()
+
+
 class SioStreamedTask:
-    MAX_READ_BYTES = 1024 * 20
-    READ_LOOP_SLEEP_TIME = 0.01
+    # Output is sent in frames of at most FRAME_MAX_BYTES, at most one
+    # every FRAME_INTERVAL seconds unless they are full.
+    FRAME_MAX_BYTES = 64 * 1024
+    FRAME_INTERVAL = 0.02
+    # Seconds to wait for the client to connect to the namespace.
+    CONNECT_TIMEOUT = 10
+    # Seconds to wait for the child to exit once it has closed its
+    # pipes, after which it is killed.
+    CHILD_EXIT_TIMEOUT = 5
 
     @staticmethod
     def run(
@@ -56,8 +177,9 @@ class SioStreamedTask:
                 "action": "sio_streamed_task_started"
             }
         Then, an arbitrary number of messages containing the task_lambda
-        output are sent, where task_data is a chunk of bytes read from
-        the file object to which the task_lambda is writing.
+        output are sent, where task_data is a frame of the output
+        written by the task_lambda to the file object, see
+        FRAME_MAX_BYTES and FRAME_INTERVAL:
             {
                 "identity": identity,
                 "output": task_data,
@@ -74,6 +196,9 @@ class SioStreamedTask:
         messages that are related to different tasks, e.g. by the
         server.
 
+        The task_lambda is run in a forked child process, the output is
+        streamed by the event loop of the worker process, see
+        `worker_loop`.
 
         Args:
             identity: An object that respects the socketio requirements
@@ -116,58 +241,63 @@ class SioStreamedTask:
         else:
             os.close(communication_pipe_write)
             os.close(end_task_pipe_write)
-            return SioStreamedTask._listen_to_logs(
-                child_pid,
-                identity,
-                server,
-                namespace,
-                abort_lambda,
-                abort_lambda_poll_time,
-                communication_pipe_read,
-                end_task_pipe_read,
+            return worker_loop.run(
+                SioStreamedTask._listen_to_logs(
+                    child_pid,
+                    identity,
+                    server,
+                    namespace,
+                    abort_lambda,
+                    abort_lambda_poll_time,
+                    communication_pipe_read,
+                    end_task_pipe_read,
+                )
             )
 
     @staticmethod
     def _run_lambda(task_lambda, communication_pipe_write, end_task_pipe_write):
         """Code path of the forked child which runs the task lambda.
 
-        Args:
-            task_lambda:
-            communication_pipe_write:
-            end_task_pipe_write:
-
-        Returns:
+        Never returns, the child exits once the result of the task has
+        been written to the end_task_pipe and both pipes are closed.
+        The parent, which then reads EOF on both pipes, reaps the child.
 
+        Args:
+            task_lambda: The task to run, see `run`.
+            communication_pipe_write: File descriptor to which the
+                output of the task is written.
+            end_task_pipe_write: File descriptor to which the result of
+                the task is written.
         """
 
-        communication_pipe_write = UnbufferedTextStream(
-            os.fdopen(communication_pipe_write, "w")
-        )
-        end_task_pipe_write = UnbufferedTextStream(os.fdopen(end_task_pipe_write, "w"))
-
-        result = "FAILED"
-        # use a try catch block so that even if there are errors in the
-        # task lambda we still send the closing message in end_task_pipe
         try:
-            result = task_lambda(communication_pipe_write)
-        except Exception as e:
-            logging.error(e)
-        finally:
-            communication_pipe_write.flush()
+            communication_pipe_write = UnbufferedTextStream(
+                os.fdopen(communication_pipe_write, "w")
+            )
+            end_task_pipe_write = UnbufferedTextStream(
+                os.fdopen(end_task_pipe_write, "w")
+            )
 
-            # the parent will now know that the child can be killed
-            end_task_pipe_write.write(str(result))
-            end_task_pipe_write.flush()
+            result = "FAILED"
+            # use a try catch block so that even if there are errors in
+            # the task lambda we still send the result in end_task_pipe
+            try:
+                result = task_lambda(communication_pipe_write)
+            except Exception as e:
+                logging.error(e)
 
-            # cleanup this end of the pipe
             communication_pipe_write.close()
+            end_task_pipe_write.write(str(result))
             end_task_pipe_write.close()
-            # this way the process does not exit and triggers celery
-            # stuff without control, we kill it ourselves
-            time.sleep(10)
+        except Exception as e:
+            logging.error(e)
+        finally:
+            # Exit right away, i.e. without running the exit handlers of
+            # the forked worker process, e.g. of celery.
+            os._exit(0)
 
     @staticmethod
-    def _listen_to_logs(
+    async def _listen_to_logs(
         child_pid,
         identity,
         server,
@@ -183,160 +313,130 @@ class SioStreamedTask:
         send to the SocketIO server.
 
         Args:
-            child_pid:
-            identity:
-            server:
-            namespace:
-            abort_lambda:
-            abort_lambda_poll_time:
-            communication_pipe_read:
-            end_task_pipe_read:
+            child_pid: PID of the child running the task, which is
+                reaped before returning.
+            identity: See `run`.
+            server: See `run`.
+            namespace: See `run`.
+            abort_lambda: See `run`.
+            abort_lambda_poll_time: See `run`.
+            communication_pipe_read: File descriptor from which the
+                output of the task is read.
+            end_task_pipe_read: File descriptor from which the result of
+                the task is read.
 
         Returns:
-
+            The status of the task, see `run`.
         """
 
-        sio_client = socketio.Client(reconnection_attempts=1)
-
+        pipes = _TaskPipes(communication_pipe_read, end_task_pipe_read)
+        sio_client = socketio.AsyncClient(reconnection_attempts=1)
         # used to make sure the client is connected to the namespace
         # before sending the first message otherwise the message might
         # get lost
         # https://github.com/miguelgrinberg/python-socketio/issues/461
-        connect_lock = threading.Lock()
-        # get the lock so the next call to it will block the thread even
-        # if it is the same thread acquiring it, since its NOT a RLock
-        connect_lock.acquire()
+        connected = asyncio.Event()
 
         @sio_client.on("connect", namespace=namespace)
         def connect():
             logging.info("connected to namespace %s" % namespace)
-            # https://docs.python.org/2/library/threading.html#threading.Lock
-            # any thread may release it
-            connect_lock.release()
-
-        sio_client.connect(server, namespaces=[namespace], transports=["websocket"])
-
-        # try to acquire again, if it has not been released yet wait for
-        # it wait a maximum of 10 seconds, if that doesnt work declare
-        # the build as failed, because that means that it took more than
-        # 10 seconds for the client to connect to the namespace
-        acquired = connect_lock.acquire(timeout=10)
-        # release the lock in any case, cleaner
-        connect_lock.release()
-        if not acquired:
-            logging.warning("could not acquire connect_lock")
-            return "FAILED"
+            connected.set()
+
+        status = "FAILED"
+        aborted = False
+        try:
+            await sio_client.connect(
+                server, namespaces=[namespace], transports=["websocket"]
+            )
+            await asyncio.wait_for(
+                connected.wait(), timeout=SioStreamedTask.CONNECT_TIMEOUT
+            )
+        except (asyncio.TimeoutError, socketio.exceptions.ConnectionError) as e:
+            logging.warning("could not connect to namespace %s: %s" % (namespace, e))
+            pipes.close()
+            SioStreamedTask._kill(child_pid)
+            await sio_client.disconnect()
+            return status
+
+        async def poll_abort_lambda():
+            nonlocal aborted
+            try:
+                while True:
+                    await asyncio.sleep(abort_lambda_poll_time)
+                    if abort_lambda():
+                        logging.info("aborting task")
+                        aborted = True
+                        break
+            except Exception as ex:
+                logging.warning("Exception during execution: %s" % ex)
+            # Closes the pipes of the child, i.e. ends the output.
+            os.kill(child_pid, signal.SIGKILL)
 
         # tell the socketio server that from its point of view the task
         # is started, i.e.  new logs related to this identity will come
         # in
-        sio_client.emit(
+        await sio_client.emit(
             "sio_streamed_task_data",
             {"identity": identity, "action": "sio_streamed_task_started"},
             namespace=namespace,
         )
 
-        status = "STARTED"
-        poll_time = 0
-        management_data = None
-
+        abort_poller = asyncio.create_task(poll_abort_lambda())
         try:
             while True:
-                sio_client.sleep(SioStreamedTask.READ_LOOP_SLEEP_TIME)
-                poll_time += SioStreamedTask.READ_LOOP_SLEEP_TIME
-
-                # check for management_data here, this way:
-                # * if there is no management_data business continues as
-                #   usual
-                # * if there is management_data we are also going to
-                #   check for any task data, this way we
-                # * avoid a race condition where checking for task_data
-                #   first and management_data later might
-                # * lead to losing some messages because in between the
-                #   two checks the task has both
-                # * outputted data and has terminated
-                if not management_data:
-                    management_data = SioStreamedTask.poll_fd_data(end_task_pipe_read)
-
-                task_data = SioStreamedTask.poll_fd_data(communication_pipe_read)
-                if task_data:
-                    logging.info("output: %s" % task_data)
-                    sio_client.emit(
-                        "sio_streamed_task_data",
-                        {
-                            "identity": identity,
-                            "output": task_data,
-                            "action": "sio_streamed_task_output",
-                        },
-                        namespace=namespace,
-                    )
-
-                    # this way we do not run the (rare) risk of missing
-                    # out on some data because the amount of data in the
-                    # pipe is larger than our read size. It could be the
-                    # case that the task outputs **a lot** of data
-                    # without the parent being able to keep up with it,
-                    # and the task terminates, so the next iteration
-                    # would lead to exiting the loop regardless of the
-                    # amount of data that could still be read.
-                    # TLDR: do not terminate as long as you keep finding
-                    # data
-                    has_found_data = True
-                else:
-                    has_found_data = False
-
-                # from time to time check if the task should be aborted
-                if poll_time > abort_lambda_poll_time:
-                    abort_lambda_poll_time = 0
-                    if abort_lambda():
-                        status = "ABORTED"
-                        logging.info("aborting task")
-                        break
-
-                # management_data has been found -> the task is done ->
-                # any data that it had to write has already been put
-                # into the communication_pipe_read
-                if management_data and not has_found_data:
-                    logging.info(f"task done, status: {management_data}")
-                    status = management_data
+                task_data = await pipes.next_frame()
+                if task_data is None:
                     break
-
+                await sio_client.emit(
+                    "sio_streamed_task_data",
+                    {
+                        "identity": identity,
+                        "output": task_data,
+                        "action": "sio_streamed_task_output",
+                    },
+                    namespace=namespace,
+                )
+
+            status = "ABORTED" if aborted else (pipes.result or "FAILED")
+            logging.info(f"task done, status: {status}")
         except Exception as ex:
             logging.warning("Exception during execution: %s" % ex)
-            status = "FAILED"
         finally:
-            # Cleanup phase. Close the pipes, emit a closing message,
-            # kill the child process.
-
-            # currently getting broken pipes on disconnect at random,
-            # the sleep is helping to make it so that the last message
-            # is delivered Seems like it's an issue related to the
-            # library?
-            # https://github.com/miguelgrinberg/python-engineio/commit/0dde7d7ae19478a56610b3a06f76419013e60d62
-            # I am able to reproduce the problem by using the client
-            # example in the docs. By replacing the wait call with
-            # disconnect.
-            # (https://python-socketio.readthedocs.io/en/latest/intro.html#client-examples)
-            sio_client.emit(
-                "sio_streamed_task_data",
-                {"identity": identity, "action": "sio_streamed_task_finished"},
-                namespace=namespace,
-                callback=lambda: sio_client.disconnect(),
-            )
-
-            os.kill(child_pid, signal.SIGKILL)
-            # close after killing so the child process does not get into
-            # errors
-            os.close(communication_pipe_read)
-            os.close(end_task_pipe_read)
-            logging.info("[Killed] child_pid: %d" % child_pid)
+            # Cleanup phase. Close the pipes, reap the child process,
+            # emit a closing message.
+            abort_poller.cancel()
+            pipes.close()
+            await SioStreamedTask._reap(child_pid)
+
+            # Disconnect once the server has received the closing
+            # message, otherwise it could get lost.
+            try:
+                await sio_client.call(
+                    "sio_streamed_task_data",
+                    {"identity": identity, "action": "sio_streamed_task_finished"},
+                    namespace=namespace,
+                    timeout=SioStreamedTask.CONNECT_TIMEOUT,
+                )
+            except socketio.exceptions.TimeoutError:
+                logging.warning("closing message was not acknowledged")
+            await sio_client.disconnect()
 
         return status
 
     @staticmethod
-    def poll_fd_data(fd):
-        (data_ready, _, _) = select.select([fd], [], [], 0)
-        if data_ready:
-            output = os.read(fd, SioStreamedTask.MAX_READ_BYTES).decode()
-            return output
-        return None
+    async def _reap(child_pid):
+        """Waits for the child to exit, killing it if it does not."""
+        deadline = time.monotonic() + SioStreamedTask.CHILD_EXIT_TIMEOUT
+        while os.waitpid(child_pid, os.WNOHANG)[0] == 0:
+            if time.monotonic() > deadline:
+                logging.warning("child %d did not exit, killing it" % child_pid)
+                SioStreamedTask._kill(child_pid)
+                return
+            await asyncio.sleep(0.01)
+        logging.info("[Reaped] child_pid: %d" % child_pid)
+
+    @staticmethod
+    def _kill(child_pid):
+        os.kill(child_pid, signal.SIGKILL)
+        os.waitpid(child_pid, 0)
+        logging.info("[Killed] child_pid: %d" % child_pid)
@@ -1,4 +1,3 @@
-import asyncio
 import copy
 import json
 import os
@@ -6,15 +5,16 @@ import shutil
 from typing import Dict, List, Optional, Union
 
 import aiohttp
-from celery import Task
 from celery.contrib.abortable import AbortableAsyncResult, AbortableTask
+from celery.signals import worker_process_shutdown
 from celery.utils.log import get_task_logger
 
 from _orchest.internals import config as _config
-from _orchest.internals.utils import copytree
+from _orchest.internals.snapshots import SnapshotStore
 from app import create_app
 from app.celery_app import make_celery
 from app.connections import k8s_custom_obj_api
+from app.core import run_dirs, worker_loop
 from app.core.environment_image_builds import build_environment_image_task
 from app.core.jupyter_image_builds import build_jupyter_image_task
 from app.core.pipelines import Pipeline, run_pipeline_workflow
@@ -31,14 +31,11 @@ logger = get_task_logger(__name__)
 celery = make_celery(create_app(CONFIG_CLASS, use_db=False), use_backend_db=True)
 
 
-# This will not work yet, because Celery does not yet support asyncio
-# tasks. In Celery 5.0 however this should be possible.
-# https://stackoverflow.com/questions/39815771/how-to-combine-celery-with-asyncio
-class APITask(Task):
-    """
+class APITask(AbortableTask):
+    """Task that shares an event loop and HTTP session with other tasks.
 
-    Idea:
-        Make the aiohttp.ClientSession persistent. Then we get:
+    Both live for as long as the worker process, see the `worker_loop`
+    module. Making the aiohttp.ClientSession persistent means that:
 
         "So if you’re making several requests to the same host, the
         underlying TCP connection will be reused, which can result in a
@@ -48,33 +45,30 @@ class APITask(Task):
         https://docs.celeryproject.org/en/master/userguide/tasks.html#instantiation
     """
 
-    _session = None
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        return worker_loop.get_session()
 
-    async def get_clientsession(self):
-        return await aiohttp.ClientSession()
+    def run_async(self, coro):
+        """Runs the coroutine on the event loop of the worker."""
+        return worker_loop.run(coro)
 
-    @property
-    async def session(self):
-        """
-        TODO:
-            Think about how to create this property since await in a
-            property is not according to PEP8
-            https://stackoverflow.com/questions/54984337/how-should-you-create-properties-when-using-asyncio
 
-            Possibility:
-            https://async-property.readthedocs.io/en/latest/readme.html
-        """
-        if self._session is None:
-            self._session = await self.get_clientsession()
-        return self._session
+@worker_process_shutdown.connect
+def close_worker_loop(*args, **kwargs):
+    worker_loop.close()
 
 
 async def run_pipeline_async(
-    session_uuid: str, run_config: RunConfig, pipeline: Pipeline, task_id: str
+    session_uuid: str,
+    run_config: RunConfig,
+    pipeline: Pipeline,
+    task_id: str,
+    session: Optional[aiohttp.ClientSession] = None,
 ):
     try:
         await run_pipeline_workflow(
-            session_uuid, task_id, pipeline, run_config=run_config
+            session_uuid, task_id, pipeline, run_config=run_config, session=session
         )
     except Exception as e:
         logger.error(e)
@@ -95,7 +89,7 @@ async def run_pipeline_async(
     return "SUCCESS"
 
 
-@celery.task(bind=True, base=AbortableTask)
+@celery.task(bind=True, base=APITask)
 def run_pipeline(
     self,
     pipeline_definition: PipelineDefinition,
@@ -125,18 +119,20 @@ def run_pipeline(
     #       anymore.
     # Run the subgraph in parallel. And pass the id of the AsyncResult
     # object.
-    # TODO: The commented line below is once we can introduce sessions.
-    # session = run_pipeline.session
     task_id = task_id if task_id is not None else self.request.id
 
     # TODO: could make the celery task fail in case the pipeline run
     # failed. Although the run did complete successfully from a task
     # scheduler perspective.
     # https://stackoverflow.com/questions/7672327/how-to-make-a-celery-task-fail-from-within-the-task
-    return asyncio.run(run_pipeline_async(session_uuid, run_config, pipeline, task_id))
+    return self.run_async(
+        run_pipeline_async(
+            session_uuid, run_config, pipeline, task_id, session=self.session
+        )
+    )
 
 
-@celery.task(bind=True, base=AbortableTask)
+@celery.task(bind=True, base=APITask)
 def start_non_interactive_pipeline_run(
     self,
     job_uuid,
@@ -172,10 +168,17 @@ def start_non_interactive_pipeline_run(
     snapshot_dir = os.path.join(job_dir, "snapshot")
     run_dir = os.path.join(job_dir, self.request.id)
 
-    # Copy the contents of `snapshot_dir` to the new (not yet existing
-    # folder) `run_dir`. No need to use_gitignore since the snapshot
-    # was copied with use_gitignore=True.
-    copytree(snapshot_dir, run_dir, use_gitignore=False)
+    # Provision the new (not yet existing folder) `run_dir` with the
+    # contents of `snapshot_dir`. No need to use a gitignore since the
+    # snapshot was copied with use_gitignore=True. The files of the
+    # snapshot are read-only, the run gets their modes in the project.
+    manifest = SnapshotStore(_config.USERDIR_JOB_SNAPSHOTS).get_manifest(
+        job_uuid, project_uuid
+    )
+    modes = {
+        relpath: entry["mode"] for relpath, entry in manifest.get("files", {}).items()
+    }
+    run_dirs.provision_run_dir(snapshot_dir, run_dir, modes=modes)
 
     # Update the `run_config` for the interactive pipeline run. The
     # pipeline run should execute on the `run_dir` as its
@@ -198,14 +201,16 @@ def start_non_interactive_pipeline_run(
     # with the new `pipeline.json` that contains the new parameters for
     # every step.
     pipeline_json = os.path.join(run_dir, run_config["pipeline_path"])
-    with open(pipeline_json, "w") as f:
-        json.dump(pipeline_definition, f, indent=4, sort_keys=True)
+    run_dirs.write_run_file(
+        pipeline_json, json.dumps(pipeline_definition, indent=4, sort_keys=True)
+    )
 
     # Note that run_config contains user_env_variables, which is of
     # interest for the session_config.
     session_config = copy.deepcopy(run_config)
     session_config.pop("env_uuid_to_image")
     session_config.pop("run_endpoint")
+    session_config.pop("workflow_template", None)
     session_config["userdir_pvc"] = userdir_pvc
     session_config["services"] = pipeline_definition.get("services", {})
     session_config["env_uuid_to_image"] = run_config["env_uuid_to_image"]
@@ -283,4 +288,10 @@ def delete_job_pipeline_run_directories(
     for uuid in pipeline_run_uuids:
         shutil.rmtree(os.path.join(job_dir, uuid), ignore_errors=True)
 
+    # Run directories can hold links to the blobs of the job snapshot.
+    # If the job has been deleted in the meantime its blobs might not
+    # have been collected since they were still referenced by the runs.
+    if not os.path.isdir(os.path.join(job_dir, "snapshot")):
+        SnapshotStore(_config.USERDIR_JOB_SNAPSHOTS).collect_garbage()
+
     return "SUCCESS"
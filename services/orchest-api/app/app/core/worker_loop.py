@@ -0,0 +1,85 @@
+"""Event loop and HTTP session living as long as the worker process.
+
+Celery tasks are synchronous, running a coroutine through
+``asyncio.run`` creates (and closes) a new event loop every time, which
+also means creating a new ``aiohttp.ClientSession`` and new TCP
+connections to the orchest-api for every pipeline run. Instead, tasks
+use the event loop and session of this module, which are created once
+per worker process, so that connections are kept alive and reused.
+
+The number of concurrent connections of the session is bounded by
+``ORCHEST_API_CONNECTION_POOL_SIZE``.
+
+"""
+import asyncio
+import os
+from typing import Any, Awaitable, Optional
+
+import aiohttp
+
+from config import CONFIG_CLASS
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_session: Optional[aiohttp.ClientSession] = None
+# The loop and session must not be shared with forked processes.
+_pid: Optional[int] = None
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Returns the event loop of the worker process."""
+    global _loop, _session, _pid
+
+    if _pid != os.getpid():
+        _loop, _session, _pid = None, None, os.getpid()
+
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+    return _loop
+
+
+async def _create_session() -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(
+        limit=CONFIG_CLASS.ORCHEST_API_CONNECTION_POOL_SIZE,
+        keepalive_timeout=CONFIG_CLASS.ORCHEST_API_KEEPALIVE_TIMEOUT,
+    )
+    return aiohttp.ClientSession(connector=connector)
+
+
+def get_session() -> aiohttp.ClientSession:
+    """Returns the HTTP session of the worker process.
+
+    The session is bound to the loop returned by `get_loop`, so it
+    should only be used by coroutines run through `run`.
+    """
+    global _session
+
+    loop = get_loop()
+    if _session is None or _session.closed:
+        _session = loop.run_until_complete(_create_session())
+    return _session
+
+
+def run(coro: Awaitable) -> Any:
+    """Runs the coroutine to completion on the worker event loop."""
+    return get_loop().run_until_complete(coro)
+
+
+def close() -> None:
+    """Closes the session and the event loop, if any."""
+    global _loop, _session
+
+    if _pid != os.getpid():
+        return
+
+    if _loop is not None and not _loop.is_closed():
+        if _session is not None and not _session.closed:
+            _loop.run_until_complete(_session.close())
+        # Like asyncio.run, e.g. for the tasks that clients leave behind
+        # once they are disconnected.
+        tasks = asyncio.all_tasks(_loop)
+        for task in tasks:
+            task.cancel()
+        _loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        _loop.close()
+    _loop, _session = None, None
@@ -0,0 +1,292 @@
+"""Watch based status tracking of Argo Workflows.
+
+Instead of every pipeline run polling the k8s API for the state of its
+own Workflow, a single watch stream per namespace is shared by all runs
+of the process. The stream is consumed by a background thread, which
+fans out changes of the Workflow nodes (steps) to the subscribed runs,
+that can be awaited from any event loop.
+
+The resource version of the last seen event is tracked so that when the
+watch is re-established, e.g. because of a timeout or a dropped
+connection, no events are missed. If the resource version has expired
+(410 Gone) the Workflows are listed again to get back in sync.
+
+Example:
+    >>> watcher = get_workflow_watcher(_config.ORCHEST_NAMESPACE)
+    >>> with watcher.subscribe("pipeline-run-task-<uuid>") as sub:
+    ...     nodes = await sub.get_nodes(timeout=2)
+
+"""
+import asyncio
+import os
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Optional, Set, Tuple
+
+from kubernetes import client as k8s_client
+from kubernetes import watch
+
+from app import errors
+from app.connections import k8s_custom_obj_api
+from app.utils import get_logger
+from config import CONFIG_CLASS
+
+logger = get_logger()
+
+# Used to signal to a subscription that its Workflow got deleted.
+_DELETED = object()
+
+_HTTP_STATUS_GONE = 410
+
+
+class _ResourceVersionExpired(Exception):
+    pass
+
+
+class WorkflowSubscription:
+    """Receives the node updates of a single Workflow.
+
+    Args:
+        watcher: The watcher the subscription belongs to.
+        workflow_name: Name of the Workflow to receive updates of.
+
+    Note:
+        Must be created from within a running event loop, since the
+        updates are delivered to that loop.
+    """
+
+    def __init__(self, watcher: "WorkflowWatcher", workflow_name: str) -> None:
+        self.workflow_name = workflow_name
+        self._watcher = watcher
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    def _put_threadsafe(self, item: Any) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+        except RuntimeError:
+            # The event loop has been closed, nobody is listening.
+            pass
+
+    async def get_nodes(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """Waits for the next change of the Workflow nodes.
+
+        Args:
+            timeout: Max number of seconds to wait for.
+
+        Returns:
+            The most recent ``status.nodes`` of the Workflow, states
+            that have not been consumed in time are skipped. None if no
+            change happened within the `timeout`.
+
+        Raises:
+            WorkflowDeletedError: The Workflow has been deleted.
+        """
+        try:
+            item = await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+        # Only the latest state is of interest.
+        while item is not _DELETED and not self._queue.empty():
+            item = self._queue.get_nowait()
+
+        if item is _DELETED:
+            raise errors.WorkflowDeletedError(self.workflow_name)
+        return item
+
+    def close(self) -> None:
+        self._watcher.unsubscribe(self)
+
+    def __enter__(self) -> "WorkflowSubscription":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+class WorkflowWatcher:
+    """Shares a single watch on the Workflows of a namespace.
+
+    Args:
+        namespace: Namespace to watch Workflows in.
+        custom_obj_api: k8s CustomObjectsApi to use.
+
+    """
+
+    def __init__(self, namespace: str, custom_obj_api: Optional[Any] = None) -> None:
+        self.namespace = namespace
+        self._api = custom_obj_api if custom_obj_api is not None else k8s_custom_obj_api
+
+        self._lock = threading.Lock()
+        self._subscriptions: Dict[str, Set[WorkflowSubscription]] = defaultdict(set)
+        # Workflow name to the last nodes that were fanned out to its
+        # subscribers, and the (phase, message) of those nodes, which
+        # is used to only fan out actual changes.
+        self._nodes: Dict[str, dict] = {}
+        self._node_phases: Dict[str, Dict[str, Tuple[str, str]]] = {}
+        self._resource_version: Optional[str] = None
+
+        self._pid = os.getpid()
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._watch: Optional[watch.Watch] = None
+
+    @property
+    def resource_version(self) -> Optional[str]:
+        return self._resource_version
+
+    def is_alive(self) -> bool:
+        return (
+            self._pid == os.getpid()
+            and self._thread is not None
+            and self._thread.is_alive()
+        )
+
+    def start(self) -> None:
+        if self.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=f"workflow-watcher-{self.namespace}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._watch is not None:
+            self._watch.stop()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=5)
+
+    def subscribe(self, workflow_name: str) -> WorkflowSubscription:
+        """Subscribes to the node updates of the given Workflow.
+
+        Subscribe before creating the Workflow to not miss any updates.
+        """
+        subscription = WorkflowSubscription(self, workflow_name)
+        with self._lock:
+            self._subscriptions[workflow_name].add(subscription)
+            nodes = self._nodes.get(workflow_name)
+        if nodes is not None:
+            subscription._put_threadsafe(nodes)
+
+        self.start()
+        return subscription
+
+    def unsubscribe(self, subscription: WorkflowSubscription) -> None:
+        name = subscription.workflow_name
+        with self._lock:
+            self._subscriptions[name].discard(subscription)
+            if not self._subscriptions[name]:
+                del self._subscriptions[name]
+                self._nodes.pop(name, None)
+                self._node_phases.pop(name, None)
+
+    def _run(self) -> None:
+        backoff = 1
+        while not self._stop_event.is_set():
+            try:
+                if self._resource_version is None:
+                    self._relist()
+                self._stream()
+                backoff = 1
+            except _ResourceVersionExpired:
+                logger.info("Workflows resource version expired, relisting.")
+                self._resource_version = None
+            except k8s_client.ApiException as e:
+                if e.status == _HTTP_STATUS_GONE:
+                    self._resource_version = None
+                    continue
+                logger.error(f"Error while watching workflows: {e}")
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, 30)
+            except Exception as e:
+                logger.error(f"Error while watching workflows: {e}")
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, 30)
+
+    def _relist(self) -> None:
+        resp = self._api.list_namespaced_custom_object(
+            "argoproj.io", "v1alpha1", self.namespace, "workflows"
+        )
+        for workflow in resp.get("items", []):
+            self._on_workflow(workflow)
+        self._resource_version = resp["metadata"]["resourceVersion"]
+
+    def _stream(self) -> None:
+        self._watch = watch.Watch()
+        for event in self._watch.stream(
+            self._api.list_namespaced_custom_object,
+            "argoproj.io",
+            "v1alpha1",
+            self.namespace,
+            "workflows",
+            resource_version=self._resource_version,
+            allow_watch_bookmarks=True,
+            timeout_seconds=CONFIG_CLASS.WORKFLOW_WATCH_TIMEOUT,
+        ):
+            if self._stop_event.is_set():
+                self._watch.stop()
+                break
+            self._on_event(event)
+
+    def _on_event(self, event: dict) -> None:
+        obj = event["object"]
+        if event["type"] == "ERROR":
+            if obj.get("code") == _HTTP_STATUS_GONE:
+                raise _ResourceVersionExpired()
+            raise k8s_client.ApiException(
+                status=obj.get("code"), reason=obj.get("message")
+            )
+
+        resource_version = obj.get("metadata", {}).get("resourceVersion")
+        if resource_version is not None:
+            self._resource_version = resource_version
+
+        if event["type"] == "BOOKMARK":
+            return
+        elif event["type"] == "DELETED":
+            name = obj["metadata"]["name"]
+            with self._lock:
+                subscriptions = list(self._subscriptions.get(name, []))
+            for subscription in subscriptions:
+                subscription._put_threadsafe(_DELETED)
+        else:
+            self._on_workflow(obj)
+
+    def _on_workflow(self, workflow: dict) -> None:
+        name = workflow["metadata"]["name"]
+        nodes = workflow.get("status", {}).get("nodes", {})
+        node_phases = {
+            node_id: (node.get("phase"), node.get("message", ""))
+            for node_id, node in nodes.items()
+        }
+
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(name, []))
+            if not subscriptions or self._node_phases.get(name) == node_phases:
+                return
+            self._nodes[name] = nodes
+            self._node_phases[name] = node_phases
+
+        for subscription in subscriptions:
+            subscription._put_threadsafe(nodes)
+
+
+_watchers: Dict[str, WorkflowWatcher] = {}
+_watchers_lock = threading.Lock()
+
+
+def get_workflow_watcher(namespace: str) -> WorkflowWatcher:
+    """Returns the watcher of the namespace, shared within the process.
+
+    A new watcher is created after a fork, since the watch thread does
+    not survive it.
+    """
+    with _watchers_lock:
+        watcher = _watchers.get(namespace)
+        if watcher is None or watcher._pid != os.getpid():
+            watcher = WorkflowWatcher(namespace)
+            _watchers[namespace] = watcher
+    return watcher
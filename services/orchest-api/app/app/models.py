@@ -671,6 +671,11 @@ class NonInteractivePipelineRun(PipelineRun):
         )
     )
 
+    # When the run was sent to celery. Runs are created as PENDING and
+    # are only dispatched once there is room for them to run, see
+    # DispatchJobPipelineRuns in the jobs namespace.
+    dispatched_time = db.Column(db.DateTime, unique=False, nullable=True)
+
     __text_search_vector = _create_text_search_vector(
         func.lower(cast(pipeline_run_index, postgresql.TEXT)),
         # This is needed to reflect what the FE is showing to the user.
@@ -707,6 +712,15 @@ Index(
     NonInteractivePipelineRun.pipeline_run_index,
 )
 
+# Used to find the job pipeline runs to dispatch and the dispatched ones
+# that have not ended yet.
+Index(
+    "ix_type_status_dispatched_time",
+    NonInteractivePipelineRun.type,
+    NonInteractivePipelineRun.status,
+    NonInteractivePipelineRun.dispatched_time,
+)
+
 UniqueConstraint(
     NonInteractivePipelineRun.job_uuid,
     NonInteractivePipelineRun.pipeline_run_index,
@@ -304,9 +304,19 @@ pipeline_run = Model(
 
 interactive_run_config = pipeline_run_config.inherit("InteractiveRunConfig", {})
 
-interactive_run_spec = pipeline_run_spec.inherit(
+# Not inherited, since the fields of a parent take precedence.
+interactive_run_spec = Model(
     "InteractiveRunSpec",
     {
+        **pipeline_run_spec,
+        # Incremental runs rely on the outputs in the project directory,
+        # jobs run in their own directories.
+        "run_type": fields.String(
+            required=False,
+            default="full",
+            description="Type of run",
+            enum=["full", "selection", "incoming", "incremental"],
+        ),
         "pipeline_definition": fields.Raw(
             required=True, description="Pipeline definition in JSON"
         ),
@@ -349,6 +359,31 @@ status_update = Model(
     },
 )
 
+step_status_update = Model(
+    "StepStatusUpdate",
+    {
+        "step_uuid": fields.String(
+            required=True, description="UUID of the pipeline step"
+        ),
+        "status": fields.String(
+            required=True,
+            description="New status of the step",
+            enum=["PENDING", "STARTED", "SUCCESS", "FAILURE", "ABORTED"],
+        ),
+    },
+)
+
+steps_status_update = Model(
+    "StepsStatusUpdate",
+    {
+        "steps": fields.List(
+            fields.Nested(step_status_update),
+            required=True,
+            description="Status updates of the pipeline steps",
+        ),
+    },
+)
+
 job_update = Model(
     "JobUpdate",
     {
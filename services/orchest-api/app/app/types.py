@@ -66,6 +66,8 @@ class RunConfig(TypedDict):
     session_type: str  # interactive, noninteractive
     session_uuid: str
     user_env_variables: Dict[str, str]
+    # Name of the WorkflowTemplate to run, only for job runs.
+    workflow_template: Optional[str]
 
 
 class SessionType(Enum):
@@ -1,14 +1,15 @@
 import logging
+import threading
 import time
 from datetime import datetime
-from typing import Container, Dict, Iterable, Optional, Union
+from typing import Container, Dict, Iterable, List, Optional, Tuple, Union
 
 from celery.utils.log import get_task_logger
 from flask import current_app
 from flask_restx import Model, Namespace
 from flask_sqlalchemy import Pagination
 from kubernetes import client as k8s_client
-from sqlalchemy import or_, text
+from sqlalchemy import case, or_, text
 from sqlalchemy.orm import query, undefer
 
 import app.models as models
@@ -87,6 +88,55 @@ def update_status_db(
     return bool(res)
 
 
+def update_steps_status_db(run_uuid: str, status_updates: List[Dict[str, str]]) -> int:
+    """Updates the status of multiple steps of a run at once.
+
+    Equivalent to calling `update_status_db` for every step of the run,
+    but done through a single UPDATE statement. The same rules apply,
+    i.e. steps that have already reached an end state are not updated.
+
+    Args:
+        run_uuid: UUID of the run the steps belong to.
+        status_updates: The new status of every step, e.g.
+            ``[{'step_uuid': 'uuid', 'status': 'STARTED',
+            'started_time': '...'}]``. The started and finished times
+            are optional.
+
+    Returns:
+        The number of updated steps.
+
+    """
+    if not status_updates:
+        return 0
+
+    model = models.PipelineRunStep
+    statuses, started_times, finished_times = {}, {}, {}
+    for update in status_updates:
+        step_uuid = update["step_uuid"]
+        statuses[step_uuid] = update["status"]
+        if update.get("started_time") is not None:
+            started_times[step_uuid] = datetime.fromisoformat(update["started_time"])
+        if update.get("finished_time") is not None:
+            finished_times[step_uuid] = datetime.fromisoformat(update["finished_time"])
+
+    data = {"status": case(statuses, value=model.step_uuid)}
+    if started_times:
+        data["started_time"] = case(
+            started_times, value=model.step_uuid, else_=model.started_time
+        )
+    if finished_times:
+        data["finished_time"] = case(
+            finished_times, value=model.step_uuid, else_=model.finished_time
+        )
+
+    return model.query.filter(
+        model.run_uuid == run_uuid,
+        model.step_uuid.in_(list(statuses)),
+        # See update_status_db.
+        model.status.in_(["PENDING", "STARTED"]),
+    ).update(data, synchronize_session="fetch")
+
+
 def get_proj_pip_env_variables(project_uuid: str, pipeline_uuid: str) -> Dict[str, str]:
     """
 
@@ -214,9 +264,71 @@ def get_jupyter_server_image_to_use() -> str:
         db.session.query(models.JupyterImageBuild).filter_by(status="SUCCESS").exists()
     ).scalar()
     if has_customized_jupyter:
-        registry_ip = k8s_core_api.read_namespaced_service(
-            _config.REGISTRY, _config.ORCHEST_NAMESPACE
-        ).spec.cluster_ip
+        registry_ip = get_registry_ip()
         return f"{registry_ip}/{_config.JUPYTER_IMAGE_NAME}:latest"
     else:
         return f"orchest/jupyter-server:{CONFIG_CLASS.ORCHEST_VERSION}"
+
+
+# (namespace, service name) to (cluster ip, time of retrieval).
+_service_cluster_ips: Dict[Tuple[str, str], Tuple[str, float]] = {}
+_service_cluster_ips_lock = threading.Lock()
+
+
+def get_service_cluster_ip(
+    name: str, namespace: str = _config.ORCHEST_NAMESPACE
+) -> str:
+    """Returns the ClusterIP of a k8s service.
+
+    The ClusterIP of a service is stable for its lifetime, so it's
+    cached for ``SERVICE_CLUSTER_IP_CACHE_TTL`` seconds to avoid a call
+    to the k8s API every time it's needed, e.g. for every step of every
+    pipeline run. Use `invalidate_service_cluster_ip` if the service is
+    known, or suspected, to have been recreated, e.g. the registry once
+    a step fails to pull its image.
+
+    Raises:
+        kubernetes.client.ApiException: If the service could not be
+            read, failed lookups are not cached.
+    """
+    key = (namespace, name)
+    with _service_cluster_ips_lock:
+        cached = _service_cluster_ips.get(key)
+    if (
+        cached is not None
+        and time.monotonic() - cached[1] < CONFIG_CLASS.SERVICE_CLUSTER_IP_CACHE_TTL
+    ):
+        return cached[0]
+
+    cluster_ip = k8s_core_api.read_namespaced_service(name, namespace).spec.cluster_ip
+    with _service_cluster_ips_lock:
+        _service_cluster_ips[key] = (cluster_ip, time.monotonic())
+    return cluster_ip
+
+
+def invalidate_service_cluster_ip(
+    name: Optional[str] = None, namespace: str = _config.ORCHEST_NAMESPACE
+) -> None:
+    """Invalidates the cached ClusterIP of a service, or of all of them.
+
+    Args:
+        name: Name of the service to invalidate. If None, the entire
+            cache is invalidated.
+        namespace: Namespace of the service.
+    """
+    with _service_cluster_ips_lock:
+        if name is None:
+            _service_cluster_ips.clear()
+        else:
+            _service_cluster_ips.pop((namespace, name), None)
+
+
+def get_registry_ip() -> str:
+    """Returns the (cached) ClusterIP of the registry.
+
+    Images are referenced through the ip because the local docker
+    engine of a node will run the container, and if the image is
+    missing it will prompt a pull which would fail because the FQDN
+    can't be resolved by the engine. K8S_TODO: fix this.
+    """
+    return get_service_cluster_ip(_config.REGISTRY)
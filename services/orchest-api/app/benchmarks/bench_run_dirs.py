@@ -0,0 +1,85 @@
+"""Benchmark the provisioning of job pipeline run directories.
+
+Creates a job snapshot made of a read-only data file of the given size
+and of some small (writable) code files, then provisions the
+directories of N runs with every strategy of ``app.core.run_dirs``,
+reporting the time it takes per run and the disk space used by all
+runs, as reported by the filesystem.
+
+Run it in a directory on the same filesystem as the userdir, e.g.
+``/userdir/jobs``, the ``reflink`` strategy is only copy-on-write on
+filesystems supporting it.
+
+Usage (from the ``app`` directory):
+    python -m benchmarks.bench_run_dirs --snapshot-mb 10 100 1000 \\
+        --runs 20 --dir /userdir/jobs
+
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from app.core import run_dirs
+
+
+def _create_snapshot(path: str, data_mb: int, n_code_files: int) -> None:
+    os.makedirs(os.path.join(path, "data"))
+    for i in range(n_code_files):
+        with open(os.path.join(path, f"step-{i}.py"), "w") as f:
+            f.write("print('hello')\n" * 100)
+
+    data_file = os.path.join(path, "data", "data.bin")
+    chunk = os.urandom(1024 * 1024)
+    with open(data_file, "wb") as f:
+        for _ in range(data_mb):
+            f.write(chunk)
+    os.chmod(data_file, 0o444)
+
+
+def _used_bytes(path: str) -> int:
+    st = os.statvfs(path)
+    return (st.f_blocks - st.f_bfree) * st.f_frsize
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--snapshot-mb", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--code-files", type=int, default=50)
+    parser.add_argument("--dir", default=None)
+    args = parser.parse_args()
+
+    print(f"{'strategy':>10}{'snap MB':>9}{'ms/run':>9}{'MB used':>9}")
+    for snapshot_mb in args.snapshot_mb:
+        job_dir = tempfile.mkdtemp(dir=args.dir)
+        try:
+            snapshot_dir = os.path.join(job_dir, "snapshot")
+            _create_snapshot(snapshot_dir, snapshot_mb, args.code_files)
+
+            for strategy in run_dirs.STRATEGIES:
+                os.sync()
+                used_before = _used_bytes(job_dir)
+                start = time.perf_counter()
+                for i in range(args.runs):
+                    run_dirs.provision_run_dir(
+                        snapshot_dir, os.path.join(job_dir, f"run-{i}"), strategy
+                    )
+                elapsed = time.perf_counter() - start
+                os.sync()
+                used = _used_bytes(job_dir) - used_before
+
+                print(
+                    f"{strategy:>10}{snapshot_mb:>9}"
+                    f"{elapsed / args.runs * 1000:>9.1f}{used / 2 ** 20:>9.0f}"
+                )
+
+                for i in range(args.runs):
+                    shutil.rmtree(os.path.join(job_dir, f"run-{i}"))
+        finally:
+            shutil.rmtree(job_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Benchmark the creation of the pipeline runs of a job.
+
+Times the transaction of RunJob, i.e. creating the runs of a job
+execution and their steps while holding the lock on the job row, for
+an increasing number of parameterizations. Celery tasks are not sent.
+
+Requires a postgres server, a database is created for the benchmark and
+dropped afterwards.
+
+Usage (from the ``app`` directory):
+    python -m benchmarks.bench_run_job --runs 100 1000 10000 \\
+        --database-uri postgresql://postgres@localhost/bench_run_job
+
+"""
+import argparse
+import copy
+import time
+import uuid
+
+from flask_migrate import upgrade
+from sqlalchemy_utils import drop_database
+
+from _orchest.internals import config as _config
+from _orchest.internals.two_phase_executor import TwoPhaseExecutor
+from app import create_app, models
+from app.apis import namespace_jobs
+from app.connections import db
+from config import CONFIG_CLASS
+
+
+def _get_pipeline_definition(n_steps: int) -> dict:
+    steps = {}
+    for i in range(n_steps):
+        steps[f"uuid-{i}"] = {
+            "incoming_connections": [f"uuid-{i - 1}"] if i > 0 else [],
+            "name": f"step-{i}",
+            "title": f"step-{i}",
+            "uuid": f"uuid-{i}",
+            "file_path": f"step-{i}.py",
+            "environment": "env-uuid",
+            "parameters": {"a": 1},
+            "kernel": {"name": "python", "display_name": "Python 3"},
+            "meta_data": {"position": [0, 0], "hidden": False},
+        }
+    return {
+        "name": "bench",
+        "uuid": "pipeline-uuid",
+        "settings": {},
+        "parameters": {},
+        "steps": steps,
+    }
+
+
+def _create_job(n_steps: int) -> str:
+    project_uuid = str(uuid.uuid4())
+    db.session.add(models.Project(uuid=project_uuid))
+    db.session.add(models.Pipeline(uuid="pipeline-uuid", project_uuid=project_uuid))
+    job_uuid = str(uuid.uuid4())
+    db.session.add(
+        models.Job(
+            uuid=job_uuid,
+            name="bench",
+            project_uuid=project_uuid,
+            pipeline_uuid="pipeline-uuid",
+            pipeline_name="bench",
+            status="STARTED",
+            parameters=[],
+            env_variables={"A": "1"},
+            pipeline_definition=_get_pipeline_definition(n_steps),
+            pipeline_run_spec={
+                "uuids": [],
+                "run_type": "full",
+                "run_config": {
+                    "userdir_pvc": "userdir-pvc",
+                    "project_dir": "/userdir/projects/project",
+                    "pipeline_path": "pipeline.orchest",
+                },
+            },
+            strategy_json={},
+            total_scheduled_executions=0,
+            total_scheduled_pipeline_runs=0,
+            max_retained_pipeline_runs=-1,
+        )
+    )
+    db.session.commit()
+    return job_uuid
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument(
+        "--database-uri",
+        default="postgresql://postgres@localhost:5432/bench_run_job",
+    )
+    args = parser.parse_args()
+
+    # Built once per job execution, independently of the number of
+    # runs, and would require environment images to exist.
+    namespace_jobs.get_job_workflow_template_manifest = lambda *args: {
+        "metadata": {"name": "workflow-template"}
+    }
+
+    config = copy.deepcopy(CONFIG_CLASS)
+    config.SQLALCHEMY_DATABASE_URI = args.database_uri
+    app = create_app(config, to_migrate_db=True)
+    with app.app_context():
+        upgrade()
+    app = create_app(config, use_db=True, be_scheduler=False)
+
+    try:
+        with app.app_context():
+            job_uuid = _create_job(args.steps)
+            print(f"{'runs':>8}{'steps':>7}{'seconds':>10}{'runs/s':>10}")
+            for n_runs in args.runs:
+                models.Job.query.filter_by(uuid=job_uuid).update(
+                    {
+                        "parameters": [
+                            {
+                                _config.PIPELINE_PARAMETERS_RESERVED_KEY: {"i": i},
+                                "uuid-0": {"a": i},
+                            }
+                            for i in range(n_runs)
+                        ]
+                    }
+                )
+                db.session.commit()
+
+                start = time.perf_counter()
+                # Only the transactional part, collaterals are not run.
+                namespace_jobs.RunJob(TwoPhaseExecutor(db.session)).transaction(
+                    job_uuid
+                )
+                db.session.flush()
+                elapsed = time.perf_counter() - start
+                db.session.rollback()
+                print(
+                    f"{n_runs:>8}{args.steps:>7}{elapsed:>10.3f}"
+                    f"{n_runs / elapsed:>10.0f}"
+                )
+            db.session.remove()
+    finally:
+        drop_database(args.database_uri)
+
+
+if __name__ == "__main__":
+    main()
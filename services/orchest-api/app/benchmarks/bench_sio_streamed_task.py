@@ -0,0 +1,198 @@
+"""Benchmark streaming the output of a task to a socket.io server.
+
+Runs tasks writing their output in lines, comparing:
+
+* polling: the parent polls the pipes of the child with a 10 ms sleep,
+    reading at most 20KB per poll and emitting every read, i.e. the
+    previous implementation of ``SioStreamedTask``.
+* frames: the parent awaits the pipes on the worker event loop and
+    emits the output in frames, see ``app.core.sio_streamed_task``.
+
+Reported are the throughput of a task writing ``--mb`` MB as fast as it
+can, the number of emitted messages, and the latency between a line
+being written and it being received by the server, for a task writing a
+line every ``--interval`` seconds.
+
+Usage (from the ``app`` directory, in the celery-worker container):
+    python -m benchmarks.bench_sio_streamed_task --mb 20
+
+"""
+import argparse
+import asyncio
+import os
+import select
+import statistics
+import threading
+import time
+
+import socketio
+from aiohttp import web
+
+from app.core import worker_loop
+from app.core.sio_streamed_task import SioStreamedTask
+
+_NAMESPACE = "/bench"
+
+
+class _Server:
+    def __init__(self) -> None:
+        self.messages = 0
+        self.bytes = 0
+        self.latencies = []
+        self.port = None
+        self._started = threading.Event()
+
+    def _on_data(self, sid, data) -> None:
+        if data["action"] != "sio_streamed_task_output":
+            return
+        now = time.time()
+        self.messages += 1
+        self.bytes += len(data["output"])
+        for line in data["output"].splitlines():
+            if line.startswith("t="):
+                self.latencies.append(now - float(line[2:]))
+
+    def _serve(self) -> None:
+        loop = asyncio.new_event_loop()
+        sio = socketio.AsyncServer(async_mode="aiohttp")
+        sio.on("sio_streamed_task_data", self._on_data, namespace=_NAMESPACE)
+        app = web.Application()
+        sio.attach(app)
+        runner = web.AppRunner(app)
+        loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._started.set()
+        loop.run_forever()
+
+    def start(self) -> None:
+        threading.Thread(target=self._serve, daemon=True).start()
+        self._started.wait()
+
+    def reset(self) -> None:
+        self.messages = 0
+        self.bytes = 0
+        self.latencies = []
+
+
+def _run_polling(task_lambda, identity, server, namespace):
+    """The previous implementation, without the abort_lambda."""
+    end_task_pipe_read, end_task_pipe_write = os.pipe()
+    communication_pipe_read, communication_pipe_write = os.pipe()
+    child_pid = os.fork()
+    if child_pid == 0:
+        os.close(communication_pipe_read)
+        os.close(end_task_pipe_read)
+        output = os.fdopen(communication_pipe_write, "w")
+        result = task_lambda(output)
+        output.close()
+        with os.fdopen(end_task_pipe_write, "w") as f:
+            f.write(str(result))
+        time.sleep(10)
+        os._exit(0)
+    os.close(communication_pipe_write)
+    os.close(end_task_pipe_write)
+
+    def poll_fd_data(fd):
+        (data_ready, _, _) = select.select([fd], [], [], 0)
+        if data_ready:
+            return os.read(fd, 1024 * 20).decode()
+        return None
+
+    sio_client = socketio.Client(reconnection_attempts=1)
+    sio_client.connect(server, namespaces=[namespace], transports=["websocket"])
+    management_data = None
+    while True:
+        sio_client.sleep(0.01)
+        if not management_data:
+            management_data = poll_fd_data(end_task_pipe_read)
+        task_data = poll_fd_data(communication_pipe_read)
+        if task_data:
+            sio_client.emit(
+                "sio_streamed_task_data",
+                {
+                    "identity": identity,
+                    "output": task_data,
+                    "action": "sio_streamed_task_output",
+                },
+                namespace=namespace,
+            )
+        elif management_data:
+            break
+    sio_client.disconnect()
+    os.kill(child_pid, 9)
+    os.waitpid(child_pid, 0)
+    os.close(communication_pipe_read)
+    os.close(end_task_pipe_read)
+    return management_data
+
+
+def _write_bulk(n_bytes: int):
+    def task(f):
+        line = "x" * 99 + "\n"
+        for _ in range(n_bytes // len(line)):
+            f.write(line)
+        f.flush()
+        return "SUCCESS"
+
+    return task
+
+
+def _write_timed(lines: int, interval: float):
+    def task(f):
+        for _ in range(lines):
+            f.write(f"t={time.time()}\n")
+            f.flush()
+            time.sleep(interval)
+        return "SUCCESS"
+
+    return task
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mb", type=int, default=20)
+    parser.add_argument("--lines", type=int, default=100)
+    parser.add_argument("--interval", type=float, default=0.02)
+    args = parser.parse_args()
+
+    server = _Server()
+    server.start()
+    address = f"http://127.0.0.1:{server.port}"
+
+    def run(mode, task_lambda):
+        if mode == "polling":
+            return _run_polling(task_lambda, "bench", address, _NAMESPACE)
+        return SioStreamedTask.run(
+            task_lambda, "bench", address, _NAMESPACE, abort_lambda=lambda: False
+        )
+
+    print(
+        f"{'mode':<10}{'MB/s':>8}{'messages':>10}"
+        f"{'latency mean':>14}{'latency p95':>13}"
+    )
+    for mode in ["polling", "frames"]:
+        server.reset()
+        start = time.perf_counter()
+        assert run(mode, _write_bulk(args.mb * 1024 * 1024)) == "SUCCESS"
+        # Until the server received everything.
+        while server.bytes < args.mb * 1024 * 1024 - 100:
+            time.sleep(0.01)
+        throughput = server.bytes / (time.perf_counter() - start) / 1024 / 1024
+        messages = server.messages
+
+        server.reset()
+        assert run(mode, _write_timed(args.lines, args.interval)) == "SUCCESS"
+        time.sleep(0.5)
+        latencies = sorted(server.latencies)
+        print(
+            f"{mode:<10}{throughput:>8.1f}{messages:>10}"
+            f"{statistics.mean(latencies) * 1000:>12.1f}ms"
+            f"{latencies[int(len(latencies) * 0.95)] * 1000:>11.1f}ms"
+        )
+    worker_loop.close()
+
+
+if __name__ == "__main__":
+    main()
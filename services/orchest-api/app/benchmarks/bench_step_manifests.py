@@ -0,0 +1,79 @@
+"""Benchmark Workflow manifest generation against pipeline size.
+
+Generates the Argo Workflow manifest of pipelines of increasing size,
+as done for every pipeline run, while counting the number of calls made
+to the k8s API. The k8s API is faked and responds with a configurable
+latency.
+
+Modes:
+* uncached: the registry ClusterIP is looked up for every manifest.
+* cached: the lookup is served by utils.get_service_cluster_ip.
+
+Usage (from the ``app`` directory):
+    python -m benchmarks.bench_step_manifests --sizes 10 100 1000
+
+"""
+import argparse
+import os
+import time
+from types import SimpleNamespace
+
+from benchmarks.utils import get_pipeline, get_run_config
+
+from app import utils
+from app.core import pipelines
+from config import CONFIG_CLASS
+
+
+class _FakeCoreApi:
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+        self.calls = 0
+
+    def read_namespaced_service(self, name, namespace):
+        self.calls += 1
+        time.sleep(self.latency)
+        return SimpleNamespace(spec=SimpleNamespace(cluster_ip="10.0.0.1"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument(
+        "--latency", type=float, default=0.002, help="Seconds per k8s API call."
+    )
+    args = parser.parse_args()
+
+    os.environ.setdefault("ORCHEST_HOST_GID", "1")
+    fake_api = _FakeCoreApi(args.latency)
+    utils.k8s_core_api = fake_api
+    run_config = get_run_config()
+    ttl = CONFIG_CLASS.SERVICE_CLUSTER_IP_CACHE_TTL
+
+    print(f"{'mode':<10}{'steps':>8}{'runs':>6}{'ms/manifest':>13}{'api calls':>11}")
+    for mode in ["uncached", "cached"]:
+        CONFIG_CLASS.SERVICE_CLUSTER_IP_CACHE_TTL = 0 if mode == "uncached" else ttl
+        for size in args.sizes:
+            pipeline = get_pipeline(size)
+            utils.invalidate_service_cluster_ip()
+            # Warm up, e.g. a previous run already resolved the ip.
+            pipelines._pipeline_to_workflow_manifest(
+                "session-uuid", "workflow", pipeline, run_config
+            )
+            fake_api.calls = 0
+            start = time.perf_counter()
+            for _ in range(args.runs):
+                pipelines._pipeline_to_workflow_manifest(
+                    "session-uuid", "workflow", pipeline, run_config
+                )
+            elapsed_ms = (time.perf_counter() - start) * 1000 / args.runs
+            print(
+                f"{mode:<10}{size:>8}{args.runs:>6}{elapsed_ms:>13.2f}"
+                f"{fake_api.calls:>11}"
+            )
+    CONFIG_CLASS.SERVICE_CLUSTER_IP_CACHE_TTL = ttl
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Benchmark HTTP connection reuse of pipeline runs in a celery worker.
+
+Launches N short pipeline runs, each of which updates its status and the
+status of its steps through the orchest-api, comparing:
+
+* per-run: every run creates its own event loop and ClientSession, i.e.
+    the behaviour of using ``asyncio.run`` in the task.
+* worker: all runs share the event loop and session of the worker
+    process, see ``app.core.worker_loop``.
+
+The orchest-api is replaced by a local server that counts the number of
+TCP connections it accepts.
+
+Usage (from the ``app`` directory, in the celery-worker container):
+    python -m benchmarks.bench_worker_session --runs 200
+
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+import aiohttp
+from aiohttp import web
+
+from app.core import pipelines, worker_loop
+from config import CONFIG_CLASS
+
+
+class _CountingServer:
+    def __init__(self) -> None:
+        self.connections = set()
+        self.requests = 0
+        self.port = None
+        self._started = threading.Event()
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.connections.add(id(request.transport))
+        self.requests += 1
+        return web.json_response({"message": "Status was updated successfully."})
+
+    def _serve(self) -> None:
+        loop = asyncio.new_event_loop()
+        app = web.Application()
+        app.router.add_route("*", "/{tail:.*}", self._handle)
+        runner = web.AppRunner(app)
+        loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._started.set()
+        loop.run_forever()
+
+    def start(self) -> None:
+        threading.Thread(target=self._serve, daemon=True).start()
+        self._started.wait()
+
+    def reset(self) -> None:
+        self.connections = set()
+        self.requests = 0
+
+
+async def _short_run(session: aiohttp.ClientSession, task_id: str, n_steps: int):
+    await pipelines.update_status(
+        "STARTED", task_id, session, type="pipeline", run_endpoint="runs"
+    )
+    steps = {f"step-{i}": "STARTED" for i in range(n_steps)}
+    await pipelines.update_steps_status(steps, task_id, session, run_endpoint="runs")
+    steps = {f"step-{i}": "SUCCESS" for i in range(n_steps)}
+    await pipelines.update_steps_status(steps, task_id, session, run_endpoint="runs")
+    await pipelines.update_status(
+        "SUCCESS", task_id, session, type="pipeline", run_endpoint="runs"
+    )
+
+
+async def _per_run(task_id: str, n_steps: int):
+    async with aiohttp.ClientSession() as session:
+        await _short_run(session, task_id, n_steps)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--steps", type=int, default=5)
+    args = parser.parse_args()
+
+    server = _CountingServer()
+    server.start()
+    CONFIG_CLASS.ORCHEST_API_ADDRESS = f"http://127.0.0.1:{server.port}/api"
+
+    print(f"{'mode':<10}{'runs':>8}{'seconds':>10}{'requests':>10}{'conns':>8}")
+    for mode in ["per-run", "worker"]:
+        server.reset()
+        start = time.perf_counter()
+        for i in range(args.runs):
+            if mode == "per-run":
+                asyncio.run(_per_run(str(i), args.steps))
+            else:
+                worker_loop.run(
+                    _short_run(worker_loop.get_session(), str(i), args.steps)
+                )
+        elapsed = time.perf_counter() - start
+        print(
+            f"{mode:<10}{args.runs:>8}{elapsed:>10.3f}{server.requests:>10}"
+            f"{len(server.connections):>8}"
+        )
+    worker_loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Benchmark Workflow manifest size and build time by pipeline size.
+
+Builds the Argo Workflow manifest of pipelines of increasing size and
+reports the time it takes and the size of the resulting object, i.e.
+the payload sent to the k8s API and stored in etcd.
+
+Usage (from the ``app`` directory):
+    python -m benchmarks.bench_workflow_manifest --sizes 10 100 1000
+
+"""
+import argparse
+import json
+import os
+import time
+from types import SimpleNamespace
+
+from benchmarks.utils import get_pipeline, get_run_config
+
+from app import utils
+from app.core import pipelines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument(
+        "--env-variables", type=int, default=20, help="Number of user env variables."
+    )
+    args = parser.parse_args()
+
+    os.environ.setdefault("ORCHEST_HOST_GID", "1")
+    utils.k8s_core_api = SimpleNamespace(
+        read_namespaced_service=lambda *args: SimpleNamespace(
+            spec=SimpleNamespace(cluster_ip="10.0.0.1")
+        )
+    )
+    run_config = get_run_config()
+    run_config["user_env_variables"] = {
+        f"VARIABLE_{i}": "value" * 4 for i in range(args.env_variables)
+    }
+
+    print(f"{'steps':>8}{'runs':>6}{'ms/manifest':>13}{'bytes':>12}{'bytes/step':>12}")
+    for size in args.sizes:
+        pipeline = get_pipeline(size)
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            manifest = pipelines._pipeline_to_workflow_manifest(
+                "session-uuid", "workflow", pipeline, run_config
+            )
+            payload = json.dumps(manifest)
+        elapsed_ms = (time.perf_counter() - start) * 1000 / args.runs
+        print(
+            f"{size:>8}{args.runs:>6}{elapsed_ms:>13.2f}{len(payload):>12}"
+            f"{len(payload) // size:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
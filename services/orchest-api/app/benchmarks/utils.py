@@ -0,0 +1,33 @@
+"""Helpers shared by the benchmarks."""
+from app.core import pipelines
+
+
+def get_pipeline(n_steps: int) -> pipelines.Pipeline:
+    """Returns a pipeline of `n_steps` steps forming a chain."""
+    steps = {}
+    for i in range(n_steps):
+        steps[f"uuid-{i}"] = {
+            "incoming_connections": [f"uuid-{i - 1}"] if i > 0 else [],
+            "name": f"step-{i}",
+            "uuid": f"uuid-{i}",
+            "file_path": f"step-{i}.py",
+            "environment": "env-uuid",
+        }
+    return pipelines.Pipeline.from_json(
+        {"name": "bench", "uuid": "pipeline-uuid", "settings": {}, "steps": steps}
+    )
+
+
+def get_run_config() -> dict:
+    """Returns a run config to generate Workflow manifests with."""
+    return {
+        "userdir_pvc": "userdir-pvc",
+        "project_dir": "/userdir/projects/project",
+        "pipeline_path": "pipeline.orchest",
+        "user_env_variables": {"A": "1", "B": "2"},
+        "session_uuid": "session-uuid",
+        "session_type": "noninteractive",
+        "pipeline_uuid": "pipeline-uuid",
+        "project_uuid": "project-uuid",
+        "env_uuid_to_image": {"env-uuid": "orchest-env:1"},
+    }
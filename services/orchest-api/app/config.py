@@ -18,6 +18,11 @@ class Config:
     # TODO: for now this is put here.
     ORCHEST_API_ADDRESS = "http://orchest-api:80/api"
     ORCHEST_WEBSERVER_ADDRESS = "http://orchest-webserver:80"
+    # Max number of concurrent connections, and for how many seconds
+    # idle connections are kept alive, of the HTTP session shared by the
+    # tasks of a celery worker process to talk to the orchest-api.
+    ORCHEST_API_CONNECTION_POOL_SIZE = 10
+    ORCHEST_API_KEEPALIVE_TIMEOUT = 60
 
     # How often to run the scheduling logic when the process is running
     # as scheduler, in seconds.
@@ -29,6 +34,32 @@ class Config:
     # activity.
     CLIENT_HEARTBEATS_IDLENESS_THRESHOLD = datetime.timedelta(minutes=30)
 
+    # Pipeline runs.
+    # Max number of seconds a single watch on Argo Workflows is kept
+    # open before being re-established, see the workflow_watcher
+    # module.
+    WORKFLOW_WATCH_TIMEOUT = 300
+    # How often, in seconds, a pipeline run checks if it has been
+    # aborted while waiting for updates of its Workflow.
+    PIPELINE_RUN_STATUS_CHECK_INTERVAL = 2
+    # Job pipeline runs are sent to celery in batches of at most
+    # JOB_PIPELINE_RUNS_DISPATCH_BATCH_SIZE runs, as long as the number
+    # of dispatched runs that have not ended is below the max, across
+    # all jobs and per job. Other runs stay PENDING until a slot frees
+    # up, see DispatchJobPipelineRuns in the jobs namespace.
+    JOB_PIPELINE_RUNS_DISPATCH_BATCH_SIZE = 50
+    MAX_CONCURRENT_JOB_PIPELINE_RUNS = 100
+    MAX_CONCURRENT_PIPELINE_RUNS_PER_JOB = 25
+    # How the directory of a job pipeline run is provisioned from the
+    # job snapshot, one of "copy", "reflink" and "hardlink", see
+    # app/core/run_dirs.py. "hardlink" is unsafe, since steps can write
+    # to the files it shares with the snapshot.
+    JOB_PIPELINE_RUN_DIR_PROVISIONING = "reflink"
+
+    # For how many seconds the ClusterIP of a service, e.g. the
+    # registry, is cached, see utils.get_service_cluster_ip.
+    SERVICE_CLUSTER_IP_CACHE_TTL = 60
+
     # Image building.
     IMAGE_BUILDER_IMAGE = "moby/buildkit:v0.10.0"
     BUILD_IMAGE_LOG_FLAG = "_ORCHEST_RESERVED_LOG_FLAG_"
@@ -0,0 +1,37 @@
+"""Add dispatched_time to pipeline_runs
+
+Revision ID: 5c5a4ec2b1d7
+Revises: 11462a4539f6
+Create Date: 2026-10-18 09:12:41.532170
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5c5a4ec2b1d7"
+down_revision = "11462a4539f6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "pipeline_runs", sa.Column("dispatched_time", sa.DateTime(), nullable=True)
+    )
+    op.create_index(
+        "ix_type_status_dispatched_time",
+        "pipeline_runs",
+        ["type", "status", "dispatched_time"],
+        unique=False,
+    )
+    # Existing job runs have already been sent to celery.
+    op.execute(
+        "UPDATE pipeline_runs SET dispatched_time = timezone('utc', now()) "
+        "WHERE type = 'NonInteractivePipelineRun'"
+    )
+
+
+def downgrade():
+    op.drop_index("ix_type_status_dispatched_time", table_name="pipeline_runs")
+    op.drop_column("pipeline_runs", "dispatched_time")
@@ -24,6 +24,7 @@ from app.apis import (
     namespace_runs,
 )
 from app.connections import db
+from app.core import pipelines
 from config import CONFIG_CLASS
 
 
@@ -191,3 +192,14 @@ def monkeypatch_lock_environment_images(monkeypatch):
     monkeypatch.setattr(
         namespace_jobs, "lock_environment_images_for_job", lambda *args, **kwargs: {}
     )
+
+
+@pytest.fixture(autouse=True)
+def monkeypatch_workflow_templates(monkeypatch):
+    monkeypatch.setattr(pipelines, "get_registry_ip", lambda: "registry-ip")
+    monkeypatch.setattr(
+        namespace_jobs, "register_workflow_template", lambda *args, **kwargs: None
+    )
+    monkeypatch.setattr(
+        namespace_jobs, "delete_job_workflow_templates", lambda *args, **kwargs: None
+    )
@@ -1,6 +1,8 @@
 import datetime
+import threading
 
 import pytest
+from sqlalchemy import func, select
 from tests.test_utils import create_job_spec
 
 from _orchest.internals.test_utils import raise_exception_function
@@ -18,6 +20,15 @@ def test_joblist_get_empty(client, query_string):
     assert not resp.get_json()["jobs"]
 
 
+def test_joblist_post_incremental(client, pipeline):
+    job_spec = create_job_spec(pipeline.project.uuid, pipeline.uuid)
+    job_spec["pipeline_run_spec"]["run_type"] = "incremental"
+
+    resp = client.post("/api/jobs/", json=job_spec)
+    assert resp.status_code == 400
+    assert client.get(f'/api/jobs/{job_spec["uuid"]}').status_code == 404
+
+
 @pytest.mark.parametrize(
     "proj_env_variables",
     [{}, {"var1": "project-value", "var2": "10"}],
@@ -767,3 +778,146 @@ def test_delete_non_retained_job_pipeline_runs_on_job_run_update_retain_n(
         ]
     )
     assert expected_deleted_run_uuids == deleted_run_uuids
+
+
+_START_RUN_TASK = "app.core.tasks.start_non_interactive_pipeline_run"
+
+
+@pytest.fixture()
+def dispatch_limits(monkeypatch):
+    monkeypatch.setattr(
+        namespace_jobs.CONFIG_CLASS, "MAX_CONCURRENT_PIPELINE_RUNS_PER_JOB", 2
+    )
+    monkeypatch.setattr(
+        namespace_jobs.CONFIG_CLASS, "MAX_CONCURRENT_JOB_PIPELINE_RUNS", 3
+    )
+
+
+def _run_job(client, pipeline, n_runs):
+    job_spec = create_job_spec(
+        pipeline.project.uuid, pipeline.uuid, parameters=[{}] * n_runs
+    )
+    job_uuid = client.post("/api/jobs/", json=job_spec).get_json()["uuid"]
+    resp = client.put(f"/api/jobs/{job_uuid}", json={"confirm_draft": True})
+    return job_uuid, resp
+
+
+def _get_runs(client, job_uuid):
+    return client.get(f"/api/jobs/{job_uuid}/pipeline_runs").get_json()["pipeline_runs"]
+
+
+def _get_sent_runs(client, celery, job_uuid):
+    run_uuids = {run["uuid"] for run in _get_runs(client, job_uuid)}
+    return [
+        task[1]["task_id"]
+        for task in celery.tasks
+        if task[1]["name"] == _START_RUN_TASK and task[1]["task_id"] in run_uuids
+    ]
+
+
+def test_dispatch_job_pipeline_runs_limits(client, celery, pipeline, dispatch_limits):
+    job_1, _ = _run_job(client, pipeline, 4)
+    job_2, _ = _run_job(client, pipeline, 4)
+
+    # At most 2 runs per job and 3 runs across jobs.
+    sent_runs_1 = _get_sent_runs(client, celery, job_1)
+    assert len(sent_runs_1) == 2
+    assert len(_get_sent_runs(client, celery, job_2)) == 1
+
+    # A run ending makes room for another one.
+    client.put(
+        f"/api/jobs/{job_1}/{sent_runs_1[0]}",
+        json={
+            "status": "SUCCESS",
+            "finished_time": datetime.datetime.now().isoformat(),
+        },
+    )
+    sent_runs_1 = _get_sent_runs(client, celery, job_1)
+    sent_runs_2 = _get_sent_runs(client, celery, job_2)
+    assert len(sent_runs_1) + len(sent_runs_2) == 4
+    assert len(sent_runs_1) <= 3
+    assert len(sent_runs_2) <= 2
+    assert len(set(sent_runs_1 + sent_runs_2)) == 4
+
+
+def test_dispatch_job_pipeline_runs_on_abort(
+    client, celery, pipeline, abortable_async_res, dispatch_limits
+):
+    job_1, _ = _run_job(client, pipeline, 4)
+    job_2, _ = _run_job(client, pipeline, 4)
+    assert len(_get_sent_runs(client, celery, job_2)) == 1
+
+    client.delete(f"/api/jobs/{job_1}")
+
+    # Bounded by the limit per job.
+    assert len(_get_sent_runs(client, celery, job_2)) == 2
+    assert len(_get_sent_runs(client, celery, job_1)) == 2
+
+
+def test_dispatch_job_pipeline_runs_lock(
+    test_app, client, celery, pipeline, dispatch_limits, monkeypatch
+):
+    job_uuid, _ = _run_job(client, pipeline, 4)
+    assert len(_get_sent_runs(client, celery, job_uuid)) == 2
+
+    monkeypatch.setattr(
+        namespace_jobs.CONFIG_CLASS, "MAX_CONCURRENT_PIPELINE_RUNS_PER_JOB", 4
+    )
+    monkeypatch.setattr(
+        namespace_jobs.CONFIG_CLASS, "MAX_CONCURRENT_JOB_PIPELINE_RUNS", 4
+    )
+
+    def dispatch():
+        with test_app.app_context():
+            with TwoPhaseExecutor(db.session) as tpe:
+                namespace_jobs.DispatchJobPipelineRuns(tpe).transaction()
+
+    with test_app.app_context():
+        with db.engine.connect() as conn:
+            transaction = conn.begin()
+            conn.execute(
+                select(
+                    func.pg_advisory_xact_lock(
+                        namespace_jobs._DISPATCH_JOB_PIPELINE_RUNS_LOCK_ID
+                    )
+                )
+            )
+
+            thread = threading.Thread(target=dispatch)
+            thread.start()
+            # Waits for the lock to be released.
+            thread.join(timeout=1)
+            assert thread.is_alive()
+            assert len(_get_sent_runs(client, celery, job_uuid)) == 2
+
+            transaction.commit()
+
+    thread.join(timeout=10)
+    assert not thread.is_alive()
+    assert len(_get_sent_runs(client, celery, job_uuid)) == 4
+
+
+def test_run_job_revert_keeps_sent_runs(client, celery, pipeline, dispatch_limits):
+    sent_run_uuids = []
+
+    def send_task(*args, **kwargs):
+        # Only the first run can be sent.
+        if sent_run_uuids:
+            raise Exception("Failed to send the task.")
+        sent_run_uuids.append(kwargs["task_id"])
+        return celery
+
+    celery.send_task = send_task
+
+    job_uuid, resp = _run_job(client, pipeline, 4)
+    assert resp.status_code == 500
+
+    # The sent run is left alone, the runs that have not been sent,
+    # including the ones that were never dispatched, are failed.
+    for run in _get_runs(client, job_uuid):
+        if run["uuid"] in sent_run_uuids:
+            assert run["status"] == "PENDING"
+        else:
+            assert run["status"] == "FAILURE"
+    job = client.get(f"/api/jobs/{job_uuid}").get_json()
+    assert job["status"] != "FAILURE"
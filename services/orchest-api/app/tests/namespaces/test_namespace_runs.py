@@ -121,3 +121,32 @@ def test_run_delete_after_end_state(client, celery, pipeline, abortable_async_re
     assert resp.status_code == 400
     assert not celery.revoked_tasks
     assert not abortable_async_res.is_aborted()
+
+
+def test_run_steps_status_put(client, celery, pipeline):
+    spec = create_pipeline_run_spec(pipeline.project.uuid, pipeline.uuid, n_steps=3)
+    run_uuid = client.post("/api/runs/", json=spec).get_json()["uuid"]
+    now = datetime.datetime.now().isoformat()
+    client.put(
+        f"/api/runs/{run_uuid}/uuid-2",
+        json={"status": "SUCCESS", "finished_time": now},
+    )
+
+    resp = client.put(
+        f"/api/runs/{run_uuid}/steps",
+        json={
+            "steps": [
+                {"step_uuid": "uuid-0", "status": "STARTED", "started_time": now},
+                {"step_uuid": "uuid-1", "status": "FAILURE", "finished_time": now},
+                {"step_uuid": "uuid-2", "status": "ABORTED"},
+            ]
+        },
+    )
+    assert resp.status_code == 200
+
+    expected = {"uuid-0": "STARTED", "uuid-1": "FAILURE", "uuid-2": "SUCCESS"}
+    for step_uuid, status in expected.items():
+        step = client.get(f"/api/runs/{run_uuid}/{step_uuid}").get_json()
+        assert step["status"] == status
+    step = client.get(f"/api/runs/{run_uuid}/uuid-0").get_json()
+    assert step["started_time"] is not None
@@ -0,0 +1,35 @@
+from app.apis.namespace_jobs import _interleave_job_pipeline_runs
+
+
+def test_interleave_round_robin():
+    pending_runs = {
+        "job-a": ["a0", "a1", "a2", "a3"],
+        "job-b": ["b0", "b1"],
+    }
+
+    runs = _interleave_job_pipeline_runs(pending_runs, {}, 5, 10)
+
+    assert runs == ["a0", "b0", "a1", "b1", "a2"]
+
+
+def test_interleave_least_dispatched_job_first():
+    pending_runs = {
+        "job-a": ["a0", "a1"],
+        "job-b": ["b0", "b1"],
+    }
+
+    runs = _interleave_job_pipeline_runs(pending_runs, {"job-a": 3}, 3, 10)
+
+    assert runs == ["b0", "a0", "b1"]
+
+
+def test_interleave_respects_per_job_limit():
+    pending_runs = {
+        "job-a": ["a0", "a1", "a2"],
+        "job-b": ["b0"],
+        "job-c": ["c0"],
+    }
+
+    runs = _interleave_job_pipeline_runs(pending_runs, {"job-a": 1, "job-c": 2}, 10, 2)
+
+    assert runs == ["b0", "a0"]
@@ -10,9 +10,13 @@ The pipeline looks as follows:
 import asyncio
 import json
 import unittest
+from types import SimpleNamespace
 
 import pytest
+from kubernetes import client as k8s_client
 
+from _orchest.internals import config as _config
+from app import utils
 from app.core import pipelines
 from app.core.pipelines import Pipeline
 
@@ -131,3 +135,266 @@ def test_pipeline_run_with_docker_containers(pipeline, monkeypatch):
         "project_dir": None,
     }
     asyncio.run(pipeline.run(filler_for_task_id, run_config=run_config))
+
+
+@pytest.fixture
+def run_config(pipeline):
+    for step in pipeline.steps:
+        step.properties["environment"] = "env-uuid"
+    return {
+        "userdir_pvc": "userdir-pvc",
+        "project_dir": "/userdir/projects/project",
+        "pipeline_path": "pipeline.orchest",
+        "user_env_variables": {"ORCHEST_STEP_UUID": "user-value", "A": 1},
+        "session_uuid": "session-uuid",
+        "session_type": "noninteractive",
+        "pipeline_uuid": "pipeline-uuid",
+        "project_uuid": "project-uuid",
+        "env_uuid_to_image": {"env-uuid": "orchest-env:1"},
+    }
+
+
+def test_workflow_manifest_registry_ip_is_cached(pipeline, run_config, monkeypatch):
+    class FakeCoreApi:
+        calls = 0
+
+        def read_namespaced_service(self, name, namespace):
+            FakeCoreApi.calls += 1
+            return SimpleNamespace(spec=SimpleNamespace(cluster_ip="10.0.0.1"))
+
+    monkeypatch.setattr(utils, "k8s_core_api", FakeCoreApi())
+    monkeypatch.setenv("ORCHEST_HOST_GID", "1")
+    utils.invalidate_service_cluster_ip()
+
+    for _ in range(3):
+        manifest = pipelines._pipeline_to_workflow_manifest(
+            "session-uuid", "workflow", pipeline, run_config
+        )
+    assert FakeCoreApi.calls == 1
+
+    tasks = manifest["spec"]["templates"][0]["dag"]["tasks"]
+    assert len(tasks) == len(pipeline.steps)
+    for task in tasks:
+        params = {p["name"]: p["value"] for p in task["arguments"]["parameters"]}
+        assert params["image"] == "10.0.0.1/orchest-env:1"
+
+    utils.invalidate_service_cluster_ip()
+    pipelines._pipeline_to_workflow_manifest(
+        "session-uuid", "workflow", pipeline, run_config
+    )
+    assert FakeCoreApi.calls == 2
+
+
+def test_image_pull_failure_invalidates_registry_ip(pipeline, run_config, monkeypatch):
+    invalidated = []
+    monkeypatch.setattr(
+        pipelines,
+        "invalidate_service_cluster_ip",
+        lambda name: invalidated.append(name),
+    )
+
+    async def update_steps_status(step_statuses, *args, **kwargs):
+        pass
+
+    monkeypatch.setattr(pipelines, "update_steps_status", update_steps_status)
+
+    step_uuid = pipeline.steps[0].properties["uuid"]
+
+    class FakeSubscription:
+        async def get_nodes(self, timeout):
+            return {
+                "node": {
+                    "templateName": "step",
+                    "inputs": {
+                        "parameters": [{"name": "step_uuid", "value": step_uuid}]
+                    },
+                    "phase": "Pending",
+                    "message": "Back-off pulling image: ImagePullBackOff",
+                }
+            }
+
+    run_config["run_endpoint"] = "runs"
+    _, had_failed_steps = asyncio.run(
+        pipelines._follow_pipeline_workflow(
+            FakeSubscription(), "task-id", pipeline, None, run_config
+        )
+    )
+
+    assert had_failed_steps
+    assert invalidated == [_config.REGISTRY]
+
+
+def test_workflow_manifest_step_template(pipeline, run_config, monkeypatch):
+    monkeypatch.setattr(pipelines, "get_registry_ip", lambda: "10.0.0.1")
+    monkeypatch.setenv("ORCHEST_HOST_GID", "1")
+
+    manifest = pipelines._pipeline_to_workflow_manifest(
+        "session-uuid", "workflow", pipeline, run_config
+    )
+
+    dag_template, step_template = manifest["spec"]["templates"]
+    for task in dag_template["dag"]["tasks"]:
+        params = {p["name"]: p["value"] for p in task["arguments"]["parameters"]}
+        assert set(params) == {
+            "step_uuid",
+            "image",
+            "working_dir",
+            "project_relative_file_path",
+            "tests_uuid",
+        }
+
+    # Shared by all steps, the internal variables take precedence.
+    env = step_template["container"]["env"]
+    assert env[0] == {"name": "ORCHEST_STEP_UUID", "value": "user-value"}
+    assert env[1] == {"name": "A", "value": "1"}
+    assert {
+        "name": "ORCHEST_STEP_UUID",
+        "value": "{{inputs.parameters.step_uuid}}",
+    } in env[2:]
+    assert {"name": "ORCHEST_PROJECT_UUID", "value": "project-uuid"} in env
+
+
+def test_job_workflow_template(pipeline, run_config, monkeypatch):
+    monkeypatch.setattr(pipelines, "get_registry_ip", lambda: "10.0.0.1")
+    monkeypatch.setenv("ORCHEST_HOST_GID", "1")
+
+    template = pipelines.get_job_workflow_template_manifest(
+        "job-uuid", pipeline, run_config
+    )
+    assert template["kind"] == "WorkflowTemplate"
+    assert template["metadata"]["labels"]["job_uuid"] == "job-uuid"
+    # Run specific values are parameters of the template.
+    env = template["spec"]["templates"][1]["container"]["env"]
+    assert {
+        "name": "ORCHEST_SESSION_UUID",
+        "value": "{{workflow.parameters.session_uuid}}",
+    } in env
+    sub_paths = [
+        mount["subPath"]
+        for mount in template["spec"]["templates"][1]["container"]["volumeMounts"]
+    ]
+    assert "{{workflow.parameters.project_dir}}" in sub_paths
+
+    # The name is derived from the content.
+    same = pipelines.get_job_workflow_template_manifest(
+        "job-uuid", pipeline, run_config
+    )
+    assert same["metadata"]["name"] == template["metadata"]["name"]
+    run_config["user_env_variables"]["A"] = "2"
+    changed = pipelines.get_job_workflow_template_manifest(
+        "job-uuid", pipeline, run_config
+    )
+    assert changed["metadata"]["name"] != template["metadata"]["name"]
+
+    run_config["workflow_template"] = template["metadata"]["name"]
+    run_config["project_dir"] = "/userdir/jobs/project/pipeline/job/run-uuid"
+    workflow = pipelines._workflow_template_ref_manifest(
+        "run-uuid", "workflow", run_config
+    )
+    assert workflow["spec"]["workflowTemplateRef"] == {
+        "name": template["metadata"]["name"]
+    }
+    assert workflow["spec"]["arguments"]["parameters"] == [
+        {"name": "session_uuid", "value": "run-uuid"},
+        {"name": "project_dir", "value": "jobs/project/pipeline/job/run-uuid"},
+    ]
+
+
+def test_register_workflow_template(monkeypatch):
+    class FakeCustomObjectsApi:
+        created = []
+        deleted_selectors = []
+
+        def create_namespaced_custom_object(self, *args, body):
+            name = body["metadata"]["name"]
+            if name in FakeCustomObjectsApi.created:
+                raise k8s_client.ApiException(status=409)
+            FakeCustomObjectsApi.created.append(name)
+
+        def delete_collection_namespaced_custom_object(self, *args, label_selector):
+            FakeCustomObjectsApi.deleted_selectors.append(label_selector)
+
+    monkeypatch.setattr(pipelines, "k8s_custom_obj_api", FakeCustomObjectsApi())
+
+    def manifest(digest):
+        return {
+            "metadata": {
+                "name": f"job-job-uuid-{digest}",
+                "labels": {
+                    "job_uuid": "job-uuid",
+                    "workflow_template_digest": digest,
+                },
+            }
+        }
+
+    pipelines.register_workflow_template(manifest("a"))
+    pipelines.register_workflow_template(manifest("a"))
+    # The templates of other runs of the job are kept.
+    pipelines.register_workflow_template(manifest("b"))
+    assert FakeCustomObjectsApi.created == ["job-job-uuid-a", "job-job-uuid-b"]
+    assert FakeCustomObjectsApi.deleted_selectors == []
+
+    pipelines.delete_job_workflow_templates("job-uuid")
+    assert FakeCustomObjectsApi.deleted_selectors == ["job_uuid=job-uuid"]
+
+
+def test_construct_pipeline_incremental(tmp_path):
+    with open("tests/input_operations/pipeline.json", "r") as f:
+        description = json.load(f)
+    pipeline = Pipeline.from_json(description)
+
+    # Writes the code of the steps and the outputs of steps 1 to 5,
+    # like the SDK does.
+    content_hashes = {}
+    for step in pipeline.steps:
+        uuid = step.properties["uuid"]
+        description["steps"][uuid]["file_path"] = f"{uuid}.py"
+        (tmp_path / f"{uuid}.py").write_text(f"print('{uuid}')")
+        if uuid == "uuid-6":
+            continue
+
+        step_data_dir = tmp_path / ".orchest" / "pipelines" / "pipeline-uuid" / "data"
+        step_data_dir = step_data_dir / uuid
+        step_data_dir.mkdir(parents=True)
+        (step_data_dir / "HEAD").write_text("2022-01-01T00:00:00; PICKLE; unnamed")
+        content_hashes[uuid] = f"content-{uuid}"
+        manifest = {
+            "timestamp": "2022-01-01T00:00:00",
+            "content_hash": content_hashes[uuid],
+            "parameters_hash": pipelines._hash_step_parameters(pipeline, step),
+            "code_hash": pipelines._hash_step_code(str(tmp_path / f"{uuid}.py")),
+            "inputs": {
+                parent.properties["uuid"]: content_hashes[parent.properties["uuid"]]
+                for parent in step.parents
+            },
+        }
+        (step_data_dir / "MANIFEST").write_text(json.dumps(manifest))
+
+    run_config = {"project_dir": str(tmp_path), "pipeline_path": "pipeline.orchest"}
+
+    def get_steps():
+        pipeline = pipelines.construct_pipeline(
+            None, "incremental", description, run_config=run_config
+        )
+        return sorted(step.properties["uuid"] for step in pipeline.steps)
+
+    # Step 6 has no output.
+    assert get_steps() == ["uuid-6"]
+
+    # Changing the code of a step runs its descendants as well.
+    (tmp_path / "uuid-4.py").write_text("print('changed')")
+    assert get_steps() == ["uuid-4", "uuid-5", "uuid-6"]
+
+    (tmp_path / "uuid-4.py").write_text("print('uuid-4')")
+    description["steps"]["uuid-3"]["parameters"] = {"a": 1}
+    assert get_steps() == ["uuid-3", "uuid-6"]
+
+    description["parameters"] = {"a": 1}
+    assert get_steps() == [f"uuid-{i}" for i in range(1, 7)]
+
+    # The output of step 2 has been written by a later run.
+    description["parameters"] = {}
+    description["steps"]["uuid-3"]["parameters"] = {}
+    head = tmp_path / ".orchest" / "pipelines" / "pipeline-uuid" / "data" / "uuid-2"
+    (head / "HEAD").write_text("2022-01-02T00:00:00; PICKLE; unnamed")
+    assert get_steps() == [f"uuid-{i}" for i in range(2, 7)]
@@ -0,0 +1,114 @@
+import os
+import shutil
+
+import pytest
+
+from app.core import run_dirs
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path):
+    snapshot_dir = tmp_path / "snapshot"
+    (snapshot_dir / "data").mkdir(parents=True)
+    (snapshot_dir / "pipeline.orchest").write_text("{}")
+    (snapshot_dir / "data" / "model.bin").write_bytes(b"\0" * 1024)
+    os.chmod(snapshot_dir / "data" / "model.bin", 0o444)
+    os.symlink("data/model.bin", snapshot_dir / "model")
+    return snapshot_dir
+
+
+@pytest.mark.parametrize("strategy", ["copy", "reflink", "hardlink"])
+def test_provision_run_dir(tmp_path, snapshot_dir, strategy):
+    run_dir = tmp_path / "run"
+
+    run_dirs.provision_run_dir(str(snapshot_dir), str(run_dir), strategy)
+
+    assert (run_dir / "pipeline.orchest").read_text() == "{}"
+    assert (run_dir / "data" / "model.bin").read_bytes() == b"\0" * 1024
+    assert os.readlink(run_dir / "model") == "data/model.bin"
+
+
+def test_hardlink_only_read_only_files(tmp_path, snapshot_dir, monkeypatch):
+    # A filesystem without support for cloning.
+    monkeypatch.setattr(run_dirs, "_clone", lambda source, target: False)
+    run_dir = tmp_path / "run"
+
+    run_dirs.provision_run_dir(str(snapshot_dir), str(run_dir), "hardlink")
+
+    assert os.path.samefile(
+        snapshot_dir / "data" / "model.bin", run_dir / "data" / "model.bin"
+    )
+    assert not os.path.samefile(
+        snapshot_dir / "pipeline.orchest", run_dir / "pipeline.orchest"
+    )
+
+
+def test_hardlink_clones_files(tmp_path, snapshot_dir, monkeypatch):
+    def clone(source, target):
+        shutil.copy2(source, target)
+        return True
+
+    # A filesystem supporting cloning.
+    monkeypatch.setattr(run_dirs, "_clone", clone)
+    run_dir = tmp_path / "run"
+
+    run_dirs.provision_run_dir(str(snapshot_dir), str(run_dir), "hardlink")
+
+    assert (run_dir / "data" / "model.bin").read_bytes() == b"\0" * 1024
+    assert not os.path.samefile(
+        snapshot_dir / "data" / "model.bin", run_dir / "data" / "model.bin"
+    )
+
+
+@pytest.mark.parametrize("strategy", ["copy", "reflink", "hardlink"])
+def test_provision_run_dir_restores_modes(tmp_path, snapshot_dir, strategy):
+    # Files of snapshots are read-only.
+    os.chmod(snapshot_dir / "pipeline.orchest", 0o444)
+    run_dir = tmp_path / "run"
+
+    run_dirs.provision_run_dir(
+        str(snapshot_dir),
+        str(run_dir),
+        strategy,
+        modes={"pipeline.orchest": 0o644, "data/model.bin": 0o444},
+    )
+
+    assert os.stat(run_dir / "pipeline.orchest").st_mode & 0o777 == 0o644
+    assert os.stat(run_dir / "data" / "model.bin").st_mode & 0o777 == 0o444
+    assert os.stat(snapshot_dir / "pipeline.orchest").st_mode & 0o777 == 0o444
+
+
+def test_hardlink_uses_modes_of_project(tmp_path, snapshot_dir, monkeypatch):
+    monkeypatch.setattr(run_dirs, "_clone", lambda source, target: False)
+    os.chmod(snapshot_dir / "pipeline.orchest", 0o444)
+    run_dir = tmp_path / "run"
+
+    run_dirs.provision_run_dir(
+        str(snapshot_dir),
+        str(run_dir),
+        "hardlink",
+        modes={"pipeline.orchest": 0o644, "data/model.bin": 0o444},
+    )
+
+    # Writable in the project, hence copied.
+    assert not os.path.samefile(
+        snapshot_dir / "pipeline.orchest", run_dir / "pipeline.orchest"
+    )
+    assert os.path.samefile(
+        snapshot_dir / "data" / "model.bin", run_dir / "data" / "model.bin"
+    )
+
+
+def test_write_run_file_does_not_modify_snapshot(tmp_path, snapshot_dir):
+    run_dir = tmp_path / "run"
+    run_dirs.provision_run_dir(str(snapshot_dir), str(run_dir), "hardlink")
+
+    run_dirs.write_run_file(str(run_dir / "data" / "model.bin"), "run")
+
+    assert (run_dir / "data" / "model.bin").read_text() == "run"
+    assert (snapshot_dir / "data" / "model.bin").read_bytes() == b"\0" * 1024
+
+
+def test_unknown_strategy(tmp_path, snapshot_dir):
+    with pytest.raises(ValueError):
+        run_dirs.provision_run_dir(str(snapshot_dir), str(tmp_path / "run"), "overlay")
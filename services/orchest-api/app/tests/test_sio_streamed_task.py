@@ -0,0 +1,117 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+import socketio
+from aiohttp import web
+
+from app.core import worker_loop
+from app.core.sio_streamed_task import SioStreamedTask
+
+_NAMESPACE = "/test"
+
+
+@pytest.fixture(scope="module")
+def sio_server():
+    """A socket.io server collecting the received messages."""
+    messages = []
+    started = threading.Event()
+    server = {"messages": messages}
+
+    def serve():
+        loop = asyncio.new_event_loop()
+        sio = socketio.AsyncServer(async_mode="aiohttp")
+        sio.on(
+            "sio_streamed_task_data",
+            lambda sid, data: messages.append(data),
+            namespace=_NAMESPACE,
+        )
+        app = web.Application()
+        sio.attach(app)
+        runner = web.AppRunner(app)
+        loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        loop.run_until_complete(site.start())
+        port = site._server.sockets[0].getsockname()[1]
+        server["address"] = f"http://127.0.0.1:{port}"
+        started.set()
+        loop.run_forever()
+
+    threading.Thread(target=serve, daemon=True).start()
+    started.wait()
+    yield server
+    worker_loop.close()
+
+
+def run_task(sio_server, task_lambda, abort_lambda=lambda: False):
+    sio_server["messages"].clear()
+    status = SioStreamedTask.run(
+        task_lambda,
+        "identity",
+        sio_server["address"],
+        _NAMESPACE,
+        abort_lambda,
+        abort_lambda_poll_time=0.05,
+    )
+    # The child has been reaped.
+    with pytest.raises(ChildProcessError):
+        os.waitpid(-1, os.WNOHANG)
+    return status, sio_server["messages"]
+
+
+def get_output(messages):
+    return "".join(
+        m["output"] for m in messages if m["action"] == "sio_streamed_task_output"
+    )
+
+
+def test_sio_streamed_task_output(sio_server, monkeypatch):
+    monkeypatch.setattr(SioStreamedTask, "FRAME_MAX_BYTES", 1000)
+    lines = [f"line {i} é\n" for i in range(1000)]
+
+    def task(f):
+        for line in lines:
+            f.write(line)
+        return "SUCCESS"
+
+    status, messages = run_task(sio_server, task)
+
+    assert status == "SUCCESS"
+    assert messages[0]["action"] == "sio_streamed_task_started"
+    assert messages[-1]["action"] == "sio_streamed_task_finished"
+    assert get_output(messages) == "".join(lines)
+    frames = messages[1:-1]
+    assert 1 < len(frames) < len(lines)
+    # A character split over two reads is sent with the next frame.
+    assert all(len(m["output"].encode()) <= 1000 + 1 for m in frames)
+
+
+def test_sio_streamed_task_failed(sio_server):
+    def task(f):
+        f.write("output\n")
+        raise Exception("failed")
+
+    status, messages = run_task(sio_server, task)
+
+    assert status == "FAILED"
+    assert get_output(messages) == "output\n"
+    assert messages[-1]["action"] == "sio_streamed_task_finished"
+
+
+def test_sio_streamed_task_aborted(sio_server):
+    abort_time = time.monotonic() + 0.2
+
+    def task(f):
+        while True:
+            f.write("output\n")
+            time.sleep(0.01)
+
+    status, messages = run_task(
+        sio_server, task, abort_lambda=lambda: time.monotonic() > abort_time
+    )
+
+    assert status == "ABORTED"
+    assert get_output(messages).startswith("output\n")
+    assert messages[-1]["action"] == "sio_streamed_task_finished"
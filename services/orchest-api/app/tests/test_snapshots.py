@@ -0,0 +1,101 @@
+import os
+import shutil
+
+import pytest
+
+from _orchest.internals.snapshots import SnapshotStore
+
+
+@pytest.fixture
+def project_dir(tmp_path):
+    project_dir = tmp_path / "project"
+    (project_dir / "data").mkdir(parents=True)
+    (project_dir / "step.py").write_text("print('hello')")
+    (project_dir / "data" / "data.csv").write_text("a,b\n1,2\n")
+    (project_dir / "data" / "copy.csv").write_text("a,b\n1,2\n")
+    os.symlink("data/data.csv", project_dir / "data.csv")
+    return project_dir
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SnapshotStore(str(tmp_path / "store"))
+
+
+def create_snapshot(store, project_dir, tmp_path, job_uuid):
+    snapshot_dir = tmp_path / job_uuid / "snapshot"
+    store.create_snapshot(
+        str(project_dir), str(snapshot_dir), job_uuid, "project", use_gitignore=False
+    )
+    return snapshot_dir
+
+
+def test_create_snapshot(store, project_dir, tmp_path):
+    snapshot_dir = create_snapshot(store, project_dir, tmp_path, "job-1")
+
+    assert (snapshot_dir / "step.py").read_text() == "print('hello')"
+    assert (snapshot_dir / "data" / "data.csv").read_text() == "a,b\n1,2\n"
+    assert os.readlink(snapshot_dir / "data.csv") == "data/data.csv"
+    # Identical files share their content.
+    assert os.path.samefile(
+        snapshot_dir / "data" / "data.csv", snapshot_dir / "data" / "copy.csv"
+    )
+
+
+def test_snapshots_are_deduplicated(store, project_dir, tmp_path):
+    snapshot_1 = create_snapshot(store, project_dir, tmp_path, "job-1")
+    (project_dir / "step.py").write_text("print('changed')")
+    snapshot_2 = create_snapshot(store, project_dir, tmp_path, "job-2")
+
+    assert os.path.samefile(snapshot_1 / "data" / "data.csv", snapshot_2 / "data.csv")
+    assert not os.path.samefile(snapshot_1 / "step.py", snapshot_2 / "step.py")
+    assert (snapshot_1 / "step.py").read_text() == "print('hello')"
+    assert (snapshot_2 / "step.py").read_text() == "print('changed')"
+
+
+def test_files_with_different_modes_are_not_shared(store, project_dir, tmp_path):
+    snapshot_1 = create_snapshot(store, project_dir, tmp_path, "job-1")
+    os.chmod(project_dir / "step.py", 0o444)
+    snapshot_2 = create_snapshot(store, project_dir, tmp_path, "job-2")
+
+    assert not os.path.samefile(snapshot_1 / "step.py", snapshot_2 / "step.py")
+    assert os.stat(snapshot_2 / "step.py").st_mode & 0o777 == 0o444
+
+
+def test_delete_snapshot_collects_unreferenced_blobs(store, project_dir, tmp_path):
+    create_snapshot(store, project_dir, tmp_path, "job-1")
+    (project_dir / "step.py").write_text("print('changed')")
+    snapshot_2 = create_snapshot(store, project_dir, tmp_path, "job-2")
+
+    shutil.rmtree(tmp_path / "job-1")
+    # Only the blob of the old step.py is not referenced anymore.
+    assert store.delete_snapshot("job-1", "project") == 1
+    assert (snapshot_2 / "step.py").read_text() == "print('changed')"
+    assert (snapshot_2 / "data" / "data.csv").read_text() == "a,b\n1,2\n"
+
+    shutil.rmtree(tmp_path / "job-2")
+    assert store.delete_group("project") == 2
+
+
+def test_blobs_are_read_only(store, project_dir, tmp_path):
+    snapshot_dir = create_snapshot(store, project_dir, tmp_path, "job-1")
+
+    assert os.stat(snapshot_dir / "step.py").st_mode & 0o222 == 0
+    manifest = store.get_manifest("job-1", "project")
+    assert manifest["files"]["step.py"]["mode"] == 0o644
+
+
+def test_modified_blobs_are_not_reused(store, project_dir, tmp_path):
+    snapshot_1 = create_snapshot(store, project_dir, tmp_path, "job-1")
+    # Written in place, e.g. by root, with the same size.
+    with open(snapshot_1 / "step.py", "r+") as f:
+        f.write("PRINT")
+
+    snapshot_2 = create_snapshot(store, project_dir, tmp_path, "job-2")
+
+    assert (snapshot_2 / "step.py").read_text() == "print('hello')"
+    assert not os.path.samefile(snapshot_1 / "step.py", snapshot_2 / "step.py")
+    # Unmodified blobs are still reused.
+    assert os.path.samefile(
+        snapshot_1 / "data" / "data.csv", snapshot_2 / "data" / "data.csv"
+    )
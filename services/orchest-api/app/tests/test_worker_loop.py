@@ -0,0 +1,32 @@
+import asyncio
+
+from app.core import worker_loop
+
+
+def test_loop_and_session_are_reused():
+    try:
+        session = worker_loop.get_session()
+        loop = worker_loop.get_loop()
+
+        async def get_running_loop():
+            return asyncio.get_running_loop()
+
+        assert worker_loop.run(get_running_loop()) is loop
+        assert worker_loop.get_session() is session
+        assert worker_loop.get_loop() is loop
+    finally:
+        worker_loop.close()
+
+    assert session.closed
+    assert loop.is_closed()
+
+
+def test_new_loop_after_fork(monkeypatch):
+    try:
+        loop = worker_loop.get_loop()
+        monkeypatch.setattr(worker_loop.os, "getpid", lambda: -1)
+        assert worker_loop.get_loop() is not loop
+    finally:
+        worker_loop.close()
+        monkeypatch.undo()
+        loop.close()
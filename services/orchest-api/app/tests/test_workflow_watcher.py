@@ -0,0 +1,171 @@
+import asyncio
+import threading
+
+import pytest
+
+from app import errors
+from app.core import workflow_watcher
+from app.core.workflow_watcher import WorkflowWatcher
+
+
+def workflow_event(type, name, resource_version, phases=None):
+    nodes = {
+        f"{name}-{i}": {"templateName": "step", "phase": phase}
+        for i, phase in enumerate(phases or [])
+    }
+    return {
+        "type": type,
+        "object": {
+            "metadata": {"name": name, "resourceVersion": resource_version},
+            "status": {"nodes": nodes},
+        },
+    }
+
+
+class FakeCustomObjectsApi:
+    def __init__(self, resource_version="1"):
+        self.resource_version = resource_version
+        self.list_calls = 0
+
+    def list_namespaced_custom_object(self, *args, **kwargs):
+        self.list_calls += 1
+        return {"metadata": {"resourceVersion": self.resource_version}, "items": []}
+
+
+class FakeWatch:
+    """Fakes a k8s watch, every call to stream yields a batch of events.
+
+    Once all batches are exhausted the stream blocks until stopped.
+    """
+
+    batches = []
+    resource_versions = []
+
+    def __init__(self):
+        self._stopped = threading.Event()
+
+    def stream(self, func, *args, **kwargs):
+        FakeWatch.resource_versions.append(kwargs.get("resource_version"))
+        if FakeWatch.batches:
+            yield from FakeWatch.batches.pop(0)
+        else:
+            self._stopped.wait(0.05)
+
+    def stop(self):
+        self._stopped.set()
+
+
+@pytest.fixture
+def fake_watch(monkeypatch):
+    FakeWatch.batches = []
+    FakeWatch.resource_versions = []
+    monkeypatch.setattr(workflow_watcher.watch, "Watch", FakeWatch)
+    return FakeWatch
+
+
+@pytest.fixture
+def watcher(fake_watch):
+    watcher = WorkflowWatcher("orchest", custom_obj_api=FakeCustomObjectsApi())
+    yield watcher
+    watcher.stop()
+
+
+def get_phases(nodes):
+    return [node["phase"] for node in nodes.values()]
+
+
+def test_fan_out_to_subscribers(fake_watch, watcher):
+    async def run():
+        with watcher.subscribe("wf-a") as sub_a, watcher.subscribe("wf-b") as sub_b:
+            fake_watch.batches.append(
+                [
+                    workflow_event("ADDED", "wf-a", "2", ["Pending"]),
+                    workflow_event("ADDED", "wf-b", "3", ["Running"]),
+                    workflow_event("ADDED", "wf-c", "4", ["Running"]),
+                ]
+            )
+            nodes_a = await sub_a.get_nodes(timeout=2)
+            nodes_b = await sub_b.get_nodes(timeout=2)
+        return nodes_a, nodes_b
+
+    nodes_a, nodes_b = asyncio.run(run())
+    assert get_phases(nodes_a) == ["Pending"]
+    assert get_phases(nodes_b) == ["Running"]
+
+
+def test_only_phase_transitions_are_fanned_out(fake_watch, watcher):
+    async def run():
+        with watcher.subscribe("wf-a") as sub:
+            fake_watch.batches.append(
+                [
+                    workflow_event("ADDED", "wf-a", "2", ["Running"]),
+                    workflow_event("MODIFIED", "wf-a", "3", ["Running"]),
+                ]
+            )
+            first = await sub.get_nodes(timeout=2)
+            second = await sub.get_nodes(timeout=0.3)
+
+            fake_watch.batches.append(
+                [workflow_event("MODIFIED", "wf-a", "4", ["Succeeded"])]
+            )
+            third = await sub.get_nodes(timeout=2)
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+    assert get_phases(first) == ["Running"]
+    assert second is None
+    assert get_phases(third) == ["Succeeded"]
+
+
+def test_reconnect_resumes_from_resource_version(fake_watch, watcher):
+    async def run():
+        with watcher.subscribe("wf-a") as sub:
+            fake_watch.batches.append(
+                [
+                    workflow_event("ADDED", "wf-a", "5", ["Running"]),
+                    {
+                        "type": "BOOKMARK",
+                        "object": {"metadata": {"resourceVersion": "8"}},
+                    },
+                ]
+            )
+            await sub.get_nodes(timeout=2)
+            # The stream ended, e.g. because of a timeout.
+            fake_watch.batches.append(
+                [workflow_event("MODIFIED", "wf-a", "9", ["Succeeded"])]
+            )
+            return await sub.get_nodes(timeout=2)
+
+    nodes = asyncio.run(run())
+    assert get_phases(nodes) == ["Succeeded"]
+    # Re-established from the bookmark, without relisting.
+    assert "8" in fake_watch.resource_versions
+    assert watcher._api.list_calls == 1
+
+
+def test_expired_resource_version_relists(fake_watch, watcher):
+    async def run():
+        with watcher.subscribe("wf-a") as sub:
+            watcher._api.resource_version = "20"
+            fake_watch.batches.append(
+                [{"type": "ERROR", "object": {"code": 410, "message": "Gone"}}]
+            )
+            fake_watch.batches.append(
+                [workflow_event("MODIFIED", "wf-a", "21", ["Failed"])]
+            )
+            return await sub.get_nodes(timeout=2)
+
+    nodes = asyncio.run(run())
+    assert get_phases(nodes) == ["Failed"]
+    assert watcher._api.list_calls == 2
+    assert "20" in fake_watch.resource_versions
+
+
+def test_deleted_workflow(fake_watch, watcher):
+    async def run():
+        with watcher.subscribe("wf-a") as sub:
+            fake_watch.batches.append([workflow_event("DELETED", "wf-a", "2")])
+            await sub.get_nodes(timeout=2)
+
+    with pytest.raises(errors.WorkflowDeletedError):
+        asyncio.run(run())
@@ -79,6 +79,7 @@ def create_required_directories() -> None:
         _config.USERDIR_JUPYTERLAB,
         _config.USERDIR_KANIKO_BASE_IMAGES_CACHE,
         _config.USERDIR_BUILDKIT_CACHE,
+        _config.USERDIR_JOB_SNAPSHOTS,
     ]:
         Path(path).mkdir(parents=True, exist_ok=True)
 
@@ -0,0 +1,287 @@
+"""Random access to the logs of steps and services.
+
+Logs are append-only files whose first line is the UUID of the log, see
+the log_streamer. To read a range of lines without reading the log from
+the start, a sparse index of line offsets is kept next to every log, in
+a ``<log>.idx`` file. It holds a checkpoint, i.e. a line number and its
+offset, every INDEX_INTERVAL_BYTES of log, and is extended as the log
+grows. A new log, which replaces or truncates the log file, invalidates
+the index.
+
+Line numbers exclude the line with the UUID of the log, i.e. line 0 is
+the first line of output.
+"""
+import bisect
+import logging
+import os
+import re
+import struct
+from array import array
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bytes of log between checkpoints, i.e. at most this amount of log is
+# read to get to a line.
+INDEX_INTERVAL_BYTES = 64 * 1024
+# Maximum number of lines returned at once.
+MAX_LINES = 10000
+# Logs are searched in chunks of at least this size.
+SEARCH_CHUNK_BYTES = 1024 * 1024
+
+_INDEX_MAGIC = b"ORCHLOG1"
+# Magic, inode of the log, indexed bytes and lines, and the first bytes
+# of the log, which contain its UUID.
+_INDEX_HEADER = struct.Struct("<8sQQQH64s")
+_LOG_HEAD_SIZE = 64
+# The line with the UUID of the log.
+_HEADER_LINES = 1
+
+
+class LogIndex:
+    """The checkpoints of a log, up to its last complete line."""
+
+    def __init__(self, inode: int, head: bytes) -> None:
+        self.inode = inode
+        self.head = head
+        # Bytes and number of the complete lines that are indexed.
+        self.size = 0
+        self.lines = 0
+        # Checkpoints, the line numbers and the offsets of their starts.
+        self.checkpoint_lines = array("Q", [0])
+        self.checkpoint_offsets = array("Q", [0])
+
+    @classmethod
+    def read(cls, index_path: str) -> Optional["LogIndex"]:
+        try:
+            with open(index_path, "rb") as f:
+                content = f.read()
+            magic, inode, size, lines, head_size, head = _INDEX_HEADER.unpack_from(
+                content
+            )
+        except (OSError, struct.error):
+            return None
+        if magic != _INDEX_MAGIC:
+            return None
+
+        index = cls(inode, head[:head_size])
+        index.size, index.lines = size, lines
+        checkpoints = array("Q")
+        checkpoints.frombytes(content[_INDEX_HEADER.size :])
+        index.checkpoint_lines = checkpoints[0::2]
+        index.checkpoint_offsets = checkpoints[1::2]
+        return index
+
+    def write(self, index_path: str) -> None:
+        checkpoints = array("Q", [0]) * (2 * len(self.checkpoint_lines))
+        checkpoints[0::2] = self.checkpoint_lines
+        checkpoints[1::2] = self.checkpoint_offsets
+        header = _INDEX_HEADER.pack(
+            _INDEX_MAGIC, self.inode, self.size, self.lines, len(self.head), self.head
+        )
+        # Written to a new file, since it could be read concurrently.
+        with open(f"{index_path}.tmp", "wb") as f:
+            f.write(header)
+            f.write(checkpoints.tobytes())
+        os.replace(f"{index_path}.tmp", index_path)
+
+    def extend(self, f) -> None:
+        """Indexes the lines that have been appended to the log."""
+        f.seek(self.size)
+        pos = self.size
+        while True:
+            # Read up to the next checkpoint.
+            size = self.checkpoint_offsets[-1] + INDEX_INTERVAL_BYTES - pos
+            if size > 0:
+                data = f.read(size)
+                newlines = data.count(b"\n")
+                if newlines:
+                    self.lines += newlines
+                    self.size = pos + data.rfind(b"\n") + 1
+                pos += len(data)
+                if len(data) < size:
+                    return
+
+            # The checkpoint is at the start of the next line.
+            line = f.readline()
+            pos += len(line)
+            if not line.endswith(b"\n"):
+                return
+            self.lines += 1
+            self.size = pos
+            self.checkpoint_lines.append(self.lines)
+            self.checkpoint_offsets.append(self.size)
+
+    def seek(self, f, line: int) -> None:
+        """Moves the file to the start of the given line of the log."""
+        i = bisect.bisect_right(self.checkpoint_lines, line) - 1
+        f.seek(self.checkpoint_offsets[i])
+        for _ in range(line - self.checkpoint_lines[i]):
+            if not f.readline():
+                return
+
+
+def get_index_path(log_path: str) -> str:
+    return f"{log_path}.idx"
+
+
+def _get_index(f, log_path: str) -> LogIndex:
+    """Gets the up to date index of the opened log."""
+    st = os.fstat(f.fileno())
+    f.seek(0)
+    head = f.read(_LOG_HEAD_SIZE)
+
+    index_path = get_index_path(log_path)
+    index = LogIndex.read(index_path)
+    if (
+        index is None
+        or index.inode != st.st_ino
+        or index.size > st.st_size
+        or not head.startswith(index.head)
+    ):
+        index = LogIndex(st.st_ino, head)
+
+    size = index.size
+    index.head = head
+    index.extend(f)
+    if index.size != size:
+        try:
+            index.write(index_path)
+        except OSError as e:
+            # It is extended again by the next request.
+            logger.warning("Could not write log index %s: %s" % (index_path, e))
+    return index
+
+
+def _count_lines(f, index: LogIndex) -> int:
+    """Counts the lines of the log, the last one can be incomplete."""
+    f.seek(index.size)
+    lines = index.lines
+    tail = f.read()
+    lines += tail.count(b"\n")
+    if tail and not tail.endswith(b"\n"):
+        lines += 1
+    return max(lines - _HEADER_LINES, 0)
+
+
+def _decode(line: bytes) -> str:
+    return line.decode("utf-8", errors="replace").rstrip("\n")
+
+
+def read_lines(
+    log_path: str, start: Optional[int] = None, end: Optional[int] = None
+) -> Dict[str, Any]:
+    """Reads the lines [start, end) of a log.
+
+    Args:
+        log_path: Path of the log.
+        start: First line to read. If negative, counts from the end of
+            the log, e.g. -10 are the last 10 lines. Defaults to 0.
+        end: Line to stop reading at, at most MAX_LINES after `start`.
+            Defaults to the end of the log.
+
+    Returns:
+        A dictionary with the "lines", the number of the first line,
+        i.e. "start", and the number of lines of the log, i.e.
+        "total_lines".
+
+    Raises:
+        FileNotFoundError: If the log does not exist.
+    """
+    with open(log_path, "rb") as f:
+        index = _get_index(f, log_path)
+        total_lines = _count_lines(f, index)
+
+        start = 0 if start is None else start
+        if start < 0:
+            start = max(total_lines + start, 0)
+        end = total_lines if end is None else min(end, total_lines)
+        end = min(end, start + MAX_LINES)
+
+        lines = []
+        if start < end:
+            index.seek(f, start + _HEADER_LINES)
+            for _ in range(end - start):
+                line = f.readline()
+                if not line:
+                    break
+                lines.append(_decode(line))
+
+    return {"lines": lines, "start": start, "total_lines": total_lines}
+
+
+def compile_pattern(pattern: str, regex: bool = False) -> "re.Pattern":
+    """Compiles the pattern to search logs for.
+
+    Raises:
+        re.error: If the pattern is an invalid regular expression.
+    """
+    pattern = pattern.encode("utf-8")
+    if not regex:
+        pattern = re.escape(pattern)
+    return re.compile(pattern, re.MULTILINE)
+
+
+def search(
+    log_path: str,
+    pattern: "re.Pattern",
+    start: int = 0,
+    max_matches: int = 100,
+) -> Dict[str, Any]:
+    """Searches the lines of a log, starting at a given line.
+
+    Args:
+        log_path: Path of the log.
+        pattern: A compiled pattern, see `compile_pattern`.
+        start: Line to start searching at.
+        max_matches: Maximum number of lines to return, at least 1.
+
+    Returns:
+        A dictionary with the "matches", i.e. the number and content of
+        the matching lines, the line to continue the search at once
+        `max_matches` lines have been found, i.e. "next_line", which is
+        None if the log has been searched entirely, and "total_lines".
+
+    Raises:
+        FileNotFoundError: If the log does not exist.
+    """
+    matches: List[Dict[str, Any]] = []
+    next_line = None
+    with open(log_path, "rb") as f:
+        index = _get_index(f, log_path)
+        total_lines = _count_lines(f, index)
+
+        line_number = max(start, 0)
+        index.seek(f, line_number + _HEADER_LINES)
+        while next_line is None:
+            # Chunks end at a line end so that lines are matched whole.
+            chunk = f.read(SEARCH_CHUNK_BYTES)
+            if not chunk:
+                break
+            chunk += f.readline()
+
+            # Newlines are only counted up to the matching lines.
+            counted = pos = 0
+            while True:
+                match = pattern.search(chunk, pos)
+                if match is None:
+                    break
+                line_start = chunk.rfind(b"\n", 0, match.start()) + 1
+                line_end = chunk.find(b"\n", match.start())
+                if line_end == -1:
+                    line_end = len(chunk)
+                line_number += chunk.count(b"\n", counted, line_start)
+                counted = line_start
+                matches.append(
+                    {"line": line_number, "text": _decode(chunk[line_start:line_end])}
+                )
+                if len(matches) == max_matches:
+                    next_line = line_number + 1
+                    break
+                pos = line_end + 1
+            if next_line is None:
+                line_number += chunk.count(b"\n", counted)
+
+    if next_line is not None and next_line >= total_lines:
+        next_line = None
+    return {"matches": matches, "next_line": next_line, "total_lines": total_lines}
@@ -110,6 +110,20 @@ def _get_kernel_pod_manifest(
         container_project_dir=_config.PROJECT_DIR,
         container_pipeline_file=_config.PIPELINE_FILE,
     )
+    # Directory of the memory-server of the session, through which data
+    # is passed in memory.
+    vols.append(
+        {
+            "name": "memory-server",
+            "hostPath": {
+                "path": _config.MEMORY_SERVER_HOST_DIR.format(
+                    session_uuid=os.environ["ORCHEST_SESSION_UUID"]
+                ),
+                "type": "DirectoryOrCreate",
+            },
+        }
+    )
+    vol_mounts.append({"name": "memory-server", "mountPath": _config.MEMORY_SERVER_DIR})
 
     environment = dict()
     environment["EG_RESPONSE_ADDRESS"] = response_addr
@@ -151,6 +165,28 @@ def _get_kernel_pod_manifest(
             # policy would likely interfere with the built-in
             # behaviors."
             "restartPolicy": "Never",
+            # The memory-server directory is on the tmpfs of the node,
+            # data can only be passed in memory on the same node.
+            "affinity": {
+                "podAffinity": {
+                    "preferredDuringSchedulingIgnoredDuringExecution": [
+                        {
+                            "weight": 100,
+                            "podAffinityTerm": {
+                                "labelSelector": {
+                                    "matchLabels": {
+                                        "app": "memory-server",
+                                        "session_uuid": metadata["labels"][
+                                            "session_uuid"
+                                        ],
+                                    }
+                                },
+                                "topologyKey": "kubernetes.io/hostname",
+                            },
+                        }
+                    ]
+                }
+            },
             "volumes": vols,
             "containers": [
                 {
@@ -6,6 +6,24 @@ from flask import current_app, request
 from _orchest.internals import config as _config
 from app.utils import project_uuid_to_path
 
+# Frames of log output a log viewer can have not acknowledged yet.
+# Further frames are dropped until it catches up.
+LOG_VIEWER_MAX_PENDING_FRAMES = 32
+
+
+class LogViewer:
+    """A log viewer of a client, identified by its session_uuid."""
+
+    def __init__(self, sid):
+        self.sid = sid
+        self.pending_frames = 0
+        # Number of bytes of output that have not been sent.
+        self.skipped = 0
+
+
+def _get_skipped_marker(skipped):
+    return "\n[Skipped %d bytes of output]\n" % skipped
+
 
 def register_build_listener(namespace, socketio):
 
@@ -87,19 +105,93 @@ def register_socketio_broadcast(socketio):
         _config.ORCHEST_SOCKETIO_JUPYTER_IMG_BUILDING_NAMESPACE, socketio
     )
 
+    # Log viewers by session_uuid, output is only sent to the client of
+    # the viewer.
+    log_viewers = {}
+    log_viewers_lock = Lock()
+
+    def get_log_frame(viewer, output, skipped):
+        """Gets the output to send to the viewer, None to drop it."""
+        # Slow clients are sent the most recent output once they catch
+        # up, i.e. they tail the log.
+        if viewer.pending_frames >= LOG_VIEWER_MAX_PENDING_FRAMES:
+            viewer.skipped += len(output) + skipped
+            return None
+
+        skipped += viewer.skipped
+        if skipped:
+            output = _get_skipped_marker(skipped) + output
+        viewer.skipped = 0
+        viewer.pending_frames += 1
+        return output
+
+    def emit_log_frame(session_uuid, viewer, output):
+        def on_ack(*args):
+            with log_viewers_lock:
+                viewer.pending_frames -= 1
+
+        socketio.emit(
+            "pty-output",
+            {"output": output, "session_uuid": session_uuid},
+            room=viewer.sid,
+            namespace="/pty",
+            callback=on_ack,
+        )
+
+    @socketio.on("disconnect", namespace="/pty")
+    def disconnect_pty():
+        with log_viewers_lock:
+            session_uuids = [
+                session_uuid
+                for session_uuid, viewer in log_viewers.items()
+                if viewer.sid == request.sid
+            ]
+            for session_uuid in session_uuids:
+                del log_viewers[session_uuid]
+
+        # The logs don't have to be read anymore.
+        for session_uuid in session_uuids:
+            socketio.emit(
+                "pty-log-manager-receiver",
+                {"action": "stop-logs", "session_uuid": session_uuid},
+                namespace="/pty",
+            )
+
     @socketio.on("pty-log-manager", namespace="/pty")
     def process_log_manager(data):
 
         if data["action"] == "pty-broadcast":
-            socketio.emit(
-                "pty-output",
-                {"output": data["output"], "session_uuid": data["session_uuid"]},
-                namespace="/pty",
-            )
+            # Emitted outside of the lock, which is taken by the acks.
+            frames = []
+            with log_viewers_lock:
+                for session_uuid in data["session_uuids"]:
+                    viewer = log_viewers.get(session_uuid)
+                    if viewer is None:
+                        continue
+                    output = get_log_frame(viewer, data["output"], data["skipped"])
+                    if output is not None:
+                        frames.append((session_uuid, viewer, output))
+
+            for session_uuid, viewer, output in frames:
+                emit_log_frame(session_uuid, viewer, output)
+
         elif data["action"] == "pty-reset":
-            socketio.emit(
-                "pty-reset", {"session_uuid": data["session_uuid"]}, namespace="/pty"
-            )
+            viewers = []
+            with log_viewers_lock:
+                for session_uuid in data["session_uuids"]:
+                    viewer = log_viewers.get(session_uuid)
+                    if viewer is not None:
+                        # Skipped output belongs to the previous log.
+                        viewer.skipped = 0
+                        viewers.append((session_uuid, viewer))
+
+            for session_uuid, viewer in viewers:
+                socketio.emit(
+                    "pty-reset",
+                    {"session_uuid": session_uuid},
+                    room=viewer.sid,
+                    namespace="/pty",
+                )
         else:
             # relay incoming message to
             # pty-log-manager-receiver (log_streamer client)
@@ -108,5 +200,10 @@ def register_socketio_broadcast(socketio):
             # for non-client data models (such as project path)
             if data["action"] == "fetch-logs":
                 data["project_path"] = project_uuid_to_path(data["project_uuid"])
+                with log_viewers_lock:
+                    log_viewers[data["session_uuid"]] = LogViewer(request.sid)
+            elif data["action"] == "stop-logs":
+                with log_viewers_lock:
+                    log_viewers.pop(data["session_uuid"], None)
 
             socketio.emit("pty-log-manager-receiver", data, namespace="/pty")
@@ -11,7 +11,12 @@ import requests
 from flask import current_app
 
 from _orchest.internals import config as _config
-from _orchest.internals.utils import copytree, is_services_definition_valid, rmtree
+from _orchest.internals.snapshots import SnapshotStore
+from _orchest.internals.utils import (
+    get_userdir_relpath,
+    is_services_definition_valid,
+    rmtree,
+)
 from app.compat import migrate_pipeline
 from app.config import CONFIG_CLASS as StaticConfig
 from app.models import Environment, Pipeline, Project
@@ -480,6 +485,15 @@ def write_config(app, key, value):
     os.system("chmod o+rw " + conf_json_path)
 
 
+def get_job_snapshot_store():
+    return SnapshotStore(
+        os.path.join(
+            current_app.config["USER_DIR"],
+            get_userdir_relpath(_config.USERDIR_JOB_SNAPSHOTS),
+        )
+    )
+
+
 def create_job_directory(job_uuid, pipeline_uuid, project_uuid):
 
     snapshot_path = os.path.join(
@@ -493,7 +507,10 @@ def create_job_directory(job_uuid, pipeline_uuid, project_uuid):
         current_app.config["USER_DIR"], "projects", project_uuid_to_path(project_uuid)
     )
 
-    copytree(project_dir, snapshot_path, use_gitignore=True)
+    # Files are deduplicated across the snapshots of all jobs.
+    get_job_snapshot_store().create_snapshot(
+        project_dir, snapshot_path, job_uuid, project_uuid, use_gitignore=True
+    )
 
 
 def remove_job_directory(job_uuid, pipeline_uuid, project_uuid):
@@ -507,6 +524,10 @@ def remove_job_directory(job_uuid, pipeline_uuid, project_uuid):
     if os.path.isdir(job_path):
         rmtree(job_path, ignore_errors=True)
 
+    # Must happen after the job directory has been removed, so that the
+    # blobs of the snapshot are not referenced anymore.
+    get_job_snapshot_store().delete_snapshot(job_uuid, project_uuid)
+
     # Clean up parent directory if this job removal created empty
     # directories.
     remove_dir_if_empty(job_pipeline_path)
@@ -535,6 +556,8 @@ def remove_project_jobs_directories(project_uuid):
     if os.path.isdir(project_jobs_path):
         rmtree(project_jobs_path, ignore_errors=True)
 
+    get_job_snapshot_store().delete_group(project_uuid)
+
 
 def get_ipynb_template(language: str):
 
@@ -730,6 +753,15 @@ def normalize_project_relative_path(path: str) -> str:
     return os.path.normpath(path)
 
 
+def is_valid_uuid(value: str) -> bool:
+    """Whether the value is a UUID, e.g. to safely use it in a path."""
+    try:
+        uuid.UUID(value)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
 def is_valid_project_relative_path(project_uuid, path: str) -> str:
     project_path = os.path.abspath(
         os.path.normpath(get_project_directory(project_uuid))
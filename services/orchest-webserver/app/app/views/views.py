@@ -2,6 +2,7 @@ import io
 import json
 import os
 import pathlib
+import re
 import subprocess
 import uuid
 import zipfile
@@ -19,7 +20,7 @@ from _orchest.internals import utils as _utils
 from _orchest.internals.two_phase_executor import TwoPhaseExecutor
 from _orchest.internals.utils import copytree, rmtree
 from app import analytics, error
-from app.core import filemanager
+from app.core import filemanager, logs
 from app.core.pipelines import CreatePipeline, DeletePipeline, MovePipeline
 from app.core.projects import (
     CreateProject,
@@ -41,6 +42,7 @@ from app.utils import (
     get_environment_directory,
     get_environments,
     get_job_counts,
+    get_job_directory,
     get_orchest_examples_json,
     get_orchest_update_info_json,
     get_pipeline_directory,
@@ -51,11 +53,13 @@ from app.utils import (
     get_repo_tag,
     get_session_counts,
     is_valid_project_relative_path,
+    is_valid_uuid,
     normalize_project_relative_path,
     pipeline_set_notebook_kernels,
     preprocess_script,
     project_entity_counts,
     project_exists,
+    project_uuid_to_path,
     resolve_absolute_path,
     serialize_environment_to_disk,
 )
@@ -911,6 +915,90 @@ def register_views(app, db):
                     {"success": True, "pipeline_json": json.dumps(pipeline_json)}
                 )
 
+    @app.route("/async/logs/<project_uuid>/<pipeline_uuid>/<log_id>", methods=["GET"])
+    def pipeline_log(project_uuid, pipeline_uuid, log_id):
+        """Reads or searches the log of a step or service.
+
+        The log is selected through the query arguments, which are, in
+        order of precedence:
+            search: Pattern to search for, a regular expression if
+                `regex` is "true", starting at line `start` and
+                returning at most `max_matches` lines.
+            last: Number of lines to read from the end of the log.
+            start, end: The range of lines to read.
+
+        Logs of pipeline runs of jobs are selected through the
+        `job_uuid` and `pipeline_run_uuid` query arguments.
+        """
+        if "/" in log_id or log_id.startswith("."):
+            return jsonify({"message": "Invalid log id."}), 400
+
+        job_uuid = request.args.get("job_uuid")
+        pipeline_run_uuid = request.args.get("pipeline_run_uuid")
+        if (job_uuid is None) != (pipeline_run_uuid is None):
+            return (
+                jsonify(
+                    {
+                        "message": "job_uuid and pipeline_run_uuid must be "
+                        "given together."
+                    }
+                ),
+                400,
+            )
+        # They are part of the path of the log.
+        for value in [project_uuid, pipeline_uuid, job_uuid, pipeline_run_uuid]:
+            if value is not None and not is_valid_uuid(value):
+                return jsonify({"message": "Invalid UUID: %s." % value}), 400
+
+        if job_uuid is not None:
+            project_dir = os.path.join(
+                get_job_directory(pipeline_uuid, project_uuid, job_uuid),
+                pipeline_run_uuid,
+            )
+        else:
+            if project_uuid_to_path(project_uuid) is None:
+                return jsonify({"message": "Project could not be found."}), 404
+            project_dir = get_project_directory(project_uuid)
+        log_path = os.path.join(
+            project_dir,
+            _config.LOGS_PATH.format(pipeline_uuid=pipeline_uuid),
+            "%s.log" % log_id,
+        )
+
+        try:
+            if "search" in request.args:
+                pattern = logs.compile_pattern(
+                    request.args["search"], request.args.get("regex") == "true"
+                )
+                max_matches = request.args.get("max_matches", 100, type=int)
+                if max_matches < 1:
+                    return jsonify({"message": "Invalid max_matches."}), 400
+                result = logs.search(
+                    log_path,
+                    pattern,
+                    request.args.get("start", 0, type=int),
+                    max_matches,
+                )
+            elif "last" in request.args:
+                last = request.args.get("last", type=int)
+                if last is None or last < 0:
+                    return jsonify({"message": "Invalid number of lines."}), 400
+                # Since -0 would be the start of the log.
+                start, end = (-last, None) if last else (0, 0)
+                result = logs.read_lines(log_path, start, end)
+            else:
+                result = logs.read_lines(
+                    log_path,
+                    request.args.get("start", type=int),
+                    request.args.get("end", type=int),
+                )
+        except FileNotFoundError:
+            return return_404("Could not find log %s." % log_id)
+        except re.error as e:
+            return jsonify({"message": "Invalid regular expression: %s" % e}), 400
+
+        return jsonify(result)
+
     @app.route(
         "/async/file-picker-tree/pipeline-cwd/<project_uuid>/<pipeline_uuid>",
         methods=["GET"],
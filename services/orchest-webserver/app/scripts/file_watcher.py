@@ -0,0 +1,255 @@
+"""Watches files for changes, without reading them.
+
+Used by the log_streamer to only read the log files that changed. On
+Linux the directories of the files are watched through inotify, so that
+files being modified, created, replaced or removed are noticed right
+away. Since inotify does not notice changes made by other machines to
+network volumes, the files are also checked periodically by stat-ing
+them, which is the only mechanism if inotify is not available.
+"""
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import threading
+import time
+from typing import Dict, Hashable, Optional, Set, Tuple
+
+# Seconds between checks of all files when inotify is available,
+# respectively not available.
+RESCAN_INTERVAL = 1.0
+POLL_INTERVAL = 0.1
+
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_WATCH_MASK = (
+    _IN_MODIFY | _IN_ATTRIB | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+)
+# struct inotify_event {int wd; uint32_t mask, cookie, len; char[]}
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+
+class _Inotify:
+    """Minimal ctypes binding of the inotify API of Linux."""
+
+    def __init__(self) -> None:
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    @classmethod
+    def create(cls) -> Optional["_Inotify"]:
+        try:
+            return cls()
+        except (OSError, AttributeError, TypeError) as e:
+            logging.info("inotify is not available, polling files: %s" % e)
+            return None
+
+    def add_watch(self, path: str) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), _IN_WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed", path)
+        return wd
+
+    def rm_watch(self, wd: int) -> None:
+        # Fails if the watch was already removed by the kernel, e.g.
+        # because the directory was removed.
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self):
+        """Yields the (wd, mask, name) of the pending events."""
+        while True:
+            try:
+                buffer = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return
+            offset = 0
+            while offset < len(buffer):
+                wd, mask, _, length = _INOTIFY_EVENT.unpack_from(buffer, offset)
+                offset += _INOTIFY_EVENT.size
+                name = buffer[offset : offset + length].rstrip(b"\0")
+                offset += length
+                yield wd, mask, os.fsdecode(name)
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class FileWatcher:
+    """Tells which of the watched files might have changed.
+
+    Files are identified by a key, e.g. the session of a log viewer,
+    multiple keys can watch the same file.
+
+    Example:
+        >>> watcher = FileWatcher()
+        >>> watcher.add("viewer", "/tmp/step.log")
+        >>> watcher.wait(timeout=1)
+        {"viewer"}
+
+    """
+
+    def __init__(self, use_inotify: bool = True) -> None:
+        self._lock = threading.Lock()
+        self._paths: Dict[Hashable, str] = {}
+        # The (inode, size, mtime) of every file when last checked.
+        self._versions: Dict[Hashable, Optional[Tuple[int, int, int]]] = {}
+        # Keys that are considered changed on the next call to `wait`.
+        self._pending: Set[Hashable] = set()
+
+        self._inotify = _Inotify.create() if use_inotify else None
+        # Watched directory by watch descriptor and the other way round.
+        self._dirs: Dict[int, str] = {}
+        self._watches: Dict[str, int] = {}
+
+        self._last_rescan = time.monotonic()
+
+        # Wakes up `wait` when files are added.
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        os.set_blocking(self._wakeup_r, False)
+
+    def add(self, key: Hashable, path: str) -> None:
+        """Watches the file at `path`, which is reported as changed."""
+        with self._lock:
+            self._paths[key] = path
+            self._versions[key] = _get_version(path)
+            self._pending.add(key)
+            self._watch_dir(os.path.dirname(path))
+        os.write(self._wakeup_w, b"\0")
+
+    def remove(self, key: Hashable) -> None:
+        with self._lock:
+            path = self._paths.pop(key, None)
+            self._versions.pop(key, None)
+            self._pending.discard(key)
+            if path is None:
+                return
+
+            dir_path = os.path.dirname(path)
+            if self._inotify is not None and all(
+                os.path.dirname(p) != dir_path for p in self._paths.values()
+            ):
+                wd = self._watches.pop(dir_path, None)
+                if wd is not None:
+                    del self._dirs[wd]
+                    self._inotify.rm_watch(wd)
+
+    def wait(self, timeout: Optional[float] = None) -> Set[Hashable]:
+        """Waits for files to change.
+
+        Args:
+            timeout: Maximum number of seconds to wait for, ``None``
+                for the rescan interval of the watcher. All files are
+                checked without inotify once per interval.
+
+        Returns:
+            The keys of the files that might have changed. Can be empty
+            if the timeout elapsed.
+        """
+        interval = POLL_INTERVAL if self._inotify is None else RESCAN_INTERVAL
+        if timeout is None:
+            timeout = interval
+
+        deadline = time.monotonic() + timeout
+        fds = [self._wakeup_r]
+        if self._inotify is not None:
+            fds.append(self._inotify.fd)
+
+        while True:
+            with self._lock:
+                if self._pending:
+                    return self._pop_pending()
+
+            now = time.monotonic()
+            if now >= deadline:
+                return set()
+            select_timeout = min(deadline, self._last_rescan + interval) - now
+            ready, _, _ = select.select(fds, [], [], max(select_timeout, 0))
+
+            with self._lock:
+                if self._wakeup_r in ready:
+                    _drain(self._wakeup_r)
+                if self._inotify is not None and self._inotify.fd in ready:
+                    self._handle_events()
+                # Also when inotify events keep coming in, for the files
+                # that don't get any.
+                if time.monotonic() - self._last_rescan >= interval:
+                    self._rescan()
+
+    def close(self) -> None:
+        if self._inotify is not None:
+            self._inotify.close()
+        os.close(self._wakeup_r)
+        os.close(self._wakeup_w)
+
+    def _watch_dir(self, dir_path: str) -> None:
+        if self._inotify is None or dir_path in self._watches:
+            return
+        try:
+            wd = self._inotify.add_watch(dir_path)
+        except OSError as e:
+            # The directory does not exist (yet), the files are checked
+            # again on the next rescan.
+            logging.info("Could not watch %s: %s" % (dir_path, e))
+            return
+        self._dirs[wd] = dir_path
+        self._watches[dir_path] = wd
+
+    def _handle_events(self) -> None:
+        changed = set()
+        for wd, mask, name in self._inotify.read_events():
+            if mask & _IN_Q_OVERFLOW:
+                self._pending.update(self._paths)
+                continue
+            dir_path = self._dirs.get(wd)
+            if dir_path is None:
+                continue
+            if mask & _IN_IGNORED:
+                # The directory has been removed.
+                del self._dirs[wd]
+                del self._watches[dir_path]
+                continue
+            changed.add(os.path.join(dir_path, name))
+
+        for key, path in self._paths.items():
+            if path in changed:
+                self._versions[key] = _get_version(path)
+                self._pending.add(key)
+
+    def _rescan(self) -> None:
+        self._last_rescan = time.monotonic()
+        for key, path in self._paths.items():
+            self._watch_dir(os.path.dirname(path))
+            version = _get_version(path)
+            if version != self._versions[key]:
+                self._versions[key] = version
+                self._pending.add(key)
+
+    def _pop_pending(self) -> Set[Hashable]:
+        pending, self._pending = self._pending, set()
+        return pending
+
+
+def _get_version(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def _drain(fd: int) -> None:
+    try:
+        while os.read(fd, 4096):
+            pass
+    except BlockingIOError:
+        pass
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 
+import codecs
 import logging
 import os
 import sys
@@ -10,12 +11,25 @@ from threading import Lock
 import socketio
 
 from _orchest.internals import config as _config
+from scripts.file_watcher import FileWatcher
 
 # timeout after 2 minutes, heartbeat should be sent every minute
 HEARTBEAT_TIMEOUT = timedelta(minutes=2)
 
+# Output is emitted in frames, at most one frame per log file every
+# FRAME_INTERVAL seconds, of at most FRAME_MAX_BYTES. If more than
+# MAX_BACKLOG_BYTES of output is pending, e.g. because a step is very
+# chatty, the output in between is skipped.
+FRAME_INTERVAL = 0.05
+FRAME_MAX_BYTES = 64 * 1024
+MAX_BACKLOG_BYTES = 1024 * 1024
+
 log_file_store = {}
-file_handles = {}
+# One reader for all sessions that follow the same log, by log path.
+log_readers = {}
+
+# Tells which log files changed, by log path.
+watcher = FileWatcher()
 
 
 lock = Lock()
@@ -46,31 +60,60 @@ class LogFile:
         self.service_name = service_name
         self.pipeline_run_uuid = pipeline_run_uuid
         self.job_uuid = job_uuid
-        self.log_uuid = ""
         self.last_heartbeat = datetime.now()
 
 
+class LogReader:
+    """Reads a log file for all the sessions that follow it.
+
+    A session corresponds to a log viewer in the client.
+    """
+
+    def __init__(self, log_path, file):
+        self.log_path = log_path
+        self.file = file
+        self.session_uuids = set()
+        self.log_uuid = ""
+        # Offset of the output, i.e. after the log_uuid line.
+        self.output_offset = 0
+        # Output can end in the middle of a multi-byte character.
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+
 def file_reader_loop(sio):
 
     logging.info("Entered file_reader_loop")
 
+    # Logs with more output than fits in a frame.
+    pending = set()
+
     while True:
 
+        # Only the log files that changed are read, the watcher returns
+        # at least once per second to check for heartbeat timeouts.
+        changed = watcher.wait(timeout=0 if pending else None)
+        changed |= pending
+        pending = set()
+
         with lock:
 
             # list() used since entries can be removed during loop
             for session_uuid in list(log_file_store):
                 check_timeout(session_uuid)
 
-            for session_uuid in log_file_store.keys():
+            for log_path in changed:
+                if log_path not in log_readers:
+                    continue
                 try:
-                    read_emit_all_content(file_handles[session_uuid], sio, session_uuid)
+                    if read_emit_all_content(log_readers[log_path], sio):
+                        pending.add(log_path)
                 except Exception as e:
                     logging.info(
                         "call to read_emit_all_content failed %s (%s)" % (e, type(e))
                     )
 
-        sio.sleep(0.01)
+        if changed:
+            sio.sleep(FRAME_INTERVAL)
 
 
 def check_timeout(session_uuid):
@@ -93,82 +136,129 @@ def check_timeout(session_uuid):
         )
 
 
-def read_emit_all_content(file, sio, session_uuid):
+def read_emit_all_content(reader, sio):
+    """Emits a frame of the content that has been appended to the log.
 
-    if session_uuid not in log_file_store:
-        logging.info("session_uuid[%s] not in log_file_store" % session_uuid)
-        return
+    A new log, i.e. the log of another run of the step or service,
+    either replaces the log file, which changes its inode, or truncates
+    it. The first line of a log is its log_uuid, the viewers are reset
+    once it has been read.
 
-    if session_uuid not in file_handles:
-        logging.info("session_uuid[%s] not in file_handles" % session_uuid)
-        return
+    Returns:
+        True if there is more content than fitted in the frame.
+    """
 
-    # check if log_uuid is current log_uuid
     try:
-        latest_log_file = open(get_log_path(log_file_store[session_uuid]), "rb")
-        latest_log_file.seek(0)
-        read_log_uuid = latest_log_file.readline().decode("utf-8").strip()
-    except IOError as e:
-        logging.info("Could not read latest log file: %s" % e)
-        return
-    except Exception as e:
-        logging.error(
-            "Could not read latest_log_file for session_uuid[%s]. Error: %s [%s]."
-            % (session_uuid, e, type(e))
-        )
-        return
+        stat = os.stat(reader.log_path)
+    except FileNotFoundError:
+        # Removed before a new run, wait for the new log file.
+        return False
+
+    file = reader.file
+    if stat.st_ino != os.fstat(file.fileno()).st_ino or stat.st_size < file.tell():
+        try:
+            latest_log_file = open(reader.log_path, "rb")
+        except IOError as e:
+            logging.info("Could not read latest log file: %s" % e)
+            return False
 
-    if (
-        read_log_uuid != log_file_store[session_uuid].log_uuid
-        and len(read_log_uuid) == 36
-    ):  # length of valid uuid
+        # new log file detected - swap file handle
+        close_file_handle(reader)
+        reader.file = file = latest_log_file
+        reader.log_uuid = ""
+
+    if not reader.log_uuid:
+        read_log_uuid = file.readline()
+        # length of valid uuid, it might not have been written entirely
+        if not read_log_uuid.endswith(b"\n") or len(read_log_uuid.strip()) != 36:
+            file.seek(0)
+            return False
+
+        reader.log_uuid = read_log_uuid.decode("utf-8").strip()
+        reader.output_offset = file.tell()
+        reader.decoder.reset()
 
         logging.info(
             "New log_uuid found, resetting pty."
-            + "Debug info: read_log_uuid[%s] stored_log_uuid[%s] session_uuid[%s]."
-            % (read_log_uuid, log_file_store[session_uuid].log_uuid, session_uuid)
+            + "Debug info: log_uuid[%s] log_path[%s]."
+            % (reader.log_uuid, reader.log_path)
         )
 
         sio.emit(
             "pty-log-manager",
-            {"action": "pty-reset", "session_uuid": session_uuid},
+            {"action": "pty-reset", "session_uuids": list(reader.session_uuids)},
             namespace="/pty",
         )
 
-        log_file_store[session_uuid].log_uuid = read_log_uuid
-
-        # new log file detected - swap file handle
-        close_file_handle(session_uuid)
-        file_handles[session_uuid] = latest_log_file
-
-        return
-    else:
-
-        try:
-            latest_log_file.close()
-        except IOError as e:
-            logging.info(
-                "Failed to close new log file %s for session_uuid %s"
-                % (e, session_uuid)
-            )
+    skipped = 0
+    if stat.st_size - file.tell() > MAX_BACKLOG_BYTES:
+        skipped = skip_to_tail(file, stat.st_size - MAX_BACKLOG_BYTES)
+        reader.decoder.reset()
 
     try:
-        content = file.read().decode("utf-8")
-
-        if content != "":
-            sio.emit(
-                "pty-log-manager",
-                {
-                    "output": content,
-                    "action": "pty-broadcast",
-                    "session_uuid": session_uuid,
-                },
-                namespace="/pty",
-            )
+        content = reader.decoder.decode(file.read(FRAME_MAX_BYTES))
     except IOError as e:
         raise Exception("IOError reading log file %s" % e)
-    except Exception as e:
-        raise e
+
+    if content != "" or skipped:
+        emit_output(sio, reader.session_uuids, content, skipped)
+
+    return file.tell() < stat.st_size
+
+
+def skip_to_tail(file, offset):
+    """Seeks to the first line that starts after the offset.
+
+    Returns:
+        The number of bytes that have been skipped.
+    """
+    start = file.tell()
+    file.seek(offset)
+    file.readline()
+    return file.tell() - start
+
+
+def emit_output(sio, session_uuids, content, skipped=0):
+    sio.emit(
+        "pty-log-manager",
+        {
+            "output": content,
+            "skipped": skipped,
+            "action": "pty-broadcast",
+            "session_uuids": list(session_uuids),
+        },
+        namespace="/pty",
+    )
+
+
+def emit_backlog(reader, session_uuid, sio):
+    """Catches a new session up with the output read by the reader."""
+    sio.emit(
+        "pty-log-manager",
+        {"action": "pty-reset", "session_uuids": [session_uuid]},
+        namespace="/pty",
+    )
+
+    # Read through the handle of the reader, without moving it, so that
+    # the output is continued by the next frame.
+    end = reader.file.tell()
+    start = max(reader.output_offset, end - MAX_BACKLOG_BYTES)
+    content = os.pread(reader.file.fileno(), end - start, start)
+    if start > reader.output_offset:
+        # Start at the first complete line.
+        content = content[content.find(b"\n") + 1 :]
+    skipped = end - reader.output_offset - len(content)
+
+    # The last character might be incomplete, it is decoded with the
+    # next frame.
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    for i in range(0, len(content), FRAME_MAX_BYTES):
+        emit_output(
+            sio,
+            [session_uuid],
+            decoder.decode(content[i : i + FRAME_MAX_BYTES]),
+            skipped if i == 0 else 0,
+        )
 
 
 # TODO: reuse (between Flask app and process scripts)
@@ -221,17 +311,34 @@ def get_log_path(log_file):
 
 
 def clear_log_file(session_uuid):
-    close_file_handle(session_uuid)
     try:
-        del log_file_store[session_uuid]
+        log_file = log_file_store.pop(session_uuid)
     except Exception:
         logging.error("Key not in log_file_store: %s" % session_uuid)
+        return
+
+    log_path = get_log_path(log_file)
+    reader = log_readers.get(log_path)
+    if reader is None:
+        return
+    reader.session_uuids.discard(session_uuid)
+    if not reader.session_uuids:
+        watcher.remove(log_path)
+        close_file_handle(reader)
+        del log_readers[log_path]
 
 
-def create_file_handle(log_file):
+def create_file_handle(log_file, sio):
 
     log_path = get_log_path(log_file)
 
+    reader = log_readers.get(log_path)
+    if reader is not None:
+        if reader.log_uuid:
+            emit_backlog(reader, log_file.session_uuid, sio)
+        reader.session_uuids.add(log_file.session_uuid)
+        return True
+
     try:
         # this avoids a problem where opening the logs of a step
         # when the file is not there and then running the step
@@ -241,7 +348,10 @@ def create_file_handle(log_file):
 
         file = open(log_path, "rb")
         file.seek(0)
-        file_handles[log_file.session_uuid] = file
+        reader = LogReader(log_path, file)
+        reader.session_uuids.add(log_file.session_uuid)
+        log_readers[log_path] = reader
+        watcher.add(log_path, log_path)
         return True
     except IOError as ioe:
         logging.error(
@@ -251,15 +361,15 @@ def create_file_handle(log_file):
     return False
 
 
-def close_file_handle(session_uuid):
+def close_file_handle(reader):
     try:
-        file_handles[session_uuid].close()
+        reader.file.close()
     except IOError as exc:
         logging.debug("Error closing log file %s" % exc)
     except Exception as e:
         logging.debug(
-            "close_file_handle filed for session_uuid[%s] with error: %s"
-            % (session_uuid, e)
+            "close_file_handle filed for log_path[%s] with error: %s"
+            % (reader.log_path, e)
         )
 
 
@@ -311,7 +421,7 @@ def main():
 
                 if data["session_uuid"] not in log_file_store:
 
-                    if create_file_handle(log_file):
+                    if create_file_handle(log_file, sio):
                         log_file_store[data["session_uuid"]] = log_file
                         logging.info(
                             "Added session_uuid (%s). Sessions active: %d"
@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+from scripts.file_watcher import FileWatcher
+
+
+@pytest.fixture(params=[True, False], ids=["inotify", "polling"])
+def watcher(request):
+    watcher = FileWatcher(use_inotify=request.param)
+    yield watcher
+    watcher.close()
+
+
+def test_file_watcher(watcher, tmp_path):
+    path = str(tmp_path / "step.log")
+    with open(path, "w") as f:
+        f.write("uuid\n")
+
+    watcher.add("viewer", path)
+    assert watcher.wait(timeout=0) == {"viewer"}
+    assert watcher.wait(timeout=0.2) == set()
+
+    with open(path, "a") as f:
+        f.write("output\n")
+    assert watcher.wait(timeout=2) == {"viewer"}
+
+    # Replaced by the log of another run.
+    os.remove(path)
+    with open(path, "w") as f:
+        f.write("uuid\n")
+    changed = set()
+    while not changed:
+        changed = watcher.wait(timeout=2)
+    assert changed == {"viewer"}
+
+    watcher.remove("viewer")
+    with open(path, "a") as f:
+        f.write("output\n")
+    assert watcher.wait(timeout=1.2) == set()
+
+
+def test_file_watcher_missing_directory(watcher, tmp_path):
+    path = str(tmp_path / "logs" / "step.log")
+    watcher.add("viewer", path)
+    assert watcher.wait(timeout=0) == {"viewer"}
+
+    os.mkdir(tmp_path / "logs")
+    with open(path, "w") as f:
+        f.write("uuid\n")
+    assert watcher.wait(timeout=2) == {"viewer"}
@@ -0,0 +1,72 @@
+import uuid
+
+import pytest
+
+from scripts import log_streamer
+
+
+class SioMock:
+    def __init__(self):
+        self.events = []
+
+    def emit(self, event, data, namespace):
+        self.events.append(data)
+
+    def pop_events(self):
+        events, self.events = self.events, []
+        return events
+
+
+@pytest.fixture
+def log_path(tmp_path, monkeypatch):
+    log_path = str(tmp_path / "step.log")
+    monkeypatch.setattr(log_streamer, "get_log_path", lambda log_file: log_path)
+    monkeypatch.setattr(log_streamer, "log_file_store", {})
+    monkeypatch.setattr(log_streamer, "log_readers", {})
+    yield log_path
+    for session_uuid in list(log_streamer.log_file_store):
+        log_streamer.clear_log_file(session_uuid)
+
+
+def add_session(session_uuid, sio):
+    log_file = log_streamer.LogFile(
+        session_uuid, "pipeline", "project", "path", step_uuid="step"
+    )
+    assert log_streamer.create_file_handle(log_file, sio)
+    log_streamer.log_file_store[session_uuid] = log_file
+
+
+def test_log_streamer_shared_reader(log_path, monkeypatch):
+    monkeypatch.setattr(log_streamer, "FRAME_MAX_BYTES", 100)
+    monkeypatch.setattr(log_streamer, "MAX_BACKLOG_BYTES", 1000)
+    sio = SioMock()
+    add_session("a", sio)
+    add_session("b", sio)
+    assert len(log_streamer.log_readers) == 1
+    reader = log_streamer.log_readers[log_path]
+
+    with open(log_path, "w") as f:
+        f.write(str(uuid.uuid4()) + "\n" + "line\n" * 10)
+    assert not log_streamer.read_emit_all_content(reader, sio)
+    reset, output = sio.pop_events()
+    assert reset["action"] == "pty-reset"
+    assert sorted(output["session_uuids"]) == ["a", "b"]
+    assert output["output"] == "line\n" * 10
+
+    # The output of chatty steps is skipped.
+    with open(log_path, "a") as f:
+        f.write("output\n" * 1000)
+    assert log_streamer.read_emit_all_content(reader, sio)
+    (output,) = sio.pop_events()
+    # Continued at the first line within the last 1000 bytes.
+    assert output["skipped"] == 7000 - 994
+    assert output["output"] == "output\n" * 14 + "ou"
+
+    # A new session is caught up with the output read so far.
+    add_session("c", sio)
+    reset, *outputs = sio.pop_events()
+    assert reset["session_uuids"] == ["c"]
+    assert all(output["session_uuids"] == ["c"] for output in outputs)
+    backlog = "".join(output["output"] for output in outputs)
+    assert backlog.endswith("output\n" * 14 + "ou")
+    assert outputs[0]["skipped"] + len(backlog) == 50 + 6006 + 100
@@ -0,0 +1,116 @@
+import os
+import uuid
+
+import pytest
+
+from app.core import logs
+
+
+@pytest.fixture
+def log_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(logs, "INDEX_INTERVAL_BYTES", 100)
+    monkeypatch.setattr(logs, "SEARCH_CHUNK_BYTES", 50)
+    yield str(tmp_path / "step.log")
+
+
+def write_log(log_path, lines, replace=True):
+    if replace:
+        # Like the pipeline runner, which removes the log of a step.
+        if os.path.exists(log_path):
+            os.remove(log_path)
+        with open(log_path, "w") as f:
+            f.write(f"{uuid.uuid4()}\n")
+    with open(log_path, "a") as f:
+        f.writelines(f"{line}\n" for line in lines)
+
+
+def test_read_lines(log_path):
+    write_log(log_path, [f"line {i}" for i in range(1000)])
+
+    result = logs.read_lines(log_path, start=500, end=503)
+    assert result == {
+        "lines": ["line 500", "line 501", "line 502"],
+        "start": 500,
+        "total_lines": 1000,
+    }
+
+    result = logs.read_lines(log_path, start=-2)
+    assert result["lines"] == ["line 998", "line 999"]
+    assert result["start"] == 998
+
+    assert logs.read_lines(log_path, start=990, end=2000)["lines"] == [
+        f"line {i}" for i in range(990, 1000)
+    ]
+    assert logs.read_lines(log_path, start=2000)["lines"] == []
+
+
+def test_read_lines_incomplete_line(log_path):
+    write_log(log_path, ["a"])
+    with open(log_path, "a") as f:
+        f.write("incomplete")
+
+    result = logs.read_lines(log_path)
+    assert result["lines"] == ["a", "incomplete"]
+    assert result["total_lines"] == 2
+
+    with open(log_path, "a") as f:
+        f.write(" line\nb\n")
+    assert logs.read_lines(log_path, start=1)["lines"] == ["incomplete line", "b"]
+
+
+def test_index_is_extended(log_path):
+    write_log(log_path, [f"line {i}" for i in range(100)])
+    logs.read_lines(log_path, start=-1)
+    index = logs.LogIndex.read(logs.get_index_path(log_path))
+    assert index.lines == 101
+    assert len(index.checkpoint_lines) > 1
+
+    write_log(log_path, [f"line {i}" for i in range(100, 200)], replace=False)
+    assert logs.read_lines(log_path, start=150, end=151)["lines"] == ["line 150"]
+    extended = logs.LogIndex.read(logs.get_index_path(log_path))
+    assert extended.lines == 201
+    assert extended.checkpoint_offsets[: len(index.checkpoint_offsets)] == (
+        index.checkpoint_offsets
+    )
+
+    # Every checkpoint is at the start of its line.
+    with open(log_path, "rb") as f:
+        content = f.read()
+    for line, offset in zip(extended.checkpoint_lines, extended.checkpoint_offsets):
+        assert content[:offset].count(b"\n") == line
+
+
+def test_index_is_invalidated(log_path):
+    write_log(log_path, [f"old {i}" for i in range(100)])
+    assert logs.read_lines(log_path, start=50, end=51)["lines"] == ["old 50"]
+
+    write_log(log_path, [f"new {i}" for i in range(200)])
+    assert logs.read_lines(log_path, start=50, end=51)["lines"] == ["new 50"]
+    assert logs.read_lines(log_path)["total_lines"] == 200
+
+
+def test_search(log_path):
+    write_log(log_path, [f"line {i}" for i in range(100)])
+
+    pattern = logs.compile_pattern("line 1.")
+    result = logs.search(log_path, pattern)
+    assert result["matches"] == []
+    assert result["next_line"] is None
+
+    pattern = logs.compile_pattern(r"line 1\d$", regex=True)
+    result = logs.search(log_path, pattern, max_matches=4)
+    assert result["matches"] == [
+        {"line": i, "text": f"line {i}"} for i in range(10, 14)
+    ]
+    assert result["next_line"] == 14
+
+    result = logs.search(log_path, pattern, start=14)
+    assert [m["line"] for m in result["matches"]] == list(range(14, 20))
+    assert result["next_line"] is None
+
+
+def test_search_match_at_end(log_path):
+    write_log(log_path, ["a", "b", "needle"])
+    result = logs.search(log_path, logs.compile_pattern("needle"), max_matches=1)
+    assert result["matches"] == [{"line": 2, "text": "needle"}]
+    assert result["next_line"] is None
@@ -0,0 +1,33 @@
+import uuid
+
+import pytest
+
+
+def _get_log(client, project_uuid, pipeline_uuid, **query):
+    return client.get(
+        f"/async/logs/{project_uuid}/{pipeline_uuid}/step-uuid", query_string=query
+    )
+
+
+@pytest.mark.parametrize("arg", ["job_uuid", "pipeline_run_uuid"])
+def test_pipeline_log_job_and_run_are_given_together(client, project, arg):
+    resp = _get_log(client, project.uuid, str(uuid.uuid4()), **{arg: uuid.uuid4()})
+    assert resp.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "pipeline_uuid,query",
+    [
+        ("not-a-uuid", {}),
+        (str(uuid.uuid4()), {"job_uuid": "..", "pipeline_run_uuid": uuid.uuid4()}),
+        (str(uuid.uuid4()), {"job_uuid": uuid.uuid4(), "pipeline_run_uuid": ".."}),
+    ],
+)
+def test_pipeline_log_invalid_uuids(client, project, pipeline_uuid, query):
+    resp = _get_log(client, project.uuid, pipeline_uuid, **query)
+    assert resp.status_code == 400
+
+
+def test_pipeline_log_unknown_project(client):
+    resp = _get_log(client, str(uuid.uuid4()), str(uuid.uuid4()))
+    assert resp.status_code == 404
@@ -28,7 +28,7 @@ const LogViewer: React.FC<ILogViewerProps> = (props) => {
 
   const generateSessionUuid = () => setSessionUuid(uuidv4());
 
-  const onPtyOutputHandler = (data) => {
+  const onPtyOutputHandler = (data, ack?: () => void) => {
     if (data.session_uuid == sessionUuid) {
       let lines = data.output.split("\n");
       for (let x = 0; x < lines.length; x++) {
@@ -38,6 +38,9 @@ const LogViewer: React.FC<ILogViewerProps> = (props) => {
           refManager.refs.term.terminal.write(lines[x] + "\n\r");
         }
       }
+      // The server holds back output until the previous output has
+      // been acknowledged.
+      if (ack) ack();
     }
   };
 
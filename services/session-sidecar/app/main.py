@@ -1,18 +1,26 @@
+import asyncio
 import json
 import logging
 import os
 import re
 import signal
-import sys
-import time
 import uuid
-from multiprocessing.pool import ThreadPool
-from typing import List
+from typing import Callable, Dict, Iterable, List
 
-from kubernetes import client, config, watch
+import aiohttp
+from kubernetes_asyncio import client, config, watch
 
 from config import Config
 
+# Seconds between flushes of the buffered service logs.
+FLUSH_INTERVAL = 0.5
+# Seconds after which the k8s API ends the pod watch, which is then
+# re-established from the last seen resource version.
+WATCH_TIMEOUT = 60
+
+_HTTP_STATUS_GONE = 410
+_IMAGE_PULL_ERRORS = ["ImagePullBackOff", "ErrImagePull"]
+
 
 def get_log_dir_path() -> str:
     return os.path.join(
@@ -42,71 +50,205 @@ def get_services_to_follow() -> List[str]:
     return services_to_follow
 
 
-def follow_service_logs(service):
-    config.load_incluster_config()
-    k8s_core_api = client.CoreV1Api()
+class ServiceLog:
+    """The log file of a service, written through a buffer.
 
-    logging.info(f"Initiating logs file for service {service}.")
-    with open(get_service_log_file_path(service), "w") as log_file:
+    The buffer is flushed periodically by `flush_periodically`, instead
+    of after every line.
+    """
+
+    def __init__(self, service: str) -> None:
+        self.service = service
+        logging.info(f"Initiating logs file for service {service}.")
+        self._file = open(get_service_log_file_path(service), "wb")
         # Used by the log_streamer.py to infer that a new session
         # has started, i.e. the previous logs can be discarded.  The
         # file streamer has this contract to understand that some
         # logs belong to a different session, i.e. different UUID
         # implies different session.
-        log_file.write("%s\n" % str(uuid.uuid4()))
-        log_file.flush()
+        self._file.write(b"%s\n" % str(uuid.uuid4()).encode())
+        self._file.flush()
+        self._ends_with_newline = True
 
-        while True:
-            pods = k8s_core_api.list_namespaced_pod(
-                namespace=Config.NAMESPACE,
-                label_selector=f"session_uuid={Config.SESSION_UUID},app={service}",
+    def write(self, data: bytes) -> None:
+        if data:
+            self._file.write(data)
+            self._ends_with_newline = data.endswith(b"\n")
+
+    def write_message(self, message: str) -> None:
+        """Writes a message of the sidecar on a line of its own."""
+        if not self._ends_with_newline:
+            self.write(b"\n")
+        self.write(f"{message}\n".encode())
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        # Logs end with a newline, like they used to when they were
+        # written line by line.
+        if not self._ends_with_newline:
+            self.write(b"\n")
+        self._file.close()
+
+
+async def flush_periodically(service_logs: Iterable[ServiceLog]) -> None:
+    while True:
+        await asyncio.sleep(FLUSH_INTERVAL)
+        for service_log in service_logs:
+            service_log.flush()
+
+
+def has_image_pull_failed(pod: client.V1Pod) -> bool:
+    for status in pod.status.container_statuses or []:
+        waiting = status.state.waiting if status.state is not None else None
+        if waiting is not None and waiting.reason in _IMAGE_PULL_ERRORS:
+            return True
+    return False
+
+
+async def watch_session_pods(
+    k8s_core_api: client.CoreV1Api, handle_pod: Callable[[client.V1Pod], bool]
+) -> None:
+    """Passes the pods of the session to `handle_pod` as they change.
+
+    A single watch is used for the pods of all services of the session.
+    Returns once `handle_pod` returns True.
+    """
+    label_selector = f"session_uuid={Config.SESSION_UUID}"
+    resource_version = None
+    while True:
+        if resource_version is None:
+            pods = await k8s_core_api.list_namespaced_pod(
+                namespace=Config.NAMESPACE, label_selector=label_selector
             )
-            if not pods.items:
-                logging.info(f"{service} is not up yet.")
-                continue
+            resource_version = pods.metadata.resource_version
+            for pod in pods.items:
+                if handle_pod(pod):
+                    return
 
+        w = watch.Watch()
+        try:
+            async with w.stream(
+                k8s_core_api.list_namespaced_pod,
+                namespace=Config.NAMESPACE,
+                label_selector=label_selector,
+                resource_version=resource_version,
+                timeout_seconds=WATCH_TIMEOUT,
+            ) as stream:
+                async for event in stream:
+                    if event["type"] != "DELETED" and handle_pod(event["object"]):
+                        return
+            resource_version = w.resource_version or resource_version
+        except client.ApiException as e:
+            if e.status != _HTTP_STATUS_GONE:
+                raise
+            # The resource version has expired, the pods are listed
+            # again to not miss any changes.
+            resource_version = None
+
+
+async def follow_service_logs(
+    k8s_core_api: client.CoreV1Api, service_log: ServiceLog, pod_name: str
+) -> None:
+    service = service_log.service
+    logging.info(f"Getting logs from service {service}, pod {pod_name}.")
+    response = await k8s_core_api.read_namespaced_pod_log(
+        name=pod_name,
+        container=f"{service}-{Config.SESSION_UUID}",
+        namespace=Config.NAMESPACE,
+        follow=True,
+        _preload_content=False,
+        # The logs are followed for as long as the service runs.
+        _request_timeout=aiohttp.ClientTimeout(),
+    )
+    try:
+        async for data in response.content.iter_any():
+            service_log.write(data)
+    finally:
+        response.release()
+    logging.info(f"No more logs for {service}.")
+
+
+async def follow_session_logs(services: List[str]) -> None:
+    """Writes the logs of the given services of the session to disk.
+
+    The services are followed concurrently on the running event loop,
+    which needs a single pod watch to find out when the services are
+    up.
+    """
+    # Otherwise the watch would be open for the entire session.
+    if not services:
+        logging.info("No services to follow.")
+        return
+
+    config.load_incluster_config()
+    service_logs = {service: ServiceLog(service) for service in services}
+    flusher = asyncio.create_task(flush_periodically(service_logs.values()))
+    followers: Dict[str, asyncio.Task] = {}
+
+    async with client.ApiClient() as api_client:
+        k8s_core_api = client.CoreV1Api(api_client)
+        # Services for which the pod is not up yet.
+        pending = set(services)
+        # Services for which a failed image pull has been reported.
+        pull_failed = set()
+
+        def handle_pod(pod: client.V1Pod) -> bool:
             # Note: this means that the session sidecar makes use of the
             # fact that user services are single pod.
-            pod = pods.items[0]
+            service = (pod.metadata.labels or {}).get("app")
+            if service not in pending:
+                return False
 
             phase = pod.status.phase
             logging.info(f"{service} phase is {phase}.")
             if phase in ["Failed", "Running", "Succeeded"]:
-                break
+                follower = follow_service_logs(
+                    k8s_core_api, service_logs[service], pod.metadata.name
+                )
+                followers[service] = asyncio.create_task(follower)
+                pending.remove(service)
             elif phase == "Unknown":
-                log_file.write("Unknown service issue.")
-                log_file.flush()
-                return
+                service_logs[service].write_message("Unknown service issue.")
+                pending.remove(service)
+            elif has_image_pull_failed(pod):
+                # The pull is retried, the service stays pending.
+                logging.info(f"{service} image pull failed.")
+                if service not in pull_failed:
+                    service_logs[service].write_message("Image pull failed.")
+                    pull_failed.add(service)
             else:  # Pending
                 logging.info(f"{service} is pending.")
-                # Based on the state of the service it may return an
-                # object without a get apparently.
-                if hasattr(pod, "get"):
-                    msg = pod.get("message", "")
-                    if "ImagePullBackOff" in msg or "ErrImagePull" in msg:
-                        logging.info(f"{service} image pull failed.")
-                        log_file.write("Image pull failed.")
-                        log_file.flush()
-                        return
-            time.sleep(1)
+            return not pending
 
-        logging.info(f"Getting logs from service {service}, pod {pod.metadata.name}.")
-        w = watch.Watch()
-        for event in w.stream(
-            k8s_core_api.read_namespaced_pod_log,
-            name=pod.metadata.name,
-            container=f"{service}-{Config.SESSION_UUID}",
-            namespace=Config.NAMESPACE,
-            follow=True,
-        ):
-            log_file.write(event)
-            log_file.write("\n")
-            log_file.flush()
-        logging.info(f"No more logs for {service}.")
+        try:
+            await watch_session_pods(k8s_core_api, handle_pod)
+            results = await asyncio.gather(*followers.values(), return_exceptions=True)
+            for service, result in zip(followers, results):
+                if isinstance(result, Exception):
+                    logging.error(f"Failed to follow {service}: {result}")
+        finally:
+            for follower in followers.values():
+                follower.cancel()
+            await asyncio.gather(*followers.values(), return_exceptions=True)
+            flusher.cancel()
+            for service_log in service_logs.values():
+                service_log.close()
+
+
+async def main(services: List[str]) -> None:
+    # Stops following the services, the logs are flushed on the way
+    # out.
+    task = asyncio.current_task()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, task.cancel)
+    try:
+        await follow_session_logs(services)
+    except asyncio.CancelledError:
+        logging.info("Stopped following services.")
 
 
 if __name__ == "__main__":
-    signal.signal(signal.SIGTERM, lambda *args, **kwargs: sys.exit(0))
     logging.getLogger().setLevel(logging.INFO)
 
     # Needs to be here since the logs directory does not exists for
@@ -135,5 +277,4 @@ if __name__ == "__main__":
     logging.info(
         f"Following services: {services_to_follow} for {Config.SESSION_TYPE} session."
     )
-    pool = ThreadPool(len(services_to_follow))
-    pool.map(follow_service_logs, services_to_follow)
+    asyncio.run(main(services_to_follow))